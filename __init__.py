@@ -13,15 +13,10 @@
 # limitations under the License.
 from .paddleocr import (
     PaddleOCR,
-    PPStructure,
     draw_ocr,
-    draw_structure_result,
-    save_structure_res,
     download_with_progressbar,
-    sorted_layout_boxes,
-    convert_info_docx,
-    to_excel,
 )
+import importlib
 import importlib.metadata as importlib_metadata
 
 try:
@@ -40,3 +35,18 @@ __all__ = [
     "convert_info_docx",
     "to_excel",
 ]
+
+
+def __getattr__(name):
+    # the structure system and layout recovery are imported on first access,
+    # see paddleocr._LAZY_ATTRS
+    if name in (
+        "PPStructure",
+        "draw_structure_result",
+        "save_structure_res",
+        "to_excel",
+        "sorted_layout_boxes",
+        "convert_info_docx",
+    ):
+        return getattr(importlib.import_module(".paddleocr", __name__), name)
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
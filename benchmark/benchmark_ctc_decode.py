@@ -0,0 +1,129 @@
+# Copyright (c) 2024 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Micro-benchmark of CTCLabelDecode top-k candidate extraction:
+the per-character loop (`decode`) against the vectorized batch path (`decode_topk`),
+and of the training / eval path (`decode_fast` feeding `RecMetric`) against
+decoding the same batch with candidates.
+
+python3 benchmark/benchmark_ctc_decode.py --batch_size 6 --seq_len 40
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+__dir__ = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(__dir__, "..")))
+
+from ppocr.metrics.rec_metric import RecMetric
+from ppocr.postprocess.rec_postprocess import CTCLabelDecode
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--char_dict_path",
+        type=str,
+        default=os.path.join(__dir__, "../ppocr/utils/dict/chinese_cht_dict.txt"),
+    )
+    parser.add_argument("--batch_size", type=int, default=6)
+    parser.add_argument("--seq_len", type=int, default=40)
+    parser.add_argument("--topk", type=int, default=3)
+    parser.add_argument("--blank_ratio", type=float, default=0.5)
+    parser.add_argument("--repeat", type=int, default=20)
+    return parser.parse_args()
+
+
+def synthetic_preds(batch_size, seq_len, num_classes, blank_ratio, seed=0):
+    rng = np.random.RandomState(seed)
+    logits = rng.standard_normal((batch_size, seq_len, num_classes)).astype(np.float32)
+    path = rng.randint(1, num_classes, size=(batch_size, seq_len))
+    path[rng.rand(batch_size, seq_len) < blank_ratio] = 0
+    np.put_along_axis(logits, path[..., None], 12.0, axis=2)
+    logits -= logits.max(axis=2, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=2, keepdims=True)
+
+
+def timeit(func, repeat):
+    func()
+    st = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - st) / repeat
+
+
+def main(args):
+    post_process = CTCLabelDecode(
+        character_dict_path=args.char_dict_path, use_space_char=True, topk=args.topk
+    )
+    num_classes = len(post_process.character)
+    preds = synthetic_preds(
+        args.batch_size, args.seq_len, num_classes, args.blank_ratio
+    )
+    preds_idx = preds.argmax(axis=2)
+
+    loop_res = post_process.decode(preds_idx, preds)
+    vec_res = post_process.decode_topk(preds)
+    assert [r[0] for r in loop_res] == [r[0] for r in vec_res], "text mismatch"
+
+    num_chars = sum(len(r[1]) for r in vec_res)
+    loop_time = timeit(lambda: post_process.decode(preds_idx, preds), args.repeat)
+    vec_time = timeit(lambda: post_process.decode_topk(preds), args.repeat)
+    print(
+        "preds shape: {}, emitted chars: {}, topk: {}".format(
+            list(preds.shape), num_chars, args.topk
+        )
+    )
+    print("loop decode:       {:.3f} ms / batch".format(loop_time * 1000))
+    print("vectorized decode: {:.3f} ms / batch".format(vec_time * 1000))
+    print("speedup: {:.1f}x".format(loop_time / max(vec_time, 1e-9)))
+
+    # eval: decode with the labels and update the metric, as tools/program.eval
+    labels = preds_idx.copy()
+    labels[:, 1:][labels[:, 1:] == labels[:, :-1]] = 0
+    metric = RecMetric()
+    eval_times = {}
+    for decode_mode in ["candidates", "fast"]:
+        post_process.decode_mode = decode_mode
+
+        def eval_batch():
+            post_result = post_process(preds, labels)
+            if decode_mode == "candidates":
+                # RecMetric reads (text, conf) pairs
+                (text_list, _), label_list = post_result
+                post_result = [(text, 0.0) for text in text_list], label_list
+            metric(post_result)
+
+        eval_times[decode_mode] = timeit(eval_batch, args.repeat)
+        print(
+            "eval {:>10}: {:.3f} ms / batch, {:.0f} samples / s".format(
+                decode_mode,
+                eval_times[decode_mode] * 1000,
+                args.batch_size / eval_times[decode_mode],
+            )
+        )
+    print(
+        "eval speedup: {:.1f}x".format(
+            eval_times["candidates"] / max(eval_times["fast"], 1e-9)
+        )
+    )
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,132 @@
+# Copyright (c) 2024 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Benchmark of the DB post-processing per page: the contour loop of the `fast`
+and `slow` score modes against the connected component extraction of `cc`.
+
+Without a det model at hand, the probability maps are made from the images:
+their dark strokes are merged into text lines and blurred at the borders.
+With --det_model_dir the maps of the det model are used instead.
+
+python3 benchmark/benchmark_db_postprocess.py --image_dir tests/test_files
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+__dir__ = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(__dir__, "..")))
+
+from ppocr.postprocess.db_postprocess import DBPostProcess
+from ppocr.utils.utility import get_image_file_list
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--image_dir", type=str, default="tests/test_files")
+    parser.add_argument("--det_model_dir", type=str, default=None)
+    parser.add_argument("--limit_side_len", type=int, default=960)
+    parser.add_argument("--thresh", type=float, default=0.3)
+    parser.add_argument("--box_thresh", type=float, default=0.6)
+    parser.add_argument("--unclip_ratio", type=float, default=1.5)
+    parser.add_argument("--modes", type=str, default="fast,slow,cc")
+    parser.add_argument("--repeat", type=int, default=5)
+    return parser.parse_args()
+
+
+def text_prob_map(img, limit_side_len):
+    h, w = img.shape[:2]
+    ratio = min(1.0, limit_side_len / max(h, w))
+    resize_h = max(32, int(round(h * ratio / 32)) * 32)
+    resize_w = max(32, int(round(w * ratio / 32)) * 32)
+    gray = cv2.cvtColor(cv2.resize(img, (resize_w, resize_h)), cv2.COLOR_BGR2GRAY)
+    ink = cv2.adaptiveThreshold(
+        gray, 1, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 25, 15
+    )
+    lines = cv2.morphologyEx(ink, cv2.MORPH_CLOSE, np.ones((3, 9), np.uint8))
+    lines = cv2.morphologyEx(lines, cv2.MORPH_OPEN, np.ones((2, 2), np.uint8))
+    prob = cv2.GaussianBlur(lines.astype(np.float32), (5, 5), 0)
+    prob = 1 / (1 + np.exp(-12 * (prob - 0.5)))
+    return prob, [h, w, resize_h / h, resize_w / w]
+
+
+def model_prob_maps(args, images):
+    import tools.infer.utility as utility
+    from ppocr.data import transform
+    from tools.infer.predict_det import TextDetector
+
+    det_args = utility.init_args().parse_args(
+        [
+            "--det_model_dir",
+            args.det_model_dir,
+            "--det_limit_side_len",
+            str(args.limit_side_len),
+        ]
+    )
+    detector = TextDetector(det_args)
+    maps = []
+    for img in images:
+        img_data, shape_list = transform({"image": img}, detector.preprocess_op)
+        outputs = detector._run_predictor(img_data[None].copy())
+        maps.append((outputs[0][0, 0], list(shape_list)))
+    return maps
+
+
+def timeit(func, repeat):
+    st = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - st) / repeat
+
+
+def main(args):
+    images = [cv2.imread(path) for path in get_image_file_list(args.image_dir)]
+    images = [img for img in images if img is not None]
+    if args.det_model_dir:
+        maps = model_prob_maps(args, images)
+    else:
+        maps = [text_prob_map(img, args.limit_side_len) for img in images]
+    print("pages: {}".format(len(maps)))
+
+    times = {}
+    for mode in args.modes.split(","):
+        post_process = DBPostProcess(
+            thresh=args.thresh,
+            box_thresh=args.box_thresh,
+            unclip_ratio=args.unclip_ratio,
+            score_mode=mode,
+        )
+        num_boxes = 0
+        total = 0.0
+        for prob, shape in maps:
+            outs = {"maps": prob[None, None]}
+            total += timeit(lambda: post_process(outs, [shape]), args.repeat)
+            num_boxes += len(post_process(outs, [shape])[0]["points"])
+        times[mode] = total / max(len(maps), 1)
+        print(
+            "{:>4}: {:.3f} ms / page, {} boxes".format(
+                mode, times[mode] * 1000, num_boxes
+            )
+        )
+    if "fast" in times and "cc" in times:
+        print("cc speedup over fast: {:.1f}x".format(times["fast"] / times["cc"]))
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,159 @@
+# Copyright (c) 2024 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Latency and throughput of the hubserving recognition under concurrent load,
+with and without the dynamic batching of tools/infer/dynamic_batcher.py.
+
+Client threads stand in for the http clients and call the recognizer the way
+the ocr_rec / ocr_system modules do. Without --rec_model_dir the recognizer
+is a stand-in whose predictor run costs `--overhead_ms` plus `--item_ms` per
+crop, on one device shared by all requests.
+
+python3 benchmark/benchmark_hubserving_batching.py --clients 16 --requests 50
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+__dir__ = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(__dir__, "..")))
+
+from tools.infer.dynamic_batcher import DynamicBatcher
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=50, help="per client")
+    parser.add_argument("--max_crops", type=int, default=4, help="crops per request")
+    parser.add_argument("--rec_batch_num", type=int, default=6)
+    parser.add_argument("--max_wait_ms", type=float, default=5)
+    parser.add_argument("--overhead_ms", type=float, default=8)
+    parser.add_argument("--item_ms", type=float, default=1)
+    parser.add_argument("--rec_model_dir", type=str, default=None)
+    return parser.parse_args()
+
+
+class StandInRecognizer(object):
+    """Sleeps for the cost of a predictor run of each rec_batch_num chunk."""
+
+    def __init__(self, rec_batch_num, overhead_ms, item_ms):
+        self.rec_batch_num = rec_batch_num
+        self.overhead = overhead_ms / 1000.0
+        self.per_item = item_ms / 1000.0
+
+    def __call__(self, img_list):
+        for beg in range(0, len(img_list), self.rec_batch_num):
+            num = len(img_list[beg : beg + self.rec_batch_num])
+            time.sleep(self.overhead + self.per_item * num)
+        return [["", 1.0, []] for _ in img_list], 0.0
+
+
+def build_recognizer(args):
+    if args.rec_model_dir is None:
+        return StandInRecognizer(args.rec_batch_num, args.overhead_ms, args.item_ms)
+    import tools.infer.utility as utility
+    from tools.infer.predict_rec import TextRecognizer
+
+    rec_args = utility.init_args().parse_args(
+        [
+            "--rec_model_dir",
+            args.rec_model_dir,
+            "--rec_batch_num",
+            str(args.rec_batch_num),
+        ]
+    )
+    return TextRecognizer(rec_args)
+
+
+def run_clients(args, handle_request):
+    """Latencies of all requests and the wall time of the run."""
+    latencies = []
+    lock = threading.Lock()
+
+    def client(seed):
+        rng = np.random.RandomState(seed)
+        for _ in range(args.requests):
+            crops = [
+                np.full((48, rng.randint(40, 320), 3), 255, dtype=np.uint8)
+                for _ in range(rng.randint(1, args.max_crops + 1))
+            ]
+            st = time.perf_counter()
+            handle_request(crops)
+            elapse = time.perf_counter() - st
+            with lock:
+                latencies.append(elapse)
+
+    threads = [
+        threading.Thread(target=client, args=(seed,)) for seed in range(args.clients)
+    ]
+    st = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, time.perf_counter() - st
+
+
+def report(name, latencies, wall_time):
+    latencies = np.array(latencies) * 1000
+    print(
+        "{:<10} p50 {:8.2f} ms  p99 {:8.2f} ms  throughput {:8.1f} req/s".format(
+            name,
+            np.percentile(latencies, 50),
+            np.percentile(latencies, 99),
+            len(latencies) / wall_time,
+        )
+    )
+
+
+def main(args):
+    recognizer = build_recognizer(args)
+    print(
+        "clients: {}, requests per client: {}, crops per request: 1-{}".format(
+            args.clients, args.requests, args.max_crops
+        )
+    )
+
+    # one request at a time on the device, as the predictor is not shared
+    device = threading.Lock()
+
+    def unbatched(crops):
+        with device:
+            return recognizer(crops)[0]
+
+    report("unbatched", *run_clients(args, unbatched))
+
+    batcher = DynamicBatcher(
+        lambda crops: list(recognizer(crops)[0]),
+        args.rec_batch_num,
+        args.max_wait_ms,
+    )
+    report("batched", *run_clients(args, batcher.map))
+    stats = batcher.stats()
+    print(
+        "batches: {}, mean batch size: {:.2f}".format(
+            stats["batches"], stats["mean_batch_size"]
+        )
+    )
+    batcher.close()
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,141 @@
+# Copyright (c) 2024 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Benchmark of the locality aware nms of EAST on dense score maps: the python
+`nms_locality`, the NumPy `nms_locality_fast` and, when installed, the c++
+`lanms.merge_quadrangle_n9` of lanms-nova.
+
+The score and geo maps are made of random rotated text boxes, every pixel of
+a box above the score threshold with a geometry pointing to its corners plus
+some noise, as the boxes EASTPostProcess.detect gives to the nms.
+
+python3 benchmark/benchmark_locality_nms.py --size 960 --num_texts 60
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+__dir__ = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(__dir__, "..")))
+
+from ppocr.postprocess.locality_aware_nms import nms_locality, nms_locality_fast
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=960)
+    parser.add_argument("--num_texts", type=int, default=60)
+    parser.add_argument("--noise", type=float, default=2.0)
+    parser.add_argument("--nms_thresh", type=float, default=0.2)
+    parser.add_argument("--num_maps", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--skip_python", action="store_true", help="skip the slow python nms"
+    )
+    return parser.parse_args()
+
+
+def east_boxes(seed, size, num_texts, noise):
+    rng = np.random.RandomState(seed)
+    score = np.zeros((size // 4, size // 4), dtype=np.float32)
+    geo = np.zeros((size // 4, size // 4, 8), dtype=np.float32)
+    for _ in range(num_texts):
+        center = tuple(rng.uniform(20, size - 20, 2))
+        rect = (
+            center,
+            (rng.uniform(40, size / 4), rng.uniform(12, 40)),
+            rng.uniform(-30, 30),
+        )
+        quad = cv2.boxPoints(rect)
+        mask = np.zeros_like(score, dtype=np.uint8)
+        cv2.fillPoly(mask, [np.int32(quad / 4)], 1)
+        ys, xs = np.nonzero(mask)
+        score[ys, xs] = rng.uniform(0.85, 1.0, len(ys))
+        origin = np.tile(np.stack([xs, ys], axis=1) * 4.0, 4)
+        geo[ys, xs] = origin - quad.reshape(1, 8) + rng.normal(0, noise, (len(ys), 8))
+    xy_text = np.argwhere(score > 0.8)
+    xy_text = xy_text[np.argsort(xy_text[:, 0])]
+    boxes = np.zeros((len(xy_text), 9), dtype=np.float32)
+    boxes[:, :8] = np.tile(xy_text[:, ::-1] * 4, 4) - geo[xy_text[:, 0], xy_text[:, 1]]
+    boxes[:, 8] = score[xy_text[:, 0], xy_text[:, 1]]
+    return boxes
+
+
+def timeit(func, repeat):
+    st = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - st) / repeat
+
+
+def main(args):
+    maps = [
+        east_boxes(seed, args.size, args.num_texts, args.noise)
+        for seed in range(args.num_maps)
+    ]
+    print(
+        "maps: {}, boxes before nms: {:.0f} / map".format(
+            len(maps), np.mean([len(boxes) for boxes in maps])
+        )
+    )
+
+    methods = {
+        "fast": lambda boxes: nms_locality_fast(
+            boxes.astype(np.float64), args.nms_thresh
+        )
+    }
+    if not args.skip_python:
+        methods["python"] = lambda boxes: nms_locality(
+            boxes.astype(np.float64), args.nms_thresh
+        )
+    try:
+        import lanms
+
+        methods["lanms"] = lambda boxes: lanms.merge_quadrangle_n9(
+            boxes, args.nms_thresh
+        )
+    except ImportError:
+        print("lanms is not installed, pip3 install lanms-nova to compare with it")
+
+    times = {}
+    for name, method in methods.items():
+        # the python nms takes seconds on dense maps, once is enough
+        repeat = 1 if name == "python" else args.repeat
+        total = 0.0
+        num_boxes = 0
+        for boxes in maps:
+            total += timeit(lambda: method(boxes), repeat)
+            num_boxes += len(method(boxes))
+        times[name] = total / len(maps)
+        print(
+            "{:>6}: {:.3f} ms / map, {} boxes".format(
+                name, times[name] * 1000, num_boxes
+            )
+        )
+    for name in ["python", "lanms"]:
+        if name in times:
+            print(
+                "fast speedup over {}: {:.2f}x".format(
+                    name, times[name] / times["fast"]
+                )
+            )
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,115 @@
+# Copyright (c) 2024 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Benchmark of the polygon nms of FCE: the pairwise `poly_nms` against
+`poly_nms_fast` with its exact `poly` and rasterized `mask` IoU.
+
+The candidates are made like the ones of FCENet: for every curved text,
+jittered copies of its boundary with int coordinates.
+
+python3 benchmark/benchmark_poly_nms.py --num_texts 30 --per_text 40
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+__dir__ = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(__dir__, "..")))
+
+from ppocr.utils.poly_nms import poly_nms, poly_nms_fast
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--num_texts", type=int, default=30)
+    parser.add_argument("--per_text", type=int, default=40)
+    parser.add_argument("--num_points", type=int, default=50)
+    parser.add_argument("--nms_thr", type=float, default=0.1)
+    parser.add_argument("--mask_scale", type=float, default=0.25)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--skip_python", action="store_true", help="skip the slow poly_nms"
+    )
+    return parser.parse_args()
+
+
+def curved_candidates(args, seed=0):
+    rng = np.random.RandomState(seed)
+    polygons = []
+    for _ in range(args.num_texts):
+        center = rng.uniform(100, 1900, 2)
+        radius = rng.uniform(80, 400)
+        start = rng.uniform(0, np.pi)
+        span = rng.uniform(0.3, 1.2)
+        height = rng.uniform(15, 60)
+        angles = np.linspace(start, start + span, args.num_points // 2)
+        unit = np.stack([np.cos(angles), np.sin(angles)], axis=1)
+        boundary = np.concatenate([unit * radius, unit[::-1] * (radius - height)])
+        boundary += center
+        for _ in range(args.per_text):
+            jitter = rng.normal(0, height / 6, (1, 2))
+            jitter = jitter + rng.normal(0, 1.5, boundary.shape)
+            points = (boundary + jitter).astype("int32").reshape(-1)
+            polygons.append(points.tolist() + [float(rng.uniform(0.3, 1.0))])
+    rng.shuffle(polygons)
+    return polygons
+
+
+def timeit(func, repeat):
+    st = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - st) / repeat
+
+
+def main(args):
+    polygons = curved_candidates(args)
+    print("candidates: {}".format(len(polygons)))
+
+    methods = {
+        "poly": lambda: poly_nms_fast(polygons, args.nms_thr),
+        "mask": lambda: poly_nms_fast(
+            polygons, args.nms_thr, iou_mode="mask", mask_scale=args.mask_scale
+        ),
+    }
+    if not args.skip_python:
+        methods["python"] = lambda: poly_nms([list(p) for p in polygons], args.nms_thr)
+
+    times = {}
+    results = {}
+    for name, method in methods.items():
+        repeat = 1 if name == "python" else args.repeat
+        times[name] = timeit(method, repeat)
+        results[name] = method()
+        print(
+            "{:>6}: {:.3f} ms, {} kept".format(
+                name, times[name] * 1000, len(results[name])
+            )
+        )
+    if "python" in times:
+        print("poly same as python: {}".format(results["poly"] == results["python"]))
+        for name in ["poly", "mask"]:
+            print(
+                "{} speedup over python: {:.1f}x".format(
+                    name, times["python"] / times[name]
+                )
+            )
+
+
+if __name__ == "__main__":
+    main(parse_args())
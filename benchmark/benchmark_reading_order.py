@@ -0,0 +1,80 @@
+# Copyright (c) 2024 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Benchmark of the box reading order on a synthetic page of vertical text:
+the quadratic `sorted_boxes` against the column clustering of
+tools/infer/reading_order.py.
+
+python3 benchmark/benchmark_reading_order.py --num_boxes 10000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+__dir__ = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(__dir__, "..")))
+
+from tools.infer.predict_system import sorted_boxes
+from tools.infer.reading_order import get_reading_order
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--num_boxes", type=int, default=10000)
+    parser.add_argument("--rows", type=int, default=50, help="boxes per column")
+    parser.add_argument("--drift", type=float, default=0.5, help="x drift per row")
+    parser.add_argument("--jitter", type=float, default=4.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip_legacy", action="store_true")
+    return parser.parse_args()
+
+
+def synthetic_page(num_boxes, rows, drift, jitter, seed=0):
+    """Right-to-left columns of vertical lines, returned shuffled."""
+    rng = np.random.RandomState(seed)
+    cols = (num_boxes + rows - 1) // rows
+    boxes = []
+    for idx in range(num_boxes):
+        col, row = idx // rows, idx % rows
+        x = (cols - col) * 60 + row * drift + rng.uniform(-jitter, jitter)
+        y = row * 90 + rng.uniform(-jitter, jitter)
+        boxes.append([[x, y], [x + 36, y], [x + 36, y + 80], [x, y + 80]])
+    boxes = np.array(boxes, dtype=np.float32)
+    return boxes[rng.permutation(num_boxes)]
+
+
+def timeit(func, repeat):
+    st = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - st) / repeat
+
+
+def main(args):
+    boxes = synthetic_page(args.num_boxes, args.rows, args.drift, args.jitter)
+    print("boxes: {}, boxes per column: {}".format(len(boxes), args.rows))
+    new_time = timeit(lambda: get_reading_order("vertical_rtl")(boxes), args.repeat)
+    print("vertical_rtl clustering: {:.3f} ms / page".format(new_time * 1000))
+    if not args.skip_legacy:
+        legacy_time = timeit(lambda: sorted_boxes(boxes), args.repeat)
+        print("legacy sorted_boxes:     {:.3f} ms / page".format(legacy_time * 1000))
+        print("speedup: {:.1f}x".format(legacy_time / max(new_time, 1e-9)))
+
+
+if __name__ == "__main__":
+    main(parse_args())
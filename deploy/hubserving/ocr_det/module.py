@@ -22,6 +22,7 @@ import sys
 sys.path.insert(0, ".")
 
 import copy
+import time
 import paddlehub
 from paddlehub.common.logger import logger
 from paddlehub.module.module import moduleinfo, runnable, serving
@@ -31,6 +32,7 @@ import paddlehub as hub
 
 from tools.infer.utility import base64_to_cv2
 from tools.infer.predict_det import TextDetector
+from tools.infer.dynamic_batcher import DynamicBatcher
 from tools.infer.utility import parse_args
 from deploy.hubserving.ocr_system.params import read_params
 
@@ -66,6 +68,19 @@ class OCRDet(hub.Module):
         cfg.enable_mkldnn = enable_mkldnn
 
         self.text_detector = TextDetector(cfg)
+        self.det_batcher = None
+        if cfg.dynamic_batching:
+            self.det_batcher = DynamicBatcher(
+                self.detect_batch,
+                cfg.det_batch_num,
+                cfg.batch_max_wait_ms,
+                name="det_batcher",
+            )
+
+    def detect_batch(self, imgs):
+        if len(imgs) > 1:
+            return self.text_detector.predict_batch(imgs)[0]
+        return [self.text_detector(img)[0] for img in imgs]
 
     def merge_configs(
         self,
@@ -117,15 +132,28 @@ class OCRDet(hub.Module):
             predicted_data != []
         ), "There is not any image to be predicted. Please check the input data."
 
+        starttime = time.time()
+        if self.det_batcher is not None:
+            futures = [
+                None if img is None else self.det_batcher.submit(img)
+                for img in predicted_data
+            ]
+            det_results = [
+                None if future is None else future.result() for future in futures
+            ]
+        else:
+            det_results = [
+                None if img is None else self.text_detector(img)[0]
+                for img in predicted_data
+            ]
+        logger.info("Predict time : {}".format(time.time() - starttime))
+
         all_results = []
-        for img in predicted_data:
-            if img is None:
+        for dt_boxes in det_results:
+            if dt_boxes is None:
                 logger.info("error in loading image")
                 all_results.append([])
                 continue
-            dt_boxes, elapse = self.text_detector(img)
-            logger.info("Predict time : {}".format(elapse))
-
             rec_res_final = []
             for dno in range(len(dt_boxes)):
                 rec_res_final.append(
@@ -29,6 +29,7 @@ def read_params():
     cfg.det_model_dir = "./inference/ch_PP-OCRv3_det_infer/"
     cfg.det_limit_side_len = 960
     cfg.det_limit_type = "max"
+    cfg.det_batch_num = 4
 
     # DB params
     cfg.det_db_thresh = 0.3
@@ -45,4 +46,9 @@ def read_params():
     cfg.use_pdserving = False
     cfg.use_tensorrt = False
 
+    # requests in flight are batched together, a batch waits at most
+    # batch_max_wait_ms for more requests
+    cfg.dynamic_batching = True
+    cfg.batch_max_wait_ms = 5
+
     return cfg
@@ -29,6 +29,7 @@ import paddlehub as hub
 
 from tools.infer.utility import base64_to_cv2
 from tools.infer.predict_rec import TextRecognizer
+from tools.infer.dynamic_batcher import DynamicBatcher
 from tools.infer.utility import parse_args
 from deploy.hubserving.ocr_rec.params import read_params
 
@@ -64,6 +65,14 @@ class OCRRec(hub.Module):
         cfg.enable_mkldnn = enable_mkldnn
 
         self.text_recognizer = TextRecognizer(cfg)
+        self.rec_batcher = None
+        if cfg.dynamic_batching:
+            self.rec_batcher = DynamicBatcher(
+                lambda img_list: list(self.text_recognizer(img_list)[0]),
+                cfg.rec_batch_num,
+                cfg.batch_max_wait_ms,
+                name="rec_batcher",
+            )
 
     def merge_configs(
         self,
@@ -123,9 +132,17 @@ class OCRRec(hub.Module):
 
         rec_res_final = []
         try:
-            rec_res, predict_time = self.text_recognizer(img_list)
-            for dno in range(len(rec_res)):
-                text, score = rec_res[dno]
+            if self.rec_batcher is not None:
+                rec_res = self.rec_batcher.map(img_list)
+            else:
+                rec_res, predict_time = self.text_recognizer(img_list)
+            for res in rec_res:
+                # TextRecognizer returns dicts, [text, score, char_details]
+                # lists with rec_compact_result
+                if isinstance(res, dict):
+                    text, score = res["text"], res["score"]
+                else:
+                    text, score = res[:2]
                 rec_res_final.append(
                     {
                         "text": text,
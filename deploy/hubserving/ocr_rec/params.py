@@ -38,4 +38,9 @@ def read_params():
     cfg.use_pdserving = False
     cfg.use_tensorrt = False
 
+    # requests in flight are batched together, a batch waits at most
+    # batch_max_wait_ms for more requests
+    cfg.dynamic_batching = True
+    cfg.batch_max_wait_ms = 5
+
     return cfg
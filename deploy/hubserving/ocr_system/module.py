@@ -32,6 +32,7 @@ import paddlehub as hub
 
 from tools.infer.utility import base64_to_cv2
 from tools.infer.predict_system import TextSystem
+from tools.infer.dynamic_batcher import BatchedTextSystem
 from tools.infer.utility import parse_args
 from deploy.hubserving.ocr_system.params import read_params
 
@@ -67,6 +68,9 @@ class OCRSystem(hub.Module):
         cfg.enable_mkldnn = enable_mkldnn
 
         self.text_sys = TextSystem(cfg)
+        self.batched_sys = None
+        if cfg.dynamic_batching:
+            self.batched_sys = BatchedTextSystem(self.text_sys, cfg.batch_max_wait_ms)
 
     def merge_configs(
         self,
@@ -118,22 +122,26 @@ class OCRSystem(hub.Module):
             predicted_data != []
         ), "There is not any image to be predicted. Please check the input data."
 
+        starttime = time.time()
+        if self.batched_sys is not None:
+            ocr_results = self.batched_sys(predicted_data)
+        else:
+            ocr_results = []
+            for img in predicted_data:
+                dt_boxes, rec_res, _ = self.text_sys(img)
+                ocr_results.append((dt_boxes, rec_res))
+        elapse = time.time() - starttime
+        logger.info("Predict time: {}".format(elapse))
+
         all_results = []
-        for img in predicted_data:
+        for img, (dt_boxes, rec_res) in zip(predicted_data, ocr_results):
             if img is None:
                 logger.info("error in loading image")
-                all_results.append([])
-                continue
-            starttime = time.time()
-            dt_boxes, rec_res, _ = self.text_sys(img)
-            elapse = time.time() - starttime
-            logger.info("Predict time: {}".format(elapse))
-
-            dt_num = len(dt_boxes)
             rec_res_final = []
-
+            dt_num = 0 if dt_boxes is None else len(dt_boxes)
             for dno in range(dt_num):
-                text, score = rec_res[dno]
+                # rec results are [text, score, char_details]
+                text, score = rec_res[dno][:2]
                 rec_res_final.append(
                     {
                         "text": text,
@@ -27,10 +27,9 @@ from copy import deepcopy
 import logging
 import numpy as np
 from pathlib import Path
-import base64
-from io import BytesIO
+import functools
+import mmap
 import pprint
-from PIL import Image
 
 
 def _import_file(module_name, file_path, make_importable=False):
@@ -48,27 +47,57 @@ tools = _import_file(
 ppocr = importlib.import_module("ppocr", "paddleocr")
 ppstructure = importlib.import_module("ppstructure", "paddleocr")
 from ppocr.utils.logging import get_logger
+from ppocr.utils.instrumentation import get_metrics
 
 from ppocr.utils.utility import (
     check_and_read,
+    close_pages,
     get_image_file_list,
     alpha_to_color,
     binarize_img,
 )
+from ppocr.utils.image_decode import (
+    DecodedImage,
+    close_data,
+    decode_for_det,
+    decode_image,
+    read_image_file,
+)
 from ppocr.utils.network import (
     maybe_download,
+    maybe_download_all,
     download_with_progressbar,
     is_link,
     confirm_model_dir_url,
 )
+from ppocr.postprocess.rec_candidates import RecCandidates
 from tools.infer import predict_system
-from tools.infer.utility import draw_ocr, str2bool, check_gpu
-from ppstructure.utility import init_args, draw_structure_result
-from ppstructure.predict_system import StructureSystem, save_structure_res, to_excel
-from ppstructure.recovery.recovery_to_doc import sorted_layout_boxes, convert_info_docx
-from ppstructure.recovery.recovery_to_markdown import convert_info_markdown
+from tools.infer.result_cache import image_digest
+from tools.infer.utility import draw_ocr, str2bool, check_gpu, get_pdf_options
 
 logger = get_logger()
+metrics = get_metrics()
+
+# the structure modules import the layout and table predictors, and the
+# layout recovery modules import docx and bs4, which are slow to import,
+# they are imported on first access
+_LAZY_ATTRS = {
+    "draw_structure_result": "ppstructure.utility",
+    "save_structure_res": "ppstructure.predict_system",
+    "to_excel": "ppstructure.predict_system",
+    "sorted_layout_boxes": "ppstructure.recovery.recovery_to_doc",
+    "convert_info_docx": "ppstructure.recovery.recovery_to_doc",
+    "convert_info_markdown": "ppstructure.recovery.recovery_to_markdown",
+}
+
+
+def __getattr__(name):
+    if name == "PPStructure":
+        return _ppstructure_class()
+    if name in _LAZY_ATTRS:
+        return getattr(importlib.import_module(_LAZY_ATTRS[name]), name)
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
 
 __all__ = [
     "PaddleOCR",
@@ -377,16 +406,34 @@ MODEL_URLS = {
 }
 
 
-def parse_args(mMain=True):
+def parse_args(mMain=True, argv=None, batch=False):
     import argparse
 
+    from ppstructure.utility import init_args
+
     parser = init_args()
     parser.add_help = mMain
+    if batch:
+        from tools.infer.batch_runner import add_batch_args
+
+        add_batch_args(parser)
     parser.add_argument("--lang", type=str, default="ch")
     parser.add_argument("--det", type=str2bool, default=True)
     parser.add_argument("--rec", type=str2bool, default=True)
     parser.add_argument("--type", type=str, default="ocr")
     parser.add_argument("--savefile", type=str2bool, default=False)
+    parser.add_argument(
+        "--profile-startup",
+        dest="profile_startup",
+        action="store_true",
+        help="report the import time and the model load time per component",
+    )
+    parser.add_argument(
+        "--profile_startup_json",
+        type=str,
+        default=None,
+        help="also save the --profile-startup report to this json file",
+    )
     parser.add_argument(
         "--ocr_version",
         type=str,
@@ -416,7 +463,7 @@ def parse_args(mMain=True):
         ]:
             action.default = None
     if mMain:
-        return parser.parse_args()
+        return parser.parse_args(argv)
     else:
         inference_args_dict = {}
         for action in parser._actions:
@@ -564,12 +611,21 @@ def get_model_config(type, version, model_type, lang):
     return model_urls[version][model_type][lang]
 
 
-def img_decode(content: bytes):
-    np_arr = np.frombuffer(content, dtype=np.uint8)
-    return cv2.imdecode(np_arr, cv2.IMREAD_UNCHANGED)
+def img_decode(content):
+    return decode_image(content)
+
 
+def _to_bgr(img, alpha_color=(255, 255, 255)):
+    # single channel image array.shape:h,w
+    if isinstance(img, np.ndarray) and len(img.shape) == 2:
+        img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+    # four channel image array.shape:h,w,c
+    if isinstance(img, np.ndarray) and len(img.shape) == 3 and img.shape[2] == 4:
+        img = alpha_to_color(img, alpha_color)
+    return img
 
-def check_img(img, alpha_color=(255, 255, 255)):
+
+def check_img(img, alpha_color=(255, 255, 255), pdf_options=None, det_side=0):
     """
     Check the image data. If it is another type of image file, try to decode it into a numpy array.
     The inference network requires three-channel images, So the following channel conversions are done
@@ -577,51 +633,36 @@ def check_img(img, alpha_color=(255, 255, 255)):
         four channel image: alpha_to_color
     args:
         img: image data
-            file format: jpg, png and other image formats that opencv can decode, as well as gif and pdf formats
-            storage type: binary image, net image file, local image file
+            file format: jpg, png and other image formats that opencv or PIL can decode, as well as gif and pdf formats
+            storage type: binary image (bytes, bytearray, memoryview or mmap), net image file, local image file
         alpha_color: Background color in images in RGBA format
-        return: numpy.array (h, w, 3) or list (p, h, w, 3) (p: page of pdf), boolean, boolean
+        pdf_options: dict of PDFPages options (page_num, target_side, limit_type, prefetch)
+        det_side: long side the detector resizes to, large JPEG images are decoded
+            at reduced resolution as a DecodedImage when it is set
+        return: numpy.array (h, w, 3), DecodedImage or a lazy PDFPages sequence of (h, w, 3) pages, boolean, boolean
     """
     flag_gif, flag_pdf = False, False
-    if isinstance(img, bytes):
-        img = img_decode(img)
+    if isinstance(img, (bytes, bytearray, memoryview, mmap.mmap)):
+        img = decode_for_det(img, det_side)
     if isinstance(img, str):
         # download net image
         if is_link(img):
             download_with_progressbar(img, "tmp.jpg")
             img = "tmp.jpg"
         image_file = img
-        img, flag_gif, flag_pdf = check_and_read(image_file)
+        img, flag_gif, flag_pdf = check_and_read(
+            image_file, lazy=True, **(pdf_options or {})
+        )
         if not flag_gif and not flag_pdf:
-            with open(image_file, "rb") as f:
-                img_str = f.read()
-                img = img_decode(img_str)
-            if img is None:
-                try:
-                    buf = BytesIO()
-                    image = BytesIO(img_str)
-                    im = Image.open(image)
-                    rgb = im.convert("RGB")
-                    rgb.save(buf, "jpeg")
-                    buf.seek(0)
-                    image_bytes = buf.read()
-                    data_base64 = str(base64.b64encode(image_bytes), encoding="utf-8")
-                    image_decode = base64.b64decode(data_base64)
-                    img_array = np.frombuffer(image_decode, np.uint8)
-                    img = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
-                except:
-                    logger.error("error in loading image:{}".format(image_file))
-                    return None, flag_gif, flag_pdf
+            # the file is mapped, not read, the decoder works on the mapping
+            img = decode_for_det(read_image_file(image_file), det_side, owns_data=True)
         if img is None:
             logger.error("error in loading image:{}".format(image_file))
             return None, flag_gif, flag_pdf
-    # single channel image array.shape:h,w
-    if isinstance(img, np.ndarray) and len(img.shape) == 2:
-        img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
-    # four channel image array.shape:h,w,c
-    if isinstance(img, np.ndarray) and len(img.shape) == 3 and img.shape[2] == 4:
-        img = alpha_to_color(img, alpha_color)
-    return img, flag_gif, flag_pdf
+    if isinstance(img, DecodedImage):
+        # the full resolution image is converted when it is decoded
+        return img.apply(lambda im: _to_bgr(im, alpha_color)), flag_gif, flag_pdf
+    return _to_bgr(img, alpha_color), flag_gif, flag_pdf
 
 
 class PaddleOCR(predict_system.TextSystem):
@@ -670,11 +711,15 @@ class PaddleOCR(predict_system.TextSystem):
             params.rec_image_shape = "3, 32, 320"
         if kwargs.get("rec_image_shape") is not None:
             params.rec_image_shape = kwargs.get("rec_image_shape")
-        # download model if using paddle infer
+        # models are downloaded when their stage is built if using paddle
+        # infer, see build_stage
+        self.model_urls = {}
         if not params.use_onnx:
-            maybe_download(params.det_model_dir, det_url)
-            maybe_download(params.rec_model_dir, rec_url)
-            maybe_download(params.cls_model_dir, cls_url)
+            self.model_urls = {
+                "det": (params.det_model_dir, det_url),
+                "rec": (params.rec_model_dir, rec_url),
+                "cls": (params.cls_model_dir, cls_url),
+            }
 
         if params.det_algorithm not in SUPPORT_DET_MODEL:
             logger.error("det_algorithm must in {}".format(SUPPORT_DET_MODEL))
@@ -689,9 +734,30 @@ class PaddleOCR(predict_system.TextSystem):
             )
 
         logger.debug(params)
+        if params.result_cache_path or not params.lazy_model_init:
+            # the cache keys hash the model files of the enabled stages
+            self.download_models(
+                ["det", "rec", "cls"] if params.use_angle_cls else ["det", "rec"]
+            )
         # init det_model and rec_model
         super().__init__(params)
         self.page_num = params.page_num
+        if params.warmup:
+            self.warmup()
+
+    def download_model(self, stage):
+        if stage in self.model_urls:
+            maybe_download(*self.model_urls[stage])
+
+    def download_models(self, stages):
+        """Download the models of the stages in parallel."""
+        maybe_download_all(
+            [self.model_urls[stage] for stage in stages if stage in self.model_urls]
+        )
+
+    def build_stage(self, stage):
+        self.download_model(stage)
+        return super().build_stage(stage)
 
     def ocr(
         self,
@@ -708,7 +774,7 @@ class PaddleOCR(predict_system.TextSystem):
         OCR with PaddleOCR
 
         Args:
-            img: Image for OCR. It can be an ndarray, img_path, or a list of ndarrays.
+            img: Image for OCR. It can be an ndarray, img_path, encoded image data (bytes, memoryview or mmap), or a list of ndarrays.
             det: Use text detection or not. If False, only text recognition will be executed. Default is True.
             rec: Use text recognition or not. If False, only text detection will be executed. Default is True.
             cls: Use angle classifier or not. Default is True. If True, the text with a rotation of 180 degrees can be recognized. If no text is rotated by 180 degrees, use cls=False to get better performance.
@@ -717,13 +783,19 @@ class PaddleOCR(predict_system.TextSystem):
             alpha_color: Set RGB color Tuple for transparent parts replacement. Default is pure white.
             slice: Use sliding window inference for large images. Default is {}.
 
+        With result_cache_path set, the results of image files, encoded images and
+        ndarrays are cached by content, see tools/infer/result_cache.py.
+
         Returns:
             If both det and rec are True, returns a list of OCR results for each image.
+            With rec_compact_result=True, each image result is a RecCandidates object that renders the same [box, [text, score, char_details]] lines on access and can be written in bulk with dump_jsonl / save_npz.
             If det is True and rec is False, returns a list of detected bounding boxes for each image.
             If det is False and rec is True, returns a list of recognized text for each image.
             If both det and rec are False, returns a list of angle classification results for each image.
         """
-        assert isinstance(img, (np.ndarray, list, str, bytes))
+        assert isinstance(
+            img, (np.ndarray, list, str, bytes, bytearray, memoryview, mmap.mmap)
+        )
         if isinstance(img, list) and det == True:
             logger.error("When input a list of images, det must be false")
             exit(0)
@@ -732,61 +804,50 @@ class PaddleOCR(predict_system.TextSystem):
                 "Since the angle classifier is not initialized, it will not be used during the forward process"
             )
 
-        img, flag_gif, flag_pdf = check_img(img, alpha_color)
-        # for infer pdf file
-        if isinstance(img, list) and flag_pdf:
-            if self.page_num > len(img) or self.page_num == 0:
-                imgs = img
-            else:
-                imgs = img[: self.page_num]
-        else:
-            imgs = [img]
-
+        options = dict(det=det, rec=rec, cls=cls, bin=bin, inv=inv)
+        with metrics.span("paddleocr"):
+            cache_key = self._ocr_cache_key(img, alpha_color, slice, **options)
+            if cache_key is not None:
+                ocr_res = self.result_cache.get(cache_key)
+                if ocr_res is None:
+                    ocr_res = self._ocr(
+                        img, alpha_color=alpha_color, slice=slice, **options
+                    )
+                    self.result_cache.put(cache_key, ocr_res)
+                return ocr_res
+            return self._ocr(img, alpha_color=alpha_color, slice=slice, **options)
+
+    def _ocr(self, img, det, rec, cls, bin, inv, alpha_color, slice):
+        imgs = self._load_pages(img, alpha_color, det=det)
+        try:
+            return self._ocr_pages(imgs, det, rec, cls, bin, inv, alpha_color, slice)
+        finally:
+            close_pages(imgs)
+
+    def _ocr_pages(self, imgs, det, rec, cls, bin, inv, alpha_color, slice):
         def preprocess_image(_image):
-            _image = alpha_to_color(_image, alpha_color)
-            if inv:
-                _image = cv2.bitwise_not(_image)
-            if bin:
-                _image = binarize_img(_image)
-            return _image
+            return self._preprocess_image(_image, alpha_color, inv, bin)
 
         if det and rec:
             ocr_res = []
-            for img in imgs:
-                img = preprocess_image(img)
-                dt_boxes, rec_res, _ = self.__call__(img, cls, slice)
-                if not dt_boxes or not rec_res:
-                    ocr_res.append(None)
-                    continue
-                
-                # 構建結果，保留完整的 rec_res 結構
-                tmp_res = []
-                for box, res in zip(dt_boxes, rec_res):
-                    # res 應該是一個列表，包含 [text, score, char_details]
-                    text = res[0]
-                    score = res[1]
-                    char_details = res[2] if len(res) > 2 else None
-                    tmp_res.append([box.tolist(), [text, score, char_details]])
-                ocr_res.append(tmp_res)
-
-                # 添加日誌，顯示 Top-3 候選字
-                for idx, res in enumerate(tmp_res):
-                    text = res[1][0]
-                    score = res[1][1]
-                    # logger.debug(f"Text {idx+1}: {text}, Score: {score:.3f}")
-                    if len(res[1]) > 2 and res[1][2]:
-                        # logger.debug("  Top-3 candidates:")
-                        for char_detail in res[1][2]:
-                            top3_str = ", ".join([f"{cand['char']} ({cand['score']:.4f})" for cand in char_detail['top3']])
-                            # logger.debug(f"    {char_detail['char']}: {top3_str}")
+            # pdf pages are rendered and recognized a few pages at a time
+            for chunk in self._page_chunks(imgs):
+                chunk = [preprocess_image(img) for img in chunk]
+                results, _ = self.batch_call(chunk, cls, slice)
+                self._close_pages(chunk)
+                ocr_res.extend(
+                    self._format_ocr_res(dt_boxes, rec_res)
+                    for dt_boxes, rec_res in results
+                )
             return ocr_res
 
         elif det and not rec:
             ocr_res = []
             for img in imgs:
                 img = preprocess_image(img)
-                dt_boxes, elapse = self.text_detector(img)
-                if dt_boxes.size == 0:
+                dt_boxes, elapse = self.detect(img)
+                self._close_pages([img])
+                if dt_boxes is None or dt_boxes.size == 0:
                     ocr_res.append(None)
                     continue
                 tmp_res = [box.tolist() for box in dt_boxes]
@@ -804,7 +865,12 @@ class PaddleOCR(predict_system.TextSystem):
                     img, cls_res_tmp, elapse = self.text_classifier(img)
                     if not rec:
                         cls_res.append(cls_res_tmp)
+                if not rec:
+                    continue
                 rec_res, elapse = self.text_recognizer(img)
+                if isinstance(rec_res, RecCandidates):
+                    ocr_res.append(rec_res)
+                    continue
                 # 將 rec_res 轉換為與 det=True, rec=True 一致的格式
                 formatted_rec_res = []
                 for res in rec_res:
@@ -816,154 +882,348 @@ class PaddleOCR(predict_system.TextSystem):
                     else:
                         formatted_rec_res.append(res)
                 ocr_res.append(formatted_rec_res)
-
-                # 添加日誌，顯示 Top-3 候選字
-                for idx, res in enumerate(formatted_rec_res):
-                    text = res[0]
-                    score = res[1]
-                    # logger.debug(f"Text {idx+1}: {text}, Score: {score:.3f}")
-                    if len(res) > 2 and res[2]:
-                        # logger.debug("  Top-3 candidates:")
-                        for char_detail in res[2]:
-                            top3_str = ", ".join([f"{cand['char']} ({cand['score']:.4f})" for cand in char_detail['top3']])
-                            # logger.debug(f"    {char_detail['char']}: {top3_str}")
             if not rec:
                 return cls_res
             return ocr_res
 
+    def ocr_batch(
+        self,
+        img_list,
+        cls=True,
+        bin=False,
+        inv=False,
+        alpha_color=(255, 255, 255),
+        slice={},
+    ):
+        """
+        OCR several inputs at once, pooling the text crops of all images and pages
+        into shared classification and recognition batches.
+
+        Args:
+            img_list: list of inputs, each one accepted by `ocr` (ndarray, img_path, bytes or pdf).
+            cls, bin, inv, alpha_color, slice: same as `ocr`.
+
+        Returns:
+            A list with one entry per input, each entry equal to what `ocr(input)` returns with det=True and rec=True.
+        """
+        if cls == True and self.use_angle_cls == False:
+            logger.warning(
+                "Since the angle classifier is not initialized, it will not be used during the forward process"
+            )
+        pages, owners = [], []
+        for idx, img in enumerate(img_list):
+            img_pages = self._load_pages(img, alpha_color)
+            for page in img_pages:
+                pages.append(self._preprocess_image(page, alpha_color, inv, bin))
+                owners.append(idx)
+            close_pages(img_pages)
+
+        results, _ = self.batch_call(pages, cls, slice)
+        self._close_pages(pages)
+        ocr_res = [[] for _ in img_list]
+        for owner, (dt_boxes, rec_res) in zip(owners, results):
+            ocr_res[owner].append(self._format_ocr_res(dt_boxes, rec_res))
+        return ocr_res
+
+    def _ocr_cache_key(self, img, alpha_color, slice, **options):
+        """Result cache key of an ocr() input, None when the result is not cached."""
+        if not self._use_ocr_cache() or isinstance(img, list):
+            return None
+        if isinstance(img, str):
+            if is_link(img) or not os.path.isfile(img):
+                return None
+            # the key is the hash of the file content, no decoding needed
+            data = read_image_file(img)
+            digest = image_digest(data)
+            close_data(data)
+        else:
+            digest = image_digest(img)
+        options["cls"] = options["cls"] and self.use_angle_cls
+        return self.cache_key(
+            "ocr",
+            digest,
+            alpha_color=alpha_color,
+            slice=slice,
+            page_num=self.page_num,
+            pdf_fit_det_limit=self.args.pdf_fit_det_limit,
+            **options,
+        )
 
-class PPStructure(StructureSystem):
+    def _load_pages(self, img, alpha_color, det=True):
+        pdf_options = dict(get_pdf_options(self.args), page_num=self.page_num)
+        det_side = 0
+        if det and self.args.det_reduced_decode and self.args.det_limit_type == "max":
+            det_side = int(self.args.det_limit_side_len)
+        with metrics.span("decode"):
+            img, flag_gif, flag_pdf = check_img(img, alpha_color, pdf_options, det_side)
+        # for infer pdf file, the pages are rendered lazily
+        if flag_pdf:
+            return img
+        return [img]
+
+    def _page_chunks(self, pages):
+        chunk_size = max(
+            1,
+            self.args.pdf_page_chunk,
+            self.args.det_batch_num,
+            self.args.pdf_prefetch + 1,
+        )
+        chunk = []
+        for page in pages:
+            chunk.append(page)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    @staticmethod
+    def _close_pages(pages):
+        """Release the mapped files of the images decoded at reduced resolution."""
+        for page in pages:
+            if isinstance(page, DecodedImage):
+                page.close()
+
+    @staticmethod
+    def _preprocess_image(img, alpha_color, inv, bin):
+        if isinstance(img, DecodedImage):
+            return img.apply(
+                lambda im: PaddleOCR._preprocess_image(im, alpha_color, inv, bin)
+            )
+        img = alpha_to_color(img, alpha_color)
+        if inv:
+            img = cv2.bitwise_not(img)
+        if bin:
+            img = binarize_img(img)
+        return img
+
+    @staticmethod
+    def _format_ocr_res(dt_boxes, rec_res):
+        if not dt_boxes or not rec_res:
+            return None
+        if isinstance(rec_res, RecCandidates):
+            # char_details 僅在存取時才展開
+            return rec_res.with_boxes(np.array(dt_boxes))
+
+        # 構建結果，保留完整的 rec_res 結構
+        tmp_res = []
+        for box, res in zip(dt_boxes, rec_res):
+            # res 應該是一個列表，包含 [text, score, char_details]
+            text = res[0]
+            score = res[1]
+            char_details = res[2] if len(res) > 2 else None
+            tmp_res.append([box.tolist(), [text, score, char_details]])
+        return tmp_res
+
+
+def _ppstructure_class():
     """
-    PPStructure class represents the structure analysis system for PaddleOCR.
+    Define PPStructure on first access, StructureSystem imports the layout
+    and table predictors.
     """
+    cls = globals().get("PPStructure")
+    if cls is not None:
+        return cls
+    from ppstructure.predict_system import StructureSystem
 
-    def __init__(self, **kwargs):
+    class PPStructure(StructureSystem):
+        """
+        PPStructure class represents the structure analysis system for PaddleOCR.
         """
-        Initializes the PPStructure object with the given parameters.
-
-        Args:
-            **kwargs: Additional keyword arguments to customize the behavior of the structure analysis system.
 
-        Raises:
-            AssertionError: If the structure version is not supported.
+        def __init__(self, **kwargs):
+            """
+            Initializes the PPStructure object with the given parameters.
 
-        """
-        params = parse_args(mMain=False)
-        params.__dict__.update(**kwargs)
-        assert (
-            params.structure_version in SUPPORT_STRUCTURE_MODEL_VERSION
-        ), "structure_version must in {}, but get {}".format(
-            SUPPORT_STRUCTURE_MODEL_VERSION, params.structure_version
-        )
-        params.use_gpu = check_gpu(params.use_gpu)
-        params.mode = "structure"
+            Args:
+                **kwargs: Additional keyword arguments to customize the behavior of the structure analysis system.
 
-        if not params.show_log:
-            logger.setLevel(logging.INFO)
-        lang, det_lang = parse_lang(params.lang)
-        if lang == "ch":
-            table_lang = "ch"
-        else:
-            table_lang = "en"
-        if params.structure_version == "PP-Structure":
-            params.merge_no_span_structure = False
+            Raises:
+                AssertionError: If the structure version is not supported.
 
-        # init model dir
-        det_model_config = get_model_config("OCR", params.ocr_version, "det", det_lang)
-        params.det_model_dir, det_url = confirm_model_dir_url(
-            params.det_model_dir,
-            os.path.join(BASE_DIR, "whl", "det", det_lang),
-            det_model_config["url"],
-        )
-        rec_model_config = get_model_config("OCR", params.ocr_version, "rec", lang)
-        params.rec_model_dir, rec_url = confirm_model_dir_url(
-            params.rec_model_dir,
-            os.path.join(BASE_DIR, "whl", "rec", lang),
-            rec_model_config["url"],
-        )
-        table_model_config = get_model_config(
-            "STRUCTURE", params.structure_version, "table", table_lang
-        )
-        params.table_model_dir, table_url = confirm_model_dir_url(
-            params.table_model_dir,
-            os.path.join(BASE_DIR, "whl", "table"),
-            table_model_config["url"],
-        )
-        layout_model_config = get_model_config(
-            "STRUCTURE", params.structure_version, "layout", lang
-        )
-        params.layout_model_dir, layout_url = confirm_model_dir_url(
-            params.layout_model_dir,
-            os.path.join(BASE_DIR, "whl", "layout"),
-            layout_model_config["url"],
-        )
-        formula_model_config = get_model_config(
-            "STRUCTURE", params.structure_version, "formula", lang
-        )
-        params.formula_model_dir, formula_url = confirm_model_dir_url(
-            params.formula_model_dir,
-            os.path.join(BASE_DIR, "whl", "formula"),
-            formula_model_config["url"],
-        )
-        # download model
-        if not params.use_onnx:
-            maybe_download(params.det_model_dir, det_url)
-            maybe_download(params.rec_model_dir, rec_url)
-            maybe_download(params.table_model_dir, table_url)
-            maybe_download(params.layout_model_dir, layout_url)
-            maybe_download(params.formula_model_dir, formula_url)
+            """
+            params = parse_args(mMain=False)
+            params.__dict__.update(**kwargs)
+            assert (
+                params.structure_version in SUPPORT_STRUCTURE_MODEL_VERSION
+            ), "structure_version must in {}, but get {}".format(
+                SUPPORT_STRUCTURE_MODEL_VERSION, params.structure_version
+            )
+            params.use_gpu = check_gpu(params.use_gpu)
+            params.mode = "structure"
+
+            if not params.show_log:
+                logger.setLevel(logging.INFO)
+            lang, det_lang = parse_lang(params.lang)
+            if lang == "ch":
+                table_lang = "ch"
+            else:
+                table_lang = "en"
+            if params.structure_version == "PP-Structure":
+                params.merge_no_span_structure = False
 
-        if params.rec_char_dict_path is None:
-            params.rec_char_dict_path = str(
-                Path(__file__).parent / rec_model_config["dict_path"]
+            # init model dir
+            det_model_config = get_model_config(
+                "OCR", params.ocr_version, "det", det_lang
             )
-        if params.table_char_dict_path is None:
-            params.table_char_dict_path = str(
-                Path(__file__).parent / table_model_config["dict_path"]
+            params.det_model_dir, det_url = confirm_model_dir_url(
+                params.det_model_dir,
+                os.path.join(BASE_DIR, "whl", "det", det_lang),
+                det_model_config["url"],
             )
-        if params.layout_dict_path is None:
-            params.layout_dict_path = str(
-                Path(__file__).parent / layout_model_config["dict_path"]
+            rec_model_config = get_model_config("OCR", params.ocr_version, "rec", lang)
+            params.rec_model_dir, rec_url = confirm_model_dir_url(
+                params.rec_model_dir,
+                os.path.join(BASE_DIR, "whl", "rec", lang),
+                rec_model_config["url"],
             )
-        if params.formula_char_dict_path is None:
-            params.formula_char_dict_path = str(
-                Path(__file__).parent / formula_model_config["dict_path"]
+            table_model_config = get_model_config(
+                "STRUCTURE", params.structure_version, "table", table_lang
             )
-        logger.debug(params)
-        super().__init__(params)
+            params.table_model_dir, table_url = confirm_model_dir_url(
+                params.table_model_dir,
+                os.path.join(BASE_DIR, "whl", "table"),
+                table_model_config["url"],
+            )
+            layout_model_config = get_model_config(
+                "STRUCTURE", params.structure_version, "layout", lang
+            )
+            params.layout_model_dir, layout_url = confirm_model_dir_url(
+                params.layout_model_dir,
+                os.path.join(BASE_DIR, "whl", "layout"),
+                layout_model_config["url"],
+            )
+            formula_model_config = get_model_config(
+                "STRUCTURE", params.structure_version, "formula", lang
+            )
+            params.formula_model_dir, formula_url = confirm_model_dir_url(
+                params.formula_model_dir,
+                os.path.join(BASE_DIR, "whl", "formula"),
+                formula_model_config["url"],
+            )
+            # download model
+            if not params.use_onnx:
+                maybe_download_all(
+                    [
+                        (params.det_model_dir, det_url),
+                        (params.rec_model_dir, rec_url),
+                        (params.table_model_dir, table_url),
+                        (params.layout_model_dir, layout_url),
+                        (params.formula_model_dir, formula_url),
+                    ]
+                )
 
-    def __call__(
-        self,
-        img,
-        return_ocr_result_in_table=False,
-        img_idx=0,
-        alpha_color=(255, 255, 255),
-    ):
-        """
-        Performs structure analysis on the input image.
+            if params.rec_char_dict_path is None:
+                params.rec_char_dict_path = str(
+                    Path(__file__).parent / rec_model_config["dict_path"]
+                )
+            if params.table_char_dict_path is None:
+                params.table_char_dict_path = str(
+                    Path(__file__).parent / table_model_config["dict_path"]
+                )
+            if params.layout_dict_path is None:
+                params.layout_dict_path = str(
+                    Path(__file__).parent / layout_model_config["dict_path"]
+                )
+            if params.formula_char_dict_path is None:
+                params.formula_char_dict_path = str(
+                    Path(__file__).parent / formula_model_config["dict_path"]
+                )
+            logger.debug(params)
+            super().__init__(params)
+
+        def __call__(
+            self,
+            img,
+            return_ocr_result_in_table=False,
+            img_idx=0,
+            alpha_color=(255, 255, 255),
+        ):
+            """
+            Performs structure analysis on the input image.
+
+            Args:
+                img (str or numpy.ndarray): The input image to perform structure analysis on.
+                return_ocr_result_in_table (bool, optional): Whether to return OCR results in table format. Defaults to False.
+                img_idx (int, optional): The index of the image. Defaults to 0.
+                alpha_color (tuple, optional): The alpha color for transparent images. Defaults to (255, 255, 255).
+
+            Returns:
+                list or dict: The structure analysis results.
+
+            """
+            img, flag_gif, flag_pdf = check_img(img, alpha_color)
+            if flag_pdf:
+                res_list = []
+                for index, pdf_img in enumerate(img):
+                    logger.info("processing {}/{} page:".format(index + 1, len(img)))
+                    res, _ = super().__call__(
+                        pdf_img, return_ocr_result_in_table, img_idx=index
+                    )
+                    res_list.append(res)
+                close_pages(img)
+                return res_list
+            res, _ = super().__call__(img, return_ocr_result_in_table, img_idx=img_idx)
+            return res
 
-        Args:
-            img (str or numpy.ndarray): The input image to perform structure analysis on.
-            return_ocr_result_in_table (bool, optional): Whether to return OCR results in table format. Defaults to False.
-            img_idx (int, optional): The index of the image. Defaults to 0.
-            alpha_color (tuple, optional): The alpha color for transparent images. Defaults to (255, 255, 255).
+    PPStructure.__module__ = __name__
+    PPStructure.__qualname__ = "PPStructure"
+    globals()["PPStructure"] = PPStructure
+    return PPStructure
 
-        Returns:
-            list or dict: The structure analysis results.
 
-        """
-        img, flag_gif, flag_pdf = check_img(img, alpha_color)
-        if isinstance(img, list) and flag_pdf:
-            res_list = []
-            for index, pdf_img in enumerate(img):
-                logger.info("processing {}/{} page:".format(index + 1, len(img)))
-                res, _ = super().__call__(
-                    pdf_img, return_ocr_result_in_table, img_idx=index
-                )
-                res_list.append(res)
-            return res_list
-        res, _ = super().__call__(img, return_ocr_result_in_table, img_idx=img_idx)
-        return res
+def batch_main(argv=None):
+    """
+    `paddleocr batch --image_dir DIR --output OUT_DIR [--batch_workers N]`
+
+    OCR every image of image_dir with BatchRunner: the images are shared out to
+    batch_workers processes, each one with its own PaddleOCR, the results are
+    streamed to OUT_DIR/results.jsonl (or parquet files with --batch_sink parquet)
+    and a rerun of an interrupted batch skips the images listed as done in
+    OUT_DIR/manifest.jsonl.
+    """
+    from tools.infer.batch_runner import BatchRunner
+
+    args = parse_args(mMain=True, argv=argv, batch=True)
+    image_file_list = sorted(get_image_file_list(args.image_dir))
+    runner = BatchRunner(
+        functools.partial(PaddleOCR, **args.__dict__),
+        args.output,
+        num_workers=args.batch_workers,
+        sink=args.batch_sink,
+        ocr_kwargs=dict(
+            det=True,
+            rec=args.rec,
+            cls=args.use_angle_cls,
+            bin=args.binarize,
+            inv=args.invert,
+            alpha_color=args.alphacolor,
+        ),
+        vis_workers=args.batch_vis_workers,
+        vis_kwargs=dict(
+            font_path=args.vis_font_path,
+            drop_score=args.drop_score,
+            pdf_options=get_pdf_options(args),
+        ),
+        rows_per_file=args.batch_rows_per_file,
+    )
+    return runner.run(image_file_list)
+
+
+def profile_startup_main(args):
+    """
+    `paddleocr --profile-startup [--profile_startup_json FILE]`
+
+    Log the import time of the components of paddleocr, measured in a fresh
+    interpreter, and the time to build the det, rec and cls predictors.
+    """
+    from tools.infer.startup_profile import profile_startup
+
+    return profile_startup(
+        functools.partial(PaddleOCR, **args.__dict__),
+        PaddleOCR.__module__,
+        save_path=args.profile_startup_json,
+    )
 
 
 def main():
@@ -979,7 +1239,11 @@ def main():
         None
     """
     # for cmd
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        return batch_main(sys.argv[2:])
     args = parse_args(mMain=True)
+    if args.profile_startup:
+        return profile_startup_main(args)
     logger.info("for usage help, please use `paddleocr --help`")
     image_dir = args.image_dir
     if is_link(image_dir):
@@ -994,7 +1258,14 @@ def main():
     if args.type == "ocr":
         engine = PaddleOCR(**(args.__dict__))
     elif args.type == "structure":
-        engine = PPStructure(**(args.__dict__))
+        from ppstructure.recovery.recovery_to_doc import (
+            sorted_layout_boxes,
+            convert_info_docx,
+        )
+        from ppstructure.recovery.recovery_to_markdown import convert_info_markdown
+        from ppstructure.predict_system import save_structure_res
+
+        engine = _ppstructure_class()(**(args.__dict__))
     else:
         raise NotImplementedError
 
@@ -16,7 +16,8 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
-from .iaa_augment import IaaAugment
+import importlib
+
 from .make_border_map import MakeBorderMap
 from .make_shrink_map import MakeShrinkMap
 from .random_crop_data import EastRandomCropData, RandomCropImgMask
@@ -62,7 +63,37 @@ from .fce_targets import FCENetTargets
 from .ct_process import *
 from .drrg_targets import DRRGTargets
 from .latex_ocr_aug import *
-from .unimernet_aug import *
+
+
+# operators whose modules are slow to import (albumentations), they are only
+# imported when a config uses them
+_LAZY_OPS = {"IaaAugment": ".iaa_augment"}
+_LAZY_OPS.update(
+    (name, ".unimernet_aug")
+    for name in [
+        "Erosion",
+        "Dilation",
+        "Bitmap",
+        "Fog",
+        "Frost",
+        "Snow",
+        "Rain",
+        "Shadow",
+        "UniMERNetTrainTransform",
+        "UniMERNetTestTransform",
+        "GoTImgDecode",
+        "UniMERNetImgDecode",
+        "UniMERNetResize",
+        "UniMERNetImageFormat",
+    ]
+)
+
+
+def __getattr__(name):
+    if name in _LAZY_OPS:
+        module = importlib.import_module(_LAZY_OPS[name], __name__)
+        return getattr(module, name)
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
 
 
 def transform(data, ops=None):
@@ -91,6 +122,9 @@ def create_operators(op_param_list, global_config=None):
         param = {} if operator[op_name] is None else operator[op_name]
         if global_config is not None:
             param.update(global_config)
-        op = eval(op_name)(**param)
+        if op_name in _LAZY_OPS:
+            op = __getattr__(op_name)(**param)
+        else:
+            op = eval(op_name)(**param)
         ops.append(op)
     return ops
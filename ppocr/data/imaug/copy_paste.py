@@ -18,13 +18,14 @@ import numpy as np
 from PIL import Image
 from shapely.geometry import Polygon
 
-from ppocr.data.imaug.iaa_augment import IaaAugment
 from ppocr.data.imaug.random_crop_data import is_poly_outside_rect
 from tools.infer.utility import get_rotate_crop_image
 
 
 class CopyPaste(object):
     def __init__(self, objects_paste_ratio=0.2, limit_paste=True, **kwargs):
+        from ppocr.data.imaug.iaa_augment import IaaAugment
+
         self.ext_data_num = 1
         self.objects_paste_ratio = objects_paste_ratio
         self.limit_paste = limit_paste
@@ -29,12 +29,14 @@ os.environ["NO_ALBUMENTATIONS_UPDATE"] = "1"
 import math
 import cv2
 import numpy as np
-import albumentations as A
 from PIL import Image
 
 
 class LatexTrainTransform:
     def __init__(self, bitmap_prob=0.04, **kwargs):
+        # albumentations is slow to import, it is only needed by these transforms
+        import albumentations as A
+
         # your init code
         self.bitmap_prob = bitmap_prob
         self.train_transform = A.Compose(
@@ -79,6 +81,8 @@ class LatexTrainTransform:
 
 class LatexTestTransform:
     def __init__(self, **kwargs):
+        import albumentations as A
+
         # your init code
         self.test_transform = A.Compose(
             [
@@ -15,7 +15,6 @@
 import math
 import cv2
 import numpy as np
-from skimage.morphology._skeletonize import thin
 from ppocr.utils.e2e_utils.extract_textpoint_fast import (
     sort_and_expand_with_direction_v2,
 )
@@ -315,6 +314,9 @@ class PGProcessTrain(object):
         """
         Find the center point of poly as key_points, then fit and gather.
         """
+        # skimage is slow to import, it is only needed by PGNet
+        from skimage.morphology._skeletonize import thin
+
         det_mask = np.zeros(
             (int(max_h / self.ds_ratio), int(max_w / self.ds_ratio))
         ).astype(np.float32)
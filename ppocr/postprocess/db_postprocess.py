@@ -25,6 +25,8 @@ import paddle
 from shapely.geometry import Polygon
 import pyclipper
 
+from .parallel import map_ordered
+
 
 class DBPostProcess(object):
     """
@@ -40,6 +42,7 @@ class DBPostProcess(object):
         use_dilation=False,
         score_mode="fast",
         box_type="quad",
+        num_threads=1,
         **kwargs,
     ):
         self.thresh = thresh
@@ -49,10 +52,12 @@ class DBPostProcess(object):
         self.min_size = 3
         self.score_mode = score_mode
         self.box_type = box_type
+        self.num_threads = num_threads
         assert score_mode in [
             "slow",
             "fast",
-        ], "Score mode must be in [slow, fast] but got: {}".format(score_mode)
+            "cc",
+        ], "Score mode must be in [slow, fast, cc] but got: {}".format(score_mode)
 
         self.dilation_kernel = None if not use_dilation else np.array([[1, 1], [1, 1]])
 
@@ -157,6 +162,84 @@ class DBPostProcess(object):
             scores.append(score)
         return np.array(boxes, dtype="int32"), scores
 
+    def boxes_from_labels(self, pred, _bitmap, dest_width, dest_height):
+        """
+        score_mode "cc" of boxes_from_bitmap, without a python loop over the
+        contours: the sums of pred over the connected components of the bitmap
+        come from one bincount, their minimum area rectangles are unclipped in
+        closed form and rescaled together. Unlike boxes_from_bitmap, the holes
+        of the components do not give boxes.
+        _bitmap: single map with shape (H, W), whose values are binarized as {0, 1}
+        """
+        bitmap = np.asarray(_bitmap, dtype=np.uint8)
+        height, width = bitmap.shape
+        num_labels, labels = cv2.connectedComponents(bitmap, connectivity=8)
+        empty = np.zeros((0, 4, 2), dtype="int32"), []
+        if num_labels <= 1:
+            return empty
+
+        fg = bitmap > 0
+        fg_labels = labels[fg]
+        area = np.bincount(fg_labels, minlength=num_labels)
+        score_sum = np.bincount(fg_labels, weights=pred[fg], minlength=num_labels)
+        keep = score_sum >= self.box_thresh * area
+        keep[0] = False
+        keep[self.max_candidates + 1 :] = False
+        if not keep.any():
+            return empty
+
+        # the convex hull of a component is the one of the ends of its
+        # horizontal runs, the points are grouped by label in row-major order
+        run_ends = np.ones((height, width), dtype=np.uint8)
+        run_ends[:, 1:] = labels[:, 1:] != labels[:, :-1]
+        run_ends[:, :-1] |= run_ends[:, 1:].copy()
+        run_ends[:, -1] = 1
+        run_ends &= bitmap
+        points = cv2.findNonZero(run_ends).reshape(-1, 2)
+        point_labels = labels[points[:, 1], points[:, 0]]
+        selected = keep[point_labels]
+        point_labels = point_labels[selected]
+        order = np.argsort(point_labels, kind="stable")
+        points = points[selected][order]
+        kept = np.flatnonzero(keep)
+        bounds = np.searchsorted(point_labels[order], np.r_[kept, kept[-1] + 1])
+
+        rects = np.array(
+            [
+                _flat_rect(cv2.minAreaRect(points[bounds[i] : bounds[i + 1]]))
+                for i in range(len(kept))
+            ],
+            dtype=np.float64,
+        ).reshape(-1, 5)
+        sides = rects[:, 2:4]
+        # like box_score_fast, the score is the mean over the rectangle, the
+        # pixels of the rectangle outside the component count as zeros
+        box_scores = score_sum[kept] / np.maximum(
+            (sides[:, 0] + 1) * (sides[:, 1] + 1), area[kept]
+        )
+        valid = (sides.min(axis=1) >= self.min_size) & (box_scores >= self.box_thresh)
+        rects, sides, box_scores = rects[valid], sides[valid], box_scores[valid]
+
+        # a rectangle unclipped by pyclipper is a rounded rectangle, whose
+        # minimum area rectangle is the rectangle grown by the offset
+        distance = (
+            sides[:, 0] * sides[:, 1] * self.unclip_ratio / (2 * sides.sum(axis=1))
+        )
+        rects[:, 2:4] += 2 * distance[:, None]
+        valid = rects[:, 2:4].min(axis=1) >= self.min_size + 2
+        rects, box_scores = rects[valid], box_scores[valid]
+        if len(rects) == 0:
+            return empty
+
+        boxes = _order_box_points(_rect_points(rects))
+        boxes[..., 0] = np.clip(
+            np.round(boxes[..., 0] / width * dest_width), 0, dest_width
+        )
+        boxes[..., 1] = np.clip(
+            np.round(boxes[..., 1] / height * dest_height), 0, dest_height
+        )
+        return boxes.astype("int32"), box_scores.tolist()
+
     def unclip(self, box, unclip_ratio):
         poly = Polygon(box)
         distance = poly.area * unclip_ratio / poly.length
@@ -229,31 +312,71 @@ class DBPostProcess(object):
         if isinstance(pred, paddle.Tensor):
             pred = pred.numpy()
         pred = pred[:, 0, :, :]
+
+        # the images are independent, see parallel.py
+        return map_ordered(
+            lambda batch_index: self.boxes_of_image(
+                pred[batch_index], shape_list[batch_index]
+            ),
+            range(pred.shape[0]),
+            self.num_threads,
+        )
+
+    def boxes_of_image(self, pred, shape):
+        src_h, src_w, ratio_h, ratio_w = shape
         segmentation = pred > self.thresh
+        if self.dilation_kernel is not None:
+            mask = cv2.dilate(
+                np.array(segmentation).astype(np.uint8),
+                self.dilation_kernel,
+            )
+        else:
+            mask = segmentation
+        if self.box_type == "poly":
+            boxes, scores = self.polygons_from_bitmap(pred, mask, src_w, src_h)
+        elif self.box_type == "quad" and self.score_mode == "cc":
+            boxes, scores = self.boxes_from_labels(pred, mask, src_w, src_h)
+        elif self.box_type == "quad":
+            boxes, scores = self.boxes_from_bitmap(pred, mask, src_w, src_h)
+        else:
+            raise ValueError("box_type can only be one of ['quad', 'poly']")
+        return {"points": boxes}
 
-        boxes_batch = []
-        for batch_index in range(pred.shape[0]):
-            src_h, src_w, ratio_h, ratio_w = shape_list[batch_index]
-            if self.dilation_kernel is not None:
-                mask = cv2.dilate(
-                    np.array(segmentation[batch_index]).astype(np.uint8),
-                    self.dilation_kernel,
-                )
-            else:
-                mask = segmentation[batch_index]
-            if self.box_type == "poly":
-                boxes, scores = self.polygons_from_bitmap(
-                    pred[batch_index], mask, src_w, src_h
-                )
-            elif self.box_type == "quad":
-                boxes, scores = self.boxes_from_bitmap(
-                    pred[batch_index], mask, src_w, src_h
-                )
-            else:
-                raise ValueError("box_type can only be one of ['quad', 'poly']")
 
-            boxes_batch.append({"points": boxes})
-        return boxes_batch
+def _flat_rect(rect):
+    (cx, cy), (w, h), angle = rect
+    return cx, cy, w, h, angle
+
+
+def _rect_points(rects):
+    """cv2.boxPoints of the (cx, cy, w, h, angle) rows of rects, shape (N, 4, 2)."""
+    center = rects[:, None, 0:2]
+    w, h = rects[:, 2], rects[:, 3]
+    angle = np.deg2rad(rects[:, 4])
+    b = np.cos(angle) * 0.5
+    a = np.sin(angle) * 0.5
+    p0 = np.stack([-a * h - b * w, b * h - a * w], axis=1)
+    p1 = np.stack([a * h - b * w, -b * h - a * w], axis=1)
+    offsets = np.stack([p0, p1, -p0, -p1], axis=1)
+    return (center + offsets).astype(np.float32)
+
+
+def _order_box_points(points):
+    """
+    The point order of DBPostProcess.get_mini_boxes for a batch of boxes:
+    the two leftmost points first (top, then bottom last), then the others.
+    """
+    points = np.take_along_axis(
+        points, np.argsort(points[..., 0], axis=1, kind="stable")[..., None], axis=1
+    )
+    left_swap = points[:, 1, 1] <= points[:, 0, 1]
+    right_swap = points[:, 3, 1] <= points[:, 2, 1]
+    index = np.empty((len(points), 4), dtype=np.int64)
+    index[:, 0] = np.where(left_swap, 1, 0)
+    index[:, 3] = np.where(left_swap, 0, 1)
+    index[:, 1] = np.where(right_swap, 3, 2)
+    index[:, 2] = np.where(right_swap, 2, 3)
+    return np.take_along_axis(points, index[..., None], axis=1)
 
 
 class DistillationDBPostProcess(object):
@@ -268,6 +391,7 @@ class DistillationDBPostProcess(object):
         use_dilation=False,
         score_mode="fast",
         box_type="quad",
+        num_threads=1,
         **kwargs,
     ):
         self.model_name = model_name
@@ -280,6 +404,7 @@ class DistillationDBPostProcess(object):
             use_dilation=use_dilation,
             score_mode=score_mode,
             box_type=box_type,
+            num_threads=num_threads,
         )
 
     def __call__(self, predicts, shape_list):
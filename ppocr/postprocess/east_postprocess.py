@@ -17,14 +17,19 @@ from __future__ import division
 from __future__ import print_function
 
 import numpy as np
-from .locality_aware_nms import nms_locality
+from .locality_aware_nms import nms_locality_fast
 import cv2
 import paddle
 
 import os
-from ppocr.utils.utility import check_install
 import sys
 
+try:
+    # the c++ la-nms of lanms-nova, when installed
+    import lanms
+except ImportError:
+    lanms = None
+
 
 class EASTPostProcess(object):
     """
@@ -72,16 +77,10 @@ class EASTPostProcess(object):
         boxes[:, :8] = text_box_restored.reshape((-1, 8))
         boxes[:, 8] = score_map[xy_text[:, 0], xy_text[:, 1]]
 
-        try:
-            check_install("lanms", "lanms-nova")
-            import lanms
-
+        if lanms is not None:
             boxes = lanms.merge_quadrangle_n9(boxes, nms_thresh)
-        except:
-            print(
-                "You should install lanms by pip3 install lanms-nova to speed up nms_locality"
-            )
-            boxes = nms_locality(boxes.astype(np.float64), nms_thresh)
+        else:
+            boxes = nms_locality_fast(boxes.astype(np.float64), nms_thresh)
         if boxes.shape[0] == 0:
             return []
         # Here we filter some low score boxes by the average score map,
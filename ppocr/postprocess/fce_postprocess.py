@@ -20,7 +20,8 @@ import cv2
 import paddle
 import numpy as np
 from numpy.fft import ifft
-from ppocr.utils.poly_nms import poly_nms, valid_boundary
+from ppocr.postprocess.parallel import map_ordered
+from ppocr.utils.poly_nms import poly_nms_fast, valid_boundary
 
 
 def fill_hole(input_mask):
@@ -76,6 +77,8 @@ class FCEPostProcess(object):
         alpha=1.0,
         beta=1.0,
         box_type="poly",
+        num_threads=1,
+        nms_mode="poly",
         **kwargs,
     ):
         self.scales = scales
@@ -87,6 +90,8 @@ class FCEPostProcess(object):
         self.alpha = alpha
         self.beta = beta
         self.box_type = box_type
+        self.num_threads = num_threads
+        self.nms_mode = nms_mode
 
     def __call__(self, preds, shape_list):
         score_maps = []
@@ -130,13 +135,17 @@ class FCEPostProcess(object):
 
     def get_boundary(self, score_maps, shape_list):
         assert len(score_maps) == len(self.scales)
+        # the levels are decoded independently, see parallel.py
         boundaries = []
-        for idx, score_map in enumerate(score_maps):
-            scale = self.scales[idx]
-            boundaries = boundaries + self._get_boundary_single(score_map, scale)
+        for level_boundaries in map_ordered(
+            lambda idx: self._get_boundary_single(score_maps[idx], self.scales[idx]),
+            range(len(score_maps)),
+            self.num_threads,
+        ):
+            boundaries = boundaries + level_boundaries
 
         # nms
-        boundaries = poly_nms(boundaries, self.nms_thr)
+        boundaries = poly_nms_fast(boundaries, self.nms_thr, self.nms_mode)
         boundaries, scores = self.resize_boundary(
             boundaries, (1 / shape_list[0, 2:]).tolist()[::-1]
         )
@@ -158,6 +167,7 @@ class FCEPostProcess(object):
             box_type=self.box_type,
             score_thr=self.score_thr,
             nms_thr=self.nms_thr,
+            nms_mode=self.nms_mode,
         )
 
     def fcenet_decode(
@@ -171,6 +181,7 @@ class FCEPostProcess(object):
         box_type="poly",
         score_thr=0.3,
         nms_thr=0.1,
+        nms_mode="poly",
     ):
         """Decoding predictions of FCENet to instances.
 
@@ -188,6 +199,8 @@ class FCEPostProcess(object):
             score_thr (float) : The threshold used to filter out the final
                 candidates.
             nms_thr (float) :  The threshold of nms.
+            nms_mode (str) : The IoU of the nms, 'poly' or 'mask', see
+                poly_nms_fast.
 
         Returns:
             boundaries (list[list[float]]): The instance boundary and confidence
@@ -231,11 +244,13 @@ class FCEPostProcess(object):
 
             polygons = fourier2poly(c, num_reconstr_points)
             score = score_map[score_mask].reshape(-1, 1)
-            polygons = poly_nms(np.hstack((polygons, score)).tolist(), nms_thr)
+            polygons = poly_nms_fast(
+                np.hstack((polygons, score)).tolist(), nms_thr, nms_mode
+            )
 
             boundaries = boundaries + polygons
 
-        boundaries = poly_nms(boundaries, nms_thr)
+        boundaries = poly_nms_fast(boundaries, nms_thr, nms_mode)
 
         if box_type == "quad":
             new_boundaries = []
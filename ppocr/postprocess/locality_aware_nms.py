@@ -6,6 +6,8 @@ This code is referred from: https://github.com/songdejia/EAST/blob/master/locali
 import numpy as np
 from shapely.geometry import Polygon
 
+from ppocr.utils.poly_nms import box_overlap_pairs, greedy_nms
+
 
 def intersection(g, p):
     """
@@ -193,6 +195,268 @@ def nms_locality(polys, thres=0.3):
     return standard_nms(np.array(S), thres)
 
 
+_NEXT = [1, 2, 3, 0]
+
+
+def _polygon_areas(polygons):
+    """Signed shoelace areas of (n, k, 2) polygons."""
+    x, y = polygons[..., 0], polygons[..., 1]
+    nxt = np.roll(np.arange(polygons.shape[-2]), -1)
+    return 0.5 * np.sum(x * y[..., nxt] - x[..., nxt] * y, axis=-1)
+
+
+def _cross(a, b):
+    return a[..., 0] * b[..., 1] - a[..., 1] * b[..., 0]
+
+
+def _untangle(quads):
+    """
+    Self-intersecting quads of (n, 4, 2) replaced by their larger lobe, as
+    `buffer(0)` makes them: a triangle, as a quad repeating its last corner.
+    """
+    quads = quads.copy()
+    for first, second in [(0, 2), (1, 3)]:
+        p, r = quads[:, first], quads[:, second]
+        d1 = quads[:, first + 1] - p
+        d2 = quads[:, (second + 1) % 4] - r
+        denom = _cross(d1, d2)
+        safe = np.where(denom == 0, 1.0, denom)
+        t = _cross(r - p, d2) / safe
+        u = _cross(r - p, d1) / safe
+        crossed = (denom != 0) & (t > 0) & (t < 1) & (u > 0) & (u < 1)
+        if not crossed.any():
+            continue
+        q = quads[crossed]
+        center = (p + t[:, None] * d1)[crossed][:, None]
+        lobe_a = np.concatenate([center, q[:, [first + 1, second, second]]], axis=1)
+        lobe_b = np.concatenate(
+            [center, q[:, [(second + 1) % 4, first, first]]], axis=1
+        )
+        area_a, area_b = _polygon_areas(lobe_a), _polygon_areas(lobe_b)
+        keep_a = np.where(area_a + area_b > 0, area_a > area_b, area_a < area_b)
+        quads[crossed] = np.where(keep_a[:, None, None], lobe_a, lobe_b)
+    return quads
+
+
+def _convex_pieces(quads, areas):
+    """
+    Split of (n, 4, 2) quads in two triangles, as quads repeating their last
+    corner. Convex quads are cut along the diagonal from corner 0, concave
+    ones along the diagonal of their reflex corner. Also returns the masks of
+    the concave quads and of the quads the split is valid for, which
+    self-intersecting ones are not.
+    """
+    edges = quads[:, _NEXT] - quads
+    # turns[k] is the turn at corner k + 1, against the orientation if reflex
+    turns = _cross(edges, edges[:, _NEXT]) * np.sign(areas)[:, None]
+    reflex = (np.argmin(turns, axis=1) + 1) % 4
+    concave = np.any(turns < 0, axis=1)
+    reflex[~concave] = 0
+    corners = (reflex[:, None] + np.arange(4)) % 4
+    first = np.take_along_axis(quads, corners[:, [0, 1, 2, 2], None], axis=1)
+    second = np.take_along_axis(quads, corners[:, [2, 3, 0, 0], None], axis=1)
+    split = np.abs(_polygon_areas(first)) + np.abs(_polygon_areas(second))
+    valid = np.abs(split - np.abs(areas)) <= 1e-9 * np.maximum(np.abs(areas), 1)
+    return (first, second), concave, valid
+
+
+def _convex_intersection_areas(a, b, area_a, area_b):
+    """
+    Intersection areas of pairs of convex quads a[k], b[k] of shape (n, 4, 2),
+    by clipping a with the half-planes of the edges of b (Sutherland-Hodgman).
+    Every clip keeps the corners inside and the crossings of the edges, so
+    the ring grows by one point at most: the kept points are moved to the
+    front and the free places repeat the last one, which adds no area.
+    """
+    n = a.shape[0]
+    rows = np.arange(n)[:, None]
+    side = np.sign(area_b)[:, None]
+    ring = a
+    empty = np.zeros(n, dtype=bool)
+    for j in range(4):
+        corner = b[:, j, None]
+        edge = (b[:, _NEXT[j]] - b[:, j])[:, None]
+        dist = side * _cross(edge, ring - corner)
+        next_dist = np.roll(dist, -1, axis=1)
+        inside = dist >= 0
+        crossing = inside != (next_dist >= 0)
+        t = dist / np.where(crossing, dist - next_dist, 1.0)
+        crossings = ring + t[..., None] * (np.roll(ring, -1, axis=1) - ring)
+
+        size = ring.shape[1]
+        points = np.stack([ring, crossings], axis=2).reshape(n, 2 * size, 2)
+        kept = np.stack([inside, crossing], axis=2).reshape(n, 2 * size)
+        count = kept.sum(axis=1)
+        empty |= count == 0
+        order = np.argsort(~kept, axis=1, kind="stable")[:, : size + 1]
+        last = order[rows, np.maximum(count - 1, 0)[:, None]]
+        order = np.where(np.arange(size + 1) < count[:, None], order, last)
+        ring = points[rows, order]
+    areas = np.abs(_polygon_areas(ring))
+    areas[empty | (np.abs(area_a) < 1e-12) | (np.abs(area_b) < 1e-12)] = 0
+    return areas
+
+
+def quad_iou(g, p):
+    """
+    IoU of the quads of the rows g[k] and p[k], batched version of
+    `intersection`. Pairs whose bounding boxes do not overlap are 0 without
+    clipping. Concave quads are clipped as two triangles, self-intersecting
+    ones as their larger lobe. Pairs of degenerate quads that are neither
+    fall back to `intersection`.
+    """
+    g = _untangle(np.asarray(g, dtype=np.float64)[:, :8].reshape(-1, 4, 2))
+    p = _untangle(np.asarray(p, dtype=np.float64)[:, :8].reshape(-1, 4, 2))
+    ious = np.zeros(g.shape[0], dtype=np.float64)
+    area_g, area_p = _polygon_areas(g), _polygon_areas(p)
+    overlap = (
+        np.all(g.min(axis=1) <= p.max(axis=1), axis=1)
+        & np.all(p.min(axis=1) <= g.max(axis=1), axis=1)
+        & (np.abs(area_g) > 1e-12)
+        & (np.abs(area_p) > 1e-12)
+    )
+    if not overlap.any():
+        return ious
+    idx = np.flatnonzero(overlap)
+    g, p, area_g, area_p = g[idx], p[idx], area_g[idx], area_p[idx]
+    pieces_g, concave_g, simple_g = _convex_pieces(g, area_g)
+    pieces_p, concave_p, simple_p = _convex_pieces(p, area_p)
+    simple = simple_g & simple_p
+    convex = simple & ~concave_g & ~concave_p
+    concave = simple & ~convex
+
+    inter = np.zeros(len(idx), dtype=np.float64)
+    inter[convex] = _convex_intersection_areas(
+        g[convex], p[convex], area_g[convex], area_p[convex]
+    )
+    if concave.any():
+        a = np.concatenate([piece[concave] for piece in pieces_g for _ in pieces_p])
+        b = np.concatenate([piece[concave] for _ in pieces_g for piece in pieces_p])
+        inter[concave] = (
+            _convex_intersection_areas(a, b, _polygon_areas(a), _polygon_areas(b))
+            .reshape(4, -1)
+            .sum(axis=0)
+        )
+    union = np.abs(area_g[simple]) + np.abs(area_p[simple]) - inter[simple]
+    ious[idx[simple]] = np.where(union > 0, inter[simple] / np.maximum(union, 1e-12), 0)
+    for k in np.flatnonzero(~simple):
+        ious[idx[k]] = intersection(g[k].reshape(-1), p[k].reshape(-1))
+    return ious
+
+
+def _iou_over(g, p, thres):
+    """
+    quad_iou(g, p) > thres, clipping only the pairs whose bound is over thres:
+    the overlap of the bounding boxes, over the union of the areas with that
+    overlap as their intersection.
+    """
+    g = np.asarray(g, dtype=np.float64)[:, :8].reshape(-1, 4, 2)
+    p = np.asarray(p, dtype=np.float64)[:, :8].reshape(-1, 4, 2)
+    size = np.minimum(g.max(axis=1), p.max(axis=1)) - np.maximum(
+        g.min(axis=1), p.min(axis=1)
+    )
+    box_inter = np.prod(np.maximum(size, 0), axis=1)
+    # the shoelace area of a self-intersecting quad is under the area of its lobe
+    area_g, area_p = np.abs(_polygon_areas(g)), np.abs(_polygon_areas(p))
+    union = np.maximum(area_g + area_p - box_inter, np.maximum(area_g, area_p))
+    over = box_inter > thres * union
+    idx = np.flatnonzero(over)
+    over[idx] = quad_iou(g[idx].reshape(-1, 8), p[idx].reshape(-1, 8)) > thres
+    return over
+
+
+def overlap_pairs(quads):
+    """
+    Index pairs (i, j), i < j, of the quads whose bounding boxes overlap,
+    see `box_overlap_pairs`.
+    """
+    quads = np.asarray(quads, dtype=np.float64)[:, :8].reshape(-1, 4, 2)
+    return box_overlap_pairs(np.concatenate([quads.min(axis=1), quads.max(axis=1)], 1))
+
+
+def standard_nms_fast(S, thres):
+    """
+    Standard nms on a suppression graph: the IoUs are only computed for the
+    pairs of `overlap_pairs`, all at once, then the boxes are visited by
+    decreasing score as in `standard_nms`.
+    """
+    if len(S) == 0:
+        return S[:0]
+    i, j = overlap_pairs(S)
+    hit = _iou_over(S[i], S[j], thres)
+    order = np.argsort(S[:, 8])[::-1]
+    return S[greedy_nms(order, i[hit], j[hit], len(S))]
+
+
+def _run_starts(rows, weighted, thres, window):
+    """
+    First rows of the runs of `nms_locality`: a row starts a run unless its
+    IoU with the weighted merge of the run before it is over thres.
+
+    The starts are guessed from the IoUs of each row with the previous one,
+    exact for the rows after a run of one row, then checked by windows: the
+    merges of the guessed runs before every row of the window are cumulated
+    sums, and all the IoUs of the window are computed at once. The rows up to
+    the first wrong guess are right. The decisions of the window become the
+    new guesses and the next window starts from the run of that row.
+    """
+    n = len(rows)
+    is_start = np.ones(n, dtype=bool)
+    is_start[1:] = ~_iou_over(rows[1:], rows[:-1], thres)
+    begin, size = 0, window
+    while begin < n - 1:
+        end = min(n, begin + size)
+        local = np.arange(end - begin)
+        run_start = np.maximum.accumulate(np.where(is_start[begin:end], local, 0))
+        sums = np.cumsum(weighted[begin:end], axis=0)
+        scores = np.cumsum(rows[begin:end, 8])
+        # the run before row k is made of the rows run_start[k - 1] to k - 1
+        head = run_start[:-1] - 1
+        sums = sums[:-1] - np.where(head[:, None] >= 0, sums[head], 0)
+        scores = scores[:-1] - np.where(head >= 0, scores[head], 0)
+        merged = np.concatenate([sums / scores[:, None], scores[:, None]], axis=1)
+        merges = _iou_over(rows[begin + 1 : end], merged, thres)
+        wrong = np.flatnonzero(merges == is_start[begin + 1 : end])
+        if len(wrong) > 0:
+            k = begin + 1 + wrong[0]
+            is_start[begin + 1 : end] = ~merges
+            begin = k if is_start[k] else begin + run_start[wrong[0]]
+            size = window
+        elif end == n:
+            break
+        elif run_start[-1] == 0:
+            # a run longer than the window
+            size *= 2
+        else:
+            begin += run_start[-1]
+            size = window
+    return np.flatnonzero(is_start)
+
+
+def nms_locality_fast(polys, thres=0.3, window=512):
+    """
+    locality aware nms of EAST in NumPy, same result as `nms_locality`
+    without a row by row loop, see `_run_starts`.
+    :param polys: a N*9 numpy array. first 8 coordinates, then prob
+    :return: boxes after nms
+    """
+    polys = np.asarray(polys)
+    n = len(polys)
+    if n == 0:
+        return polys.reshape(0, 9)
+    rows = polys.astype(np.float64)
+    weighted = rows[:, :8] * rows[:, 8:9]
+    starts = _run_starts(rows, weighted, thres, window)
+
+    scores = np.add.reduceat(rows[:, 8], starts)
+    S = np.concatenate(
+        [np.add.reduceat(weighted, starts) / scores[:, None], scores[:, None]], axis=1
+    )
+    single = np.diff(np.append(starts, n)) == 1
+    S[single] = rows[starts[single]]
+    return standard_nms_fast(S.astype(polys.dtype), thres)
+
+
 if __name__ == "__main__":
     # 343,350,448,135,474,143,369,359
     print(Polygon(np.array([[343, 350], [448, 135], [474, 143], [369, 359]])).area)
@@ -0,0 +1,61 @@
+# Copyright (c) 2024 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Thread pools for the per-image work of the post-processing.
+
+Most of the detection post-processing (thresholding, dilation, contours,
+connected components, scoring) is in OpenCV and NumPy calls that release the
+GIL, so the images of a batch, or the tiles of a page, are processed in
+parallel by threads. The results keep the order of the inputs whatever the
+thread count.
+
+The pools are shared by all the post-processors of the process, one per
+thread count. Work submitted from a pool thread runs inline, so nested
+calls (a tile whose detection post-processes a batch) never wait on their
+own pool.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+__all__ = ["get_executor", "map_ordered"]
+
+_executors = {}
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def _mark_worker():
+    _local.worker = True
+
+
+def get_executor(num_threads):
+    """The shared pool of num_threads threads."""
+    with _lock:
+        executor = _executors.get(num_threads)
+        if executor is None:
+            executor = _executors[num_threads] = ThreadPoolExecutor(
+                max_workers=num_threads,
+                thread_name_prefix="ppocr_post",
+                initializer=_mark_worker,
+            )
+        return executor
+
+
+def map_ordered(func, items, num_threads=1):
+    """[func(item) for item in items], on num_threads threads if more than 1."""
+    items = list(items)
+    if num_threads <= 1 or len(items) <= 1 or getattr(_local, "worker", False):
+        return [func(item) for item in items]
+    return list(get_executor(num_threads).map(func, items))
@@ -25,6 +25,7 @@ import cv2
 import paddle
 from paddle.nn import functional as F
 
+from ppocr.postprocess.parallel import map_ordered
 from ppocr.postprocess.pse_postprocess.pse import pse
 
 
@@ -40,6 +41,7 @@ class PSEPostProcess(object):
         min_area=16,
         box_type="quad",
         scale=4,
+        num_threads=1,
         **kwargs,
     ):
         assert box_type in ["quad", "poly"], "Only quad and poly is supported"
@@ -48,6 +50,7 @@ class PSEPostProcess(object):
         self.min_area = min_area
         self.box_type = box_type
         self.scale = scale
+        self.num_threads = num_threads
 
     def __call__(self, outs_dict, shape_list):
         pred = outs_dict["maps"]
@@ -66,14 +69,13 @@ class PSEPostProcess(object):
         score = score.numpy()
         kernels = kernels.numpy().astype(np.uint8)
 
-        boxes_batch = []
-        for batch_index in range(pred.shape[0]):
+        def boxes_of_image(batch_index):
             boxes, scores = self.boxes_from_bitmap(
                 score[batch_index], kernels[batch_index], shape_list[batch_index]
             )
+            return {"points": boxes, "scores": scores}
 
-            boxes_batch.append({"points": boxes, "scores": scores})
-        return boxes_batch
+        return map_ordered(boxes_of_image, range(pred.shape[0]), self.num_threads)
 
     def boxes_from_bitmap(self, score, kernels, shape):
         label = pse(kernels, self.min_area)
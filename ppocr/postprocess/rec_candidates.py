@@ -0,0 +1,326 @@
+# Copyright (c) 2024 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Columnar storage of the per-character candidates produced by CTCLabelDecode.
+
+All characters of all lines live in flat NumPy arrays indexed through per-line
+offsets. The `[text, score, char_details]` list/dict form returned by the
+default decode path is only rendered when a line is accessed.
+"""
+
+import json
+from collections.abc import Sequence
+
+import numpy as np
+
+__all__ = ["RecCandidates", "CharDetails", "weighted_top1_scores"]
+
+
+def weighted_top1_scores(offsets, top1_scores, first_weight=1.0, rest_weight=0.5):
+    """
+    Line confidence used by TextRecognizer: weighted mean of the top-1 score of
+    every character, the first character weighted `first_weight` and the others
+    `rest_weight`. Empty lines score 0.
+    """
+    offsets = np.asarray(offsets)
+    lengths = np.diff(offsets)
+    num_lines = len(lengths)
+    line_ids = np.repeat(np.arange(num_lines), lengths)
+    weights = np.full(len(top1_scores), rest_weight, dtype=np.float64)
+    weights[offsets[:-1][lengths > 0]] = first_weight
+    num = np.bincount(
+        line_ids, weights=weights * top1_scores.astype(np.float64), minlength=num_lines
+    )
+    den = np.bincount(line_ids, weights=weights, minlength=num_lines)
+    scores = np.zeros(num_lines, dtype=np.float64)
+    np.divide(num, den, out=scores, where=den > 0)
+    return scores
+
+
+class CharDetails(Sequence):
+    """
+    Lazy view of the char_details of one line. Items are rendered as
+    {"char", "position", "time_step", "top3": [{"char", "score"}, ...]} on access.
+    """
+
+    def __init__(self, candidates, line_idx):
+        self._candidates = candidates
+        self._line_idx = line_idx
+
+    def __len__(self):
+        offsets = self._candidates.offsets
+        return int(offsets[self._line_idx + 1] - offsets[self._line_idx])
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return self.tolist()[idx]
+        length = len(self)
+        if idx < 0:
+            idx += length
+        if not 0 <= idx < length:
+            raise IndexError("char index out of range")
+        return self._candidates.render_char(self._line_idx, idx)
+
+    def __eq__(self, other):
+        if isinstance(other, (list, CharDetails)):
+            return self.tolist() == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return repr(self.tolist())
+
+    def tolist(self):
+        return self._candidates.char_details(self._line_idx)
+
+
+class RecCandidates(object):
+    """
+    Recognition results of a list of text lines backed by NumPy arrays.
+
+    args:
+        character(list): the decoder's character table, index 0 is the CTC blank
+        texts(list): decoded text of each line
+        scores(array): confidence of each line, shape [L]
+        offsets(array): characters of line i are [offsets[i], offsets[i + 1]), shape [L + 1]
+        char_ids(array): int32 character index of every emitted character, shape [N]
+        time_steps(array): int32 CTC time step of every emitted character, shape [N]
+        topk_ids(array): int32 candidate character indices, shape [N, k]
+        topk_scores(array): float16/float32 candidate scores, shape [N, k]
+        boxes(array|None): optional detection box of each line, shape [L, 4, 2]
+
+    Indexing returns `[text, score, char_details]`, or `[box, [text, score, char_details]]`
+    when boxes are attached, i.e. the same layout as the default result lists.
+    """
+
+    def __init__(
+        self,
+        character,
+        texts,
+        scores,
+        offsets,
+        char_ids,
+        time_steps,
+        topk_ids,
+        topk_scores,
+        boxes=None,
+    ):
+        self.character = character
+        self.texts = list(texts)
+        self.scores = np.asarray(scores, dtype=np.float64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.char_ids = np.asarray(char_ids, dtype=np.int32)
+        self.time_steps = np.asarray(time_steps, dtype=np.int32)
+        self.topk_ids = np.asarray(topk_ids, dtype=np.int32)
+        self.topk_scores = np.asarray(topk_scores)
+        self.boxes = boxes
+        assert len(self.offsets) == len(self.texts) + 1
+
+    @classmethod
+    def empty(cls, character, topk=3, score_dtype="float32"):
+        return cls(
+            character,
+            [],
+            np.zeros(0),
+            np.zeros(1, dtype=np.int64),
+            np.zeros(0, dtype=np.int32),
+            np.zeros(0, dtype=np.int32),
+            np.zeros((0, topk), dtype=np.int32),
+            np.zeros((0, topk), dtype=score_dtype),
+        )
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def __getitem__(self, idx):
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("line index out of range")
+        line = [self.texts[idx], float(self.scores[idx]), CharDetails(self, idx)]
+        if self.boxes is None:
+            return line
+        return [np.asarray(self.boxes[idx]).tolist(), line]
+
+    def __repr__(self):
+        return "RecCandidates(lines={}, chars={}, topk={})".format(
+            len(self), len(self.char_ids), self.topk_ids.shape[1]
+        )
+
+    def render_char(self, line_idx, char_idx):
+        i = int(self.offsets[line_idx]) + char_idx
+        character = self.character
+        return {
+            "char": character[self.char_ids[i]],
+            "position": char_idx,
+            "time_step": int(self.time_steps[i]),
+            "top3": [
+                {"char": character[cand_id], "score": cand_score}
+                for cand_id, cand_score in zip(
+                    self.topk_ids[i].tolist(), self.topk_scores[i].tolist()
+                )
+            ],
+        }
+
+    def char_details(self, line_idx):
+        """Render the char_details of one line as a list of dicts."""
+        beg, end = int(self.offsets[line_idx]), int(self.offsets[line_idx + 1])
+        character = self.character
+        char_ids = self.char_ids[beg:end].tolist()
+        time_steps = self.time_steps[beg:end].tolist()
+        topk_ids = self.topk_ids[beg:end].tolist()
+        topk_scores = self.topk_scores[beg:end].tolist()
+        return [
+            {
+                "char": character[char_ids[i]],
+                "position": i,
+                "time_step": time_steps[i],
+                "top3": [
+                    {"char": character[cand_id], "score": cand_score}
+                    for cand_id, cand_score in zip(topk_ids[i], topk_scores[i])
+                ],
+            }
+            for i in range(end - beg)
+        ]
+
+    def tolist(self):
+        """Render every line in the default list/dict form."""
+        res = []
+        for idx in range(len(self)):
+            line = [self.texts[idx], float(self.scores[idx]), self.char_details(idx)]
+            if self.boxes is not None:
+                line = [np.asarray(self.boxes[idx]).tolist(), line]
+            res.append(line)
+        return res
+
+    def take(self, indices):
+        """Return the lines at `indices` (in that order) as a new RecCandidates."""
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1)
+        lengths = np.diff(self.offsets)[indices]
+        offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        # flat gather index of every character of the selected lines
+        starts = np.repeat(self.offsets[:-1][indices] - offsets[:-1], lengths)
+        char_index = starts + np.arange(offsets[-1])
+        boxes = None
+        if self.boxes is not None:
+            boxes = [self.boxes[i] for i in indices.tolist()]
+        return RecCandidates(
+            self.character,
+            [self.texts[i] for i in indices.tolist()],
+            self.scores[indices],
+            offsets,
+            self.char_ids[char_index],
+            self.time_steps[char_index],
+            self.topk_ids[char_index],
+            self.topk_scores[char_index],
+            boxes=boxes,
+        )
+
+    def with_boxes(self, boxes):
+        assert len(boxes) == len(self), "number of boxes and lines must match"
+        return RecCandidates(
+            self.character,
+            self.texts,
+            self.scores,
+            self.offsets,
+            self.char_ids,
+            self.time_steps,
+            self.topk_ids,
+            self.topk_scores,
+            boxes=boxes,
+        )
+
+    @classmethod
+    def concat(cls, candidates_list):
+        assert len(candidates_list) > 0
+        first = candidates_list[0]
+        lengths = np.concatenate([np.diff(c.offsets) for c in candidates_list])
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        return cls(
+            first.character,
+            [text for c in candidates_list for text in c.texts],
+            np.concatenate([c.scores for c in candidates_list]),
+            offsets,
+            np.concatenate([c.char_ids for c in candidates_list]),
+            np.concatenate([c.time_steps for c in candidates_list]),
+            np.concatenate([c.topk_ids for c in candidates_list]),
+            np.concatenate([c.topk_scores for c in candidates_list]),
+        )
+
+    def dump_jsonl(self, fp, **extra):
+        """
+        Write one JSON object per line to the text file object `fp`:
+        {**extra, "box", "text", "score", "time_steps", "candidates", "candidate_scores"}
+        where candidates[j] lists the top-k characters of the j-th character.
+        """
+        character = self.character
+        offsets = self.offsets.tolist()
+        time_steps = self.time_steps.tolist()
+        cand_chars = [
+            [character[cand_id] for cand_id in ids] for ids in self.topk_ids.tolist()
+        ]
+        cand_scores = self.topk_scores.tolist()
+        scores = self.scores.tolist()
+        lines = []
+        for idx in range(len(self)):
+            beg, end = offsets[idx], offsets[idx + 1]
+            item = dict(extra)
+            if self.boxes is not None:
+                item["box"] = np.asarray(self.boxes[idx]).tolist()
+            item["text"] = self.texts[idx]
+            item["score"] = scores[idx]
+            item["time_steps"] = time_steps[beg:end]
+            item["candidates"] = cand_chars[beg:end]
+            item["candidate_scores"] = cand_scores[beg:end]
+            lines.append(json.dumps(item, ensure_ascii=False))
+        if lines:
+            fp.write("\n".join(lines) + "\n")
+
+    def save_npz(self, file, compressed=False):
+        arrays = dict(
+            character=np.array(self.character),
+            texts=np.array(self.texts, dtype=str),
+            scores=self.scores,
+            offsets=self.offsets,
+            char_ids=self.char_ids,
+            time_steps=self.time_steps,
+            topk_ids=self.topk_ids,
+            topk_scores=self.topk_scores,
+        )
+        if self.boxes is not None:
+            arrays["boxes"] = np.asarray(self.boxes, dtype=np.float32)
+        if compressed:
+            np.savez_compressed(file, **arrays)
+        else:
+            np.savez(file, **arrays)
+
+    @classmethod
+    def load_npz(cls, file):
+        with np.load(file) as data:
+            return cls(
+                data["character"].tolist(),
+                data["texts"].tolist(),
+                data["scores"],
+                data["offsets"],
+                data["char_ids"],
+                data["time_steps"],
+                data["topk_ids"],
+                data["topk_scores"],
+                boxes=data["boxes"] if "boxes" in data else None,
+            )
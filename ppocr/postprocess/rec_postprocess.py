@@ -19,8 +19,12 @@ from paddle.nn import functional as F
 import re
 import json
 from ppocr.utils.logging import get_logger
+from ppocr.utils.instrumentation import get_metrics
+from .rec_candidates import RecCandidates
 
 logger = get_logger()
+metrics = get_metrics()
+
 
 class BaseRecLabelDecode(object):
     """Convert between text-label and text-index"""
@@ -197,9 +201,41 @@ class BaseRecLabelDecode(object):
 class CTCLabelDecode(BaseRecLabelDecode):
     """Convert between text-label and text-index"""
 
-    def __init__(self, character_dict_path=None, use_space_char=False, merge_repeated=True, **kwargs):
+    def __init__(
+        self,
+        character_dict_path=None,
+        use_space_char=False,
+        merge_repeated=True,
+        topk=3,
+        compact_result=False,
+        candidate_dtype="float32",
+        decode_mode="auto",
+        **kwargs,
+    ):
         super(CTCLabelDecode, self).__init__(character_dict_path, use_space_char)
         self.merge_repeated = merge_repeated  # 控制是否合併重複字符
+        assert topk >= 1, "topk must be >= 1, but got {}".format(topk)
+        self.topk = topk
+        # 以 NumPy 陣列儲存候選字（RecCandidates），僅在存取時才轉成 dict
+        self.compact_result = compact_result
+        assert candidate_dtype in [
+            "float16",
+            "float32",
+        ], "candidate_dtype must be in [float16, float32] but got: {}".format(
+            candidate_dtype
+        )
+        self.candidate_dtype = candidate_dtype
+        # fast: argmax and collapse only, giving (text, conf) as RecMetric reads it;
+        # candidates: text with top-k candidates; auto: fast when a label is given,
+        # i.e. in training and eval, candidates for inference
+        assert decode_mode in [
+            "auto",
+            "fast",
+            "candidates",
+        ], "decode_mode must be in [auto, fast, candidates] but got: {}".format(
+            decode_mode
+        )
+        self.decode_mode = decode_mode
 
     def add_special_char(self, dict_character):
         dict_character = ["blank"] + dict_character
@@ -209,7 +245,11 @@ class CTCLabelDecode(BaseRecLabelDecode):
         return [0]  # 假設空白字符的索引為 0
 
     def decode(self, preds_idx, prob_matrix=None, is_remove_duplicate=False, return_word_box=False):
-        """Convert probabilities to text and top-3 candidates."""
+        """Convert probabilities to text and top-k candidates.
+
+        Reference implementation that walks every time step in Python, kept for
+        label decoding and as the baseline of `decode_topk`.
+        """
         # 獲取空白字符索引
         blank_idx = 0  # 因為空白字符在 add_special_char 中被添加到開頭
         ignored_tokens = self.get_ignored_tokens()
@@ -232,11 +272,11 @@ class CTCLabelDecode(BaseRecLabelDecode):
 
             # 識別有效字符位置
             for t, char_idx in enumerate(pred):
-                if char_idx in ignored_tokens:
-                    continue
                 if char_idx == blank_idx:
                     last_was_blank = True
                     continue
+                if char_idx in ignored_tokens:
+                    continue
                 # 如果需要合併重複字符，且當前字符與上一個字符相同，且中間沒有空白字符，則跳過
                 if self.merge_repeated and char_idx == last_char_idx and not last_was_blank:
                     continue
@@ -278,7 +318,7 @@ class CTCLabelDecode(BaseRecLabelDecode):
                         if idx != blank_idx and idx not in ignored_tokens:
                             valid_indices.append(idx)
                             valid_probs.append(float(prob_val))
-                            if len(valid_indices) >= 3:  # 只取前 3 個
+                            if len(valid_indices) >= self.topk:
                                 break
 
                     # 構建該字符的 Top-3 候選字
@@ -308,6 +348,135 @@ class CTCLabelDecode(BaseRecLabelDecode):
 
         return result_list
 
+    def ctc_selection(self, preds_idx):
+        """The emitted steps of a [batch_size, seq_len] argmax path: blank and
+        ignored tokens are masked, repeats between consecutive steps collapsed."""
+        selection = np.ones(preds_idx.shape, dtype=bool)
+        if self.merge_repeated:
+            selection[:, 1:] = preds_idx[:, 1:] != preds_idx[:, :-1]
+        for ignored_token in self.get_ignored_tokens():
+            selection &= preds_idx != ignored_token
+        return selection
+
+    def decode_fast(self, preds):
+        """Argmax path decode without candidates, for training and eval.
+
+        Returns:
+            [(text, conf)] per sample, conf being the mean probability of the
+            emitted characters (0 for an empty text), as BaseRecLabelDecode.decode.
+        """
+        with metrics.span("rec.post.ctc"):
+            batch_size = preds.shape[0]
+            preds_idx = preds.argmax(axis=2)
+            selection = self.ctc_selection(preds_idx)
+            batch_ids = np.nonzero(selection)[0]
+            char_probs = np.take_along_axis(preds, preds_idx[..., None], axis=2)[..., 0]
+            counts = np.bincount(batch_ids, minlength=batch_size)
+            confs = np.bincount(
+                batch_ids, weights=char_probs[selection], minlength=batch_size
+            ) / np.maximum(counts, 1)
+
+            character = self.character
+            chars = [character[char_id] for char_id in preds_idx[selection].tolist()]
+            bounds = np.concatenate([[0], np.cumsum(counts)]).tolist()
+            result_list = []
+            for batch_idx, conf in enumerate(confs.tolist()):
+                text = "".join(chars[bounds[batch_idx] : bounds[batch_idx + 1]])
+                if self.reverse:  # for arabic rec
+                    text = self.pred_reverse(text)
+                result_list.append((text, conf))
+        return result_list
+
+    def topk_arrays(self, preds):
+        """Emitted characters and their top-k candidates for a [batch_size, seq_len, num_classes] matrix.
+
+        Top-k candidates are computed once for all emitted characters of the batch
+        with `argpartition`, instead of sorting the whole vocabulary per character.
+
+        Returns:
+            offsets: characters of sample i are [offsets[i], offsets[i + 1])
+            char_ids, time_steps: index and time step of every emitted character
+            topk_ids, topk_scores: candidates of every emitted character, best first
+        """
+        with metrics.span("rec.post.ctc"):
+            ignored_tokens = self.get_ignored_tokens()
+            batch_size, seq_len, num_classes = preds.shape
+            preds_idx = preds.argmax(axis=2)
+            selection = self.ctc_selection(preds_idx)
+
+            # np.nonzero walks row-major, so emitted steps are grouped by sample and ordered by time
+            batch_ids, time_steps = np.nonzero(selection)
+            char_ids = preds_idx[batch_ids, time_steps]
+            offsets = np.zeros(batch_size + 1, dtype=np.int64)
+            np.cumsum(selection.sum(axis=1), out=offsets[1:])
+
+        with metrics.span("rec.post.topk"):
+            k = min(self.topk, num_classes - len(ignored_tokens))
+            probs = preds[batch_ids, time_steps].astype(np.float32, copy=False)
+            probs[:, ignored_tokens] = -np.inf
+            if k < num_classes:
+                topk_ids = np.argpartition(-probs, k - 1, axis=1)[:, :k]
+            else:
+                topk_ids = np.broadcast_to(np.arange(num_classes), probs.shape)
+            topk_scores = np.take_along_axis(probs, topk_ids, axis=1)
+            order = np.argsort(-topk_scores, axis=1, kind="stable")
+            topk_ids = np.take_along_axis(topk_ids, order, axis=1)
+            topk_scores = np.take_along_axis(topk_scores, order, axis=1)
+        return offsets, char_ids, time_steps, topk_ids, topk_scores
+
+    def decode_topk(self, preds, return_word_box=False):
+        """Vectorized version of `decode`, with the same output layout."""
+        offsets, char_ids, time_steps, topk_ids, topk_scores = self.topk_arrays(preds)
+        offsets = offsets.tolist()
+        char_ids = char_ids.tolist()
+        time_steps = time_steps.tolist()
+        topk_ids = topk_ids.tolist()
+        topk_scores = topk_scores.tolist()
+
+        character = self.character
+        result_list = []
+        for batch_idx in range(len(offsets) - 1):
+            beg, end = offsets[batch_idx], offsets[batch_idx + 1]
+            chars = [character[char_id] for char_id in char_ids[beg:end]]
+            char_details = [
+                {
+                    "char": chars[position],
+                    "position": position,
+                    "time_step": time_steps[i],
+                    "top3": [
+                        {"char": character[cand_id], "score": cand_score}
+                        for cand_id, cand_score in zip(topk_ids[i], topk_scores[i])
+                    ],
+                }
+                for position, i in enumerate(range(beg, end))
+            ]
+            text = "".join(chars)
+            if return_word_box:
+                result_list.append([text, char_details, time_steps[beg:end]])
+            else:
+                result_list.append([text, char_details])
+        return result_list
+
+    def decode_compact(self, preds):
+        """Decode into a RecCandidates object, line scores are left as 0."""
+        offsets, char_ids, time_steps, topk_ids, topk_scores = self.topk_arrays(preds)
+        character = self.character
+        char_list = [character[char_id] for char_id in char_ids.tolist()]
+        bounds = offsets.tolist()
+        texts = [
+            "".join(char_list[bounds[i] : bounds[i + 1]]) for i in range(len(bounds) - 1)
+        ]
+        return RecCandidates(
+            character,
+            texts,
+            np.zeros(len(texts)),
+            offsets,
+            char_ids,
+            time_steps,
+            topk_ids,
+            topk_scores.astype(self.candidate_dtype),
+        )
+
     def __call__(self, preds, label=None, return_word_box=False, *args, **kwargs):
         if isinstance(preds, tuple) or isinstance(preds, list):
             preds = preds[-1]
@@ -318,17 +487,23 @@ class CTCLabelDecode(BaseRecLabelDecode):
             logger.error(f"preds must be 3D array with shape [batch_size, sequence_length, num_classes], but got shape {preds.shape}")
             return [], []
 
-        # 提取 Top-1 索引和完整的概率分佈
-        preds_idx = preds.argmax(axis=2)  # 形狀為 [batch_size, sequence_length]
-        prob_matrix = preds  # 形狀為 [batch_size, sequence_length, num_classes]
+        if not return_word_box and (
+            self.decode_mode == "fast"
+            or (self.decode_mode == "auto" and label is not None)
+        ):
+            text = self.decode_fast(preds)
+            if label is None:
+                return text
+            if isinstance(label, paddle.Tensor):
+                label = label.numpy()
+            # labels are not collapsed, a doubled letter is two characters
+            return text, BaseRecLabelDecode.decode(self, label)
 
-        # 調用 decode 方法，傳入是否合併重複字符的參數
-        text = self.decode(
-            preds_idx,
-            prob_matrix,  # 傳遞完整的概率分佈
-            is_remove_duplicate=self.merge_repeated,
-            return_word_box=return_word_box,
-        )
+        if self.compact_result and not return_word_box and label is None:
+            return self.decode_compact(preds)
+
+        # 一次性計算整個 batch 的 Top-k 候選字
+        text = self.decode_topk(preds, return_word_box=return_word_box)
 
         # 處理 word box 的比例調整（如果需要）
         if return_word_box:
@@ -368,10 +543,11 @@ class DistillationCTCLabelDecode(CTCLabelDecode):
         model_name=["student"],
         key=None,
         multi_head=False,
+        decode_mode="auto",
         **kwargs,
     ):
         super(DistillationCTCLabelDecode, self).__init__(
-            character_dict_path, use_space_char
+            character_dict_path, use_space_char, decode_mode=decode_mode
         )
         if not isinstance(model_name, list):
             model_name = [model_name]
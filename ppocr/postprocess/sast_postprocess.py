@@ -24,7 +24,7 @@ sys.path.append(__dir__)
 sys.path.append(os.path.join(__dir__, ".."))
 
 import numpy as np
-from .locality_aware_nms import nms_locality
+from .locality_aware_nms import nms_locality_fast
 import paddle
 import cv2
 import time
@@ -152,7 +152,7 @@ class SASTPostProcess(object):
 
             dets = lanms.merge_quadrangle_n9(dets, self.nms_thresh)
         else:
-            dets = nms_locality(dets, self.nms_thresh)
+            dets = nms_locality_fast(dets, self.nms_thresh)
         return dets
 
     def cluster_by_quads_tco(self, tcl_map, tcl_map_thresh, quads, tco_map):
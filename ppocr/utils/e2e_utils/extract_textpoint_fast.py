@@ -21,7 +21,6 @@ import math
 
 import numpy as np
 from itertools import groupby
-from skimage.morphology._skeletonize import thin
 
 
 def get_dict(character_dict_path):
@@ -420,6 +419,9 @@ def generate_pivot_list_fast(
     """
     return center point and end point of TCL instance; filter with the char maps;
     """
+    # skimage is slow to import, it is only needed by PGNet
+    from skimage.morphology._skeletonize import thin
+
     p_score = p_score[0]
     f_direction = f_direction.transpose(1, 2, 0)
     p_tcl_map = (p_score > score_thresh) * 1.0
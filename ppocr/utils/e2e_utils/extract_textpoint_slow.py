@@ -21,7 +21,6 @@ import math
 
 import numpy as np
 from itertools import groupby
-from skimage.morphology._skeletonize import thin
 
 
 def get_dict(character_dict_path):
@@ -354,6 +353,9 @@ def generate_pivot_list_curved(
     """
     return center point and end point of TCL instance; filter with the char maps;
     """
+    # skimage is slow to import, it is only needed by PGNet
+    from skimage.morphology._skeletonize import thin
+
     p_score = p_score[0]
     f_direction = f_direction.transpose(1, 2, 0)
     p_tcl_map = (p_score > score_thresh) * 1.0
@@ -598,6 +600,9 @@ def generate_pivot_list_tt_inference(
     """
     return center point and end point of TCL instance; filter with the char maps;
     """
+    # skimage is slow to import, it is only needed by PGNet
+    from skimage.morphology._skeletonize import thin
+
     p_score = p_score[0]
     f_direction = f_direction.transpose(1, 2, 0)
     p_tcl_map = (p_score > score_thresh) * 1.0
@@ -0,0 +1,254 @@
+# Copyright (c) 2024 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Image decoding for inference inputs.
+
+Encoded images are accepted as bytes, bytearray, memoryview or mmap and are
+decoded from a numpy view of that buffer, without copying it. Formats that
+OpenCV can not read are decoded with PIL and converted to arrays directly.
+Large JPEG images can be decoded at 1/2, 1/4 or 1/8 resolution when the
+detector would shrink them anyway, see `decode_for_det`.
+"""
+
+import mmap
+from io import BytesIO
+
+import cv2
+import numpy as np
+from PIL import Image
+
+__all__ = [
+    "DecodedImage",
+    "as_buffer",
+    "close_data",
+    "decode_image",
+    "decode_for_det",
+    "jpeg_size",
+    "pil_to_array",
+    "read_image_file",
+    "reduce_factor",
+]
+
+REDUCED_FLAGS = {
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+# start of frame markers, they hold the image size
+_JPEG_SOF = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def close_data(data):
+    """Close mapped image data, other data is left to the garbage collector."""
+    if isinstance(data, mmap.mmap):
+        data.close()
+
+
+def as_buffer(data):
+    """uint8 view of bytes, bytearray, memoryview or mmap data, no copy is made."""
+    return np.frombuffer(data, dtype=np.uint8)
+
+
+def read_image_file(image_file):
+    """Map an image file into memory, empty files are read as bytes."""
+    with open(image_file, "rb") as f:
+        try:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return f.read()
+
+
+def pil_to_array(image):
+    """Convert a PIL image to a BGR, BGRA or gray array without re-encoding it."""
+    if image.mode in ("RGBA", "LA", "PA") or (
+        image.mode == "P" and "transparency" in image.info
+    ):
+        return cv2.cvtColor(np.asarray(image.convert("RGBA")), cv2.COLOR_RGBA2BGRA)
+    if image.mode == "L":
+        return np.array(image)
+    return cv2.cvtColor(np.asarray(image.convert("RGB")), cv2.COLOR_RGB2BGR)
+
+
+def _pil_decode(data, draft_size=None):
+    try:
+        if isinstance(data, mmap.mmap):
+            data.seek(0)
+            image = Image.open(data)
+        else:
+            image = Image.open(BytesIO(data))
+        if draft_size is not None:
+            image.draft("RGB", draft_size)
+        return pil_to_array(image)
+    except Exception:
+        return None
+
+
+def decode_image(data, flags=cv2.IMREAD_UNCHANGED):
+    """Decode an encoded image with OpenCV, or with PIL for the formats OpenCV can not read."""
+    buf = as_buffer(data)
+    img = cv2.imdecode(buf, flags) if buf.size > 0 else None
+    if img is None:
+        img = _pil_decode(data)
+    return img
+
+
+def jpeg_size(data):
+    """(height, width) from the header of a JPEG image, None for other data."""
+    buf = as_buffer(data)
+    if buf.size < 4 or buf[0] != 0xFF or buf[1] != 0xD8:
+        return None
+    pos = 2
+    while pos + 9 < buf.size:
+        if buf[pos] != 0xFF:
+            return None
+        marker = int(buf[pos + 1])
+        if marker == 0xFF:
+            # fill byte
+            pos += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            pos += 2
+            continue
+        length = int(buf[pos + 2]) << 8 | int(buf[pos + 3])
+        if marker in _JPEG_SOF:
+            height = int(buf[pos + 5]) << 8 | int(buf[pos + 6])
+            width = int(buf[pos + 7]) << 8 | int(buf[pos + 8])
+            return height, width
+        pos += 2 + length
+    return None
+
+
+def reduce_factor(data, target_side):
+    """
+    Largest JPEG decode reduction (1, 2, 4 or 8) that keeps the long side of
+    the image at least `target_side`, 1 for other formats.
+    """
+    if target_side <= 0:
+        return 1
+    size = jpeg_size(data)
+    if size is None:
+        return 1
+    long_side = max(size)
+    for factor in (8, 4, 2):
+        if (long_side + factor - 1) // factor >= target_side:
+            return factor
+    return 1
+
+
+class DecodedImage(object):
+    """
+    An image decoded at reduced resolution for text detection.
+
+    `img` is the reduced image, `full()` decodes the full resolution image
+    from the encoded data the first time it is needed. Functions given to
+    `apply` are run on both, so preprocessing does not force a full decode.
+
+    Args:
+        data: encoded image, kept to decode the full resolution image.
+        img(ndarray): the reduced image.
+        full_shape(tuple): (height, width) of the full resolution image.
+        owns_data(bool): close a mapped `data` once the full resolution image
+            is decoded, or on `close()`.
+    """
+
+    def __init__(self, data, img, full_shape, owns_data=False):
+        self.data = data
+        self.owns_data = owns_data
+        self.img = img
+        self.full_shape = tuple(full_shape[:2])
+        self.scale = np.array(
+            [
+                float(self.full_shape[1]) / img.shape[1],
+                float(self.full_shape[0]) / img.shape[0],
+            ],
+            dtype=np.float32,
+        )
+        self._full = None
+        self._transforms = []
+
+    @property
+    def shape(self):
+        return self.full_shape + self.img.shape[2:]
+
+    def apply(self, func):
+        self.img = func(self.img)
+        if self._full is not None:
+            self._full = func(self._full)
+        else:
+            self._transforms.append(func)
+        return self
+
+    def full(self):
+        if self._full is None:
+            img = decode_image(self.data)
+            for func in self._transforms:
+                img = func(img)
+            self._full = img
+            self._transforms = []
+            self.close()
+        return self._full
+
+    def close(self):
+        """Release the encoded data, `full()` can not decode it afterwards."""
+        if self.owns_data:
+            close_data(self.data)
+            self.data = None
+
+    def to_full(self, boxes):
+        """Map boxes of the reduced image to full resolution coordinates."""
+        if boxes is None:
+            return None
+        if isinstance(boxes, np.ndarray):
+            return boxes * self.scale
+        return [np.asarray(box) * self.scale for box in boxes]
+
+    def to_reduced(self, boxes):
+        """Map boxes of the full resolution image to reduced coordinates."""
+        return [np.asarray(box) / self.scale for box in boxes]
+
+
+def decode_for_det(data, target_side=0, owns_data=False):
+    """
+    Decode an encoded image for a detector that resizes the long side to
+    `target_side`. JPEG images at least twice that size are decoded at reduced
+    resolution and returned as a DecodedImage, others as a full resolution array.
+    With `owns_data`, a mapped `data` is closed once it is no longer needed.
+    """
+    factor = reduce_factor(data, target_side)
+    if factor == 1:
+        img = decode_image(data)
+        if owns_data:
+            close_data(data)
+        return img
+    full_shape = jpeg_size(data)
+    img = cv2.imdecode(
+        as_buffer(data), REDUCED_FLAGS[factor] | cv2.IMREAD_IGNORE_ORIENTATION
+    )
+    if img is None:
+        height, width = full_shape
+        img = _pil_decode(
+            data,
+            draft_size=(
+                (width + factor - 1) // factor,
+                (height + factor - 1) // factor,
+            ),
+        )
+        if img is None:
+            if owns_data:
+                close_data(data)
+            return None
+        if img.ndim == 2:
+            img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+    return DecodedImage(data, img, full_shape, owns_data=owns_data)
@@ -0,0 +1,380 @@
+# Copyright (c) 2024 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Lightweight instrumentation of the inference pipeline.
+
+Spans time the stages of a request (decode, det.pre, det.infer, det.post, sort,
+crop, cls.*, rec.*, serialize). They nest per thread: the outermost span of a
+thread decides whether the request is sampled, with probability
+`sample_rate`, and the spans inside it follow that decision. The durations of
+sampled spans are aggregated into histograms, counters (boxes, crops, ...) and
+ratio histograms (batch fill) are recorded for every request.
+
+The metrics are exported as a json snapshot, as json lines with the spans of
+every sampled request, or in the Prometheus text format over http.
+
+With a sample rate of 0 (the default) `span` returns a shared no-op object
+and `count` / `observe` return at once.
+"""
+
+import bisect
+import json
+import random
+import re
+import threading
+import time
+
+from ppocr.utils.logging import get_logger
+
+logger = get_logger()
+
+__all__ = [
+    "Histogram",
+    "Metrics",
+    "TIME_BUCKETS",
+    "RATIO_BUCKETS",
+    "configure_metrics",
+    "get_metrics",
+]
+
+# seconds
+TIME_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+RATIO_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+
+
+class Histogram(object):
+    """Counts of the observed values per bucket, as in Prometheus histograms."""
+
+    def __init__(self, buckets=TIME_BUCKETS):
+        self.buckets = tuple(buckets)
+        # the last count is the +Inf bucket
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Estimate of the q quantile, interpolated inside its bucket."""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for idx, num in enumerate(self.counts):
+            if num > 0 and seen + num >= rank:
+                lower = self.buckets[idx - 1] if idx > 0 else 0.0
+                if idx == len(self.buckets):
+                    return lower
+                return lower + (self.buckets[idx] - lower) * (rank - seen) / num
+            seen += num
+        return self.buckets[-1]
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "buckets": {
+                str(le): num for le, num in zip(self.buckets + ("+Inf",), self.counts)
+            },
+        }
+
+
+class _NullSpan(object):
+    """Span used while the instrumentation is off."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span(object):
+    __slots__ = (
+        "metrics",
+        "name",
+        "parent",
+        "root",
+        "sampled",
+        "depth",
+        "start_time",
+        "records",
+    )
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        local = self.metrics._local
+        parent = getattr(local, "span", None)
+        self.parent = parent
+        if parent is None:
+            rate = self.metrics.sample_rate
+            self.sampled = rate >= 1 or random.random() < rate
+            self.root = self
+            self.depth = 0
+            self.records = [] if self.metrics._json_file is not None else None
+        else:
+            self.sampled = parent.sampled
+            self.root = parent.root
+            self.depth = parent.depth + 1
+        local.span = self
+        self.start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapse = time.perf_counter() - self.start_time
+        self.metrics._local.span = self.parent
+        if not self.sampled:
+            return False
+        self.metrics.observe_span(self.name, elapse)
+        records = self.root.records
+        if records is not None:
+            records.append(
+                {
+                    "name": self.name,
+                    "depth": self.depth,
+                    "start_ms": (self.start_time - self.root.start_time) * 1000,
+                    "duration_ms": elapse * 1000,
+                }
+            )
+            if self.root is self:
+                self.metrics.write_trace(self.name, records)
+        return False
+
+
+class Metrics(object):
+    """Span histograms, counters and value histograms of one process."""
+
+    def __init__(self):
+        self.sample_rate = 0.0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._spans = {}
+        self._counters = {}
+        self._histograms = {}
+        self._json_path = None
+        self._json_file = None
+        self._server = None
+
+    @property
+    def enabled(self):
+        return self.sample_rate > 0
+
+    def configure(self, sample_rate=None, json_path=None, port=None):
+        """
+        args:
+            sample_rate(float): fraction of the requests whose spans are
+                recorded, 0 turns the instrumentation off
+            json_path(str): append the spans of every sampled request there,
+                one json line per request
+            port(int): serve the metrics in the Prometheus text format
+        """
+        if sample_rate is not None:
+            self.sample_rate = max(0.0, min(1.0, float(sample_rate)))
+        if json_path and json_path != self._json_path:
+            with self._lock:
+                if self._json_file is not None:
+                    self._json_file.close()
+                self._json_file = open(json_path, "a", encoding="utf-8")
+                self._json_path = json_path
+        if port and self._server is None:
+            try:
+                self.serve(port)
+            except OSError as e:
+                # e.g. taken by another worker process
+                logger.warning(
+                    "can not serve the metrics on port {}: {}".format(port, e)
+                )
+        return self
+
+    def span(self, name):
+        """Context manager timing the stage `name`."""
+        if self.sample_rate <= 0:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def count(self, name, value=1):
+        if self.sample_rate <= 0:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name, value, buckets=RATIO_BUCKETS):
+        """Add a value to the histogram `name`, e.g. the fill ratio of a batch."""
+        if self.sample_rate <= 0:
+            return
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram(buckets)
+            histogram.observe(value)
+
+    def observe_span(self, name, elapse):
+        with self._lock:
+            histogram = self._spans.get(name)
+            if histogram is None:
+                histogram = self._spans[name] = Histogram(TIME_BUCKETS)
+            histogram.observe(elapse)
+
+    def write_trace(self, name, records):
+        line = json.dumps(
+            {
+                "trace": name,
+                "time": time.time(),
+                # parents are recorded after their children
+                "spans": sorted(records, key=lambda record: record["start_ms"]),
+            }
+        )
+        with self._lock:
+            if self._json_file is not None:
+                self._json_file.write(line + "\n")
+                self._json_file.flush()
+
+    def snapshot(self):
+        """Json serializable dict of all the metrics."""
+        with self._lock:
+            return {
+                "sample_rate": self.sample_rate,
+                "spans": {
+                    name: histogram.as_dict()
+                    for name, histogram in sorted(self._spans.items())
+                },
+                "counters": dict(sorted(self._counters.items())),
+                "histograms": {
+                    name: histogram.as_dict()
+                    for name, histogram in sorted(self._histograms.items())
+                },
+            }
+
+    def to_prometheus(self, prefix="ppocr"):
+        """The metrics in the Prometheus text exposition format."""
+        lines = []
+
+        def add_histogram(metric, histogram, labels):
+            cumulative = 0
+            for le, num in zip(histogram.buckets + ("+Inf",), histogram.counts):
+                cumulative += num
+                lines.append(
+                    '{}_bucket{{{}le="{}"}} {}'.format(metric, labels, le, cumulative)
+                )
+            labels = "{" + labels.rstrip(",") + "}" if labels else ""
+            lines.append("{}_sum{} {}".format(metric, labels, histogram.sum))
+            lines.append("{}_count{} {}".format(metric, labels, histogram.count))
+
+        with self._lock:
+            if self._spans:
+                metric = prefix + "_span_seconds"
+                lines.append("# TYPE {} histogram".format(metric))
+                for name, histogram in sorted(self._spans.items()):
+                    add_histogram(metric, histogram, 'span="{}",'.format(name))
+            for name, value in sorted(self._counters.items()):
+                metric = "{}_{}_total".format(prefix, _metric_name(name))
+                lines.append("# TYPE {} counter".format(metric))
+                lines.append("{} {}".format(metric, value))
+            for name, histogram in sorted(self._histograms.items()):
+                metric = "{}_{}".format(prefix, _metric_name(name))
+                lines.append("# TYPE {} histogram".format(metric))
+                add_histogram(metric, histogram, "")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="0.0.0.0"):
+        """Serve to_prometheus() on http://host:port/metrics from a daemon thread."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.to_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server
+
+    def reset(self):
+        with self._lock:
+            self._spans.clear()
+            self._counters.clear()
+            self._histograms.clear()
+
+    def close(self):
+        with self._lock:
+            if self._json_file is not None:
+                self._json_file.close()
+                self._json_file = None
+                self._json_path = None
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def _metric_name(name):
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+_metrics = Metrics()
+
+
+def get_metrics():
+    """The metrics of the process, shared by all the predictors."""
+    return _metrics
+
+
+def configure_metrics(args):
+    """Apply --metrics_sample_rate, --metrics_json_path and --metrics_port."""
+    return _metrics.configure(
+        sample_rate=getattr(args, "metrics_sample_rate", 0.0),
+        json_path=getattr(args, "metrics_json_path", None),
+        port=getattr(args, "metrics_port", 0),
+    )
@@ -0,0 +1,426 @@
+# Copyright (c) 2024 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Download, verification and extraction of the inference models.
+
+Every download and extraction holds a file lock next to its target, so the
+worker processes of a node that start together download each model once: the
+first one fetches it and the others wait for the lock and find it complete.
+
+An extracted model directory is complete once its manifest is written, after
+its files. The manifest records the sha256 of the archive and of every file.
+The archive digest is checked against the expected one when it is known,
+see PADDLE_OCR_MODEL_CHECKSUMS.
+
+Archives are streamed to disk and extracted in chunks of `chunk_size` bytes,
+they are never read whole into memory.
+
+Environment variables:
+    PADDLE_OCR_MODEL_MIRROR: base url to download the archives from instead of
+        their original host, e.g. an internal http server
+    PADDLE_OCR_OFFLINE_DIR: directory with the archives (xxx_infer.tar) or the
+        extracted models (xxx_infer/) to use without any network access
+    PADDLE_OCR_MODEL_CHECKSUMS: json file mapping the archive names (or urls)
+        to their sha256
+"""
+
+import hashlib
+import json
+import os
+import tarfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ppocr.utils.logging import get_logger
+
+logger = get_logger()
+
+__all__ = ["FileLock", "ModelStore", "get_model_store"]
+
+DOWNLOAD_RETRY_LIMIT = 3
+CHUNK_SIZE = 1 << 20
+MANIFEST_NAME = ".model_store.json"
+# suffixes of the archive members that are extracted, as inference + suffix
+MODEL_SUFFIXES = [".pdiparams", ".pdiparams.info", ".pdmodel"]
+
+
+class FileLock(object):
+    """
+    Exclusive lock on `path` shared by the processes of a host, released when
+    the process exits. The lock file itself is left in place.
+    """
+
+    def __init__(self, path, poll_interval=0.1):
+        self.path = path
+        self.poll_interval = poll_interval
+        self._fd = None
+
+    def acquire(self):
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            import fcntl
+
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        except ImportError:
+            import msvcrt
+
+            while True:
+                try:
+                    msvcrt.locking(self._fd, msvcrt.LK_NBLCK, 1)
+                    break
+                except OSError:
+                    time.sleep(self.poll_interval)
+        return self
+
+    def release(self):
+        if self._fd is None:
+            return
+        try:
+            import fcntl
+
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        except ImportError:
+            import msvcrt
+
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        os.close(self._fd)
+        self._fd = None
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
+
+
+def _lock_path(path):
+    return path.rstrip("/\\") + ".lock"
+
+
+def _archive_name(url):
+    return url.split("#")[0].split("?")[0].rstrip("/").split("/")[-1]
+
+
+def _copy_stream(src, dst, chunk_size, digest=None):
+    """Copy file object src to dst, returns the number of bytes copied."""
+    size = 0
+    while True:
+        chunk = src.read(chunk_size)
+        if not chunk:
+            return size
+        dst.write(chunk)
+        if digest is not None:
+            digest.update(chunk)
+        size += len(chunk)
+
+
+def file_sha256(path, chunk_size=CHUNK_SIZE):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return digest.hexdigest()
+            digest.update(chunk)
+
+
+class ModelStore(object):
+    """
+    args:
+        mirror(str): base url replacing the host and path of the model urls
+        offline_dir(str): directory with the archives or the extracted models,
+            no download is attempted when it is set
+        checksums(dict): expected sha256 per archive name or url
+        chunk_size(int): bytes per read of the downloads and extractions
+        retry_limit(int): attempts per download
+    """
+
+    def __init__(
+        self,
+        mirror=None,
+        offline_dir=None,
+        checksums=None,
+        chunk_size=CHUNK_SIZE,
+        retry_limit=DOWNLOAD_RETRY_LIMIT,
+    ):
+        self.mirror = mirror.rstrip("/") if mirror else None
+        self.offline_dir = offline_dir
+        self.checksums = dict(checksums or {})
+        self.chunk_size = chunk_size
+        self.retry_limit = retry_limit
+
+    @classmethod
+    def from_env(cls, environ=None):
+        environ = os.environ if environ is None else environ
+        checksums = {}
+        checksum_path = environ.get("PADDLE_OCR_MODEL_CHECKSUMS")
+        if checksum_path:
+            with open(checksum_path, encoding="utf-8") as f:
+                checksums = json.load(f)
+        return cls(
+            mirror=environ.get("PADDLE_OCR_MODEL_MIRROR") or None,
+            offline_dir=environ.get("PADDLE_OCR_OFFLINE_DIR") or None,
+            checksums=checksums,
+        )
+
+    def source_url(self, url):
+        """The url an archive is downloaded from, on the mirror if one is set."""
+        if self.mirror is None:
+            return url
+        return "{}/{}".format(self.mirror, _archive_name(url))
+
+    def expected_sha256(self, url, sha256=None):
+        if sha256:
+            return sha256.lower()
+        if "#sha256=" in url:
+            return url.split("#sha256=")[-1].lower()
+        expected = self.checksums.get(url) or self.checksums.get(_archive_name(url))
+        return expected.lower() if expected else None
+
+    def download(self, url, save_path, sha256=None):
+        """
+        Download url to save_path unless it exists. Returns the sha256 of the
+        file when it was downloaded, None when it already existed.
+        """
+        if os.path.exists(save_path):
+            return None
+        save_dir = os.path.dirname(os.path.abspath(save_path))
+        os.makedirs(save_dir, exist_ok=True)
+        with FileLock(_lock_path(save_path)):
+            # downloaded by another process while we waited for the lock
+            if os.path.exists(save_path):
+                return None
+            tmp_path, digest = self._fetch_archive(url, save_dir)
+            self._check_digest(url, digest, sha256, tmp_path)
+            os.replace(tmp_path, save_path)
+        return digest
+
+    def is_complete(self, model_dir):
+        manifest = self.read_manifest(model_dir)
+        if manifest is None:
+            # a custom model or one extracted before the manifest existed
+            return os.path.exists(
+                os.path.join(model_dir, "inference.pdiparams")
+            ) and os.path.exists(os.path.join(model_dir, "inference.pdmodel"))
+        for name, info in manifest["files"].items():
+            path = os.path.join(model_dir, name)
+            if not os.path.exists(path) or os.path.getsize(path) != info["size"]:
+                return False
+        return True
+
+    def read_manifest(self, model_dir):
+        path = os.path.join(model_dir, MANIFEST_NAME)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def verify(self, model_dir):
+        """Re-hash the files of model_dir, returns the names that changed."""
+        manifest = self.read_manifest(model_dir)
+        if manifest is None:
+            return []
+        changed = []
+        for name, info in sorted(manifest["files"].items()):
+            path = os.path.join(model_dir, name)
+            if not os.path.exists(path) or file_sha256(path) != info["sha256"]:
+                changed.append(name)
+        return changed
+
+    def fetch(self, model_dir, url, sha256=None):
+        """
+        Make sure model_dir holds the model of the tar archive at url:
+        download (or take from the offline directory), verify and extract it.
+        """
+        if self.is_complete(model_dir):
+            return model_dir
+        assert _archive_name(url).endswith(
+            ".tar"
+        ), "Only supports tar compressed package"
+        parent = os.path.dirname(os.path.abspath(model_dir))
+        os.makedirs(parent, exist_ok=True)
+        with FileLock(_lock_path(os.path.abspath(model_dir))):
+            if self.is_complete(model_dir):
+                return model_dir
+            os.makedirs(model_dir, exist_ok=True)
+            # a stale manifest must not survive a partial extraction
+            manifest_path = os.path.join(model_dir, MANIFEST_NAME)
+            if os.path.exists(manifest_path):
+                os.remove(manifest_path)
+
+            local = self._offline_source(url)
+            if local is not None and os.path.isdir(local):
+                files = self._copy_model_dir(local, model_dir)
+                archive_digest = None
+            else:
+                if local is not None:
+                    archive, archive_digest = local, file_sha256(local)
+                    self._check_digest(url, archive_digest, sha256)
+                else:
+                    logger.info("download {} to {}".format(url, model_dir))
+                    archive, archive_digest = self._fetch_archive(url, model_dir)
+                    self._check_digest(url, archive_digest, sha256, archive)
+                try:
+                    files = self._extract(archive, model_dir)
+                finally:
+                    if local is None:
+                        os.remove(archive)
+            self._write_manifest(model_dir, url, archive_digest, files)
+        return model_dir
+
+    def fetch_all(self, items, max_workers=4):
+        """fetch() the (model_dir, url) pairs of items in parallel."""
+        items = [item for item in items if not self.is_complete(item[0])]
+        if len(items) <= 1 or max_workers <= 1:
+            return [self.fetch(*item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as pool:
+            return list(pool.map(lambda item: self.fetch(*item), items))
+
+    def _offline_source(self, url):
+        if self.offline_dir is None:
+            return None
+        name = _archive_name(url)
+        for path in [
+            os.path.join(self.offline_dir, name),
+            os.path.join(self.offline_dir, os.path.splitext(name)[0]),
+        ]:
+            if os.path.exists(path):
+                return path
+        raise RuntimeError(
+            "{} is not in the offline directory {}".format(name, self.offline_dir)
+        )
+
+    def _check_digest(self, url, digest, sha256=None, tmp_path=None):
+        expected = self.expected_sha256(url, sha256)
+        if expected is None or digest == expected:
+            return
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise RuntimeError(
+            "sha256 of {} is {}, expected {}".format(
+                _archive_name(url), digest, expected
+            )
+        )
+
+    def _fetch_archive(self, url, save_dir):
+        """Download url into save_dir, returns the temporary path and sha256."""
+        import requests
+        from tqdm import tqdm
+
+        source = self.source_url(url)
+        name = _archive_name(url)
+        tmp_path = os.path.join(save_dir, "{}.{}.tmp".format(name, os.getpid()))
+        for retry_cnt in range(1, self.retry_limit + 1):
+            try:
+                req = requests.get(source, stream=True, timeout=60)
+                if req.status_code != 200:
+                    raise RuntimeError(
+                        "Downloading from {} failed with code "
+                        "{}!".format(source, req.status_code)
+                    )
+                total_size = int(req.headers.get("content-length") or 0)
+                digest = hashlib.sha256()
+                size = 0
+                with open(tmp_path, "wb") as f, tqdm(
+                    total=total_size or None,
+                    unit="B",
+                    unit_scale=True,
+                    desc=name,
+                    disable=not total_size,
+                ) as pbar:
+                    for chunk in req.iter_content(chunk_size=self.chunk_size):
+                        f.write(chunk)
+                        digest.update(chunk)
+                        size += len(chunk)
+                        pbar.update(len(chunk))
+                if total_size and size != total_size:
+                    raise IOError("got {} of {} bytes".format(size, total_size))
+                return tmp_path, digest.hexdigest()
+            except RuntimeError:
+                raise
+            except Exception as e:  # requests.exceptions.ConnectionError
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                logger.info(
+                    "Downloading {} from {} failed {} times with exception {}".format(
+                        name, source, retry_cnt, str(e)
+                    )
+                )
+                if retry_cnt < self.retry_limit:
+                    time.sleep(1)
+        raise RuntimeError(
+            "Download from {} failed. Retry limit reached".format(source)
+        )
+
+    def _extract(self, archive, model_dir):
+        """Stream the model members of archive into model_dir."""
+        files = {}
+        with tarfile.open(archive, "r") as tar_obj:
+            for member in tar_obj:
+                filename = None
+                for suffix in MODEL_SUFFIXES:
+                    if member.name.endswith(suffix):
+                        filename = "inference" + suffix
+                if filename is None or not member.isfile():
+                    continue
+                files[filename] = self._write_file(
+                    tar_obj.extractfile(member), model_dir, filename
+                )
+        return files
+
+    def _copy_model_dir(self, src_dir, model_dir):
+        files = {}
+        for name in sorted(os.listdir(src_dir)):
+            if not any(name == "inference" + suffix for suffix in MODEL_SUFFIXES):
+                continue
+            with open(os.path.join(src_dir, name), "rb") as src:
+                files[name] = self._write_file(src, model_dir, name)
+        return files
+
+    def _write_file(self, src, model_dir, filename):
+        path = os.path.join(model_dir, filename)
+        tmp_path = "{}.{}.tmp".format(path, os.getpid())
+        digest = hashlib.sha256()
+        with open(tmp_path, "wb") as dst:
+            size = _copy_stream(src, dst, self.chunk_size, digest)
+        os.replace(tmp_path, path)
+        return {"size": size, "sha256": digest.hexdigest()}
+
+    def _write_manifest(self, model_dir, url, archive_digest, files):
+        manifest = {
+            "url": url,
+            "archive_sha256": archive_digest,
+            "files": files,
+        }
+        path = os.path.join(model_dir, MANIFEST_NAME)
+        tmp_path = "{}.{}.tmp".format(path, os.getpid())
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, path)
+
+
+_model_store = None
+
+
+def get_model_store():
+    """The store of the process, configured from the environment variables."""
+    global _model_store
+    if _model_store is None:
+        _model_store = ModelStore.from_env()
+    return _model_store
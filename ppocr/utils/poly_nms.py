@@ -12,7 +12,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import cv2
 import numpy as np
+import shapely
 from shapely.geometry import Polygon
 
 
@@ -144,3 +146,182 @@ def poly_nms(polygons, threshold):
         index = np.delete(index, remove_index)
 
     return keep_poly
+
+
+def box_overlap_pairs(boxes):
+    """Find the pairs of overlapping axis-aligned boxes by a sorted sweep.
+
+    The boxes are sorted by their left side, the boxes overlapping a box in
+    x are then the run of the following ones starting before its right side,
+    of which the ones overlapping in y are kept.
+
+    Args:
+        boxes (ndarray): The boxes of shape (n, 4), as x0, y0, x1, y1.
+
+    Returns:
+        i, j (ndarray): The indices of the pairs, with i < j.
+    """
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    x0, y0, x1, y1 = boxes.T
+    order = np.argsort(x0, kind="stable")
+    ends = np.searchsorted(x0[order], x1[order], side="right")
+    counts = np.maximum(ends - np.arange(1, len(order) + 1), 0)
+    first = np.repeat(np.arange(len(order)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    i, j = order[first], order[first + 1 + offsets]
+    keep = (y0[j] <= y1[i]) & (y0[i] <= y1[j])
+    i, j = i[keep], j[keep]
+    return np.minimum(i, j), np.maximum(i, j)
+
+
+def _neighbors(i, j, num):
+    """The pairs (i, j) as adjacency lists: the neighbors of k are
+    dst[bounds[k] : bounds[k + 1]]."""
+    src = np.concatenate([i, j])
+    dst = np.concatenate([j, i])
+    by_src = np.argsort(src, kind="stable")
+    return dst[by_src], np.searchsorted(src[by_src], np.arange(num + 1))
+
+
+def greedy_nms(order, i, j, num):
+    """Greedy nms on a suppression graph.
+
+    Args:
+        order (ndarray): The indices of the items by decreasing score.
+        i, j (ndarray): The pairs of items whose overlap is over the
+            threshold.
+        num (int): The number of items.
+
+    Returns:
+        keep (list[int]): The kept items, by decreasing score.
+    """
+    dst, bounds = _neighbors(i, j, num)
+    suppressed = np.zeros(num, dtype=bool)
+    keep = []
+    for k in order:
+        if suppressed[k]:
+            continue
+        keep.append(int(k))
+        suppressed[dst[bounds[k] : bounds[k + 1]]] = True
+    return keep
+
+
+def _poly_areas(points):
+    if not hasattr(shapely, "polygons"):
+        # shapely < 2 has no vectorized geometry functions
+        return np.array([Polygon(p).area for p in points])
+    return shapely.area(shapely.polygons(points))
+
+
+def _poly_iou_func(points, areas, buffer=0.0001):
+    """The boundary_iou of a polygon with others, as func(k, others)."""
+    if not hasattr(shapely, "polygons"):
+        return lambda k, others: np.array(
+            [boundary_iou(points[k].reshape(-1), points[o].reshape(-1)) for o in others]
+        )
+    buffered = shapely.buffer(shapely.polygons(points), buffer)
+
+    def func(k, others):
+        inter = shapely.area(shapely.intersection(buffered[k], buffered[others]))
+        union = areas[k] + areas[others] - inter
+        return np.where(union == 0, 0.0, inter / np.where(union == 0, 1.0, union))
+
+    return func
+
+
+def _mask_iou_func(points, scale):
+    """The IoU of a polygon with others rasterized at scale, as func(k, others)."""
+    points = np.round(points * scale).astype(np.int32)
+    lo, hi = points.min(axis=1), points.max(axis=1)
+    masks = {}
+
+    def mask_of(k):
+        if k not in masks:
+            width, height = hi[k] - lo[k] + 1
+            mask = np.zeros((height, width), dtype=np.uint8)
+            cv2.fillPoly(mask, [points[k] - lo[k]], 1)
+            masks[k] = mask, np.count_nonzero(mask)
+        return masks[k]
+
+    def func(k, others):
+        mask_k, area_k = mask_of(k)
+        ious = np.zeros(len(others), dtype=np.float64)
+        for idx, o in enumerate(others):
+            mask_o, area_o = mask_of(o)
+            (x0, y0), (x1, y1) = np.maximum(lo[k], lo[o]), np.minimum(hi[k], hi[o]) + 1
+            if x0 >= x1 or y0 >= y1:
+                continue
+            inter = np.count_nonzero(
+                mask_k[y0 - lo[k][1] : y1 - lo[k][1], x0 - lo[k][0] : x1 - lo[k][0]]
+                & mask_o[y0 - lo[o][1] : y1 - lo[o][1], x0 - lo[o][0] : x1 - lo[o][0]]
+            )
+            union = area_k + area_o - inter
+            ious[idx] = inter / union if union > 0 else 0.0
+        return ious
+
+    return func
+
+
+def poly_nms_fast(polygons, threshold, iou_mode="poly", mask_scale=0.25):
+    """Polygon nms of poly_nms without its pairwise loop.
+
+    The candidate pairs are the ones whose bounding boxes overlap, found by
+    box_overlap_pairs. Of these, the pairs whose polygon IoU can not be over
+    the threshold, with the overlap of their boxes as intersection, are
+    dropped. Then the polygons are visited by decreasing score as poly_nms,
+    and the IoUs of a kept polygon with its candidates still there are
+    computed at once.
+
+    Args:
+        polygons (list[list[float]]): The polygons, each of 2k coordinates
+            followed by its score.
+        threshold (float): The IoU over which a polygon is suppressed.
+        iou_mode (str): 'poly' for the exact IoU of poly_nms, 'mask' for the
+            IoU of the polygons rasterized at mask_scale, faster on dense
+            maps of large polygons.
+        mask_scale (float): The scale of the rasters of the 'mask' mode.
+
+    Returns:
+        keep_poly (list[list[float]]): The kept polygons with their score,
+            by decreasing score as poly_nms.
+    """
+    assert isinstance(polygons, list)
+    assert iou_mode in ["poly", "mask"], "iou_mode should be 'poly' or 'mask'"
+    if len(polygons) == 0:
+        return []
+    polygons = np.array(polygons, dtype=np.float64)
+    num = len(polygons)
+    points = polygons[:, :-1].reshape(num, -1, 2)
+    # the order of poly_nms: by score, the last ones of equal scores first
+    order = np.argsort(polygons[:, -1], kind="stable")[::-1]
+    rank = np.empty(num, dtype=np.int64)
+    rank[order] = np.arange(num)
+
+    lo, hi = points.min(axis=1), points.max(axis=1)
+    if iou_mode == "poly":
+        # poly_intersection grows the polygons by its buffer
+        lo, hi = lo - 0.0001, hi + 0.0001
+    i, j = box_overlap_pairs(np.concatenate([lo, hi], axis=1))
+    size = np.minimum(hi[i], hi[j]) - np.maximum(lo[i], lo[j])
+    box_inter = np.prod(np.maximum(size, 0), axis=1)
+    areas = _poly_areas(points)
+    union = areas[i] + areas[j] - box_inter
+    maybe = (union <= 0) | (box_inter > threshold * union)
+    dst, bounds = _neighbors(i[maybe], j[maybe], num)
+
+    if iou_mode == "poly":
+        iou_func = _poly_iou_func(points, areas)
+    else:
+        iou_func = _mask_iou_func(points, mask_scale)
+    suppressed = np.zeros(num, dtype=bool)
+    keep = []
+    for k in order:
+        if suppressed[k]:
+            continue
+        keep.append(k)
+        # the candidates before k are kept ones, under the threshold
+        others = dst[bounds[k] : bounds[k + 1]]
+        others = others[~suppressed[others] & (rank[others] > rank[k])]
+        if len(others) > 0:
+            suppressed[others[iou_func(k, others) > threshold]] = True
+    return polygons[keep].tolist()
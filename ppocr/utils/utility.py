@@ -21,6 +21,8 @@ import paddle
 import importlib.util
 import sys
 import subprocess
+import threading
+import queue
 
 
 def print_dict(d, logger, delimiter=0):
@@ -116,7 +118,150 @@ def alpha_to_color(img, alpha_color=(255, 255, 255)):
     return img
 
 
-def check_and_read(img_path):
+class PDFPages(object):
+    """
+    Pages of a pdf file as a lazy sequence of BGR images.
+
+    A page is only rendered when it is accessed, and only once, at the zoom
+    chosen from its size before rendering. `len`, slicing and `page_num` are
+    resolved from the page count, so pages that are never used are never
+    rendered. Iteration can render the next `prefetch` pages in a background
+    thread while the current one is being processed.
+
+    Args:
+        pdf_path(str): path of the pdf file.
+        page_num(int): only the first `page_num` pages are used, 0 for all pages.
+        target_side(int): 0 keeps the default zoom (2x, or 1x when the 2x page
+            is larger than 2000 pixels). Otherwise each page is rendered so that
+            its long side (limit_type "max") or short side (limit_type "min")
+            is `target_side` pixels, i.e. the size the detector resizes to.
+        limit_type(str): "max" or "min", see target_side.
+        prefetch(int): number of pages rendered ahead during iteration.
+
+    The document stays open until `close()`, which consumers call once the
+    last page is used; PDFPages is also a context manager.
+    """
+
+    def __init__(
+        self, pdf_path, page_num=0, target_side=0, limit_type="max", prefetch=0
+    ):
+        from paddle.utils import try_import
+
+        self.fitz = try_import("fitz")
+        self.pdf_path = pdf_path
+        self.target_side = target_side
+        self.limit_type = limit_type
+        self.prefetch = prefetch
+        self._doc = self.fitz.open(pdf_path)
+        # MuPDF documents can not be used by several threads at once
+        self._lock = threading.Lock()
+        page_count = self._doc.page_count
+        if page_num > 0:
+            page_count = min(page_num, page_count)
+        self._pages = range(page_count)
+
+    def _view(self, pages):
+        view = object.__new__(PDFPages)
+        view.__dict__.update(self.__dict__)
+        view._pages = pages
+        return view
+
+    def __len__(self):
+        return len(self._pages)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return self._view(self._pages[idx])
+        return self._render(self._pages[idx])
+
+    def __iter__(self):
+        if self.prefetch <= 0:
+            for pg in self._pages:
+                yield self._render(pg)
+            return
+
+        pages = queue.Queue(maxsize=self.prefetch)
+        stop = threading.Event()
+
+        def worker():
+            for pg in self._pages:
+                try:
+                    item = self._render(pg)
+                except Exception as e:
+                    item = e
+                while not stop.is_set():
+                    try:
+                        pages.put(item, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set() or isinstance(item, Exception):
+                    return
+
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+        try:
+            for _ in self._pages:
+                item = pages.get()
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            thread.join()
+
+    def zoom(self, page):
+        """Zoom factor of a page, decided from its size in points."""
+        rect = page.rect
+        if self.target_side > 0:
+            if self.limit_type == "min":
+                side = min(rect.width, rect.height)
+            else:
+                side = max(rect.width, rect.height)
+            return self.target_side / max(side, 1)
+        # if width or height > 2000 pixels, don't enlarge the image
+        size = (rect * self.fitz.Matrix(2, 2)).irect
+        if size.width > 2000 or size.height > 2000:
+            return 1
+        return 2
+
+    def _render(self, pg):
+        with self._lock:
+            page = self._doc[pg]
+            zoom = self.zoom(page)
+            pm = page.get_pixmap(matrix=self.fitz.Matrix(zoom, zoom), alpha=False)
+            img = np.frombuffer(pm.samples, dtype=np.uint8)
+            img = img.reshape(pm.height, pm.width, pm.n)
+        return cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
+
+    @property
+    def closed(self):
+        return self._doc.is_closed
+
+    def close(self):
+        with self._lock:
+            if not self._doc.is_closed:
+                self._doc.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def close_pages(pages):
+    """Close a lazy PDFPages sequence, lists of pages are left as they are."""
+    if isinstance(pages, PDFPages):
+        pages.close()
+
+
+def check_and_read(img_path, lazy=False, **pdf_options):
+    """
+    Read gif and pdf files, other images return (None, False, False).
+    pdf pages are returned as a list, or as a lazy PDFPages sequence when
+    `lazy` is True. pdf_options are passed to PDFPages.
+    """
     if os.path.basename(img_path)[-3:].lower() == "gif":
         gif = cv2.VideoCapture(img_path)
         ret, frame = gif.read()
@@ -129,26 +274,11 @@ def check_and_read(img_path):
         imgvalue = frame[:, :, ::-1]
         return imgvalue, True, False
     elif os.path.basename(img_path)[-3:].lower() == "pdf":
-        from paddle.utils import try_import
-
-        fitz = try_import("fitz")
-        from PIL import Image
-
-        imgs = []
-        with fitz.open(img_path) as pdf:
-            for pg in range(0, pdf.page_count):
-                page = pdf[pg]
-                mat = fitz.Matrix(2, 2)
-                pm = page.get_pixmap(matrix=mat, alpha=False)
-
-                # if width or height > 2000 pixels, don't enlarge the image
-                if pm.width > 2000 or pm.height > 2000:
-                    pm = page.get_pixmap(matrix=fitz.Matrix(1, 1), alpha=False)
-
-                img = Image.frombytes("RGB", [pm.width, pm.height], pm.samples)
-                img = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
-                imgs.append(img)
-            return imgs, False, True
+        imgs = PDFPages(img_path, **pdf_options)
+        if not lazy:
+            pages, imgs = imgs, list(imgs)
+            pages.close()
+        return imgs, False, True
     return None, False, False
 
 
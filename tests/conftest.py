@@ -0,0 +1,121 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+import tools.infer.utility as utility
+
+
+def det_model(data):
+    """Pixel-wise "model": dark pixels are text, zero padding is background."""
+    return (data.mean(axis=1, keepdims=True) < -1.0).astype(np.float32) * 0.9
+
+
+def ctc_model(data, num_classes=37):
+    """CTC "model" reading one class per 8 columns, zero padding is blank."""
+    b, _, _, w = data.shape
+    steps = (w + 7) // 8
+    data = np.pad(data, [(0, 0), (0, 0), (0, 0), (0, steps * 8 - w)])
+    blocks = np.abs(data).reshape(b, -1, steps, 8).sum(axis=(1, 3))
+    ids = np.where(blocks > 0, (blocks * 7).astype(np.int64) % 36 + 1, 0)
+    probs = np.full((b, steps, num_classes), 0.1, dtype=np.float32)
+    np.put_along_axis(probs, ids[..., None], 5.0, axis=2)
+    return probs / probs.sum(axis=2, keepdims=True)
+
+
+MODELS = {"det": det_model, "ctc": ctc_model}
+
+
+class FakeInput(object):
+    def copy_from_cpu(self, data):
+        self.data = data
+
+
+class FakeOnnxInput(object):
+    name = "x"
+
+    def __init__(self, shape):
+        self.shape = shape
+
+
+class FakeOutput(object):
+    def __init__(self, predictor):
+        self.predictor = predictor
+
+    def copy_to_cpu(self):
+        return self.predictor.model(self.predictor.input_tensor.data)
+
+
+class FakePredictor(object):
+    """
+    Paddle inference predictor (or onnxruntime session) running `model` on
+    its input. It records the input shape of every run, and fails when two
+    threads run it at the same time (a run takes at least `delay` seconds).
+    """
+
+    def __init__(self, model, delay=0.0):
+        self.model = model
+        self.delay = delay
+        self.input_tensor = FakeInput()
+        self.output_tensor = FakeOutput(self)
+        self.shapes = []
+        self.clones = []
+        self.running = False
+
+    @property
+    def batch_sizes(self):
+        return [shape[0] for shape in self.shapes]
+
+    def clone(self):
+        predictor = FakePredictor(self.model, self.delay)
+        self.clones.append(predictor)
+        return predictor
+
+    def get_input_names(self):
+        return ["x"]
+
+    def get_input_handle(self, name):
+        return self.input_tensor
+
+    def get_output_names(self):
+        return ["softmax_0.tmp_0"]
+
+    def get_output_handle(self, name):
+        return self.output_tensor
+
+    def run(self, output_names=None, input_dict=None):
+        assert not self.running, "predictor shared by two threads"
+        self.running = True
+        time.sleep(self.delay)
+        if input_dict is not None:
+            self.input_tensor.copy_from_cpu(input_dict["x"])
+        self.shapes.append(self.input_tensor.data.shape)
+        self.running = False
+        if input_dict is not None:
+            return [self.output_tensor.copy_to_cpu()]
+
+
+@pytest.fixture
+def fake_predictor(monkeypatch):
+    """
+    Returns install(model, delay=0.0, onnx_shape=None): utility.create_predictor
+    then hands out a new FakePredictor of `model` ("det", "ctc" or a function
+    of the input batch), which install returns. With onnx_shape it is handed
+    out as an onnxruntime session whose input has that shape.
+    """
+
+    def install(model, delay=0.0, onnx_shape=None):
+        predictor = FakePredictor(MODELS.get(model, model), delay)
+        if onnx_shape is not None:
+            res = (predictor, FakeOnnxInput(onnx_shape), None, None)
+        else:
+            res = (predictor, predictor.input_tensor, [predictor.output_tensor], None)
+        monkeypatch.setattr(utility, "create_predictor", lambda args, mode, logger: res)
+        return predictor
+
+    return install
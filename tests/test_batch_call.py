@@ -0,0 +1,111 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+import paddleocr
+from tools.infer import predict_system
+from tools.infer.crop_engine import CropEngine
+
+
+def make_image(value):
+    """Flat image whose value is both its number of boxes and its crops' text."""
+    return np.full((100, 120, 3), value, dtype=np.uint8)
+
+
+class FakeDetector(object):
+    """Finds one box per grey level of the image, none in a black image."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, img):
+        self.calls.append(1)
+        return self._boxes(img), 0.0
+
+    def predict_batch(self, imgs):
+        self.calls.append(len(imgs))
+        return [self._boxes(img) for img in imgs], 0.0
+
+    @staticmethod
+    def _boxes(img):
+        boxes = [
+            [[10, 10 * i], [60, 10 * i], [60, 10 * i + 8], [10, 10 * i + 8]]
+            for i in range(int(img[0, 0, 0]))
+        ]
+        return np.array(boxes, dtype=np.float32).reshape(-1, 4, 2)
+
+
+class FakeRecognizer(object):
+    """Reads the grey level of each crop, so results name their image."""
+
+    rec_image_shape = [3, 48, 320]
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, img_list):
+        self.batches.append(len(img_list))
+        return [[str(int(img.mean())), 0.9, []] for img in img_list], 0.0
+
+
+def setup_system(text_system, det_batch_num):
+    text_system.args.det_batch_num = det_batch_num
+    text_system.result_cache = None
+    text_system.text_detector = FakeDetector()
+    text_system.text_recognizer = FakeRecognizer()
+    text_system.use_angle_cls = False
+    text_system.drop_score = 0.5
+    text_system.sort_boxes = list
+    text_system.crop_engine = CropEngine()
+    return text_system
+
+
+@pytest.mark.parametrize("det_batch_num", [1, 4])
+def test_batch_call_maps_results_to_images(det_batch_num):
+    text_system = predict_system.TextSystem.__new__(predict_system.TextSystem)
+    text_system.args = paddleocr.parse_args(mMain=False, argv=[])
+    setup_system(text_system, det_batch_num)
+    values = [3, 0, None, 1, 2, None, 0]
+    img_list = [None if value is None else make_image(value) for value in values]
+
+    results, _ = text_system.batch_call(img_list, cls=False)
+    assert len(results) == len(values)
+    for value, (dt_boxes, rec_res) in zip(values, results):
+        if value is None:
+            assert dt_boxes is None and rec_res is None
+            continue
+        assert len(dt_boxes) == value
+        assert [res[0] for res in rec_res] == [str(value)] * value
+        np.testing.assert_allclose(
+            np.array(dt_boxes).reshape(-1, 4, 2),
+            FakeDetector._boxes(make_image(value)),
+        )
+    # the crops of all the images are recognized together
+    assert text_system.text_recognizer.batches == [6]
+    if det_batch_num > 1:
+        assert text_system.text_detector.calls == [5]
+
+
+def test_ocr_batch_maps_results_to_inputs():
+    ocr = paddleocr.PaddleOCR.__new__(paddleocr.PaddleOCR)
+    ocr.args = paddleocr.parse_args(mMain=False, argv=[])
+    ocr.page_num = 0
+    setup_system(ocr, 4)
+    values = [2, 0, 1, 3]
+
+    res = ocr.ocr_batch([make_image(value) for value in values], cls=False)
+    assert len(res) == len(values)
+    for value, pages in zip(values, res):
+        assert len(pages) == 1
+        if value == 0:
+            assert pages == [None]
+            continue
+        assert [line[1][0] for line in pages[0]] == [str(value)] * value
+        assert [line[0] for line in pages[0]] == (
+            FakeDetector._boxes(make_image(value)).tolist()
+        )
@@ -0,0 +1,171 @@
+import json
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+from ppocr.postprocess.rec_postprocess import CTCLabelDecode
+from tools.infer import pipeline
+from tools.infer.batch_runner import (
+    BatchRunner,
+    JsonlSink,
+    page_records,
+    save_visualization,
+)
+
+FONT_PATH = os.path.join(current_dir, "..", "doc", "fonts", "latin.ttf")
+
+
+class FakeEngine(object):
+    """Model-free stand-in for PaddleOCR, the file name is the only text line."""
+
+    calls = []
+
+    def ocr(self, img_path, **kwargs):
+        FakeEngine.calls.append(img_path)
+        if "broken" in img_path:
+            raise ValueError("broken image")
+        box = [[2.0, 2.0], [30.0, 2.0], [30.0, 12.0], [2.0, 12.0]]
+        return [[[box, [os.path.basename(img_path), np.float32(0.9), []]]]]
+
+
+def make_inputs(tmp_path, num, broken=()):
+    paths = []
+    for idx in range(num):
+        name = "broken_{}.png" if idx in broken else "img_{}.png"
+        path = str(tmp_path / name.format(idx))
+        cv2.imwrite(path, np.full((16, 40, 3), 255, dtype=np.uint8))
+        paths.append(path)
+    return paths
+
+
+def read_jsonl(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_page_records():
+    box = [[0, 0], [4, 0], [4, 2], [0, 2]]
+    assert page_records(None) is None
+    assert page_records([[box, ["a", 0.5, []]]]) == [
+        {"box": box, "text": "a", "score": 0.5}
+    ]
+    assert page_records([box]) == [{"box": box}]
+
+
+def test_compact_page_records(tmp_path):
+    rng = np.random.RandomState(0)
+    preds = rng.rand(3, 20, 37).astype(np.float32)
+    compact = CTCLabelDecode(compact_result=True)(preds / preds.sum(2, keepdims=True))
+    boxes = rng.rand(3, 4, 2).astype(np.float32) * 100
+    records = page_records(compact.with_boxes(boxes))
+    for idx, record in enumerate(records):
+        assert record["text"] == compact.texts[idx]
+        assert record["char_details"] == compact.char_details(idx)
+
+    sink = JsonlSink(str(tmp_path))
+    sink.write({"input": "a.png", "pages": [records]})
+    sink.close()
+    assert read_jsonl(sink.path)[0]["pages"][0] == json.loads(json.dumps(records))
+
+
+@pytest.mark.parametrize("num_workers", [1, 3])
+def test_run_and_resume(tmp_path, num_workers):
+    inputs = make_inputs(tmp_path, 8, broken=(5,))
+    output_dir = str(tmp_path / "out")
+    runner = BatchRunner(FakeEngine, output_dir, num_workers=num_workers)
+    stats = runner.run(inputs[:6])
+    assert stats == {"total": 6, "skipped": 0, "done": 5, "failed": 1}
+
+    records = read_jsonl(os.path.join(output_dir, "results.jsonl"))
+    assert sorted(record["input"] for record in records) == sorted(inputs[:5])
+    for record in records:
+        assert record["pages"][0][0]["text"] == os.path.basename(record["input"])
+
+    # the second run only processes the new and the failed inputs
+    FakeEngine.calls = []
+    stats = BatchRunner(FakeEngine, output_dir).run(inputs)
+    assert stats == {"total": 8, "skipped": 5, "done": 2, "failed": 1}
+    assert sorted(FakeEngine.calls) == sorted(inputs[5:])
+    assert len(read_jsonl(os.path.join(output_dir, "results.jsonl"))) == 7
+
+
+def test_manifest_waits_for_parquet_flush(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    inputs = make_inputs(tmp_path, 5)
+    output_dir = str(tmp_path / "out")
+    runner = BatchRunner(FakeEngine, output_dir, sink="parquet", rows_per_file=2)
+
+    manifest_sizes = []
+
+    def make_sink():
+        sink = BatchRunner._make_sink(runner)
+        write = sink.write
+
+        def checked_write(record):
+            manifest_sizes.append(len(read_jsonl(manifest_path)))
+            return write(record)
+
+        sink.write = checked_write
+        return sink
+
+    manifest_path = os.path.join(output_dir, "manifest.jsonl")
+    runner._make_sink = make_sink
+    assert runner.run(inputs)["done"] == 5
+    # inputs are committed two by two, when a part file is written
+    assert manifest_sizes == [0, 0, 2, 2, 4]
+
+    parts = sorted(name for name in os.listdir(output_dir) if name.endswith(".parquet"))
+    assert len(parts) == 3
+    rows = []
+    for name in parts:
+        rows.extend(pq.read_table(os.path.join(output_dir, name)).to_pylist())
+    assert [row["text"] for row in rows] == [os.path.basename(p) for p in inputs]
+
+
+def test_visualization_pool(tmp_path):
+    inputs = make_inputs(tmp_path, 2)
+    output_dir = str(tmp_path / "out")
+    BatchRunner(
+        FakeEngine,
+        output_dir,
+        vis_workers=1,
+        vis_kwargs={"font_path": FONT_PATH},
+    ).run(inputs)
+    assert sorted(os.listdir(os.path.join(output_dir, "vis"))) == [
+        "img_0.png",
+        "img_1.png",
+    ]
+
+
+def test_visualization_renders_like_ocr(tmp_path, monkeypatch):
+    fitz = pytest.importorskip("fitz")
+    path = str(tmp_path / "doc.pdf")
+    doc = fitz.open()
+    for w, h in [(300, 200), (400, 300)]:
+        doc.new_page(width=w, height=h)
+    doc.save(path)
+    doc.close()
+
+    opened = []
+    load_image_pages = pipeline.load_image_pages
+
+    def tracking_load(*args, **kwargs):
+        opened.append(load_image_pages(*args, **kwargs))
+        return opened[-1]
+
+    monkeypatch.setattr(pipeline, "load_image_pages", tracking_load)
+    line = {"box": [[2, 2], [30, 2], [30, 12], [2, 12]], "text": "a", "score": 0.9}
+    pdf_options = {"page_num": 1, "target_side": 100, "limit_type": "max"}
+    save_visualization(
+        path, [[line]], str(tmp_path), FONT_PATH, pdf_options=pdf_options
+    )
+    # the first page only, rendered at the size the OCR used
+    assert len(opened[0]) == 1 and opened[0].closed
+    img = cv2.imread(str(tmp_path / "doc.png"))
+    assert img.shape[:2] == (67, 200)
@@ -0,0 +1,68 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+from tools.infer.crop_engine import CropEngine
+from tools.infer.utility import get_minarea_rect_crop, get_rotate_crop_image
+
+
+def make_image(h=400, w=600, seed=0):
+    rng = np.random.RandomState(seed)
+    return (rng.rand(h, w, 3) * 255).astype(np.uint8)
+
+
+def rect(x0, y0, x1, y1):
+    return np.array([[x0, y0], [x1, y0], [x1, y1], [x0, y1]], dtype=np.float32)
+
+
+BOXES = [
+    rect(10, 20, 200, 52),  # horizontal line
+    rect(300, 10, 332, 390),  # vertical line, rotated to horizontal
+    rect(0, 0, 600, 400),  # whole image
+    rect(550, 350, 610, 420),  # partly outside, warped with border replicate
+    np.array([[100, 100], [250, 120], [245, 160], [95, 140]], dtype=np.float32),
+    rect(10.5, 20.25, 200, 52),  # non integer
+]
+
+
+@pytest.mark.parametrize("box", BOXES)
+def test_crop_matches_get_rotate_crop_image(box):
+    img = make_image()
+    ref = get_rotate_crop_image(img, box.copy())
+    crop = CropEngine()(img, [box])[0]
+    assert crop.shape == ref.shape
+    np.testing.assert_array_equal(crop, ref)
+
+
+def test_poly_crop_matches_get_minarea_rect_crop():
+    img = make_image()
+    poly = np.array([[50, 60], [150, 50], [260, 70], [250, 110], [60, 100]])
+    np.testing.assert_array_equal(
+        CropEngine(box_type="poly").crop(img, poly), get_minarea_rect_crop(img, poly)
+    )
+
+
+def test_crop_to_target_height():
+    img = make_image()
+    crops = CropEngine(target_height=48)(img, BOXES)
+    assert all(crop.shape[0] == 48 for crop in crops)
+    # the vertical line keeps its aspect ratio after the rotation
+    assert crops[1].shape[1] == round(380 * 48 / 32)
+
+
+def test_threaded_crop_keeps_order():
+    img = make_image()
+    rng = np.random.RandomState(1)
+    boxes = []
+    for _ in range(100):
+        x0, y0 = rng.randint(0, 500), rng.randint(0, 350)
+        boxes.append(rect(x0, y0, x0 + rng.randint(5, 100), y0 + rng.randint(5, 50)))
+    ref = CropEngine()(img, boxes)
+    crops = CropEngine(num_threads=4)(img, boxes)
+    for crop, ref_crop in zip(crops, ref):
+        np.testing.assert_array_equal(crop, ref_crop)
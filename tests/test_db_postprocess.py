@@ -0,0 +1,148 @@
+import glob
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+from ppocr.postprocess.db_postprocess import (
+    DBPostProcess,
+    _order_box_points,
+    _rect_points,
+)
+
+SAMPLES = sorted(glob.glob(os.path.join(current_dir, "test_files", "*.jpg")))
+
+
+def text_prob_map(img, limit_side_len=960):
+    """
+    DB-like probability map of an image: dark strokes merged into text lines,
+    close to 1 inside the lines and falling off at their borders.
+    """
+    h, w = img.shape[:2]
+    ratio = min(1.0, limit_side_len / max(h, w))
+    resize_h = max(32, int(round(h * ratio / 32)) * 32)
+    resize_w = max(32, int(round(w * ratio / 32)) * 32)
+    gray = cv2.cvtColor(cv2.resize(img, (resize_w, resize_h)), cv2.COLOR_BGR2GRAY)
+    ink = cv2.adaptiveThreshold(
+        gray, 1, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 25, 15
+    )
+    lines = cv2.morphologyEx(ink, cv2.MORPH_CLOSE, np.ones((3, 9), np.uint8))
+    lines = cv2.morphologyEx(lines, cv2.MORPH_OPEN, np.ones((2, 2), np.uint8))
+    prob = cv2.GaussianBlur(lines.astype(np.float32), (5, 5), 0)
+    prob = 1 / (1 + np.exp(-12 * (prob - 0.5)))
+    return prob, [h, w, resize_h / h, resize_w / w]
+
+
+def bbox_iou(a, b):
+    (ax0, ay0), (ax1, ay1) = a.min(0), a.max(0)
+    (bx0, by0), (bx1, by1) = b.min(0), b.max(0)
+    iw = max(0, min(ax1, bx1) - max(ax0, bx0))
+    ih = max(0, min(ay1, by1) - max(ay0, by0))
+    inter = float(iw * ih)
+    union = (ax1 - ax0) * (ay1 - ay0) + (bx1 - bx0) * (by1 - by0) - inter
+    return inter / max(union, 1e-6)
+
+
+def test_rect_points_match_opencv():
+    rng = np.random.RandomState(0)
+    post_process = DBPostProcess()
+    for _ in range(500):
+        points = rng.randint(0, 200, (rng.randint(3, 20), 2)).astype(np.int32)
+        rect = cv2.minAreaRect(points)
+        row = np.array([[rect[0][0], rect[0][1], rect[1][0], rect[1][1], rect[2]]])
+        box = _rect_points(row)
+        assert np.allclose(box[0], cv2.boxPoints(rect), atol=1e-3)
+        expected, _ = post_process.get_mini_boxes(points)
+        assert np.allclose(_order_box_points(box)[0], np.array(expected), atol=1e-3)
+
+
+def test_rectangles_match_reference():
+    prob = np.zeros((320, 480), dtype=np.float32)
+    quads = [
+        ((120, 60), (160, 24), 0),
+        ((300, 160), (200, 30), 15),
+        ((200, 260), (90, 40), -30),
+    ]
+    for quad in quads:
+        cv2.fillPoly(prob, [np.int32(cv2.boxPoints(quad))], 0.9)
+    shape_list = [[640, 960, 0.5, 0.5]]
+    outs = {"maps": prob[None, None]}
+
+    reference = DBPostProcess(box_thresh=0.6, unclip_ratio=1.5)(outs, shape_list)
+    fast = DBPostProcess(box_thresh=0.6, unclip_ratio=1.5, score_mode="cc")(
+        outs, shape_list
+    )
+    reference, fast = reference[0]["points"], fast[0]["points"]
+    assert fast.dtype == np.int32 and fast.shape == (3, 4, 2)
+    for box in reference:
+        dist = np.abs(fast - box[None]).max(axis=(1, 2))
+        assert dist.min() <= 4
+
+
+@pytest.mark.parametrize("path", SAMPLES, ids=os.path.basename)
+def test_parity_on_samples(path):
+    prob, shape = text_prob_map(cv2.imread(path))
+    height, width = prob.shape
+    post_process = DBPostProcess(box_thresh=0.6, unclip_ratio=1.5)
+    bitmap = prob > post_process.thresh
+    reference, ref_scores = post_process.boxes_from_bitmap(prob, bitmap, width, height)
+    boxes, scores = post_process.boxes_from_labels(prob, bitmap, width, height)
+    assert len(boxes) == len(scores) and min(scores) >= 0.6
+
+    # boxes clearly above the score threshold are found, except the ones of
+    # the holes, which lie inside a box
+    confident = [box for box, score in zip(reference, ref_scores) if score >= 0.65]
+    found = 0
+    for box in confident:
+        center = tuple(float(v) for v in box.mean(axis=0))
+        if any(bbox_iou(box, other) >= 0.7 for other in boxes) or any(
+            cv2.pointPolygonTest(other.reshape(-1, 1, 2), center, False) >= 0
+            for other in boxes
+        ):
+            found += 1
+    assert found >= 0.95 * len(confident)
+    # and nearly every box is one of the reference
+    matched = sum(
+        1 for box in boxes if any(bbox_iou(box, other) >= 0.7 for other in reference)
+    )
+    assert matched >= 0.95 * len(boxes)
+
+
+def test_max_candidates_and_empty_maps():
+    prob = np.zeros((64, 64), dtype=np.float32)
+    post_process = DBPostProcess(score_mode="cc", max_candidates=2)
+    boxes, scores = post_process.boxes_from_labels(prob, prob > 0.3, 64, 64)
+    assert boxes.shape == (0, 4, 2) and scores == []
+
+    for idx in range(4):
+        prob[4 + idx * 14 : 14 + idx * 14, 4:60] = 1.0
+    boxes, scores = post_process.boxes_from_labels(prob, prob > 0.3, 64, 64)
+    assert len(boxes) == 2
+
+
+def test_batch_on_threads_keeps_order():
+    prob = np.zeros((6, 1, 64, 96), dtype=np.float32)
+    for idx in range(6):
+        prob[idx, 0, 8 : 20 + 4 * idx, 10 : 40 + 8 * idx] = 0.9
+    shape_list = np.array([[128, 192, 0.5, 0.5]] * 6)
+    serial = DBPostProcess()({"maps": prob}, shape_list)
+    threaded = DBPostProcess(num_threads=3)({"maps": prob}, shape_list)
+    assert len(threaded) == 6
+    for ref, out in zip(serial, threaded):
+        np.testing.assert_array_equal(ref["points"], out["points"])
+
+
+def test_nested_map_runs_inline():
+    from ppocr.postprocess.parallel import map_ordered
+
+    def outer(i):
+        return map_ordered(lambda j: (i, j), range(3), num_threads=2)
+
+    assert map_ordered(outer, range(4), num_threads=2) == [
+        [(i, j) for j in range(3)] for i in range(4)
+    ]
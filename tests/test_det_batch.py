@@ -0,0 +1,187 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+import tools.infer.utility as utility
+from tools.infer import predict_det, predict_system
+
+
+def make_image(h, w, seed):
+    rng = np.random.RandomState(seed)
+    img = np.full((h, w, 3), 255, dtype=np.uint8)
+    for _ in range(4):
+        x, y = rng.randint(0, w - 120), rng.randint(0, h - 30)
+        cv2.rectangle(img, (x, y), (x + rng.randint(40, 110), y + 18), (0, 0, 0), -1)
+    return img
+
+
+@pytest.fixture
+def detector(fake_predictor):
+    fake_predictor("det")
+    args = utility.init_args().parse_args(["--det_batch_num", "3"])
+    return predict_det.TextDetector(args)
+
+
+def test_predict_batch_matches_predict(detector):
+    imgs = [
+        make_image(h, w, seed)
+        for seed, (h, w) in enumerate(
+            [(300, 400), (320, 410), (600, 200), (1500, 900), (310, 400)]
+        )
+    ]
+    batch_dt_boxes, _ = detector.predict_batch(imgs)
+    assert len(batch_dt_boxes) == len(imgs)
+    for img, dt_boxes in zip(imgs, batch_dt_boxes):
+        ref_boxes, _ = detector.predict(img)
+        assert len(ref_boxes) > 0
+        np.testing.assert_allclose(dt_boxes, ref_boxes)
+
+
+def test_predict_batch_groups_by_bucket(detector):
+    imgs = [make_image(300, 400, seed) for seed in range(4)]
+    detector.predictor.shapes.clear()
+    detector.predict_batch(imgs)
+    assert detector.predictor.batch_sizes == [3, 1]
+
+
+def test_predict_batch_buckets_stay_within_side_limit(detector):
+    # resized to 960x608: the 128 px bucket of the height would be 1024
+    imgs = [make_image(1920, 1200, seed) for seed in range(2)]
+    detector.predictor.shapes.clear()
+    batch_dt_boxes, _ = detector.predict_batch(imgs)
+    assert detector.predictor.shapes == [(2, 3, 960, 640)]
+    for img, dt_boxes in zip(imgs, batch_dt_boxes):
+        np.testing.assert_allclose(dt_boxes, detector.predict(img)[0])
+
+
+@pytest.mark.parametrize(
+    "shape, batch_sizes",
+    [(["N", 3, "H", "W"], [3, 1]), ([1, 3, 320, 320], [1, 1, 1, 1])],
+)
+def test_predict_batch_onnx_static_input(fake_predictor, shape, batch_sizes):
+    sess = fake_predictor("det", onnx_shape=shape)
+    argv = ["--use_onnx", "true", "--det_batch_num", "3"]
+    detector = predict_det.TextDetector(utility.init_args().parse_args(argv))
+    imgs = [make_image(300, 400, seed) for seed in range(4)]
+    batch_dt_boxes, _ = detector.predict_batch(imgs)
+    assert sess.batch_sizes == batch_sizes
+    for img, dt_boxes in zip(imgs, batch_dt_boxes):
+        np.testing.assert_allclose(dt_boxes, detector.predict(img)[0])
+
+
+def make_page(h, w, lines, seed=0):
+    img = np.full((h, w, 3), 255, dtype=np.uint8)
+    for x0, y0, x1, y1 in lines:
+        cv2.rectangle(img, (x0, y0), (x1, y1), (0, 0, 0), -1)
+    return img
+
+
+def box_extents(dt_boxes):
+    boxes = np.asarray(dt_boxes, dtype=np.float32).reshape(-1, 4, 2)
+    return np.array(
+        sorted(np.concatenate([boxes.min(axis=1), boxes.max(axis=1)], 1).tolist())
+    )
+
+
+LINES = [
+    (40, 40, 700, 70),  # crosses the first vertical tile border
+    (1100, 500, 1180, 1700),  # vertical line across two horizontal borders
+    (1500, 1900, 1900, 1930),
+    (300, 1300, 420, 1330),
+]
+SLICE = {
+    "horizontal_stride": 512,
+    "vertical_stride": 512,
+    "merge_x_thres": 20,
+    "merge_y_thres": 20,
+    "merge_direction": "both",
+    "overlap": 128,
+    "batch_size": 4,
+}
+
+
+@pytest.fixture
+def text_system(fake_predictor):
+    fake_predictor("det")
+    args = utility.init_args().parse_args(["--det_limit_side_len", "4096"])
+    # only the detector is needed for detect()
+    text_system = predict_system.TextSystem.__new__(predict_system.TextSystem)
+    text_system.text_detector = predict_det.TextDetector(args)
+    text_system.args = args
+    return text_system
+
+
+@pytest.mark.parametrize("skip_empty", [False, True])
+def test_detect_tiles_matches_full_image(text_system, skip_empty):
+    img = make_page(2048, 2048, LINES)
+    ref_boxes, _ = text_system.detect(img)
+    slice = dict(SLICE, skip_empty=skip_empty)
+    text_system.text_detector.predictor.shapes.clear()
+    dt_boxes, _ = text_system.detect(img, slice)
+    # unclip of a fragment differs a little from unclip of the whole line
+    np.testing.assert_allclose(box_extents(dt_boxes), box_extents(ref_boxes), atol=20)
+
+    num_tiles = sum(text_system.text_detector.predictor.batch_sizes)
+    if skip_empty:
+        # coarse pass + the tiles touching the four lines
+        assert num_tiles < 16
+    else:
+        assert num_tiles == 16
+
+
+def make_detector(fake_predictor, argv):
+    fake_predictor("det")
+    return predict_det.TextDetector(utility.init_args().parse_args(argv))
+
+
+@pytest.mark.parametrize("score_mode", ["fast", "cc"])
+def test_threaded_postprocess_is_deterministic(fake_predictor, score_mode):
+    imgs = [make_image(300 + 10 * seed, 400, seed) for seed in range(7)]
+    argv = ["--det_batch_num", "4", "--det_db_score_mode", score_mode]
+    serial = make_detector(fake_predictor, argv)
+    threaded = make_detector(fake_predictor, argv + ["--det_postprocess_threads", "4"])
+    assert threaded.postprocess_op.num_threads == 4
+    ref_boxes, _ = serial.predict_batch(imgs)
+    for _ in range(3):
+        dt_boxes, _ = threaded.predict_batch(imgs)
+        for boxes, ref in zip(dt_boxes, ref_boxes):
+            np.testing.assert_array_equal(boxes, ref)
+
+
+def test_threaded_slices(fake_predictor):
+    img = make_page(2048, 2048, LINES)
+    slice = {k: v for k, v in SLICE.items() if k not in ["overlap", "batch_size"]}
+    results = []
+    for threads in ["1", "4"]:
+        argv = ["--det_limit_side_len", "4096", "--det_postprocess_threads", threads]
+        text_system = predict_system.TextSystem.__new__(predict_system.TextSystem)
+        text_system.text_detector = make_detector(fake_predictor, argv)
+        text_system.args = text_system.text_detector.args
+        results.append(text_system.detect(img, slice)[0])
+    assert len(results[0]) > 0
+    np.testing.assert_array_equal(results[0], results[1])
+
+
+def rect(x0, y0, x1, y1):
+    return [[x0, y0], [x1, y0], [x1, y1], [x0, y1]]
+
+
+@pytest.mark.parametrize("flag", [0, 1, 2, 3])
+def test_suppress_identical_boxes(flag):
+    boxes = [rect(10, 10, 200, 40), rect(10, 10, 200, 40)]
+    keep = utility.suppress_duplicate_boxes(boxes, [flag, flag])
+    assert keep.tolist() == [0]
+
+
+def test_suppress_keeps_fragments_cut_on_same_border():
+    # a line cut at both sides of a 100 px overlap: the short right
+    # fragment lies mostly inside the left one but extends past it
+    boxes = [rect(0, 10, 500, 40), rect(400, 10, 560, 40)]
+    keep = utility.suppress_duplicate_boxes(boxes, [1, 1])
+    assert keep.tolist() == [0, 1]
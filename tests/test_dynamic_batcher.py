@@ -0,0 +1,171 @@
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+import tools.infer.utility as utility
+from tools.infer import predict_system
+from tools.infer.crop_engine import CropEngine
+from tools.infer.dynamic_batcher import BatchedTextSystem, DynamicBatcher
+
+
+def test_batches_concurrent_callers():
+    sizes = []
+    start = threading.Event()
+
+    def batch_fn(items):
+        start.wait()
+        sizes.append(len(items))
+        return [item * 10 for item in items]
+
+    batcher = DynamicBatcher(batch_fn, max_batch_size=4, max_wait_ms=50)
+    results = {}
+
+    def caller(idx):
+        results[idx] = batcher.map([idx, idx + 100])
+
+    threads = [threading.Thread(target=caller, args=(idx,)) for idx in range(6)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    start.set()
+    for thread in threads:
+        thread.join()
+    batcher.close()
+
+    assert results == {idx: [idx * 10, (idx + 100) * 10] for idx in range(6)}
+    assert sum(sizes) == 12
+    assert max(sizes) == 4
+    assert len(sizes) < 12
+    assert batcher.stats()["items"] == 12
+
+
+def test_deadline_flushes_partial_batch():
+    batcher = DynamicBatcher(lambda items: items, max_batch_size=8, max_wait_ms=5)
+    st = time.perf_counter()
+    assert batcher.map(["a"]) == ["a"]
+    assert time.perf_counter() - st < 1
+    assert batcher.stats()["batch_sizes"] == {1: 1}
+    batcher.close()
+
+
+def test_errors_reach_every_caller():
+    def batch_fn(items):
+        raise ValueError("bad batch")
+
+    batcher = DynamicBatcher(batch_fn, max_batch_size=2, max_wait_ms=20)
+    futures = batcher.submit_many([1, 2])
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.result()
+    # the scheduler keeps serving after a failed batch
+    batcher.batch_fn = lambda items: items
+    assert batcher.map([3]) == [3]
+    batcher.close()
+
+
+class FakeDetector(object):
+    def __call__(self, img):
+        num = int(img[0, 0, 0])
+        boxes = [
+            [[0, 4 * i], [8, 4 * i], [8, 4 * i + 3], [0, 4 * i + 3]] for i in range(num)
+        ]
+        return np.array(boxes, dtype=np.float32).reshape(-1, 4, 2), 0.0
+
+    def predict_batch(self, imgs):
+        return [self(img)[0] for img in imgs], 0.0
+
+
+class FakeRecognizer(object):
+    rec_image_shape = [3, 48, 320]
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def __call__(self, img_list):
+        self.batch_sizes.append(len(img_list))
+        return [["w{}".format(img.shape[1]), 0.9, []] for img in img_list], 0.0
+
+
+def make_text_system():
+    args = utility.init_args().parse_args(
+        ["--rec_batch_num", "6", "--det_batch_num", "2"]
+    )
+    text_system = predict_system.TextSystem.__new__(predict_system.TextSystem)
+    text_system.args = args
+    text_system.text_detector = FakeDetector()
+    text_system.text_recognizer = FakeRecognizer()
+    text_system.use_angle_cls = False
+    text_system.drop_score = 0.5
+    text_system.sort_boxes = list
+    text_system.crop_engine = CropEngine()
+    return text_system
+
+
+def test_batched_text_system_matches_text_system():
+    text_system = make_text_system()
+    imgs = [np.full((40, 16, 3), num, dtype=np.uint8) for num in (3, 0, 4)]
+    expected = [text_system(img)[:2] for img in imgs]
+    text_system.text_recognizer.batch_sizes = []
+
+    batched = BatchedTextSystem(text_system, max_wait_ms=20)
+    results = {}
+
+    def request(idx):
+        results[idx] = batched(imgs + [None])
+
+    threads = [threading.Thread(target=request, args=(idx,)) for idx in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    batched.close()
+
+    for idx in range(3):
+        assert results[idx][-1] == (None, None)
+        for (boxes, rec_res), (exp_boxes, exp_rec_res) in zip(results[idx], expected):
+            assert rec_res == exp_rec_res
+            np.testing.assert_array_equal(np.array(boxes), np.array(exp_boxes))
+    # 21 crops of three requests share the rec batches
+    assert sum(text_system.text_recognizer.batch_sizes) == 21
+    assert max(text_system.text_recognizer.batch_sizes) > 4
+
+
+class DictRecognizer(object):
+    """Returns dicts, as TextRecognizer does."""
+
+    def __call__(self, img_list):
+        res = [
+            {"text": "w{}".format(img.shape[1]), "score": 0.9, "char_details": []}
+            for img in img_list
+        ]
+        return res, 0.0
+
+
+@pytest.mark.parametrize("dynamic_batching", [False, True])
+def test_hubserving_rec_module(dynamic_batching):
+    pytest.importorskip("paddlehub")
+    from deploy.hubserving.ocr_rec.module import OCRRec
+
+    module = object.__new__(OCRRec)
+    module.text_recognizer = DictRecognizer()
+    module.rec_batcher = None
+    if dynamic_batching:
+        module.rec_batcher = DynamicBatcher(
+            lambda img_list: list(module.text_recognizer(img_list)[0]), 4, 5
+        )
+    imgs = [np.zeros((48, w, 3), dtype=np.uint8) for w in (30, 70)]
+    try:
+        res = module.predict(images=imgs)
+    finally:
+        if module.rec_batcher is not None:
+            module.rec_batcher.close()
+    assert res == [
+        [{"text": "w30", "confidence": 0.9}, {"text": "w70", "confidence": 0.9}]
+    ]
@@ -0,0 +1,153 @@
+import mmap
+import os
+import sys
+from io import BytesIO
+
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+from ppocr.utils.image_decode import (
+    DecodedImage,
+    decode_for_det,
+    decode_image,
+    jpeg_size,
+    pil_to_array,
+    read_image_file,
+    reduce_factor,
+)
+from tools.infer import predict_system
+from tools.infer.crop_engine import CropEngine
+
+
+def make_image(h, w, seed=0):
+    rng = np.random.RandomState(seed)
+    img = np.full((h, w, 3), 255, dtype=np.uint8)
+    for _ in range(20):
+        x, y = rng.randint(0, w - 400), rng.randint(0, h - 200)
+        cv2.rectangle(img, (x, y), (x + 300, y + rng.randint(20, 160)), (0, 0, 0), -1)
+    return img
+
+
+def encode_jpeg(img, progressive=False):
+    params = [cv2.IMWRITE_JPEG_PROGRESSIVE, int(progressive)]
+    return cv2.imencode(".jpg", img, params)[1].tobytes()
+
+
+@pytest.mark.parametrize("progressive", [False, True])
+def test_jpeg_size(progressive):
+    data = encode_jpeg(make_image(1234, 2345), progressive)
+    assert jpeg_size(data) == (1234, 2345)
+    assert jpeg_size(cv2.imencode(".png", make_image(300, 500))[1].tobytes()) is None
+
+
+def test_decode_without_copy(tmp_path):
+    img = make_image(300, 500)
+    data = cv2.imencode(".png", img)[1].tobytes()
+    path = str(tmp_path / "img.png")
+    with open(path, "wb") as f:
+        f.write(data)
+    mapped = read_image_file(path)
+    assert isinstance(mapped, mmap.mmap)
+    for source in [data, bytearray(data), memoryview(data), mapped]:
+        np.testing.assert_array_equal(decode_image(source), img)
+
+
+@pytest.mark.parametrize(
+    "mode, channels", [("RGB", 3), ("RGBA", 4), ("L", None), ("P", 3)]
+)
+def test_pil_fallback(mode, channels):
+    image = Image.fromarray(make_image(250, 500)[:, :, ::-1]).convert(mode)
+    buf = BytesIO()
+    # opencv can not read pcx files
+    image.convert("RGB" if mode == "RGBA" else mode).save(buf, "PCX")
+    img = decode_image(buf.getvalue())
+    assert img is not None and img.shape[:2] == (250, 500)
+    arr = pil_to_array(image)
+    assert arr.ndim == (2 if channels is None else 3)
+    if channels is not None:
+        assert arr.shape[2] == channels
+        np.testing.assert_array_equal(arr[:, :, :3], make_image(250, 500))
+
+
+def test_decode_for_det():
+    img = make_image(3000, 4000)
+    data = encode_jpeg(img)
+    assert reduce_factor(data, 960) == 4
+    assert reduce_factor(data, 2500) == 1
+    assert reduce_factor(cv2.imencode(".png", img)[1].tobytes(), 960) == 1
+
+    decoded = decode_for_det(memoryview(data), 960)
+    assert isinstance(decoded, DecodedImage)
+    assert decoded.img.shape == (750, 1000, 3)
+    assert decoded.shape == (3000, 4000, 3)
+    boxes = np.array([[[10, 20], [110, 20], [110, 60], [10, 60]]], dtype=np.float32)
+    np.testing.assert_allclose(decoded.to_full(boxes), boxes * 4)
+    np.testing.assert_allclose(decoded.to_reduced(boxes * 4)[0], boxes[0])
+
+    decoded.apply(cv2.bitwise_not)
+    np.testing.assert_array_equal(
+        decoded.full(), cv2.bitwise_not(cv2.imdecode(np.frombuffer(data, np.uint8), -1))
+    )
+    # small images keep the full resolution
+    assert isinstance(
+        decode_for_det(encode_jpeg(make_image(800, 900)), 960), np.ndarray
+    )
+
+
+def test_owned_mapping_is_closed(tmp_path):
+    img = make_image(3000, 4000)
+    path = str(tmp_path / "img.jpg")
+    with open(path, "wb") as f:
+        f.write(encode_jpeg(img))
+
+    mapped = read_image_file(path)
+    decoded = decode_for_det(mapped, 960, owns_data=True)
+    assert not mapped.closed
+    assert decoded.to_full(None) is None
+    decoded.full()
+    assert mapped.closed and decoded.data is None
+
+    mapped = read_image_file(path)
+    decoded = decode_for_det(mapped, 960, owns_data=True)
+    decoded.close()
+    assert mapped.closed
+
+    mapped = read_image_file(path)
+    assert isinstance(decode_for_det(mapped, 2500, owns_data=True), np.ndarray)
+    assert mapped.closed
+    # mappings of the caller are left open
+    mapped = read_image_file(path)
+    decode_for_det(mapped, 960).close()
+    assert not mapped.closed
+    mapped.close()
+
+
+class FakeRecognizer(object):
+    rec_image_shape = [3, 48, 320]
+
+
+def test_crop_decoded_uses_full_resolution_for_small_lines():
+    text_system = predict_system.TextSystem.__new__(predict_system.TextSystem)
+    text_system.text_recognizer = FakeRecognizer()
+    text_system.crop_engine = CropEngine()
+
+    img = make_image(3000, 4000)
+    decoded = decode_for_det(encode_jpeg(img), 960)
+    tall = np.array(
+        [[400, 400], [1600, 400], [1600, 800], [400, 800]], dtype=np.float32
+    )
+    small = np.array(
+        [[400, 1000], [1600, 1000], [1600, 1120], [400, 1120]], dtype=np.float32
+    )
+    crops = text_system.crop(decoded, [tall])
+    assert crops[0].shape[:2] == (100, 300)
+    # only lines lower than the rec input need the full image
+    assert decoded._full is None
+    crops = text_system.crop(decoded, [small, tall])
+    assert [crop.shape[:2] for crop in crops] == [(120, 1200), (100, 300)]
+    assert decoded._full is not None
@@ -0,0 +1,185 @@
+import json
+import os
+import sys
+import time
+import urllib.request
+
+import numpy as np
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+import tools.infer.utility as utility
+from ppocr.postprocess.rec_postprocess import CTCLabelDecode
+from ppocr.utils.instrumentation import Histogram, Metrics, get_metrics
+from tools.infer import predict_rec, predict_system
+from tools.infer.crop_engine import CropEngine
+
+
+def test_disabled_metrics_record_nothing():
+    metrics = Metrics()
+    assert not metrics.enabled
+    span = metrics.span("det")
+    assert span is metrics.span("rec")
+    with span:
+        metrics.count("crops", 3)
+        metrics.observe("rec.batch_fill", 0.5)
+    with metrics.span("rec.pre"):
+        pass
+    snapshot = metrics.snapshot()
+    assert snapshot["spans"] == {} and snapshot["counters"] == {}
+
+    st = time.perf_counter()
+    for _ in range(100000):
+        with metrics.span("det"):
+            pass
+    assert time.perf_counter() - st < 0.5
+
+
+def test_nested_spans_and_json_traces(tmp_path):
+    json_path = str(tmp_path / "traces.jsonl")
+    metrics = Metrics().configure(sample_rate=1, json_path=json_path)
+    for _ in range(2):
+        with metrics.span("ocr"):
+            with metrics.span("det"):
+                with metrics.span("det.infer"):
+                    pass
+            with metrics.span("rec"):
+                pass
+    metrics.count("crops", 5)
+    metrics.close()
+
+    snapshot = metrics.snapshot()
+    assert sorted(snapshot["spans"]) == ["det", "det.infer", "ocr", "rec"]
+    assert snapshot["spans"]["det.infer"]["count"] == 2
+    assert snapshot["counters"] == {"crops": 5}
+
+    with open(json_path, encoding="utf-8") as f:
+        traces = [json.loads(line) for line in f]
+    assert len(traces) == 2
+    spans = traces[0]["spans"]
+    assert [(span["name"], span["depth"]) for span in spans] == [
+        ("ocr", 0),
+        ("det", 1),
+        ("det.infer", 2),
+        ("rec", 1),
+    ]
+
+
+def test_children_follow_the_sampling_of_the_root():
+    metrics = Metrics().configure(sample_rate=0.3)
+    for _ in range(200):
+        with metrics.span("ocr"):
+            with metrics.span("det"):
+                pass
+        metrics.count("images")
+    snapshot = metrics.snapshot()
+    sampled = snapshot["spans"]["ocr"]["count"]
+    assert 0 < sampled < 200
+    assert snapshot["spans"]["det"]["count"] == sampled
+    # counters are not sampled
+    assert snapshot["counters"]["images"] == 200
+
+
+def test_histogram_quantiles():
+    histogram = Histogram((1, 2, 4))
+    for value in [0.5, 1.5, 1.5, 3, 10]:
+        histogram.observe(value)
+    assert histogram.counts == [1, 2, 1, 1]
+    assert 1 <= histogram.quantile(0.5) <= 2
+    assert histogram.quantile(1.0) == 4
+
+
+def test_prometheus_endpoint():
+    metrics = Metrics().configure(sample_rate=1)
+    with metrics.span("det.post"):
+        pass
+    metrics.count("det.boxes", 7)
+    metrics.observe("rec.batch_fill", 0.5)
+    server = metrics.serve(0, host="127.0.0.1")
+    try:
+        url = "http://127.0.0.1:{}/metrics".format(server.server_address[1])
+        text = urllib.request.urlopen(url, timeout=5).read().decode("utf-8")
+    finally:
+        metrics.close()
+    assert 'ppocr_span_seconds_bucket{span="det.post",le="+Inf"} 1' in text
+    assert 'ppocr_span_seconds_count{span="det.post"} 1' in text
+    assert "ppocr_det_boxes_total 7" in text
+    assert 'ppocr_rec_batch_fill_bucket{le="0.5"} 1' in text
+
+
+class FakeDetector(object):
+    def __call__(self, img):
+        boxes = [
+            [[0, 4 * i], [8, 4 * i], [8, 4 * i + 3], [0, 4 * i + 3]] for i in range(3)
+        ]
+        return np.array(boxes, dtype=np.float32), 0.0
+
+
+def spaced_chars(data):
+    """CTC "model" emitting class 5 at every other of its w // 8 time steps."""
+    b, _, _, w = data.shape
+    probs = np.full((b, w // 8, 37), 0.01, dtype=np.float32)
+    probs[:, ::2, 5] = 1.0
+    return probs
+
+
+@pytest.fixture
+def global_metrics():
+    metrics = get_metrics()
+    metrics.reset()
+    metrics.configure(sample_rate=1)
+    yield metrics
+    metrics.configure(sample_rate=0)
+    metrics.reset()
+
+
+def test_text_system_spans(fake_predictor, global_metrics):
+    fake_predictor(spaced_chars)
+    args = utility.init_args().parse_args(
+        ["--rec_batch_num", "2", "--metrics_sample_rate", "1"]
+    )
+    text_system = predict_system.TextSystem.__new__(predict_system.TextSystem)
+    text_system.args = args
+    text_system.text_detector = FakeDetector()
+    text_system.text_recognizer = predict_rec.TextRecognizer(args)
+    text_system.use_angle_cls = False
+    text_system.drop_score = 0.0
+    text_system.sort_boxes = list
+    text_system.crop_engine = CropEngine()
+    text_system.result_cache = None
+
+    dt_boxes, rec_res, _ = text_system(np.full((20, 16, 3), 128, dtype=np.uint8))
+    assert len(rec_res) == 3
+
+    snapshot = global_metrics.snapshot()
+    for name in [
+        "ocr",
+        "det",
+        "sort",
+        "crop",
+        "rec",
+        "rec.pre",
+        "rec.infer",
+        "rec.post",
+        "rec.post.ctc",
+        "rec.post.topk",
+    ]:
+        assert snapshot["spans"][name]["count"] >= 1, name
+    assert snapshot["counters"] == {"crops": 3, "det.boxes": 3}
+    # 3 crops in batches of 2
+    assert snapshot["histograms"]["rec.batch_fill"]["count"] == 2
+
+
+@pytest.mark.parametrize("method", ["decode_fast", "topk_arrays"])
+def test_failed_stage_closes_its_span(monkeypatch, global_metrics, method):
+    post_process = CTCLabelDecode()
+
+    def fail(preds_idx):
+        raise ValueError("bad preds")
+
+    monkeypatch.setattr(post_process, "ctc_selection", fail)
+    with pytest.raises(ValueError):
+        getattr(post_process, method)(np.zeros((1, 4, 37), dtype=np.float32))
+    assert getattr(global_metrics._local, "span", None) is None
@@ -0,0 +1,153 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+from ppocr.postprocess.east_postprocess import EASTPostProcess
+from ppocr.postprocess.locality_aware_nms import (
+    intersection,
+    nms_locality,
+    nms_locality_fast,
+    overlap_pairs,
+    quad_iou,
+    standard_nms,
+    standard_nms_fast,
+)
+
+
+def east_maps(seed, size=256, num_texts=12, noise=2.0):
+    """
+    EAST-like score and geo maps of random rotated text boxes, the geometry
+    of every pixel pointing to the corners of its box with some noise.
+    """
+    rng = np.random.RandomState(seed)
+    score = np.zeros((size // 4, size // 4), dtype=np.float32)
+    geo = np.zeros((size // 4, size // 4, 8), dtype=np.float32)
+    quads = []
+    for _ in range(num_texts):
+        center = tuple(rng.uniform(20, size - 20, 2))
+        rect = (
+            center,
+            (rng.uniform(30, 120), rng.uniform(10, 30)),
+            rng.uniform(-30, 30),
+        )
+        quad = cv2.boxPoints(rect)
+        mask = np.zeros_like(score, dtype=np.uint8)
+        cv2.fillPoly(mask, [np.int32(quad / 4)], 1)
+        ys, xs = np.nonzero(mask)
+        score[ys, xs] = rng.uniform(0.85, 1.0, len(ys))
+        origin = np.tile(np.stack([xs, ys], axis=1) * 4.0, 4)
+        geo[ys, xs] = origin - quad.reshape(1, 8) + rng.normal(0, noise, (len(ys), 8))
+        quads.append(quad)
+    return score, geo, quads
+
+
+def east_boxes(seed, noise=2.0):
+    """The boxes of EASTPostProcess.detect before the nms."""
+    score, geo, _ = east_maps(seed, noise=noise)
+    xy_text = np.argwhere(score > 0.8)
+    xy_text = xy_text[np.argsort(xy_text[:, 0])]
+    boxes = np.zeros((len(xy_text), 9), dtype=np.float32)
+    boxes[:, :8] = np.tile(xy_text[:, ::-1] * 4, 4) - geo[xy_text[:, 0], xy_text[:, 1]]
+    boxes[:, 8] = score[xy_text[:, 0], xy_text[:, 1]]
+    return boxes
+
+
+def test_quad_iou_matches_shapely():
+    rng = np.random.RandomState(0)
+    # any quads: convex, concave and self-intersecting ones
+    g = rng.uniform(0, 10, (2000, 8))
+    p = rng.uniform(0, 10, (2000, 8))
+    # and rotated rectangles, some of them equal or sharing corners
+    rects = [
+        cv2.boxPoints(
+            (
+                tuple(rng.uniform(0, 20, 2)),
+                tuple(rng.uniform(1, 15, 2)),
+                rng.uniform(90),
+            )
+        ).reshape(8)
+        for _ in range(1000)
+    ]
+    g = np.concatenate([g, rects[:500], rects[:100]])
+    p = np.concatenate([p, rects[500:], np.roll(rects[:100], 2, axis=1)])
+    expected = np.array([intersection(a, b) for a, b in zip(g, p)])
+    ious = quad_iou(g, p)
+    np.testing.assert_allclose(ious, expected, atol=1e-9)
+    np.testing.assert_allclose(ious[-100:], 1.0)
+    np.testing.assert_allclose(quad_iou(p, g), ious, atol=1e-9)
+
+
+def test_overlap_pairs_match_brute_force():
+    rng = np.random.RandomState(1)
+    quads = rng.uniform(0, 100, (300, 4, 2)) * [1, 0.2] + rng.uniform(
+        0, 400, (300, 1, 2)
+    )
+    lo, hi = quads.min(axis=1), quads.max(axis=1)
+    expected = {
+        (i, j)
+        for i in range(len(quads))
+        for j in range(i + 1, len(quads))
+        if np.all(lo[i] <= hi[j]) and np.all(lo[j] <= hi[i])
+    }
+    i, j = overlap_pairs(quads.reshape(-1, 8))
+    assert set(zip(i.tolist(), j.tolist())) == expected
+    assert len(i) == len(expected)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_standard_nms_matches_reference(seed):
+    rng = np.random.RandomState(seed)
+    boxes = east_boxes(seed)
+    boxes = boxes[rng.choice(len(boxes), 300, replace=False)]
+    boxes[:, 8] = rng.permutation(300) / 300.0
+    expected = standard_nms(boxes.astype(np.float64), 0.2)
+    np.testing.assert_array_equal(
+        standard_nms_fast(boxes.astype(np.float64), 0.2), expected
+    )
+
+
+@pytest.mark.parametrize("noise", [0.5, 2.0, 6.0])
+@pytest.mark.parametrize("seed", range(2))
+def test_nms_locality_matches_reference(seed, noise):
+    boxes = east_boxes(seed, noise=noise)
+    for dtype in [np.float64, np.float32]:
+        expected = nms_locality(boxes.astype(dtype), 0.2)
+        out = nms_locality_fast(boxes.astype(dtype), 0.2)
+        assert out.dtype == dtype and out.shape == expected.shape
+        np.testing.assert_allclose(out, expected, rtol=1e-5, atol=1e-3)
+
+
+def test_window_sizes_give_the_same_runs():
+    boxes = east_boxes(5, noise=6.0).astype(np.float64)
+    expected = nms_locality_fast(boxes, 0.2)
+    for window in [7, 64, 4096]:
+        np.testing.assert_array_equal(nms_locality_fast(boxes, 0.2, window), expected)
+
+
+def test_empty_and_single():
+    assert nms_locality_fast(np.zeros((0, 9)), 0.2).shape == (0, 9)
+    box = np.array([[0, 0, 10, 0, 10, 5, 0, 5, 0.9]])
+    np.testing.assert_array_equal(nms_locality_fast(box, 0.2), box)
+
+
+def test_east_postprocess_finds_the_texts():
+    score, geo, quads = east_maps(3, num_texts=4, noise=1.0)
+    outs = {
+        "f_score": score[None, None],
+        "f_geo": np.transpose(geo, (2, 0, 1))[None],
+    }
+    post_process = EASTPostProcess(score_thresh=0.8, cover_thresh=0.1, nms_thresh=0.2)
+    points = post_process(outs, [[256, 256, 1.0, 1.0]])[0]["points"]
+    assert len(points) >= 1
+    for box in points:
+        iou = quad_iou(
+            np.repeat(box.reshape(1, 8), len(quads), axis=0),
+            np.array(quads).reshape(-1, 8),
+        )
+        assert iou.max() > 0.5
@@ -0,0 +1,72 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+from tools.infer.utility import merge_fragmented
+
+
+def make_box(x0, y0, x1, y1):
+    return [[x0, y0], [x1, y0], [x1, y1], [x0, y1]]
+
+
+def fragmented_lines(num_lines=50, seam=300, seed=0):
+    """Horizontal lines cut at every `seam` pixels, and their unbroken extents."""
+    rng = np.random.RandomState(seed)
+    boxes, lines = [], []
+    for line in range(num_lines):
+        y = line * 40.0
+        x0, x1 = rng.uniform(0, 200), rng.uniform(500, 2000)
+        cuts = [x0] + [c for c in range(seam, 3000, seam) if x0 < c < x1] + [x1]
+        for a, b in zip(cuts[:-1], cuts[1:]):
+            dy = rng.uniform(-1, 1)
+            boxes.append(make_box(a, y + dy, b, y + 28 + dy))
+        lines.append((x0, x1))
+    return np.array(boxes, dtype=np.float32), lines
+
+
+def test_merge_horizontal_fragments():
+    boxes, lines = fragmented_lines()
+    # shuffle so the merge can not rely on the slice order
+    boxes = boxes[np.random.RandomState(1).permutation(len(boxes))]
+    merged = merge_fragmented(boxes, x_threshold=5, y_threshold=5)
+    assert merged.shape == (len(lines), 4, 2)
+    extents = sorted((box[0][0], box[1][0]) for box in merged.tolist())
+    np.testing.assert_allclose(extents, sorted(lines), atol=1e-3)
+
+
+def test_merge_keeps_separate_boxes():
+    boxes = [
+        make_box(0, 0, 100, 30),
+        make_box(130, 0, 200, 30),  # gap larger than x_threshold
+        make_box(100, 50, 200, 80),  # next line
+        make_box(0, 100, 100, 130),
+        make_box(102, 100, 150, 160),  # bottom edge too far
+    ]
+    merged = merge_fragmented(boxes, x_threshold=10, y_threshold=10)
+    np.testing.assert_array_equal(merged, np.array(boxes, dtype=np.float32))
+
+
+@pytest.mark.parametrize("direction", ["vertical", "both"])
+def test_merge_vertical_fragments(direction):
+    # a vertical column cut by two horizontal slice borders, and its neighbour
+    boxes = [
+        make_box(500, 0, 540, 300),
+        make_box(501, 300, 540, 600),
+        make_box(500, 600, 539, 750),
+        make_box(440, 10, 480, 290),
+    ]
+    merged = merge_fragmented(boxes, x_threshold=5, y_threshold=5, direction=direction)
+    np.testing.assert_array_equal(
+        merged,
+        np.array([make_box(500, 0, 540, 750), make_box(440, 10, 480, 290)]),
+    )
+    assert len(merge_fragmented(boxes, x_threshold=5, y_threshold=5)) == 4
+
+
+def test_merge_empty():
+    assert merge_fragmented(np.zeros((0, 4, 2))).shape == (0, 4, 2)
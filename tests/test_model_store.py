@@ -0,0 +1,187 @@
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import sys
+import tarfile
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+from ppocr.utils import model_store
+from ppocr.utils.model_store import MANIFEST_NAME, ModelStore
+
+MEMBERS = {
+    "en_PP-OCRv4_rec_infer/inference.pdmodel": b"program" * 1000,
+    "en_PP-OCRv4_rec_infer/inference.pdiparams": os.urandom(300000),
+    "en_PP-OCRv4_rec_infer/inference.pdiparams.info": b"info",
+    "en_PP-OCRv4_rec_infer/README.md": b"not extracted",
+}
+ARCHIVE = "en_PP-OCRv4_rec_infer.tar"
+
+
+def write_archive(path):
+    with tarfile.open(path, "w") as tar:
+        for name, data in MEMBERS.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class ModelServer(object):
+    """Serves a directory over http and counts the requests per path."""
+
+    def __init__(self, directory):
+        hits = self.hits = {}
+
+        class Handler(SimpleHTTPRequestHandler):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, directory=directory, **kwargs)
+
+            def do_GET(self):
+                hits[self.path] = hits.get(self.path, 0) + 1
+                super().do_GET()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = "http://127.0.0.1:{}".format(self.server.server_address[1])
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def server(tmp_path):
+    served = tmp_path / "served"
+    served.mkdir()
+    server = ModelServer(str(served))
+    server.sha256 = write_archive(str(served / ARCHIVE))
+    yield server
+    server.close()
+
+
+def assert_extracted(model_dir):
+    names = sorted(os.listdir(model_dir))
+    assert names == [
+        MANIFEST_NAME,
+        "inference.pdiparams",
+        "inference.pdiparams.info",
+        "inference.pdmodel",
+    ]
+    with open(os.path.join(model_dir, "inference.pdiparams"), "rb") as f:
+        assert f.read() == MEMBERS["en_PP-OCRv4_rec_infer/inference.pdiparams"]
+
+
+def test_fetch_extracts_and_records_the_digests(tmp_path, server):
+    model_dir = str(tmp_path / "models" / "rec")
+    url = "{}/{}".format(server.url, ARCHIVE)
+    store = ModelStore(chunk_size=4096)
+    store.fetch(model_dir, url, sha256=server.sha256)
+    assert_extracted(model_dir)
+    with open(os.path.join(model_dir, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+    assert manifest["archive_sha256"] == server.sha256
+    assert store.verify(model_dir) == []
+
+    store.fetch(model_dir, url)
+    assert server.hits == {"/" + ARCHIVE: 1}
+
+    # a truncated file is not complete, a modified one fails verify
+    with open(os.path.join(model_dir, "inference.pdmodel"), "wb") as f:
+        f.write(b"x")
+    assert not store.is_complete(model_dir)
+    assert store.verify(model_dir) == ["inference.pdmodel"]
+    store.fetch(model_dir, url)
+    assert server.hits == {"/" + ARCHIVE: 2}
+    assert store.verify(model_dir) == []
+
+
+def test_checksum_mismatch(tmp_path, server):
+    model_dir = str(tmp_path / "rec")
+    url = "{}/{}".format(server.url, ARCHIVE)
+    store = ModelStore(checksums={ARCHIVE: "0" * 64})
+    with pytest.raises(RuntimeError, match="sha256"):
+        store.fetch(model_dir, url)
+    assert os.listdir(model_dir) == []
+    assert not store.is_complete(model_dir)
+
+
+def fetch_worker(model_dir, url):
+    ModelStore().fetch(model_dir, url)
+
+
+def test_concurrent_workers_download_once(tmp_path, server):
+    model_dir = str(tmp_path / "rec")
+    url = "{}/{}".format(server.url, ARCHIVE)
+    ctx = multiprocessing.get_context("fork")
+    workers = [
+        ctx.Process(target=fetch_worker, args=(model_dir, url)) for _ in range(6)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(60)
+        assert worker.exitcode == 0
+    assert server.hits == {"/" + ARCHIVE: 1}
+    assert_extracted(model_dir)
+
+
+def test_parallel_fetch_and_download(tmp_path, server):
+    store = ModelStore()
+    url = "{}/{}".format(server.url, ARCHIVE)
+    items = [(str(tmp_path / name), url) for name in ["det", "rec", "cls"]]
+    store.fetch_all(items)
+    for model_dir, _ in items:
+        assert_extracted(model_dir)
+    assert server.hits == {"/" + ARCHIVE: 3}
+
+    save_path = str(tmp_path / "params" / ARCHIVE)
+    assert store.download(url, save_path) == server.sha256
+    assert store.download(url, save_path) is None
+    assert server.hits == {"/" + ARCHIVE: 4}
+
+
+def test_mirror_and_offline_dir(tmp_path, server):
+    url = "https://paddleocr.bj.bcebos.com/PP-OCRv4/english/" + ARCHIVE
+    store = ModelStore.from_env({"PADDLE_OCR_MODEL_MIRROR": server.url + "/"})
+    store.fetch(str(tmp_path / "mirror"), url)
+    assert_extracted(str(tmp_path / "mirror"))
+    assert server.hits == {"/" + ARCHIVE: 1}
+
+    # archives and extracted models of the offline directory, no network
+    offline = tmp_path / "offline"
+    offline.mkdir()
+    write_archive(str(offline / ARCHIVE))
+    store = ModelStore(offline_dir=str(offline))
+    store.fetch(str(tmp_path / "from_tar"), url)
+    assert_extracted(str(tmp_path / "from_tar"))
+    os.remove(str(offline / ARCHIVE))
+    os.rename(str(tmp_path / "from_tar"), str(offline / "en_PP-OCRv4_rec_infer"))
+    store.fetch(str(tmp_path / "from_dir"), url)
+    assert_extracted(str(tmp_path / "from_dir"))
+    assert server.hits == {"/" + ARCHIVE: 1}
+
+    with pytest.raises(RuntimeError, match="offline"):
+        store.fetch(str(tmp_path / "det"), url.replace("rec", "det"))
+
+
+def test_network_helpers_use_the_store(tmp_path, server, monkeypatch):
+    from ppocr.utils import network
+
+    monkeypatch.setattr(model_store, "_model_store", ModelStore())
+    model_dir = str(tmp_path / "rec")
+    network.maybe_download(model_dir, "{}/{}".format(server.url, ARCHIVE))
+    assert_extracted(model_dir)
+    network.maybe_download(model_dir, "{}/{}".format(server.url, ARCHIVE))
+    assert server.hits == {"/" + ARCHIVE: 1}
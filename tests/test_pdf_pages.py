@@ -0,0 +1,212 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+from ppocr.utils.utility import PDFPages, check_and_read
+from tools.infer.pipeline import TextSystemPipeline, load_image_pages
+
+fitz = pytest.importorskip("fitz")
+
+PAGE_SIZES = [(595, 842), (1200, 900), (300, 200), (842, 595)]
+
+
+@pytest.fixture
+def pdf_path(tmp_path):
+    path = str(tmp_path / "doc.pdf")
+    doc = fitz.open()
+    for idx, (w, h) in enumerate(PAGE_SIZES):
+        page = doc.new_page(width=w, height=h)
+        page.insert_text((20, 40), "page {}".format(idx), fontsize=24)
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def legacy_pages(pdf_path):
+    """Eager 2x rendering of every page, re-rendered at 1x when too large."""
+    from PIL import Image
+
+    imgs = []
+    with fitz.open(pdf_path) as pdf:
+        for pg in range(pdf.page_count):
+            page = pdf[pg]
+            pm = page.get_pixmap(matrix=fitz.Matrix(2, 2), alpha=False)
+            if pm.width > 2000 or pm.height > 2000:
+                pm = page.get_pixmap(matrix=fitz.Matrix(1, 1), alpha=False)
+            img = Image.frombytes("RGB", [pm.width, pm.height], pm.samples)
+            imgs.append(cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR))
+    return imgs
+
+
+class CountingPages(PDFPages):
+    rendered = []
+
+    def _render(self, pg):
+        CountingPages.rendered.append(pg)
+        return super()._render(pg)
+
+
+def test_matches_legacy_rendering(pdf_path):
+    expected = legacy_pages(pdf_path)
+    imgs, flag_gif, flag_pdf = check_and_read(pdf_path)
+    assert isinstance(imgs, list) and flag_pdf and not flag_gif
+    assert len(imgs) == len(expected)
+    for img, ref in zip(imgs, expected):
+        np.testing.assert_array_equal(img, ref)
+
+
+@pytest.mark.parametrize("prefetch", [0, 2])
+def test_lazy_pages_honor_page_num(pdf_path, prefetch):
+    CountingPages.rendered = []
+    pages = CountingPages(pdf_path, page_num=2, prefetch=prefetch)
+    assert len(pages) == 2
+    assert CountingPages.rendered == []
+    imgs = list(pages)
+    assert CountingPages.rendered == [0, 1]
+    for img, ref in zip(imgs, legacy_pages(pdf_path)):
+        np.testing.assert_array_equal(img, ref)
+
+    # slices stay lazy
+    tail = CountingPages(pdf_path)[1:]
+    assert len(tail) == 3
+    assert CountingPages.rendered == [0, 1]
+    assert tail[-1].shape[:2] == (595 * 2, 842 * 2)
+
+
+def test_prefetch_stops_on_early_exit(pdf_path):
+    pages = PDFPages(pdf_path, prefetch=1)
+    for idx, img in enumerate(pages):
+        if idx == 1:
+            break
+    # the document is still usable after the prefetch thread stopped
+    assert len(list(pages)) == len(PAGE_SIZES)
+    pages.close()
+
+
+@pytest.mark.parametrize("limit_type", ["max", "min"])
+def test_target_side(pdf_path, limit_type):
+    pages, _, is_pdf = check_and_read(
+        pdf_path, lazy=True, target_side=960, limit_type=limit_type
+    )
+    assert is_pdf
+    side = max if limit_type == "max" else min
+    for img in pages:
+        assert abs(side(img.shape[:2]) - 960) <= 1
+
+
+def test_load_image_pages(pdf_path):
+    pages = load_image_pages(pdf_path, page_num=3, prefetch=2)
+    assert isinstance(pages, PDFPages)
+    assert [img.shape[:2] for img in pages] == [(1684, 1190), (900, 1200), (400, 600)]
+
+
+def test_close(pdf_path):
+    with PDFPages(pdf_path) as pages:
+        view = pages[1:]
+        assert len(list(view)) == len(PAGE_SIZES) - 1
+    assert pages.closed and view.closed
+    # closing twice is fine
+    pages.close()
+
+
+class FakeArgs(object):
+    page_num = 0
+
+
+class FakeTextSystem(object):
+    args = FakeArgs()
+    use_angle_cls = False
+
+    def detect(self, img, slice={}):
+        return None, 0.0
+
+
+def test_pipeline_closes_pages(pdf_path):
+    opened = []
+
+    def loader(path):
+        opened.append(PDFPages(path))
+        return opened[-1]
+
+    pipeline = TextSystemPipeline(FakeTextSystem(), loader=loader)
+    items = list(pipeline.run([pdf_path, pdf_path]))
+    assert len(items) == 2 * len(PAGE_SIZES)
+    assert len(opened) == 2 and all(pages.closed for pages in opened)
+
+
+def test_ocr_closes_pages(pdf_path, monkeypatch):
+    import paddleocr
+
+    opened = []
+    check_img = paddleocr.check_img
+
+    def tracking_check_img(*args, **kwargs):
+        res = check_img(*args, **kwargs)
+        opened.append(res[0])
+        return res
+
+    monkeypatch.setattr(paddleocr, "check_img", tracking_check_img)
+    ocr = paddleocr.PaddleOCR.__new__(paddleocr.PaddleOCR)
+    ocr.args = paddleocr.parse_args(mMain=False, argv=[])
+    ocr.page_num = 0
+    ocr.batch_call = lambda chunk, cls, slice: ([(None, None)] * len(chunk), {})
+
+    res = ocr._ocr(pdf_path, True, True, False, False, False, (255, 255, 255), slice={})
+    assert res == [None] * len(PAGE_SIZES)
+
+    def failing_batch_call(chunk, cls, slice):
+        raise RuntimeError("det failed")
+
+    ocr.batch_call = failing_batch_call
+    with pytest.raises(RuntimeError):
+        ocr._ocr(pdf_path, True, True, False, False, False, (255, 255, 255), {})
+    assert len(opened) == 2
+    assert all(isinstance(pages, PDFPages) and pages.closed for pages in opened)
+
+
+class FakeDetector(object):
+    def __call__(self, img):
+        return np.array([[[10, 10], [90, 10], [90, 30], [10, 30]]], "float32"), 0.0
+
+
+class FakeRecognizer(object):
+    rec_image_shape = [3, 48, 320]
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, img_list):
+        self.batches.append(len(img_list))
+        return [["text", 0.9, []] for _ in img_list], 0.0
+
+
+def test_ocr_pools_rec_across_pages(pdf_path):
+    import paddleocr
+    from tools.infer.crop_engine import CropEngine
+
+    ocr = paddleocr.PaddleOCR.__new__(paddleocr.PaddleOCR)
+    ocr.args = paddleocr.parse_args(mMain=False, argv=[])
+    ocr.page_num = 0
+    ocr.result_cache = None
+    ocr.text_detector = FakeDetector()
+    ocr.text_recognizer = FakeRecognizer()
+    ocr.use_angle_cls = False
+    ocr.drop_score = 0.5
+    ocr.sort_boxes = list
+    ocr.crop_engine = CropEngine()
+
+    res = ocr._ocr(pdf_path, True, True, False, False, False, (255, 255, 255), {})
+    assert [len(page) for page in res] == [1] * len(PAGE_SIZES)
+    # the lines of the default chunk of pages are recognized together
+    assert ocr.text_recognizer.batches == [len(PAGE_SIZES)]
+
+    ocr.text_recognizer = FakeRecognizer()
+    ocr.args.pdf_page_chunk = 1
+    ocr._ocr(pdf_path, True, True, False, False, False, (255, 255, 255), {})
+    assert ocr.text_recognizer.batches == [1] * len(PAGE_SIZES)
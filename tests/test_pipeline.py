@@ -0,0 +1,87 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+from tools.infer.pipeline import TextSystemPipeline
+
+
+class FakeArgs(object):
+    page_num = 0
+
+
+class FakeTextSystem(object):
+    """Model-free stand-in for TextSystem, one box per image with its mean value as text."""
+
+    def __init__(self, fail_on=None):
+        self.args = FakeArgs()
+        self.use_angle_cls = False
+        self.fail_on = fail_on
+
+    def detect(self, img, slice={}):
+        # uneven latency so that stages really overlap
+        time.sleep(0.001 * (int(img.mean()) % 3))
+        h, w = img.shape[:2]
+        return np.array([[[0, 0], [w, 0], [w, h], [0, h]]], dtype=np.float32), 0.0
+
+    def sort_boxes(self, dt_boxes):
+        return list(dt_boxes)
+
+    def crop(self, img, dt_boxes):
+        return [img for _ in dt_boxes]
+
+    def text_recognizer(self, img_list):
+        if self.fail_on is not None and int(img_list[0].mean()) == self.fail_on:
+            raise RuntimeError("rec failed")
+        return [[str(int(img.mean())), 1.0, []] for img in img_list], 0.0
+
+    def filter_rec_res(self, dt_boxes, rec_res):
+        return dt_boxes, rec_res
+
+
+def make_inputs(num):
+    return [np.full((8, 16, 3), i, dtype=np.uint8) for i in range(num)]
+
+
+@pytest.mark.parametrize("queue_size", [1, 4])
+def test_pipeline_keeps_input_order(queue_size):
+    pipeline = TextSystemPipeline(
+        FakeTextSystem(),
+        queue_size=queue_size,
+        serializer=lambda item: item["rec_res"][0][0],
+    )
+    items = list(pipeline.run(make_inputs(20)))
+    assert [item["input_idx"] for item in items] == list(range(20))
+    assert [item["output"] for item in items] == [str(i) for i in range(20)]
+    stats = pipeline.stats()
+    assert set(stats) == {"decode", "det", "crop", "rec", "serialize"}
+    assert all(stats[name]["items"] == 20 for name in stats)
+    assert all(stats[name]["max_queue_depth"] <= queue_size + 1 for name in stats)
+
+
+def test_pipeline_multi_page_loader():
+    pipeline = TextSystemPipeline(
+        FakeTextSystem(), loader=lambda n: make_inputs(n) if n else []
+    )
+    items = list(pipeline.run([2, 0, 3]))
+    assert [(item["input_idx"], item["page_idx"]) for item in items] == [
+        (0, 0),
+        (0, 1),
+        (2, 0),
+        (2, 1),
+        (2, 2),
+    ]
+
+
+def test_pipeline_propagates_stage_error():
+    pipeline = TextSystemPipeline(FakeTextSystem(fail_on=5), queue_size=2)
+    results = []
+    with pytest.raises(RuntimeError, match="rec failed"):
+        for item in pipeline.run(make_inputs(20)):
+            results.append(item["input_idx"])
+    assert results == list(range(5))
@@ -0,0 +1,90 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+from ppocr.utils.poly_nms import (
+    box_overlap_pairs,
+    boundary_iou,
+    poly_nms,
+    poly_nms_fast,
+)
+
+
+def curved_candidates(seed, num_texts=8, per_text=20, num_points=30):
+    """
+    FCE-like candidates: for every curved text, jittered copies of its
+    boundary with int coordinates, as fourier2poly gives them.
+    """
+    rng = np.random.RandomState(seed)
+    polygons = []
+    for _ in range(num_texts):
+        center = rng.uniform(100, 900, 2)
+        radius = rng.uniform(80, 300)
+        start = rng.uniform(0, np.pi)
+        span = rng.uniform(0.3, 1.2)
+        height = rng.uniform(15, 50)
+        angles = np.linspace(start, start + span, num_points // 2)
+        outer = np.stack([np.cos(angles), np.sin(angles)], axis=1) * radius
+        inner = np.stack([np.cos(angles), np.sin(angles)], axis=1) * (radius - height)
+        boundary = np.concatenate([outer, inner[::-1]]) + center
+        for _ in range(per_text):
+            jitter = rng.normal(0, height / 6, (1, 2)) + rng.normal(
+                0, 1.5, boundary.shape
+            )
+            points = (boundary + jitter).astype("int32").reshape(-1)
+            polygons.append(points.tolist() + [float(rng.uniform(0.3, 1.0))])
+    rng.shuffle(polygons)
+    return polygons
+
+
+@pytest.mark.parametrize("threshold", [0.1, 0.3, 0.5])
+@pytest.mark.parametrize("seed", range(3))
+def test_parity_with_poly_nms(seed, threshold):
+    polygons = curved_candidates(seed)
+    expected = poly_nms([list(p) for p in polygons], threshold)
+    assert poly_nms_fast(polygons, threshold) == expected
+
+
+def test_equal_scores_keep_the_order_of_poly_nms():
+    polygons = curved_candidates(3, num_texts=3, per_text=10)
+    for polygon in polygons:
+        polygon[-1] = 0.5
+    expected = poly_nms([list(p) for p in polygons], 0.1)
+    assert poly_nms_fast(polygons, 0.1) == expected
+
+
+def test_empty_and_disjoint():
+    assert poly_nms_fast([], 0.1) == []
+    square = [0, 0, 10, 0, 10, 10, 0, 10]
+    polygons = [square + [0.5], [v + 20 for v in square] + [0.9]]
+    assert poly_nms_fast(polygons, 0.1) == [polygons[1], polygons[0]]
+
+
+def test_mask_mode_is_close_to_poly():
+    polygons = curved_candidates(4)
+    exact = poly_nms_fast(polygons, 0.3)
+    masked = poly_nms_fast(polygons, 0.3, iou_mode="mask", mask_scale=0.5)
+    # the texts are found, with nearly the same candidates
+    assert abs(len(masked) - len(exact)) <= max(2, len(exact) // 5)
+    for kept in exact[: len(exact) // 2]:
+        assert any(boundary_iou(kept[:-1], other[:-1]) > 0.9 for other in masked)
+
+
+def test_box_overlap_pairs_match_brute_force():
+    rng = np.random.RandomState(5)
+    lo = rng.uniform(0, 500, (400, 2))
+    boxes = np.concatenate([lo, lo + rng.uniform(1, 60, (400, 2))], axis=1)
+    expected = {
+        (i, j)
+        for i in range(len(boxes))
+        for j in range(i + 1, len(boxes))
+        if np.all(boxes[i, :2] <= boxes[j, 2:]) and np.all(boxes[j, :2] <= boxes[i, 2:])
+    }
+    i, j = box_overlap_pairs(boxes)
+    assert len(i) == len(expected)
+    assert set(zip(i.tolist(), j.tolist())) == expected
@@ -0,0 +1,65 @@
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+import tools.infer.utility as utility
+from tools.infer import predict_rec
+from tools.infer.predictor_pool import PredictorPool, predictor_pool_size
+
+
+def make_recognizer(fake_predictor, pool_size):
+    predictor = fake_predictor("ctc", delay=0.002)
+    args = utility.init_args().parse_args(
+        ["--predictor_pool_size", str(pool_size), "--rec_batch_num", "2"]
+    )
+    return predict_rec.TextRecognizer(args), [predictor] + predictor.clones
+
+
+def test_pool_size():
+    args = utility.init_args().parse_args(["--predictor_pool_size", "3"])
+    assert predictor_pool_size(args) == 3
+    args = utility.init_args().parse_args(
+        ["--predictor_pool_size", "0", "--cpu_threads", "1"]
+    )
+    assert predictor_pool_size(args) == (os.cpu_count() or 1)
+
+
+def test_checkout_hands_out_each_clone_once(fake_predictor):
+    args = utility.init_args().parse_args([])
+    predictor = fake_predictor("ctc")
+    pool = PredictorPool(
+        args, "rec", predictor, predictor.input_tensor, [predictor.output_tensor], 3
+    )
+    assert len(predictor.clones) == 2
+    with pool.checkout() as first, pool.checkout() as second:
+        with pool.checkout() as third:
+            handles = [first, second, third]
+    assert len(set(id(handle.predictor) for handle in handles)) == 3
+    # each clone has its own tensor handles
+    assert len(set(id(handle.input_tensor) for handle in handles)) == 3
+    assert pool._free.qsize() == 3
+
+
+def test_concurrent_recognition(fake_predictor):
+    rng = np.random.RandomState(0)
+    crop_lists = [
+        [(rng.rand(48, rng.randint(30, 300), 3) * 255).astype(np.uint8)] * 4
+        for _ in range(8)
+    ]
+    recognizer, _ = make_recognizer(fake_predictor, 1)
+    expected = [recognizer(crops)[0] for crops in crop_lists]
+
+    recognizer, predictors = make_recognizer(fake_predictor, 4)
+    assert len(predictors) == 4
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda crops: recognizer(crops)[0], crop_lists))
+    assert [[res["text"] for res in rec_res] for rec_res in results] == [
+        [res["text"] for res in rec_res] for rec_res in expected
+    ]
+    assert sum(len(predictor.shapes) for predictor in predictors) == 16
+    assert sum(len(predictor.shapes) > 0 for predictor in predictors) > 1
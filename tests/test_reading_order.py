@@ -0,0 +1,116 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+from tools.infer.predict_system import sorted_boxes
+from tools.infer.reading_order import (
+    cluster_intervals,
+    get_reading_order,
+    reading_order_indices,
+)
+
+
+def make_box(x, y, w, h):
+    return np.array([[x, y], [x + w, y], [x + w, y + h], [x, y + h]], dtype=np.float32)
+
+
+def make_vertical_page(num_cols=6, num_rows=10, drift=0.0, seed=0):
+    """Columns of vertical text lines; boxes listed in right-to-left reading order."""
+    rng = np.random.RandomState(seed)
+    boxes = []
+    for col in range(num_cols):
+        x = 1000 - col * 60
+        for row in range(num_rows):
+            dx = row * drift + rng.uniform(-4, 4)
+            boxes.append(make_box(x + dx, 20 + row * 90, 36, 80 + rng.uniform(-5, 5)))
+    return np.array(boxes)
+
+
+def shuffled(boxes, seed=1):
+    perm = np.random.RandomState(seed).permutation(len(boxes))
+    return boxes[perm], np.argsort(perm)
+
+
+@pytest.mark.parametrize("drift", [0.0, 2.5])
+def test_vertical_rtl_order(drift):
+    boxes = make_vertical_page(drift=drift)
+    shuffled_boxes, expected = shuffled(boxes)
+    indices = reading_order_indices(shuffled_boxes, vertical=True, reverse=True)
+    np.testing.assert_array_equal(indices, expected)
+    ordered = get_reading_order("vertical_rtl")(shuffled_boxes)
+    np.testing.assert_array_equal(np.array(ordered), boxes)
+
+
+def test_vertical_ltr_order():
+    boxes = make_vertical_page(drift=1.0)
+    ordered = get_reading_order("vertical_ltr")(shuffled(boxes)[0])
+    expected = [
+        boxes[col * 10 + row] for col in reversed(range(6)) for row in range(10)
+    ]
+    np.testing.assert_array_equal(np.array(ordered), np.array(expected))
+
+
+def test_horizontal_ltr_order():
+    rng = np.random.RandomState(0)
+    boxes = np.array(
+        [
+            make_box(20 + col * 150 + rng.uniform(-3, 3), 30 + line * 40, 120, 28)
+            for line in range(12)
+            for col in range(4)
+        ]
+    )
+    ordered = get_reading_order("horizontal_ltr")(shuffled(boxes)[0])
+    np.testing.assert_array_equal(np.array(ordered), boxes)
+
+
+def test_matches_legacy_on_clean_columns():
+    boxes = np.array(
+        [
+            make_box(1000 - col * 60, 20 + row * 90, 36, 80)
+            for col in range(5)
+            for row in range(8)
+        ]
+    )
+    shuffled_boxes = shuffled(boxes)[0]
+    np.testing.assert_array_equal(
+        np.array(get_reading_order("vertical_rtl")(shuffled_boxes)),
+        np.array(sorted_boxes(shuffled_boxes)),
+    )
+
+
+def test_cluster_intervals():
+    lo = np.array([0.0, 50.0, 2.0, 53.0, 100.0])
+    hi = np.array([40.0, 90.0, 42.0, 95.0, 110.0])
+    np.testing.assert_array_equal(cluster_intervals(lo, hi), [0, 1, 0, 1, 2])
+
+
+def test_cluster_intervals_ignore_wide_intervals():
+    # a wide interval does not pull the following ones into its group
+    lo = np.array([0.0, 0.0, 200.0, 400.0])
+    hi = np.array([600.0, 40.0, 240.0, 440.0])
+    np.testing.assert_array_equal(cluster_intervals(lo, hi), [0, 0, 1, 2])
+
+
+@pytest.mark.parametrize("name", ["vertical_rtl", "vertical_ltr"])
+def test_full_width_header_and_footer(name):
+    columns = make_vertical_page(num_cols=3, num_rows=5)
+    header = make_box(900, -60, 200, 40)
+    footer = make_box(880, 480, 210, 40)
+    if name == "vertical_ltr":
+        columns = np.array(
+            [columns[col * 5 + row] for col in reversed(range(3)) for row in range(5)]
+        )
+    boxes = np.concatenate([[header], columns, [footer]])
+    ordered = get_reading_order(name)(shuffled(boxes)[0])
+    np.testing.assert_array_equal(np.array(ordered), boxes)
+
+
+def test_empty_and_unknown():
+    assert get_reading_order("vertical_rtl")(np.zeros((0, 4, 2))) == []
+    with pytest.raises(ValueError):
+        get_reading_order("diagonal")
@@ -0,0 +1,71 @@
+import math
+import os
+import sys
+
+import numpy as np
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+import tools.infer.utility as utility
+from tools.infer import predict_rec
+
+
+def make_recognizer(fake_predictor, *argv):
+    fake_predictor("ctc")
+    args = utility.init_args().parse_args(["--rec_algorithm", "CRNN"] + list(argv))
+    return predict_rec.TextRecognizer(args)
+
+
+def make_crops(num=40, seed=0):
+    """Crops of the rec input height, so the padding is the only thing buckets change."""
+    rng = np.random.RandomState(seed)
+    crops = []
+    while len(crops) < num:
+        w = rng.randint(30, 900)
+        # skip widths the float ratio round trip does not reproduce exactly
+        if int(48 * (w / 48.0)) != w or math.ceil(48 * (w / 48.0)) != w:
+            continue
+        crops.append((rng.rand(48, w, 3) * 255).astype(np.uint8))
+    return crops
+
+
+def test_width_buckets_keep_results(fake_predictor):
+    crops = make_crops()
+    ref_res, _ = make_recognizer(fake_predictor)(crops)
+    recognizer = make_recognizer(
+        fake_predictor, "--rec_width_buckets", "320,480,640,960,1280"
+    )
+    rec_res, _ = recognizer(crops)
+    assert [res["text"] for res in rec_res] == [res["text"] for res in ref_res]
+    widths = [shape[3] for shape in recognizer.predictor.shapes]
+    assert set(widths) <= {320, 480, 640, 960, 1280, 1600, 1920}
+
+    stats = recognizer.width_bucket_stats()
+    assert sum(hits["crops"] for hits in stats.values()) == len(crops)
+    assert sum(hits["batches"] for hits in stats.values()) == len(widths)
+
+
+@pytest.mark.parametrize(
+    "width, bucket", [(100, 320), (320, 320), (321, 480), (1280, 1280), (1300, 1600)]
+)
+def test_width_bucket_ladder(fake_predictor, width, bucket):
+    recognizer = make_recognizer(
+        fake_predictor, "--rec_width_buckets", "320,480,640,960,1280"
+    )
+    assert recognizer.width_bucket(width / 48.0) == bucket
+
+
+@pytest.mark.parametrize("compact", ["false", "true"])
+def test_fast_decode_results(fake_predictor, compact):
+    crops = make_crops(num=7)
+    argv = ["--rec_batch_num", "2", "--rec_compact_result", compact]
+    ref_res, _ = make_recognizer(fake_predictor, "--rec_batch_num", "2")(crops)
+    recognizer = make_recognizer(fake_predictor, *argv)
+    recognizer.postprocess_op.decode_mode = "fast"
+    rec_res, _ = recognizer(crops)
+    assert [res["text"] for res in rec_res] == [res["text"] for res in ref_res]
+    assert all(res["text"] for res in rec_res)
+    assert all(0.0 <= res["score"] <= 1.0 for res in rec_res)
+    assert all(res["char_details"] == [] for res in rec_res)
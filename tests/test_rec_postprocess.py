@@ -0,0 +1,148 @@
+import json
+import os
+import sys
+
+import numpy as np
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+from ppocr.metrics.rec_metric import RecMetric
+from ppocr.postprocess.rec_postprocess import BaseRecLabelDecode, CTCLabelDecode
+from ppocr.postprocess.rec_candidates import RecCandidates, weighted_top1_scores
+
+
+def make_preds(batch_size=4, seq_len=40, num_classes=37, seed=0):
+    """Random CTC probabilities with blanks and repeated characters."""
+    rng = np.random.RandomState(seed)
+    logits = rng.rand(batch_size, seq_len, num_classes).astype(np.float32)
+    path = rng.randint(0, num_classes, size=(batch_size, seq_len))
+    path[:, ::3] = 0  # blank
+    path[:, 1::5] = path[:, 0::5][:, : path[:, 1::5].shape[1]]  # repeats
+    np.put_along_axis(logits, path[..., None], 5.0, axis=2)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=2, keepdims=True)
+
+
+@pytest.mark.parametrize("merge_repeated", [True, False])
+@pytest.mark.parametrize("topk", [1, 3, 5])
+def test_decode_topk_matches_reference(merge_repeated, topk):
+    post_process = CTCLabelDecode(merge_repeated=merge_repeated, topk=topk)
+    preds = make_preds()
+    expected = post_process.decode(preds.argmax(axis=2), preds)
+    result = post_process.decode_topk(preds)
+    assert result == expected
+
+
+def test_ctc_collapse_keeps_repeats_split_by_blank():
+    post_process = CTCLabelDecode(merge_repeated=True)
+    # "a", "a", blank, "a", "b" -> "aab"
+    path = np.array([[11, 11, 0, 11, 12]])
+    preds = np.full((1, 5, 37), 0.01, dtype=np.float32)
+    np.put_along_axis(preds, path[..., None], 0.9, axis=2)
+    text_list, detail_list = post_process(preds)
+    assert text_list == ["aab"]
+    assert [d["time_step"] for d in detail_list[0]] == [0, 3, 4]
+    assert all(len(d["top3"]) == 3 for d in detail_list[0])
+    assert all(c["char"] != "blank" for d in detail_list[0] for c in d["top3"])
+
+
+def test_decode_topk_empty_result():
+    post_process = CTCLabelDecode()
+    preds = np.zeros((2, 10, 37), dtype=np.float32)
+    preds[:, :, 0] = 1.0
+    text_list, detail_list = post_process(preds)
+    assert text_list == ["", ""]
+    assert detail_list == [[], []]
+
+
+def test_compact_result_matches_dict_result(tmp_path):
+    preds = make_preds(batch_size=5)
+    expected = CTCLabelDecode(merge_repeated=True)(preds)
+    compact = CTCLabelDecode(merge_repeated=True, compact_result=True)(preds)
+    assert isinstance(compact, RecCandidates)
+    assert compact.texts == expected[0]
+    assert [line[2] for line in compact] == expected[1]
+
+    subset = compact.take([3, 0])
+    assert subset.texts == [expected[0][3], expected[0][0]]
+    assert subset[0][2].tolist() == expected[1][3]
+    merged = RecCandidates.concat([subset, compact.take([1])])
+    assert merged.tolist()[2][2] == expected[1][1]
+
+    boxes = np.zeros((len(compact), 4, 2), dtype=np.float32)
+    paged = compact.with_boxes(boxes)
+    npz_path = str(tmp_path / "res.npz")
+    paged.save_npz(npz_path)
+    loaded = RecCandidates.load_npz(npz_path)
+    assert loaded.tolist() == paged.tolist()
+
+    jsonl_path = tmp_path / "res.jsonl"
+    with open(jsonl_path, "w", encoding="utf-8") as f:
+        paged.dump_jsonl(f, image="a.jpg")
+    lines = [json.loads(line) for line in jsonl_path.read_text().splitlines()]
+    assert [line["text"] for line in lines] == expected[0]
+    assert lines[0]["image"] == "a.jpg"
+    assert lines[0]["candidates"] == [
+        [c["char"] for c in d["top3"]] for d in expected[1][0]
+    ]
+
+
+def test_weighted_top1_scores():
+    offsets = np.array([0, 2, 2, 5])
+    top1 = np.array([0.9, 0.5, 0.2, 0.4, 0.6], dtype=np.float32)
+    scores = weighted_top1_scores(offsets, top1)
+    np.testing.assert_allclose(scores[0], (0.9 + 0.25) / 1.5, rtol=1e-6)
+    assert scores[1] == 0.0
+    np.testing.assert_allclose(scores[2], (0.2 + 0.2 + 0.3) / 2.0, rtol=1e-6)
+
+
+@pytest.mark.parametrize("merge_repeated", [True, False])
+def test_decode_fast_matches_reference(merge_repeated):
+    post_process = CTCLabelDecode(merge_repeated=merge_repeated)
+    preds = make_preds(batch_size=6)
+    preds[2, :, :] = 0.0
+    preds[2, :, 0] = 1.0  # empty text
+    expected = BaseRecLabelDecode.decode(
+        post_process,
+        preds.argmax(axis=2),
+        preds.max(axis=2),
+        is_remove_duplicate=merge_repeated,
+    )
+    result = post_process.decode_fast(preds)
+    assert [text for text, _ in result] == [text for text, _ in expected]
+    np.testing.assert_allclose(
+        [conf for _, conf in result], [conf for _, conf in expected], rtol=1e-6
+    )
+    assert result[2] == ("", 0.0)
+
+
+def test_decode_mode_dispatch():
+    preds = make_preds()
+    label = np.zeros((4, 25), dtype=np.int64)
+    label[:, :4] = [[12, 25, 25, 21]]  # "book", the doubled letter is kept
+
+    auto = CTCLabelDecode()
+    preds_text, label_text = auto(preds, label)
+    assert preds_text == auto.decode_fast(preds)
+    assert label_text == [("book", 1.0)] * 4
+    text_list, detail_list = auto(preds)
+    assert text_list == [text for text, _ in preds_text]
+    assert len(detail_list) == 4
+
+    candidates = CTCLabelDecode(decode_mode="candidates")
+    (text_list, detail_list), _ = candidates(preds, label)
+    assert text_list == [text for text, _ in preds_text]
+
+    assert CTCLabelDecode(decode_mode="fast")(preds) == preds_text
+
+
+def test_decode_fast_feeds_rec_metric():
+    post_process = CTCLabelDecode()
+    preds = make_preds()
+    label = preds.argmax(axis=2)
+    label[:, 1:][label[:, 1:] == label[:, :-1]] = 0
+    metric = RecMetric()
+    metric(post_process(preds, label))
+    assert metric.get_metric()["acc"] > 0.99
@@ -0,0 +1,266 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+import tools.infer.utility as utility
+from tools.infer import predict_system
+from tools.infer.crop_engine import CropEngine
+from tools.infer.result_cache import (
+    DET_ARGS,
+    REC_ARGS,
+    ResultCache,
+    build_result_cache,
+    config_fingerprint,
+    image_digest,
+)
+
+
+def test_two_tier_lru(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = ResultCache(path, max_bytes=1 << 20, memory_items=2)
+    for idx in range(3):
+        cache.put("key{}".format(idx), {"value": idx})
+    assert cache.get("key2") == {"value": 2}
+    # key0 fell out of the memory tier, it comes from sqlite
+    assert cache.get("key0") == {"value": 0}
+    assert cache.get("missing") is None
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["disk_hits"], stats["misses"]) == (1, 1, 1)
+    cache.close()
+
+    reopened = ResultCache(path, max_bytes=1 << 20, memory_items=2)
+    assert reopened.get("key1") == {"value": 1}
+    assert reopened.stats()["disk_hits"] == 1
+
+
+def test_size_bounded_eviction(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache.sqlite"), max_bytes=5000, memory_items=0)
+    blob = np.zeros(1000, dtype=np.uint8)
+    for idx in range(4):
+        cache.put(idx, blob)
+    # key 0 is the most recently used one now
+    assert cache.get(0) is not None
+    cache.put(4, blob)
+    cache.put(5, blob)
+    assert cache.stats()["disk_bytes"] <= 5000
+    assert cache.get(0) is not None
+    assert cache.get(1) is None
+    assert cache.get(5) is not None
+    assert cache.stats()["evictions"] >= 2
+
+
+def test_fingerprint(tmp_path):
+    model_dir = tmp_path / "rec"
+    model_dir.mkdir()
+    (model_dir / "inference.pdiparams").write_bytes(b"v1")
+    args = utility.init_args().parse_args(["--rec_model_dir", str(model_dir)])
+    det_fp = config_fingerprint(args, DET_ARGS)
+    ocr_fp = config_fingerprint(args, DET_ARGS + REC_ARGS)
+
+    args.drop_score = 0.8
+    assert config_fingerprint(args, DET_ARGS) == det_fp
+    assert config_fingerprint(args, DET_ARGS + REC_ARGS) != ocr_fp
+    ocr_fp = config_fingerprint(args, DET_ARGS + REC_ARGS)
+    # a new model file in the same dir
+    (model_dir / "inference.pdiparams").write_bytes(b"model v2")
+    assert config_fingerprint(args, DET_ARGS + REC_ARGS) != ocr_fp
+
+    args.det_db_thresh = 0.5
+    assert config_fingerprint(args, DET_ARGS) != det_fp
+
+
+def test_fingerprint_hashes_model_content(tmp_path):
+    model_file = tmp_path / "rec" / "inference.pdiparams"
+    model_file.parent.mkdir()
+    model_file.write_bytes(b"v1")
+    argv = ["--rec_model_dir", str(model_file.parent)]
+    argv += ["--optim_cache_dir", str(tmp_path / "optim")]
+    args = utility.init_args().parse_args(argv)
+    ocr_fp = config_fingerprint(args, DET_ARGS + REC_ARGS)
+    # the same model copied again
+    os.utime(str(model_file), (1, 1))
+    assert config_fingerprint(args, DET_ARGS + REC_ARGS) == ocr_fp
+    model_file.write_bytes(b"v2")
+    assert config_fingerprint(args, DET_ARGS + REC_ARGS) != ocr_fp
+
+
+def test_fingerprint_skips_disabled_cls_model(tmp_path):
+    cls_dir = tmp_path / "cls"
+    args = utility.init_args().parse_args(["--cls_model_dir", str(cls_dir)])
+    ocr_fp = config_fingerprint(args, DET_ARGS + REC_ARGS)
+    # e.g. downloaded by another PaddleOCR instance
+    cls_dir.mkdir()
+    (cls_dir / "inference.pdiparams").write_bytes(b"cls")
+    assert config_fingerprint(args, DET_ARGS + REC_ARGS) == ocr_fp
+    args.use_angle_cls = True
+    assert config_fingerprint(args, DET_ARGS + REC_ARGS) != ocr_fp
+
+
+@pytest.mark.parametrize(
+    "use_angle_cls, stages", [(False, ["det", "rec"]), (True, ["det", "rec", "cls"])]
+)
+def test_result_cache_downloads_enabled_stages(
+    monkeypatch, tmp_path, use_angle_cls, stages
+):
+    import paddleocr
+
+    downloaded = []
+    monkeypatch.setattr(
+        paddleocr.PaddleOCR,
+        "download_models",
+        lambda self, stages: downloaded.extend(stages),
+    )
+    ocr = paddleocr.PaddleOCR(
+        result_cache_path=str(tmp_path / "cache.sqlite"),
+        use_angle_cls=use_angle_cls,
+        det_model_dir=str(tmp_path / "det"),
+        rec_model_dir=str(tmp_path / "rec"),
+        cls_model_dir=str(tmp_path / "cls"),
+        show_log=False,
+    )
+    assert downloaded == stages
+    ocr.result_cache.close()
+
+
+@pytest.mark.parametrize(
+    "name, value",
+    [
+        ("det_batch_num", 4),
+        ("det_batch_bucket_step", 32),
+        ("det_fce_nms_mode", "mask"),
+        ("rec_batch_num", 16),
+        ("cls_batch_num", 16),
+        ("pdf_page_chunk", 1),
+    ],
+)
+def test_fingerprint_batching_args(name, value):
+    args = utility.init_args().parse_args([])
+    ocr_fp = config_fingerprint(args, DET_ARGS + REC_ARGS)
+    det_fp = config_fingerprint(args, DET_ARGS)
+    setattr(args, name, value)
+    assert config_fingerprint(args, DET_ARGS + REC_ARGS) != ocr_fp
+    if name.startswith("det_"):
+        assert config_fingerprint(args, DET_ARGS) != det_fp
+
+
+TILE_SLICE = {
+    "horizontal_stride": 300,
+    "vertical_stride": 300,
+    "merge_x_thres": 50,
+    "merge_y_thres": 35,
+    "overlap": 50,
+}
+
+
+@pytest.mark.parametrize(
+    "name, value",
+    [
+        ("horizontal_stride", 400),
+        ("vertical_stride", 400),
+        ("merge_x_thres", 20),
+        ("merge_y_thres", 20),
+        ("merge_direction", "vertical"),
+        ("overlap", 80),
+        ("batch_size", 2),
+        ("nms_thresh", 0.3),
+        ("skip_empty", True),
+        ("coarse_side", 1024),
+    ],
+)
+def test_cache_key_slice_options(tmp_path, name, value):
+    text_system = make_text_system(tmp_path, det_only=False)
+    key = text_system.cache_key("ocr", "digest", slice=TILE_SLICE)
+    changed = dict(TILE_SLICE, **{name: value})
+    assert text_system.cache_key("ocr", "digest", slice=changed) != key
+
+
+def test_cache_key_slice_defaults(tmp_path):
+    text_system = make_text_system(tmp_path, det_only=False)
+    key = text_system.cache_key("det", "digest", slice=TILE_SLICE)
+    explicit = dict(TILE_SLICE, batch_size=8, nms_thresh=0.5)
+    assert text_system.cache_key("det", "digest", slice=explicit) == key
+
+
+def test_image_digest():
+    img = np.zeros((4, 6, 3), dtype=np.uint8)
+    assert image_digest(img) == image_digest(img.copy())
+    assert image_digest(img) != image_digest(img.reshape(6, 4, 3))
+    assert image_digest(b"abc") == image_digest(memoryview(b"abc"))
+
+
+class FakeDetector(object):
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, img):
+        self.calls += 1
+        return np.array([[[0, 0], [8, 0], [8, 4], [0, 4]]], dtype=np.float32), 0.0
+
+
+class FakeRecognizer(object):
+    rec_image_shape = [3, 48, 320]
+
+    def __init__(self, text):
+        self.text = text
+        self.calls = 0
+
+    def __call__(self, img_list):
+        self.calls += 1
+        return [[self.text, 0.9, []] for _ in img_list], 0.0
+
+
+def make_text_system(tmp_path, det_only):
+    args = utility.init_args().parse_args(
+        [
+            "--result_cache_path",
+            str(tmp_path / "cache.sqlite"),
+            "--result_cache_det_only",
+            str(det_only),
+        ]
+    )
+    text_system = predict_system.TextSystem.__new__(predict_system.TextSystem)
+    text_system.args = args
+    text_system.text_detector = FakeDetector()
+    text_system.text_recognizer = FakeRecognizer("a")
+    text_system.use_angle_cls = False
+    text_system.drop_score = 0.5
+    text_system.sort_boxes = list
+    text_system.crop_engine = CropEngine()
+    text_system.result_cache = build_result_cache(args)
+    text_system.det_fingerprint = config_fingerprint(args, DET_ARGS)
+    text_system.ocr_fingerprint = config_fingerprint(args, DET_ARGS + REC_ARGS)
+    return text_system
+
+
+def test_text_system_result_cache(tmp_path):
+    text_system = make_text_system(tmp_path, det_only=False)
+    img = np.full((16, 16, 3), 255, dtype=np.uint8)
+    first = text_system(img)
+    second = text_system(img.copy())
+    assert first[1] == second[1] == [["a", 0.9, []]]
+    assert text_system.text_detector.calls == 1
+    assert text_system.text_recognizer.calls == 1
+    assert text_system.result_cache.stats()["memory_hits"] == 1
+
+
+@pytest.mark.parametrize("det_batch_num", [1, 2])
+def test_det_only_cache_reruns_rec(tmp_path, det_batch_num):
+    text_system = make_text_system(tmp_path, det_only=True)
+    text_system.args.det_batch_num = det_batch_num
+    text_system.text_detector.predict_batch = lambda imgs: (
+        [text_system.text_detector(img)[0] for img in imgs],
+        0.0,
+    )
+    imgs = [np.full((16, 16, 3), value, dtype=np.uint8) for value in (0, 255)]
+    text_system.batch_call(imgs)
+    # a new recognizer, the cached boxes are reused
+    text_system.text_recognizer = FakeRecognizer("b")
+    results, _ = text_system.batch_call(imgs)
+    assert [rec_res for _, rec_res in results] == [[["b", 0.9, []]]] * 2
+    assert text_system.text_detector.calls == 2
+    assert text_system.text_recognizer.calls == 1
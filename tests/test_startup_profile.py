@@ -0,0 +1,128 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+import tools.infer.utility as utility
+from tools.infer import predict_system
+from tools.infer.startup_profile import (
+    component_times,
+    load_times,
+    parse_importtime,
+)
+
+IMPORTTIME_OUTPUT = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:       300 |        300 |     numpy.core
+import time:      1000 |       1300 |   numpy
+import time:        50 |         50 |     cv2.data
+import time:       700 |        750 |   cv2
+import time:        10 |       2180 | app
+import time:        40 |         40 | unrelated
+"""
+
+
+def test_parse_importtime():
+    entries = parse_importtime(IMPORTTIME_OUTPUT)
+    assert entries[0] == ("_io", 1, 120, 120)
+    assert entries[1] == ("numpy.core", 2, 300, 300)
+    assert entries[5] == ("app", 0, 10, 2180)
+    assert len(entries) == 7
+
+
+def test_component_times():
+    total_us, children = component_times(parse_importtime(IMPORTTIME_OUTPUT), "app")
+    assert total_us == 2180
+    assert children == [("numpy", 1300), ("cv2", 750), ("_io", 120)]
+    with pytest.raises(ValueError):
+        component_times([], "app")
+
+
+class FakeStage(object):
+    def __init__(self, args):
+        self.args = args
+
+
+def make_text_system(monkeypatch, argv):
+    built = []
+    for module, name in [
+        (predict_system.predict_det, "TextDetector"),
+        (predict_system.predict_rec, "TextRecognizer"),
+        (predict_system.predict_cls, "TextClassifier"),
+    ]:
+        monkeypatch.setattr(
+            module,
+            name,
+            lambda args, name=name: built.append(name) or FakeStage(args),
+        )
+    args = utility.init_args().parse_args(argv)
+    return predict_system.TextSystem(args), built
+
+
+def test_stages_are_built_on_first_use(monkeypatch):
+    text_system, built = make_text_system(monkeypatch, ["--use_angle_cls", "true"])
+    assert built == []
+    detector = text_system.text_detector
+    assert text_system.text_detector is detector
+    assert built == ["TextDetector"]
+    text_system.init_stages()
+    assert built == ["TextDetector", "TextRecognizer", "TextClassifier"]
+
+
+def test_eager_model_init(monkeypatch):
+    text_system, built = make_text_system(monkeypatch, ["--lazy_model_init", "false"])
+    # the angle classifier is disabled by default
+    assert built == ["TextDetector", "TextRecognizer"]
+    with pytest.raises(AttributeError):
+        text_system.text_classifier
+
+
+def test_load_times(monkeypatch):
+    text_system, built = make_text_system(monkeypatch, [])
+    engine, times = load_times(lambda: text_system)
+    assert engine is text_system
+    assert sorted(times) == ["det", "init", "rec"]
+    assert built == ["TextDetector", "TextRecognizer"]
+
+
+def test_import_skips_optional_dependencies():
+    code = (
+        "import sys, paddleocr; "
+        "print(sorted(m for m in ('albumentations', 'docx', 'bs4', "
+        "'skimage.morphology') if m in sys.modules))"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=os.path.abspath(os.path.join(current_dir, "..")),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    assert proc.returncode == 0, proc.stderr
+    assert proc.stdout.strip().splitlines()[-1] == "[]"
+
+
+def test_import_defers_structure_and_batch_modules():
+    modules = (
+        "'ppstructure.utility', 'ppstructure.predict_system', "
+        "'tools.infer.batch_runner'"
+    )
+    code = (
+        "import sys, paddleocr; "
+        "print(sorted(m for m in ({}) if m in sys.modules)); "
+        "print(paddleocr.PPStructure.__name__, paddleocr.to_excel.__name__)"
+    ).format(modules)
+    proc = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=os.path.abspath(os.path.join(current_dir, "..")),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    assert proc.returncode == 0, proc.stderr
+    assert proc.stdout.strip().splitlines()[-2:] == ["[]", "PPStructure to_excel"]
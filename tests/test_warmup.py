@@ -0,0 +1,123 @@
+import os
+import sys
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+import tools.infer.utility as utility
+from tools.infer import optim_cache, predict_system
+from tools.infer.warmup import plan_warmup
+
+
+def parse_args(argv):
+    return utility.init_args().parse_args(argv)
+
+
+def test_plan_covers_rec_width_buckets():
+    args = parse_args(
+        [
+            "--rec_width_buckets",
+            "160,320,480,640",
+            "--use_angle_cls",
+            "true",
+            "--det_batch_num",
+            "4",
+        ]
+    )
+    plan = plan_warmup(args)
+    assert plan["rec"] == [(48, 320, 6), (48, 480, 6), (48, 640, 6), (48, 320, 1)]
+    assert plan["cls"] == [(48, 192, 6), (48, 192, 1)]
+    assert (960, 960, 1) in plan["det"]
+    assert plan["det"][-1] == (960, 720, 4)
+
+
+def test_plan_without_buckets():
+    args = parse_args(["--det_limit_type", "min", "--det_limit_side_len", "736"])
+    plan = plan_warmup(args)
+    assert [w for _, w, _ in plan["rec"]] == [320, 480, 640, 960, 320]
+    assert plan["cls"] == []
+    assert all(min(h, w) == 736 for h, w, _ in plan["det"])
+
+
+class FakeStage(object):
+    def __init__(self):
+        self.shapes = []
+
+    def __call__(self, imgs):
+        if not isinstance(imgs, list):
+            imgs = [imgs]
+        self.shapes.append((len(imgs),) + imgs[0].shape[:2])
+        return None, 0.0
+
+    def predict_batch(self, imgs):
+        return self(imgs)
+
+
+def test_warmup_runs_every_stage():
+    args = parse_args(["--use_angle_cls", "true", "--det_batch_num", "2"])
+    text_system = predict_system.TextSystem.__new__(predict_system.TextSystem)
+    text_system.args = args
+    text_system.text_detector = FakeStage()
+    text_system.text_recognizer = FakeStage()
+    text_system.text_classifier = FakeStage()
+    times = text_system.warmup()
+    assert sorted(times) == ["cls", "det", "rec"]
+
+    plan = plan_warmup(args)
+    for stage, attr in predict_system.STAGE_ATTRS.items():
+        expected = [(batch, h, w) for h, w, batch in plan[stage] for _ in range(2)]
+        assert getattr(text_system, attr).shapes == expected
+
+
+def write_model(model_dir, params=b"weights"):
+    os.makedirs(model_dir, exist_ok=True)
+    files = [
+        os.path.join(model_dir, "inference.json"),
+        os.path.join(model_dir, "inference.pdiparams"),
+    ]
+    for path, data in zip(files, [b"program", params]):
+        with open(path, "wb") as f:
+            f.write(data)
+    return files
+
+
+def test_cache_dir_follows_model_and_device(tmp_path):
+    files = write_model(str(tmp_path / "det"))
+    cache_root = str(tmp_path / "cache")
+    args = parse_args(["--optim_cache_dir", cache_root])
+    cache_dir = optim_cache.model_cache_dir(args, "det", files)
+    assert os.path.basename(cache_dir).startswith("det_")
+    assert optim_cache.model_cache_dir(args, "det", files) == cache_dir
+    assert os.path.exists(os.path.join(cache_root, optim_cache.DIGEST_INDEX))
+
+    mkldnn_args = parse_args(["--optim_cache_dir", cache_root, "--enable_mkldnn", "1"])
+    assert optim_cache.model_cache_dir(mkldnn_args, "det", files) != cache_dir
+    write_model(str(tmp_path / "det"), params=b"new weights")
+    assert optim_cache.model_cache_dir(args, "det", files) != cache_dir
+    assert optim_cache.model_cache_dir(parse_args([]), "det", files) is None
+
+
+def test_optimized_model_lookup(tmp_path):
+    cache_dir = str(tmp_path / "det_0")
+    assert optim_cache.paddle_optimized_model(cache_dir) is None
+    tmp_dir = str(tmp_path / "det_0.123")
+    write_model(tmp_dir)
+    for name in ["inference.json", "inference.pdiparams"]:
+        os.rename(
+            os.path.join(tmp_dir, name),
+            os.path.join(tmp_dir, name.replace("inference", "_optimized")),
+        )
+    optim_cache.publish(tmp_dir, cache_dir)
+    assert not os.path.exists(tmp_dir)
+    model_file, params_file = optim_cache.paddle_optimized_model(cache_dir)
+    assert model_file.endswith("_optimized.json")
+
+    # a second process that optimized the model at the same time keeps ours
+    other_dir = str(tmp_path / "det_0.456")
+    write_model(other_dir)
+    optim_cache.publish(other_dir, cache_dir)
+    assert not os.path.exists(other_dir)
+    assert optim_cache.paddle_optimized_model(cache_dir) == (model_file, params_file)
+
+    optim_cache.mark_unsupported(cache_dir, "cannot load")
+    assert optim_cache.paddle_optimized_model(cache_dir) is None
@@ -167,6 +167,7 @@ def main():
         scaler,
         amp_level,
         amp_custom_black_list,
+        benchmark=global_config.get("eval_benchmark", False),
     )
     logger.info("metric eval ***************")
     for k, v in metric.items():
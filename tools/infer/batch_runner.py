@@ -0,0 +1,411 @@
+# Copyright (c) 2024 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Resumable batch OCR of many image files, used by `paddleocr batch`.
+
+Inputs are pulled from a shared queue by worker processes, each one with its
+own OCR engine. The main process streams the results to an append-only sink
+(results.jsonl, or parquet part files) and then records the inputs in
+manifest.jsonl, so an interrupted run skips the finished inputs when it is
+started again. Visualizations are drawn by a separate process pool, off the
+OCR path.
+"""
+
+import json
+import multiprocessing
+import os
+import queue
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from ppocr.utils.logging import get_logger
+
+logger = get_logger()
+
+__all__ = [
+    "BatchRunner",
+    "Manifest",
+    "JsonlSink",
+    "ParquetSink",
+    "add_batch_args",
+    "page_records",
+]
+
+
+def add_batch_args(parser):
+    parser.add_argument(
+        "--batch_workers",
+        type=int,
+        default=1,
+        help="worker processes, each one loads its own models",
+    )
+    parser.add_argument(
+        "--batch_sink", type=str, default="jsonl", choices=["jsonl", "parquet"]
+    )
+    parser.add_argument(
+        "--batch_rows_per_file",
+        type=int,
+        default=10000,
+        help="text lines per parquet part file",
+    )
+    parser.add_argument(
+        "--batch_vis_workers",
+        type=int,
+        default=0,
+        help="processes drawing the visualizations, 0 to skip them",
+    )
+    return parser
+
+
+def _to_builtin(obj):
+    # numpy values, and the CharDetails / RecCandidates of compact rec results
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError("{} is not JSON serializable".format(type(obj)))
+
+
+def page_records(page_res):
+    """Lines of one page of PaddleOCR.ocr output as dicts, None for pages without text."""
+    if page_res is None:
+        return None
+    lines = []
+    for line in page_res:
+        if len(line) == 2 and isinstance(line[1], (list, tuple)):
+            box, rec_res = line
+            record = {
+                "box": np.asarray(box).tolist(),
+                "text": rec_res[0],
+                "score": float(rec_res[1]),
+            }
+            if len(rec_res) > 2 and rec_res[2]:
+                # the CharDetails view of a compact result refers to the
+                # arrays of the whole page, it is rendered to a list
+                record["char_details"] = list(rec_res[2])
+        else:
+            # det only
+            record = {"box": np.asarray(line).tolist()}
+        lines.append(record)
+    return lines
+
+
+class Manifest(object):
+    """Append-only record of the finished inputs of a batch run."""
+
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # the last line of an interrupted run
+                        continue
+                    if entry.get("status") == "done":
+                        self.done.add(entry["input"])
+        self._file = open(path, "a", encoding="utf-8")
+
+    def commit(self, input_path, status, **info):
+        entry = dict(input=input_path, status=status, **info)
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+        if status == "done":
+            self.done.add(input_path)
+
+    def close(self):
+        self._file.close()
+
+
+class JsonlSink(object):
+    """One json line per input in results.jsonl, every line is flushed at once."""
+
+    def __init__(self, output_dir):
+        self.path = os.path.join(output_dir, "results.jsonl")
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def write(self, record):
+        """Write one input record, return True when all written records are on disk."""
+        self._file.write(
+            json.dumps(record, ensure_ascii=False, default=_to_builtin) + "\n"
+        )
+        self._file.flush()
+        return True
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetSink(object):
+    """
+    One row per text line in parquet part files of about `rows_per_file`
+    rows. A part file is only renamed into place once it is complete.
+    """
+
+    def __init__(self, output_dir, rows_per_file=10000):
+        from paddle.utils import try_import
+
+        self.pa = try_import("pyarrow")
+        self.pq = try_import("pyarrow.parquet")
+        self.output_dir = output_dir
+        self.rows_per_file = max(1, rows_per_file)
+        self.prefix = "results-{}-{}".format(time.strftime("%Y%m%d%H%M%S"), os.getpid())
+        self._rows = []
+        self._parts = 0
+
+    def write(self, record):
+        for page_idx, lines in enumerate(record["pages"]):
+            for line_idx, line in enumerate(lines or []):
+                self._rows.append(
+                    {
+                        "input": record["input"],
+                        "page": page_idx,
+                        "line": line_idx,
+                        "box": line["box"],
+                        "text": line.get("text"),
+                        "score": line.get("score"),
+                        "char_details": json.dumps(
+                            line.get("char_details"),
+                            ensure_ascii=False,
+                            default=_to_builtin,
+                        ),
+                    }
+                )
+        if len(self._rows) >= self.rows_per_file:
+            self.flush()
+            return True
+        return False
+
+    def flush(self):
+        if not self._rows:
+            return
+        path = os.path.join(
+            self.output_dir, "{}-{:05d}.parquet".format(self.prefix, self._parts)
+        )
+        self.pq.write_table(self.pa.Table.from_pylist(self._rows), path + ".tmp")
+        os.replace(path + ".tmp", path)
+        self._rows = []
+        self._parts += 1
+
+    def close(self):
+        self.flush()
+
+
+def _ocr_input(engine, input_path, ocr_kwargs):
+    try:
+        result = engine.ocr(input_path, **ocr_kwargs)
+        return input_path, [page_records(page) for page in result or []], None
+    except Exception:
+        return input_path, None, traceback.format_exc()
+
+
+def _worker(engine_factory, ocr_kwargs, tasks, results):
+    try:
+        engine = engine_factory()
+    except Exception:
+        results.put((None, None, traceback.format_exc()))
+        return
+    while True:
+        input_path = tasks.get()
+        if input_path is None:
+            break
+        results.put(_ocr_input(engine, input_path, ocr_kwargs))
+
+
+def save_visualization(
+    input_path, pages, vis_dir, font_path, drop_score=0.5, pdf_options=None
+):
+    """
+    Draw the text lines of every page of an input and save them in vis_dir.
+    pdf_options (page_num and the PDFPages options) have to be the ones the
+    input was OCR'd with, so that the boxes match the rendered pages.
+    """
+    from ppocr.utils.utility import close_pages
+    from tools.infer.pipeline import load_image_pages
+    from tools.infer.utility import draw_ocr_box_txt
+
+    stem = os.path.splitext(os.path.basename(input_path))[0]
+    imgs = load_image_pages(input_path, **(pdf_options or {}))
+    try:
+        for page_idx, (img, lines) in enumerate(zip(imgs, pages)):
+            if not lines:
+                continue
+            image = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+            txts, scores = None, None
+            if "text" in lines[0]:
+                txts = [line["text"] for line in lines]
+                scores = [line["score"] for line in lines]
+            draw_img = draw_ocr_box_txt(
+                image,
+                [line["box"] for line in lines],
+                txts,
+                scores,
+                drop_score=drop_score,
+                font_path=font_path,
+            )
+            name = stem if len(pages) == 1 else "{}_{}".format(stem, page_idx)
+            cv2.imwrite(os.path.join(vis_dir, name + ".png"), draw_img[:, :, ::-1])
+    finally:
+        close_pages(imgs)
+
+
+class BatchRunner(object):
+    """
+    Args:
+        engine_factory(callable): builds the OCR engine (e.g. a PaddleOCR) in each
+            worker, it has to be picklable when num_workers > 1.
+        output_dir(str): directory of the sink files, manifest.jsonl and vis/.
+        num_workers(int): worker processes, 1 runs the engine in this process.
+        sink(str): "jsonl" or "parquet" (needs pyarrow).
+        ocr_kwargs(dict): keyword args of engine.ocr.
+        vis_workers(int): processes drawing the visualizations, 0 to skip them.
+        vis_kwargs(dict): font_path, drop_score and pdf_options of the visualizations.
+        rows_per_file(int): text lines per parquet part file.
+    """
+
+    def __init__(
+        self,
+        engine_factory,
+        output_dir,
+        num_workers=1,
+        sink="jsonl",
+        ocr_kwargs=None,
+        vis_workers=0,
+        vis_kwargs=None,
+        rows_per_file=10000,
+    ):
+        self.engine_factory = engine_factory
+        self.output_dir = output_dir
+        self.num_workers = max(1, num_workers)
+        self.sink = sink
+        self.ocr_kwargs = ocr_kwargs or {}
+        self.vis_workers = vis_workers
+        self.vis_kwargs = vis_kwargs or {}
+        self.rows_per_file = rows_per_file
+
+    def _make_sink(self):
+        if self.sink == "jsonl":
+            return JsonlSink(self.output_dir)
+        if self.sink == "parquet":
+            return ParquetSink(self.output_dir, self.rows_per_file)
+        raise ValueError("unknown batch sink: {}".format(self.sink))
+
+    def _results(self, inputs):
+        """(input_path, pages, error) of every input, in completion order."""
+        if self.num_workers == 1 or len(inputs) <= 1:
+            engine = self.engine_factory()
+            for input_path in inputs:
+                yield _ocr_input(engine, input_path, self.ocr_kwargs)
+            return
+
+        num_workers = min(self.num_workers, len(inputs))
+        tasks, results = multiprocessing.Queue(), multiprocessing.Queue()
+        for input_path in inputs:
+            tasks.put(input_path)
+        for _ in range(num_workers):
+            tasks.put(None)
+        workers = [
+            multiprocessing.Process(
+                target=_worker,
+                args=(self.engine_factory, self.ocr_kwargs, tasks, results),
+            )
+            for _ in range(num_workers)
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            remaining = len(inputs)
+            while remaining > 0:
+                try:
+                    input_path, pages, error = results.get(timeout=1)
+                except queue.Empty:
+                    if not any(worker.is_alive() for worker in workers):
+                        raise RuntimeError("all batch workers exited")
+                    continue
+                if input_path is None:
+                    raise RuntimeError("batch worker failed to start:\n" + error)
+                remaining -= 1
+                yield input_path, pages, error
+            for worker in workers:
+                worker.join()
+        finally:
+            for worker in workers:
+                if worker.is_alive():
+                    worker.terminate()
+
+    def run(self, inputs):
+        """OCR the inputs that are not in the manifest yet, return the run counts."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        manifest = Manifest(os.path.join(self.output_dir, "manifest.jsonl"))
+        todo = [input_path for input_path in inputs if input_path not in manifest.done]
+        stats = {"total": len(inputs), "skipped": len(inputs) - len(todo)}
+        stats.update(done=0, failed=0)
+        logger.info(
+            "batch: {} inputs, {} already done".format(stats["total"], stats["skipped"])
+        )
+
+        vis_pool, vis_futures = None, []
+        if self.vis_workers > 0:
+            vis_dir = os.path.join(self.output_dir, "vis")
+            os.makedirs(vis_dir, exist_ok=True)
+            vis_pool = ProcessPoolExecutor(max_workers=self.vis_workers)
+
+        sink = self._make_sink()
+        # written to the sink, committed to the manifest once the sink has flushed them
+        pending = []
+        try:
+            for input_path, pages, error in self._results(todo):
+                if error is not None:
+                    logger.error("batch: {} failed\n{}".format(input_path, error))
+                    manifest.commit(input_path, "failed", error=error.splitlines()[-1])
+                    stats["failed"] += 1
+                    continue
+                pending.append((input_path, len(pages)))
+                if sink.write({"input": input_path, "pages": pages}):
+                    for done_path, num_pages in pending:
+                        manifest.commit(done_path, "done", pages=num_pages)
+                    stats["done"] += len(pending)
+                    pending = []
+                if vis_pool is not None:
+                    vis_futures.append(
+                        vis_pool.submit(
+                            save_visualization,
+                            input_path,
+                            pages,
+                            vis_dir,
+                            **self.vis_kwargs,
+                        )
+                    )
+        finally:
+            sink.close()
+            for done_path, num_pages in pending:
+                manifest.commit(done_path, "done", pages=num_pages)
+            stats["done"] += len(pending)
+            manifest.close()
+            if vis_pool is not None:
+                vis_pool.shutdown(wait=True)
+        for future in vis_futures:
+            if future.exception() is not None:
+                logger.warning(
+                    "batch: visualization failed: {}".format(future.exception())
+                )
+        logger.info("batch: {}".format(stats))
+        return stats
@@ -0,0 +1,116 @@
+# Copyright (c) 2024 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Text line crop extraction for TextSystem.
+
+Upright integer rectangles (most DB boxes on scanned pages) are cut out by
+slicing, which gives the same pixels as the perspective warp of
+get_rotate_crop_image without touching the rest of the page. Other quads are
+warped as before. Optionally every crop is produced directly at the
+recognizer's input height, so resize_norm_img does not resize it again.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from tools.infer.utility import get_minarea_rect
+
+__all__ = ["CropEngine"]
+
+
+class CropEngine(object):
+    """
+    args:
+        box_type(str): "quad" crops the detected quads, "poly" their min area rects
+        target_height(int|None): output height of every crop (after the rotation
+            of tall crops), None keeps the size of the box
+        num_threads(int): crop with a thread pool when > 1
+        min_parallel_boxes(int): only pages with at least this many boxes use the pool
+    """
+
+    def __init__(
+        self, box_type="quad", target_height=None, num_threads=0, min_parallel_boxes=32
+    ):
+        self.box_type = box_type
+        self.target_height = target_height
+        self.num_threads = num_threads
+        self.min_parallel_boxes = min_parallel_boxes
+        self._pool = None
+
+    def __call__(self, img, dt_boxes):
+        if self.num_threads > 1 and len(dt_boxes) >= self.min_parallel_boxes:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.num_threads)
+            # cv2 releases the GIL while warping / resizing
+            return list(self._pool.map(lambda box: self.crop(img, box), dt_boxes))
+        return [self.crop(img, box) for box in dt_boxes]
+
+    def crop(self, img, box):
+        if self.box_type == "quad":
+            points = np.asarray(box, dtype=np.float32)
+        else:
+            points = np.asarray(get_minarea_rect(box), dtype=np.float32)
+        assert len(points) == 4, "shape of points must be 4*2"
+        crop_w = int(
+            max(
+                np.linalg.norm(points[0] - points[1]),
+                np.linalg.norm(points[2] - points[3]),
+            )
+        )
+        crop_h = int(
+            max(
+                np.linalg.norm(points[0] - points[3]),
+                np.linalg.norm(points[1] - points[2]),
+            )
+        )
+        # tall crops are rotated to horizontal, as in get_rotate_crop_image
+        rotate = crop_h * 1.0 / crop_w >= 1.5 if crop_w > 0 else False
+        dst_w, dst_h = crop_w, crop_h
+        if self.target_height is not None:
+            scale = self.target_height / float(crop_w if rotate else crop_h)
+            dst_w = max(1, int(round(crop_w * scale)))
+            dst_h = max(1, int(round(crop_h * scale)))
+
+        if self._is_upright_rect(points, img.shape, crop_w, crop_h):
+            left, top = int(points[0][0]), int(points[0][1])
+            dst_img = img[top : top + crop_h, left : left + crop_w]
+            if (dst_w, dst_h) != (crop_w, crop_h):
+                dst_img = cv2.resize(dst_img, (dst_w, dst_h))
+        else:
+            pts_std = np.float32([[0, 0], [dst_w, 0], [dst_w, dst_h], [0, dst_h]])
+            M = cv2.getPerspectiveTransform(points, pts_std)
+            dst_img = cv2.warpPerspective(
+                img,
+                M,
+                (dst_w, dst_h),
+                borderMode=cv2.BORDER_REPLICATE,
+                flags=cv2.INTER_CUBIC,
+            )
+        if rotate:
+            dst_img = np.rot90(dst_img)
+        return dst_img
+
+    @staticmethod
+    def _is_upright_rect(points, img_shape, crop_w, crop_h):
+        """Whether the quad is an integer, in-image rectangle in tl, tr, br, bl order."""
+        if crop_w <= 0 or crop_h <= 0 or not np.all(points == np.round(points)):
+            return False
+        (x0, y0), (x1, y1), (x2, y2), (x3, y3) = points.tolist()
+        if not (y0 == y1 and y2 == y3 and x0 == x3 and x1 == x2):
+            return False
+        if x1 - x0 != crop_w or y3 - y0 != crop_h:
+            return False
+        return x0 >= 0 and y0 >= 0 and x1 <= img_shape[1] and y3 <= img_shape[0]
@@ -0,0 +1,210 @@
+# Copyright (c) 2024 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Dynamic batching of the items of concurrent requests.
+
+Request threads submit items (images, text crops) and get futures back. One
+scheduler thread takes the queued items of all requests, up to
+`max_batch_size` of them or until `max_wait_ms` after the first one, runs the
+batch function on them at once and sets each future to its own output. As
+only the scheduler thread runs the batch function, the predictor behind it is
+never used by two threads at a time.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+__all__ = ["DynamicBatcher", "BatchedTextSystem"]
+
+_STOP = object()
+
+
+class DynamicBatcher(object):
+    """
+    Args:
+        batch_fn(callable): maps a list of items to the list of their outputs.
+        max_batch_size(int): largest batch given to batch_fn.
+        max_wait_ms(float): how long the first item of a batch waits for others.
+        name(str): name of the scheduler thread.
+    """
+
+    def __init__(self, batch_fn, max_batch_size, max_wait_ms=5, name="batcher"):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._batch_sizes = {}
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, item):
+        """Queue one item, the returned future holds its output."""
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def submit_many(self, items):
+        return [self.submit(item) for item in items]
+
+    def map(self, items):
+        """Outputs of the items, they may be batched with the items of other callers."""
+        return [future.result() for future in self.submit_many(items)]
+
+    def _collect(self):
+        """Block for the first item, then gather more until the batch is full or the deadline passes."""
+        first = self._queue.get()
+        if first is _STOP:
+            return None
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            try:
+                entry = (
+                    self._queue.get(timeout=timeout)
+                    if timeout > 0
+                    else self._queue.get_nowait()
+                )
+            except queue.Empty:
+                break
+            if entry is _STOP:
+                # finish this batch first
+                self._queue.put(_STOP)
+                break
+            batch.append(entry)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            items = [item for item, _ in batch]
+            try:
+                outputs = self.batch_fn(items)
+                if len(outputs) != len(items):
+                    raise RuntimeError(
+                        "batch_fn returned {} outputs for {} items".format(
+                            len(outputs), len(items)
+                        )
+                    )
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), output in zip(batch, outputs):
+                future.set_result(output)
+            with self._lock:
+                self._batch_sizes[len(batch)] = self._batch_sizes.get(len(batch), 0) + 1
+
+    def stats(self):
+        """Number of batches and items, and the batch size histogram."""
+        with self._lock:
+            sizes = dict(self._batch_sizes)
+        batches = sum(sizes.values())
+        items = sum(size * count for size, count in sizes.items())
+        return {
+            "batches": batches,
+            "items": items,
+            "mean_batch_size": float(items) / batches if batches else 0.0,
+            "batch_sizes": sizes,
+        }
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._thread.join()
+
+
+class BatchedTextSystem(object):
+    """
+    OCR of the images of concurrent requests with a shared det, cls and rec
+    DynamicBatcher each, at the det_batch_num, cls_batch_num and rec_batch_num
+    of the TextSystem args. The crops of one request are recognized together
+    with the crops of the other requests in flight.
+    """
+
+    def __init__(self, text_system, max_wait_ms=5):
+        self.text_system = text_system
+        args = text_system.args
+        self.det = DynamicBatcher(
+            self._detect_batch, args.det_batch_num, max_wait_ms, name="det_batcher"
+        )
+        self.cls = None
+        if text_system.use_angle_cls:
+            self.cls = DynamicBatcher(
+                lambda crops: text_system.text_classifier(crops)[0],
+                args.cls_batch_num,
+                max_wait_ms,
+                name="cls_batcher",
+            )
+        self.rec = DynamicBatcher(
+            lambda crops: list(text_system.text_recognizer(crops)[0]),
+            args.rec_batch_num,
+            max_wait_ms,
+            name="rec_batcher",
+        )
+
+    def _detect_batch(self, imgs):
+        if len(imgs) > 1:
+            return self.text_system.text_detector.predict_batch(imgs)[0]
+        return [self.text_system.detect(img)[0] for img in imgs]
+
+    def __call__(self, img_list, cls=True):
+        """
+        args:
+            img_list(list): images with shape [h, w, 3], None entries are skipped
+        return:
+            list of (filter_boxes, filter_rec_res) per image, (None, None) for
+            the None images and the images without boxes
+        """
+        text_system = self.text_system
+        det_futures = [
+            None if img is None else self.det.submit(img) for img in img_list
+        ]
+        pending = []
+        for img, det_future in zip(img_list, det_futures):
+            dt_boxes = None if det_future is None else det_future.result()
+            if dt_boxes is None:
+                pending.append(None)
+                continue
+            dt_boxes = text_system.sort_boxes(dt_boxes)
+            crops = text_system.crop(img, dt_boxes)
+            if self.cls is not None and cls:
+                crops = self.cls.map(crops)
+            # the rec of this image runs while the next one is cropped
+            pending.append((dt_boxes, self.rec.submit_many(crops)))
+
+        results = []
+        for entry in pending:
+            if entry is None:
+                results.append((None, None))
+                continue
+            dt_boxes, rec_futures = entry
+            rec_res = [future.result() for future in rec_futures]
+            results.append(text_system.filter_rec_res(dt_boxes, rec_res))
+        return results
+
+    def stats(self):
+        stats = {"det": self.det.stats(), "rec": self.rec.stats()}
+        if self.cls is not None:
+            stats["cls"] = self.cls.stats()
+        return stats
+
+    def close(self):
+        for batcher in (self.det, self.cls, self.rec):
+            if batcher is not None:
+                batcher.close()
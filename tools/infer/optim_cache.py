@@ -0,0 +1,173 @@
+# Copyright (c) 2024 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Persistent cache of optimized models, used by create_predictor when
+--optim_cache_dir is set.
+
+Each model gets a directory named after the hash of the model files and of the
+device and precision it is optimized for. Paddle saves the program produced by
+its IR passes there on the first start and later starts load it with the IR
+optimization switched off; with TensorRT the directory holds the serialized
+engines. onnxruntime saves its optimized graph to `model.onnx` in it.
+
+A cached program that fails to load, e.g. a oneDNN program on paddle versions
+that cannot deserialize it, is marked unsupported and the model is optimized
+on every start as without the cache.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+
+__all__ = [
+    "device_key",
+    "mark_unsupported",
+    "model_digest",
+    "model_cache_dir",
+    "onnx_optimized_path",
+    "paddle_optimized_model",
+    "publish",
+]
+
+UNSUPPORTED = "unsupported"
+DIGEST_INDEX = "digests.json"
+
+
+def _file_state(path):
+    st = os.stat(path)
+    return "{}|{}|{}".format(os.path.abspath(path), st.st_size, st.st_mtime_ns)
+
+
+def model_digest(paths, cache_root=None):
+    """
+    sha1 of the content of the model files. The digests are remembered in the
+    cache root by path, size and mtime, so unchanged models are not read again.
+    """
+    index_path = os.path.join(cache_root, DIGEST_INDEX) if cache_root else None
+    index = {}
+    if index_path and os.path.exists(index_path):
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except ValueError:
+            index = {}
+    state = ";".join(_file_state(path) for path in paths)
+    if state in index:
+        return index[state]
+
+    h = hashlib.sha1()
+    for path in paths:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    digest = h.hexdigest()
+    if index_path:
+        index[state] = digest
+        tmp_path = "{}.{}".format(index_path, os.getpid())
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, index_path)
+    return digest
+
+
+def device_key(args, mode):
+    """The args that change the optimized program of a model."""
+    if args.use_onnx:
+        import onnxruntime as ort
+
+        return {
+            "runtime": "onnxruntime " + ort.__version__,
+            "providers": args.onnx_providers or ("cuda" if args.use_gpu else "cpu"),
+            "gpu_id": args.gpu_id if args.use_gpu else None,
+        }
+    import paddle
+
+    device = "cpu"
+    if args.use_gpu:
+        device = "gpu:{}".format(args.gpu_id)
+    else:
+        for name in ["npu", "mlu", "xpu", "gcu"]:
+            if getattr(args, "use_" + name, False):
+                device = name
+                break
+    return {
+        "runtime": "paddle " + paddle.__version__,
+        "device": device,
+        "mode": mode,
+        "rec_algorithm": args.rec_algorithm if mode == "rec" else None,
+        "precision": getattr(args, "precision", "fp32"),
+        "use_tensorrt": args.use_tensorrt,
+        "max_batch_size": args.max_batch_size if args.use_tensorrt else None,
+        "min_subgraph_size": args.min_subgraph_size if args.use_tensorrt else None,
+        "enable_mkldnn": args.enable_mkldnn,
+    }
+
+
+def model_cache_dir(args, mode, model_files):
+    """Cache directory of the model, None when --optim_cache_dir is not set."""
+    cache_root = getattr(args, "optim_cache_dir", None)
+    if not cache_root:
+        return None
+    os.makedirs(cache_root, exist_ok=True)
+    key = json.dumps(
+        [model_digest(model_files, cache_root), device_key(args, mode)],
+        sort_keys=True,
+        default=str,
+    )
+    name = "{}_{}".format(mode, hashlib.sha1(key.encode("utf-8")).hexdigest()[:16])
+    return os.path.join(cache_root, name)
+
+
+def is_unsupported(cache_dir):
+    return os.path.exists(os.path.join(cache_dir, UNSUPPORTED))
+
+
+def mark_unsupported(cache_dir, error):
+    """Do not load or save the optimized model of this directory again."""
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(os.path.join(cache_dir, UNSUPPORTED), "w", encoding="utf-8") as f:
+        f.write(str(error))
+
+
+def paddle_optimized_model(cache_dir):
+    """(model, params) paths of the saved optimized program, or None."""
+    if cache_dir is None or is_unsupported(cache_dir):
+        return None
+    params_file = os.path.join(cache_dir, "_optimized.pdiparams")
+    for name in ["_optimized.json", "_optimized.pdmodel"]:
+        model_file = os.path.join(cache_dir, name)
+        if os.path.exists(model_file) and os.path.exists(params_file):
+            return model_file, params_file
+    return None
+
+
+def publish(tmp_dir, cache_dir):
+    """
+    Move a directory written by this process into place. When another process
+    got there first its copy is kept.
+    """
+    if not os.listdir(tmp_dir):
+        os.rmdir(tmp_dir)
+        return
+    try:
+        os.rename(tmp_dir, cache_dir)
+    except OSError:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def onnx_optimized_path(cache_dir):
+    """Path of the optimized onnx graph, and whether it was saved already."""
+    path = os.path.join(cache_dir, "model.onnx")
+    return path, os.path.exists(path)
@@ -0,0 +1,297 @@
+# Copyright (c) 2024 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Streaming execution of TextSystem.
+
+Every stage (decode -> det -> crop/sort -> cls -> rec -> serialize) runs in its
+own worker thread and the stages are connected by bounded queues, so page N+1
+is decoded and detected while page N is being recognized. Each predictor is
+only ever used by the thread of its own stage.
+"""
+
+import queue
+import threading
+import time
+import traceback
+
+import cv2
+
+from ppocr.utils.logging import get_logger
+from ppocr.utils.instrumentation import get_metrics
+from ppocr.utils.utility import check_and_read, close_pages
+from tools.infer.utility import get_pdf_options
+
+logger = get_logger()
+metrics = get_metrics()
+
+__all__ = ["TextSystemPipeline", "load_image_pages"]
+
+_SENTINEL = object()
+
+
+class _Failure(object):
+    def __init__(self, stage, exc):
+        self.stage = stage
+        self.exc = exc
+        self.traceback = traceback.format_exc()
+
+
+def load_image_pages(image_file, page_num=0, **pdf_options):
+    """
+    Read an image file into a list of pages. pdf files give a lazy PDFPages
+    sequence instead, its pages are rendered while they are iterated.
+    """
+    img, flag_gif, flag_pdf = check_and_read(
+        image_file, lazy=True, page_num=page_num, **pdf_options
+    )
+    if not flag_gif and not flag_pdf:
+        img = cv2.imread(image_file)
+    if not flag_pdf:
+        if img is None:
+            logger.debug("error in loading image:{}".format(image_file))
+            return []
+        return [img]
+    return img
+
+
+class _StageStats(object):
+    def __init__(self, name, in_queue):
+        self.name = name
+        self.in_queue = in_queue
+        self.items = 0
+        self.busy = 0.0
+        self.max_queue_depth = 0
+
+    def as_dict(self):
+        return {
+            "queue_depth": self.in_queue.qsize() if self.in_queue is not None else 0,
+            "max_queue_depth": self.max_queue_depth,
+            "items": self.items,
+            "busy": self.busy,
+        }
+
+
+class TextSystemPipeline(object):
+    """
+    args:
+        text_system(TextSystem): the detector / classifier / recognizer to run
+        queue_size(int): capacity of every inter-stage queue
+        cls(bool): run the angle classifier if the text system has one
+        slice(dict): sliding window params, see TextSystem.detect
+        loader(callable): maps one input to a list of pages, default handles
+            ndarrays and image / gif / pdf paths
+        serializer(callable): optional fn(item) run in the last stage, its
+            return value is stored in item["output"]
+    """
+
+    def __init__(
+        self,
+        text_system,
+        queue_size=4,
+        cls=True,
+        slice={},
+        loader=None,
+        serializer=None,
+    ):
+        self.text_system = text_system
+        self.queue_size = max(1, queue_size)
+        self.use_cls = text_system.use_angle_cls and cls
+        self.slice = slice
+        self.pdf_options = get_pdf_options(text_system.args)
+        self.loader = loader if loader is not None else self._default_loader
+        self.serializer = serializer
+        self._stats = {}
+        self._stop = threading.Event()
+
+    def _default_loader(self, item):
+        if isinstance(item, str):
+            return load_image_pages(item, **self.pdf_options)
+        return [item]
+
+    def _detect(self, item):
+        dt_boxes, elapse = self.text_system.detect(item["img"], self.slice)
+        item["time_dict"]["det"] = elapse
+        item["dt_boxes"] = dt_boxes
+        return item
+
+    def _crop(self, item):
+        if item["dt_boxes"] is None:
+            item["crops"] = []
+            return item
+        item["dt_boxes"] = self.text_system.sort_boxes(item["dt_boxes"])
+        item["crops"] = self.text_system.crop(item["img"], item["dt_boxes"])
+        return item
+
+    def _classify(self, item):
+        if len(item["crops"]) > 0:
+            st = time.time()
+            item["crops"], _, _ = self.text_system.text_classifier(item["crops"])
+            item["time_dict"]["cls"] = time.time() - st
+        return item
+
+    def _recognize(self, item):
+        if item["dt_boxes"] is None:
+            item["rec_res"] = None
+            return item
+        st = time.time()
+        rec_res, _ = self.text_system.text_recognizer(item["crops"])
+        item["time_dict"]["rec"] = time.time() - st
+        item["dt_boxes"], item["rec_res"] = self.text_system.filter_rec_res(
+            item["dt_boxes"], rec_res
+        )
+        # crops are not needed any more, release them early
+        item["crops"] = None
+        return item
+
+    def _serialize(self, item):
+        with metrics.span("serialize"):
+            item["output"] = self.serializer(item)
+        return item
+
+    def stats(self):
+        """Per-stage queue depth, max depth, processed items and busy seconds."""
+        return {name: stats.as_dict() for name, stats in self._stats.items()}
+
+    def _put(self, out_queue, item):
+        while not self._stop.is_set():
+            try:
+                out_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _source(self, inputs, out_queue, stats):
+        try:
+            for input_idx, input_item in enumerate(inputs):
+                if self._stop.is_set():
+                    return
+                st = time.time()
+                try:
+                    with metrics.span("decode"):
+                        pages = self.loader(input_item)
+                except Exception as e:
+                    pages = None
+                    failure = _Failure("decode", e)
+                stats.busy += time.time() - st
+                if pages is None:
+                    self._put(out_queue, failure)
+                    return
+                try:
+                    for page_idx, img in enumerate(pages):
+                        stats.items += 1
+                        item = {
+                            "input_idx": input_idx,
+                            "page_idx": page_idx,
+                            "input": input_item,
+                            "img": img,
+                            "time_dict": {"det": 0, "rec": 0, "cls": 0, "all": 0},
+                            "start": time.time(),
+                        }
+                        if not self._put(out_queue, item):
+                            return
+                finally:
+                    close_pages(pages)
+        finally:
+            self._put(out_queue, _SENTINEL)
+
+    def _worker(self, name, func, in_queue, out_queue, stats):
+        while True:
+            try:
+                item = in_queue.get(timeout=0.1)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return
+                continue
+            stats.max_queue_depth = max(stats.max_queue_depth, in_queue.qsize() + 1)
+            if item is _SENTINEL or isinstance(item, _Failure):
+                self._put(out_queue, item)
+                if item is _SENTINEL:
+                    return
+                continue
+            if self._stop.is_set():
+                continue
+            st = time.time()
+            try:
+                if item["img"] is not None:
+                    item = func(item)
+                else:
+                    item.update(dt_boxes=None, crops=[], rec_res=None)
+            except Exception as e:
+                item = _Failure(name, e)
+            stats.busy += time.time() - st
+            stats.items += 1
+            self._put(out_queue, item)
+
+    def run(self, inputs):
+        """
+        Generator over the OCR results of `inputs`, in input order. Yields one
+        dict per page with keys input_idx, page_idx, input, img, dt_boxes,
+        rec_res, time_dict (and output when a serializer is set).
+        """
+        stages = [("det", self._detect), ("crop", self._crop)]
+        if self.use_cls:
+            stages.append(("cls", self._classify))
+        stages.append(("rec", self._recognize))
+        if self.serializer is not None:
+            stages.append(("serialize", self._serialize))
+
+        self._stop.clear()
+        queues = [queue.Queue(self.queue_size) for _ in range(len(stages) + 1)]
+        self._stats = {"decode": _StageStats("decode", None)}
+        threads = [
+            threading.Thread(
+                target=self._source,
+                args=(inputs, queues[0], self._stats["decode"]),
+                daemon=True,
+            )
+        ]
+        for i, (name, func) in enumerate(stages):
+            self._stats[name] = _StageStats(name, queues[i])
+            threads.append(
+                threading.Thread(
+                    target=self._worker,
+                    args=(name, func, queues[i], queues[i + 1], self._stats[name]),
+                    daemon=True,
+                )
+            )
+        for t in threads:
+            t.start()
+
+        out_queue = queues[-1]
+        try:
+            while True:
+                item = out_queue.get()
+                if item is _SENTINEL:
+                    break
+                if isinstance(item, _Failure):
+                    logger.error(
+                        "pipeline stage {} failed:\n{}".format(
+                            item.stage, item.traceback
+                        )
+                    )
+                    raise item.exc
+                item["time_dict"]["all"] = time.time() - item.pop("start")
+                yield item
+        finally:
+            self._stop.set()
+            for q in queues:
+                # unblock producers waiting on a full queue
+                while True:
+                    try:
+                        q.get_nowait()
+                    except queue.Empty:
+                        break
+            for t in threads:
+                t.join(timeout=1.0)
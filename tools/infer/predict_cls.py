@@ -28,11 +28,14 @@ import time
 import traceback
 
 import tools.infer.utility as utility
+from tools.infer.predictor_pool import PredictorPool
 from ppocr.postprocess import build_post_process
 from ppocr.utils.logging import get_logger
+from ppocr.utils.instrumentation import configure_metrics, get_metrics
 from ppocr.utils.utility import get_image_file_list, check_and_read
 
 logger = get_logger()
+metrics = get_metrics()
 
 
 class TextClassifier(object):
@@ -51,6 +54,10 @@ class TextClassifier(object):
             self.output_tensors,
             _,
         ) = utility.create_predictor(args, "cls", logger)
+        configure_metrics(args)
+        self.predictor_pool = PredictorPool(
+            args, "cls", self.predictor, self.input_tensor, self.output_tensors
+        )
         self.use_onnx = args.use_onnx
 
     def resize_norm_img(self, img):
@@ -97,32 +104,36 @@ class TextClassifier(object):
                 h, w = img_list[indices[ino]].shape[0:2]
                 wh_ratio = w * 1.0 / h
                 max_wh_ratio = max(max_wh_ratio, wh_ratio)
-            for ino in range(beg_img_no, end_img_no):
-                norm_img = self.resize_norm_img(img_list[indices[ino]])
-                norm_img = norm_img[np.newaxis, :]
-                norm_img_batch.append(norm_img)
-            norm_img_batch = np.concatenate(norm_img_batch)
-            norm_img_batch = norm_img_batch.copy()
+            metrics.observe("cls.batch_fill", (end_img_no - beg_img_no) / batch_num)
+            with metrics.span("cls.pre"):
+                for ino in range(beg_img_no, end_img_no):
+                    norm_img = self.resize_norm_img(img_list[indices[ino]])
+                    norm_img = norm_img[np.newaxis, :]
+                    norm_img_batch.append(norm_img)
+                norm_img_batch = np.concatenate(norm_img_batch)
+                norm_img_batch = norm_img_batch.copy()
 
-            if self.use_onnx:
-                input_dict = {}
-                input_dict[self.input_tensor.name] = norm_img_batch
-                outputs = self.predictor.run(self.output_tensors, input_dict)
-                prob_out = outputs[0]
-            else:
-                self.input_tensor.copy_from_cpu(norm_img_batch)
-                self.predictor.run()
-                prob_out = self.output_tensors[0].copy_to_cpu()
-                self.predictor.try_shrink_memory()
-            cls_result = self.postprocess_op(prob_out)
-            elapse += time.time() - starttime
-            for rno in range(len(cls_result)):
-                label, score = cls_result[rno]
-                cls_res[indices[beg_img_no + rno]] = [label, score]
-                if "180" in label and score > self.cls_thresh:
-                    img_list[indices[beg_img_no + rno]] = cv2.rotate(
-                        img_list[indices[beg_img_no + rno]], 1
-                    )
+            with metrics.span("cls.infer"), self.predictor_pool.checkout() as handle:
+                if self.use_onnx:
+                    input_dict = {}
+                    input_dict[handle.input_tensor.name] = norm_img_batch
+                    outputs = handle.predictor.run(handle.output_tensors, input_dict)
+                    prob_out = outputs[0]
+                else:
+                    handle.input_tensor.copy_from_cpu(norm_img_batch)
+                    handle.predictor.run()
+                    prob_out = handle.output_tensors[0].copy_to_cpu()
+                    handle.predictor.try_shrink_memory()
+            with metrics.span("cls.post"):
+                cls_result = self.postprocess_op(prob_out)
+                elapse += time.time() - starttime
+                for rno in range(len(cls_result)):
+                    label, score = cls_result[rno]
+                    cls_res[indices[beg_img_no + rno]] = [label, score]
+                    if "180" in label and score > self.cls_thresh:
+                        img_list[indices[beg_img_no + rno]] = cv2.rotate(
+                            img_list[indices[beg_img_no + rno]], 1
+                        )
         return img_list, cls_res, elapse
 
 
@@ -26,12 +26,17 @@ import time
 import sys
 
 import tools.infer.utility as utility
+from tools.infer.predictor_pool import PredictorPool
 from ppocr.utils.logging import get_logger
-from ppocr.utils.utility import get_image_file_list, check_and_read
+from ppocr.utils.instrumentation import configure_metrics, get_metrics
+from ppocr.utils.utility import get_image_file_list, check_and_read, close_pages
 from ppocr.data import create_operators, transform
 from ppocr.postprocess import build_post_process
+from ppocr.postprocess.parallel import map_ordered
 import json
 
+metrics = get_metrics()
+
 
 class TextDetector(object):
     def __init__(self, args, logger=None):
@@ -122,12 +127,16 @@ class TextDetector(object):
             postprocess_params["beta"] = args.beta
             postprocess_params["fourier_degree"] = args.fourier_degree
             postprocess_params["box_type"] = args.det_box_type
+            postprocess_params["nms_mode"] = getattr(args, "det_fce_nms_mode", "poly")
         elif self.det_algorithm == "CT":
             pre_process_list[0] = {"ScaleAlignedShort": {"short_size": 640}}
             postprocess_params["name"] = "CTPostProcess"
         else:
             logger.info("unknown det_algorithm:{}".format(self.det_algorithm))
             sys.exit(0)
+        self.postprocess_threads = max(1, getattr(args, "det_postprocess_threads", 1))
+        if self.det_algorithm in ["DB", "DB++", "PSE", "FCE", "CT"]:
+            postprocess_params["num_threads"] = self.postprocess_threads
 
         self.preprocess_op = create_operators(pre_process_list)
         self.postprocess_op = build_post_process(postprocess_params)
@@ -137,9 +146,19 @@ class TextDetector(object):
             self.output_tensors,
             self.config,
         ) = utility.create_predictor(args, "det", logger)
-
+        configure_metrics(args)
+        self.predictor_pool = PredictorPool(
+            args, "det", self.predictor, self.input_tensor, self.output_tensors
+        )
+
+        # an onnx model with a fixed batch or input size can not run the
+        # padded batches of predict_batch
+        self.static_input = False
         if self.use_onnx:
-            img_h, img_w = self.input_tensor.shape[2:]
+            img_n, _, img_h, img_w = self.input_tensor.shape
+            self.static_input = any(
+                isinstance(dim, int) and dim > 0 for dim in [img_n, img_h, img_w]
+            )
             if isinstance(img_h, str) or isinstance(img_w, str):
                 pass
             elif img_h is not None and img_w is not None and img_h > 0 and img_w > 0:
@@ -227,39 +246,22 @@ class TextDetector(object):
         dt_boxes = np.array(dt_boxes_new)
         return dt_boxes
 
-    def predict(self, img):
-        ori_im = img.copy()
-        data = {"image": img}
-
-        st = time.time()
-
-        if self.args.benchmark:
-            self.autolog.times.start()
-
-        data = transform(data, self.preprocess_op)
-        img, shape_list = data
-        if img is None:
-            return None, 0
-        img = np.expand_dims(img, axis=0)
-        shape_list = np.expand_dims(shape_list, axis=0)
-        img = img.copy()
-
-        if self.args.benchmark:
-            self.autolog.times.stamp()
-        if self.use_onnx:
-            input_dict = {}
-            input_dict[self.input_tensor.name] = img
-            outputs = self.predictor.run(self.output_tensors, input_dict)
-        else:
-            self.input_tensor.copy_from_cpu(img)
-            self.predictor.run()
-            outputs = []
-            for output_tensor in self.output_tensors:
-                output = output_tensor.copy_to_cpu()
-                outputs.append(output)
-            if self.args.benchmark:
-                self.autolog.times.stamp()
-
+    def _run_predictor(self, img):
+        with metrics.span("det.infer"), self.predictor_pool.checkout() as handle:
+            if self.use_onnx:
+                input_dict = {}
+                input_dict[handle.input_tensor.name] = img
+                outputs = handle.predictor.run(handle.output_tensors, input_dict)
+            else:
+                handle.input_tensor.copy_from_cpu(img)
+                handle.predictor.run()
+                outputs = []
+                for output_tensor in handle.output_tensors:
+                    output = output_tensor.copy_to_cpu()
+                    outputs.append(output)
+        return outputs
+
+    def _build_preds(self, outputs):
         preds = {}
         if self.det_algorithm == "EAST":
             preds["f_geo"] = outputs[0]
@@ -279,20 +281,134 @@ class TextDetector(object):
             preds["score"] = outputs[1]
         else:
             raise NotImplementedError
+        return preds
 
-        post_result = self.postprocess_op(preds, shape_list)
-        dt_boxes = post_result[0]["points"]
-
+    def _filter_boxes(self, dt_boxes, image_shape):
         if self.args.det_box_type == "poly":
-            dt_boxes = self.filter_tag_det_res_only_clip(dt_boxes, ori_im.shape)
-        else:
-            dt_boxes = self.filter_tag_det_res(dt_boxes, ori_im.shape)
+            return self.filter_tag_det_res_only_clip(dt_boxes, image_shape)
+        return self.filter_tag_det_res(dt_boxes, image_shape)
+
+    def predict(self, img):
+        ori_shape = img.shape
+        data = {"image": img}
+
+        st = time.time()
+
+        if self.args.benchmark:
+            self.autolog.times.start()
+
+        with metrics.span("det.pre"):
+            data = transform(data, self.preprocess_op)
+        img, shape_list = data
+        if img is None:
+            return None, 0
+        img = np.expand_dims(img, axis=0)
+        shape_list = np.expand_dims(shape_list, axis=0)
+        img = img.copy()
+
+        if self.args.benchmark:
+            self.autolog.times.stamp()
+        outputs = self._run_predictor(img)
+        if self.args.benchmark and not self.use_onnx:
+            self.autolog.times.stamp()
+
+        with metrics.span("det.post"):
+            preds = self._build_preds(outputs)
+            post_result = self.postprocess_op(preds, shape_list)
+            dt_boxes = post_result[0]["points"]
+            dt_boxes = self._filter_boxes(dt_boxes, ori_shape)
 
         if self.args.benchmark:
             self.autolog.times.end(stamp=True)
         et = time.time()
         return dt_boxes, et - st
 
+    def _bucket_shape(self, h, w):
+        step = self.args.det_batch_bucket_step
+        pad_h, pad_w = int(np.ceil(h / step) * step), int(np.ceil(w / step) * step)
+        if self.args.det_limit_type == "max":
+            # the padding does not go past the limit the images are resized to
+            limit = int(self.args.det_limit_side_len) // 32 * 32
+            pad_h, pad_w = min(pad_h, max(h, limit)), min(pad_w, max(w, limit))
+        return pad_h, pad_w
+
+    def predict_batch(self, imgs, batch_num=None):
+        """
+        Detect text in several images with batched predictor runs.
+
+        Every image is resized as in predict(), padded with zeros to its shape
+        bucket (height and width rounded up to det_batch_bucket_step, but not
+        past det_limit_side_len with det_limit_type max) and the images of one
+        bucket are run together, at most `batch_num` (default det_batch_num)
+        at a time.
+        The output maps are cropped back to each image's resized size before
+        post-processing, so boxes go through each image's own shape_list.
+
+        Only DB / DB++ (whose maps have the input resolution) are batched,
+        other algorithms and onnx models with static input dims run image by
+        image.
+
+        return:
+            dt_boxes_list(list): dt_boxes of each image, None if it can not be resized
+            elapse(float): total time
+        """
+        if self.det_algorithm not in ["DB", "DB++"] or self.static_input:
+            dt_boxes_list, elapse = [], 0
+            for img in imgs:
+                dt_boxes, sub_elapse = self(img)
+                dt_boxes_list.append(dt_boxes)
+                elapse += sub_elapse
+            return dt_boxes_list, elapse
+
+        st = time.time()
+        if batch_num is None:
+            batch_num = self.args.det_batch_num
+        batch_num = max(1, batch_num)
+        norm_imgs, shape_lists, buckets = [], [], {}
+        for idx, img in enumerate(imgs):
+            with metrics.span("det.pre"):
+                norm_img, shape_list = transform({"image": img}, self.preprocess_op)
+            norm_imgs.append(norm_img)
+            shape_lists.append(shape_list)
+            if norm_img is None:
+                continue
+            key = self._bucket_shape(*norm_img.shape[1:])
+            buckets.setdefault(key, []).append(idx)
+
+        dt_boxes_list = [None] * len(imgs)
+        for (pad_h, pad_w), indices in buckets.items():
+            for beg in range(0, len(indices), batch_num):
+                batch_indices = indices[beg : beg + batch_num]
+                metrics.observe("det.batch_fill", len(batch_indices) / batch_num)
+                batch = np.zeros(
+                    (len(batch_indices), 3, pad_h, pad_w), dtype=np.float32
+                )
+                for i, idx in enumerate(batch_indices):
+                    _, h, w = norm_imgs[idx].shape
+                    batch[i, :, :h, :w] = norm_imgs[idx]
+                maps = self._build_preds(self._run_predictor(batch))["maps"]
+
+                def postprocess(i):
+                    idx = batch_indices[i]
+                    _, h, w = norm_imgs[idx].shape
+                    with metrics.span("det.post"):
+                        post_result = self.postprocess_op(
+                            {"maps": maps[i : i + 1, :, :h, :w]},
+                            np.expand_dims(shape_lists[idx], axis=0),
+                        )
+                        return self._filter_boxes(
+                            post_result[0]["points"], imgs[idx].shape
+                        )
+
+                # the images are cropped from their own maps, they are
+                # post-processed one by one on the post-processing threads
+                batch_boxes = map_ordered(
+                    postprocess, range(len(batch_indices)), self.postprocess_threads
+                )
+                for idx, dt_boxes in zip(batch_indices, batch_boxes):
+                    dt_boxes_list[idx] = dt_boxes
+        return dt_boxes_list, time.time() - st
+
     def __call__(self, img, use_slice=False):
         # For image like poster with one side much greater than the other side,
         # splitting recursively and processing with overlap to enhance performance.
@@ -422,7 +538,9 @@ if __name__ == "__main__":
 
     save_results = []
     for idx, image_file in enumerate(image_file_list):
-        img, flag_gif, flag_pdf = check_and_read(image_file)
+        img, flag_gif, flag_pdf = check_and_read(
+            image_file, lazy=True, **utility.get_pdf_options(args)
+        )
         if not flag_gif and not flag_pdf:
             img = cv2.imread(image_file)
         if not flag_pdf:
@@ -431,14 +549,21 @@ if __name__ == "__main__":
                 continue
             imgs = [img]
         else:
-            page_num = args.page_num
-            if page_num > len(img) or page_num == 0:
-                page_num = len(img)
-            imgs = img[:page_num]
+            imgs = img
+        if args.det_batch_num > 1:
+            # pdf pages are detected in batches
+            pages, imgs = imgs, list(imgs)
+            close_pages(pages)
+            st = time.time()
+            batch_dt_boxes, _ = text_detector.predict_batch(imgs)
+            batch_elapse = (time.time() - st) / max(1, len(imgs))
         for index, img in enumerate(imgs):
             st = time.time()
-            dt_boxes, _ = text_detector(img)
-            elapse = time.time() - st
+            if args.det_batch_num > 1:
+                dt_boxes, elapse = batch_dt_boxes[index], batch_elapse
+            else:
+                dt_boxes, _ = text_detector(img)
+                elapse = time.time() - st
             total_time += elapse
             if len(imgs) > 1:
                 save_pred = (
@@ -482,6 +607,7 @@ if __name__ == "__main__":
             )
             cv2.imwrite(img_path, src_im)
             logger.info("The visualized image saved in {}".format(img_path))
+        close_pages(imgs)
 
     with open(os.path.join(draw_img_save_dir, "det_results.txt"), "w") as f:
         f.writelines(save_results)
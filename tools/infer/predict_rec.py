@@ -24,16 +24,21 @@ os.environ["FLAGS_allocator_strategy"] = "auto_growth"
 import cv2
 import numpy as np
 import math
+import bisect
 import time
 import traceback
 import paddle
 
 import tools.infer.utility as utility
+from tools.infer.predictor_pool import PredictorPool
 from ppocr.postprocess import build_post_process
+from ppocr.postprocess.rec_candidates import RecCandidates, weighted_top1_scores
 from ppocr.utils.logging import get_logger
+from ppocr.utils.instrumentation import configure_metrics, get_metrics
 from ppocr.utils.utility import get_image_file_list, check_and_read
 
 logger = get_logger()
+metrics = get_metrics()
 
 
 class TextRecognizer(object):
@@ -47,7 +52,10 @@ class TextRecognizer(object):
             "name": "CTCLabelDecode",
             "character_dict_path": args.rec_char_dict_path,
             "use_space_char": args.use_space_char,
-            "merge_repeated": False if "SVTR" in args.rec_algorithm else True  # 根據算法動態設置
+            "merge_repeated": False if "SVTR" in args.rec_algorithm else True,  # 根據算法動態設置
+            "topk": args.rec_topk,
+            "compact_result": args.rec_compact_result,
+            "candidate_dtype": args.rec_candidate_dtype,
         }
         if self.rec_algorithm == "SRN":
             postprocess_params = {
@@ -153,6 +161,10 @@ class TextRecognizer(object):
             self.output_tensors,
             self.config,
         ) = utility.create_predictor(args, "rec", logger)
+        configure_metrics(args)
+        self.predictor_pool = PredictorPool(
+            args, "rec", self.predictor, self.input_tensor, self.output_tensors
+        )
         self.benchmark = args.benchmark
         self.use_onnx = args.use_onnx
         if args.benchmark:
@@ -175,6 +187,84 @@ class TextRecognizer(object):
                 logger=logger,
             )
         self.return_word_box = args.return_word_box
+        # 寬度分桶: 只有預設的 resize_norm_img 路徑會依 batch 的 max_wh_ratio 補寬
+        self.rec_width_buckets = sorted(
+            int(v) for v in args.rec_width_buckets.split(",") if v.strip()
+        )
+        self.use_width_buckets = len(
+            self.rec_width_buckets
+        ) > 0 and self.rec_algorithm not in [
+            "SAR",
+            "SRN",
+            "SVTR",
+            "SATRN",
+            "ParseQ",
+            "CPPD",
+            "CPPDPadding",
+            "VisionLAN",
+            "PREN",
+            "SPIN",
+            "ABINet",
+            "RobustScanner",
+            "CAN",
+            "LaTeXOCR",
+            "NRTR",
+            "ViTSTR",
+            "RFL",
+            "RARE",
+        ]
+        self.width_bucket_hits = {}
+
+    def width_bucket(self, wh_ratio):
+        """
+        Padded input width of a crop: the smallest rec_width_buckets entry that
+        fits it without squeezing. Wider crops are rounded up to multiples of
+        the last ladder step.
+        """
+        imgH, imgW = self.rec_image_shape[1:3]
+        width = max(imgW, int(math.ceil(imgH * wh_ratio)))
+        ladder = self.rec_width_buckets
+        pos = bisect.bisect_left(ladder, width)
+        if pos < len(ladder):
+            return ladder[pos]
+        step = ladder[-1] - ladder[-2] if len(ladder) > 1 else ladder[-1]
+        return ladder[-1] + int(math.ceil((width - ladder[-1]) / step)) * step
+
+    def width_bucket_stats(self):
+        """Crops and batches per bucket width since the recognizer was created."""
+        return {
+            width: dict(hits) for width, hits in sorted(self.width_bucket_hits.items())
+        }
+
+    def batch_ranges(self, sorted_ratios):
+        """
+        Split the width-sorted crops into [beg, end) batches of at most
+        rec_batch_num crops. With width buckets a batch never mixes two
+        widths; the bucket width of each batch is returned with it (None
+        without buckets).
+        """
+        img_num = len(sorted_ratios)
+        batch_num = self.rec_batch_num
+        if not self.use_width_buckets:
+            return [
+                (beg, min(img_num, beg + batch_num), None)
+                for beg in range(0, img_num, batch_num)
+            ]
+        buckets = [self.width_bucket(ratio) for ratio in sorted_ratios]
+        ranges = []
+        beg = 0
+        while beg < img_num:
+            end = min(img_num, beg + batch_num)
+            # buckets are non-decreasing, so the batch ends at the first wider crop
+            end = bisect.bisect_right(buckets, buckets[beg], beg, end)
+            ranges.append((beg, end, buckets[beg]))
+            hits = self.width_bucket_hits.setdefault(
+                buckets[beg], {"crops": 0, "batches": 0}
+            )
+            hits["crops"] += end - beg
+            hits["batches"] += 1
+            beg = end
+        return ranges
 
     def resize_norm_img(self, img, max_wh_ratio):
         imgC, imgH, imgW = self.rec_image_shape
@@ -214,7 +304,9 @@ class TextRecognizer(object):
                 imgW = w
         h, w = img.shape[:2]
         ratio = w / float(h)
-        if math.ceil(imgH * ratio) > imgW:
+        if h == imgH and w <= imgW:
+            resized_w = w
+        elif math.ceil(imgH * ratio) > imgW:
             resized_w = imgW
         else:
             resized_w = int(math.ceil(imgH * ratio))
@@ -222,7 +314,11 @@ class TextRecognizer(object):
             if resized_w > self.rec_image_shape[2]:
                 resized_w = self.rec_image_shape[2]
             imgW = self.rec_image_shape[2]
-        resized_image = cv2.resize(img, (resized_w, imgH))
+        if (h, w) == (imgH, resized_w):
+            # crop is already at the input size (CropEngine target_height)
+            resized_image = img
+        else:
+            resized_image = cv2.resize(img, (resized_w, imgH))
         resized_image = resized_image.astype("float32")
         resized_image = resized_image.transpose((2, 0, 1)) / 255
         resized_image -= 0.5
@@ -540,6 +636,32 @@ class TextRecognizer(object):
         img = img.astype("float32")
         return img
 
+    def _run_predictor(self, inputs):
+        """
+        Run one batch on a predictor of the pool. `inputs` are the model inputs
+        in input name order, onnx models only take the first one.
+        """
+        with metrics.span("rec.infer"), self.predictor_pool.checkout() as handle:
+            if self.use_onnx:
+                input_dict = {}
+                input_dict[handle.input_tensor.name] = inputs[0]
+                return handle.predictor.run(handle.output_tensors, input_dict)
+            if len(inputs) == 1:
+                handle.input_tensor.copy_from_cpu(inputs[0])
+            else:
+                input_names = handle.predictor.get_input_names()
+                for i in range(len(input_names)):
+                    input_tensor = handle.predictor.get_input_handle(input_names[i])
+                    input_tensor.copy_from_cpu(inputs[i])
+            handle.predictor.run()
+            outputs = []
+            for output_tensor in handle.output_tensors:
+                output = output_tensor.copy_to_cpu()
+                outputs.append(output)
+        if self.benchmark:
+            self.autolog.times.stamp()
+        return outputs
+
     def __call__(self, img_list):
         img_num = len(img_list)
         # logger.debug(f"Number of images to process: {img_num}")
@@ -555,111 +677,132 @@ class TextRecognizer(object):
         indices = np.argsort(np.array(width_list))
         # 初始化為包含基本信息的字典列表
         rec_res = [{"text": "", "score": 0.0, "char_details": []}] * img_num
-        batch_num = self.rec_batch_num
+        compact_res = []
+        is_ctc = self.postprocess_params["name"] == "CTCLabelDecode"
+        # decode_mode fast gives (text, conf) pairs, without char_details
+        fast_decode = (
+            is_ctc
+            and self.postprocess_op.decode_mode == "fast"
+            and not self.return_word_box
+        )
+        compact = (
+            is_ctc
+            and self.postprocess_op.compact_result
+            and not self.return_word_box
+            and not fast_decode
+        )
+        batch_ranges = self.batch_ranges([width_list[i] for i in indices])
         st = time.time()
         if self.benchmark:
             self.autolog.times.start()
-        for beg_img_no in range(0, img_num, batch_num):
-            end_img_no = min(img_num, beg_img_no + batch_num)
-            norm_img_batch = []
-            if self.rec_algorithm == "SRN":
-                encoder_word_pos_list = []
-                gsrm_word_pos_list = []
-                gsrm_slf_attn_bias1_list = []
-                gsrm_slf_attn_bias2_list = []
-            if self.rec_algorithm == "SAR":
-                valid_ratios = []
-            imgC, imgH, imgW = self.rec_image_shape[:3]
-            max_wh_ratio = imgW / imgH
-            wh_ratio_list = []
-            for ino in range(beg_img_no, end_img_no):
-                h, w = img_list[indices[ino]].shape[0:2]
-                wh_ratio = w * 1.0 / h
-                max_wh_ratio = max(max_wh_ratio, wh_ratio)
-                wh_ratio_list.append(wh_ratio)
-            for ino in range(beg_img_no, end_img_no):
+        for beg_img_no, end_img_no, bucket_width in batch_ranges:
+            metrics.observe(
+                "rec.batch_fill", (end_img_no - beg_img_no) / self.rec_batch_num
+            )
+            with metrics.span("rec.pre"):
+                norm_img_batch = []
+                if self.rec_algorithm == "SRN":
+                    encoder_word_pos_list = []
+                    gsrm_word_pos_list = []
+                    gsrm_slf_attn_bias1_list = []
+                    gsrm_slf_attn_bias2_list = []
                 if self.rec_algorithm == "SAR":
-                    norm_img, _, _, valid_ratio = self.resize_norm_img_sar(
-                        img_list[indices[ino]], self.rec_image_shape
-                    )
-                    norm_img = norm_img[np.newaxis, :]
-                    valid_ratio = np.expand_dims(valid_ratio, axis=0)
-                    valid_ratios.append(valid_ratio)
-                    norm_img_batch.append(norm_img)
-                elif self.rec_algorithm == "SRN":
-                    norm_img = self.process_image_srn(
-                        img_list[indices[ino]], self.rec_image_shape, 8, 25
-                    )
-                    encoder_word_pos_list.append(norm_img[1])
-                    gsrm_word_pos_list.append(norm_img[2])
-                    gsrm_slf_attn_bias1_list.append(norm_img[3])
-                    gsrm_slf_attn_bias2_list.append(norm_img[4])
-                    norm_img_batch.append(norm_img[0])
-                elif self.rec_algorithm in ["SVTR", "SATRN", "ParseQ", "CPPD"]:
-                    norm_img = self.resize_norm_img_svtr(
-                        img_list[indices[ino]], self.rec_image_shape
-                    )
-                    norm_img = norm_img[np.newaxis, :]
-                    norm_img_batch.append(norm_img)
-                elif self.rec_algorithm in ["CPPDPadding"]:
-                    norm_img = self.resize_norm_img_cppd_padding(
-                        img_list[indices[ino]], self.rec_image_shape
-                    )
-                    norm_img = norm_img[np.newaxis, :]
-                    norm_img_batch.append(norm_img)
-                elif self.rec_algorithm in ["VisionLAN", "PREN"]:
-                    norm_img = self.resize_norm_img_vl(
-                        img_list[indices[ino]], self.rec_image_shape
-                    )
-                    norm_img = norm_img[np.newaxis, :]
-                    norm_img_batch.append(norm_img)
-                elif self.rec_algorithm == "SPIN":
-                    norm_img = self.resize_norm_img_spin(img_list[indices[ino]])
-                    norm_img = norm_img[np.newaxis, :]
-                    norm_img_batch.append(norm_img)
-                elif self.rec_algorithm == "ABINet":
-                    norm_img = self.resize_norm_img_abinet(
-                        img_list[indices[ino]], self.rec_image_shape
-                    )
-                    norm_img = norm_img[np.newaxis, :]
-                    norm_img_batch.append(norm_img)
-                elif self.rec_algorithm == "RobustScanner":
-                    norm_img, _, _, valid_ratio = self.resize_norm_img_sar(
-                        img_list[indices[ino]],
-                        self.rec_image_shape,
-                        width_downsample_ratio=0.25,
-                    )
-                    norm_img = norm_img[np.newaxis, :]
-                    valid_ratio = np.expand_dims(valid_ratio, axis=0)
                     valid_ratios = []
-                    valid_ratios.append(valid_ratio)
-                    norm_img_batch.append(norm_img)
-                    word_positions_list = []
-                    word_positions = np.array(range(0, 40)).astype("int64")
-                    word_positions = np.expand_dims(word_positions, axis=0)
-                    word_positions_list.append(word_positions)
-                elif self.rec_algorithm == "CAN":
-                    norm_img = self.norm_img_can(img_list[indices[ino]], max_wh_ratio)
-                    norm_img = norm_img[np.newaxis, :]
-                    norm_img_batch.append(norm_img)
-                    norm_image_mask = np.ones(norm_img.shape, dtype="float32")
-                    word_label = np.ones([1, 36], dtype="int64")
-                    norm_img_mask_batch = []
-                    word_label_list = []
-                    norm_img_mask_batch.append(norm_image_mask)
-                    word_label_list.append(word_label)
-                elif self.rec_algorithm == "LaTeXOCR":
-                    norm_img = self.norm_img_latexocr(img_list[indices[ino]])
-                    norm_img = norm_img[np.newaxis, :]
-                    norm_img_batch.append(norm_img)
-                else:
-                    norm_img = self.resize_norm_img(
-                        img_list[indices[ino]], max_wh_ratio
-                    )
-                    norm_img = norm_img[np.newaxis, :]
-                    norm_img_batch.append(norm_img)
-            norm_img_batch = np.concatenate(norm_img_batch)
-            norm_img_batch = norm_img_batch.copy()
+                imgC, imgH, imgW = self.rec_image_shape[:3]
+                max_wh_ratio = imgW / imgH
+                wh_ratio_list = []
+                for ino in range(beg_img_no, end_img_no):
+                    h, w = img_list[indices[ino]].shape[0:2]
+                    wh_ratio = w * 1.0 / h
+                    max_wh_ratio = max(max_wh_ratio, wh_ratio)
+                    wh_ratio_list.append(wh_ratio)
+                if bucket_width is not None:
+                    max_wh_ratio = bucket_width / imgH
+                for ino in range(beg_img_no, end_img_no):
+                    if self.rec_algorithm == "SAR":
+                        norm_img, _, _, valid_ratio = self.resize_norm_img_sar(
+                            img_list[indices[ino]], self.rec_image_shape
+                        )
+                        norm_img = norm_img[np.newaxis, :]
+                        valid_ratio = np.expand_dims(valid_ratio, axis=0)
+                        valid_ratios.append(valid_ratio)
+                        norm_img_batch.append(norm_img)
+                    elif self.rec_algorithm == "SRN":
+                        norm_img = self.process_image_srn(
+                            img_list[indices[ino]], self.rec_image_shape, 8, 25
+                        )
+                        encoder_word_pos_list.append(norm_img[1])
+                        gsrm_word_pos_list.append(norm_img[2])
+                        gsrm_slf_attn_bias1_list.append(norm_img[3])
+                        gsrm_slf_attn_bias2_list.append(norm_img[4])
+                        norm_img_batch.append(norm_img[0])
+                    elif self.rec_algorithm in ["SVTR", "SATRN", "ParseQ", "CPPD"]:
+                        norm_img = self.resize_norm_img_svtr(
+                            img_list[indices[ino]], self.rec_image_shape
+                        )
+                        norm_img = norm_img[np.newaxis, :]
+                        norm_img_batch.append(norm_img)
+                    elif self.rec_algorithm in ["CPPDPadding"]:
+                        norm_img = self.resize_norm_img_cppd_padding(
+                            img_list[indices[ino]], self.rec_image_shape
+                        )
+                        norm_img = norm_img[np.newaxis, :]
+                        norm_img_batch.append(norm_img)
+                    elif self.rec_algorithm in ["VisionLAN", "PREN"]:
+                        norm_img = self.resize_norm_img_vl(
+                            img_list[indices[ino]], self.rec_image_shape
+                        )
+                        norm_img = norm_img[np.newaxis, :]
+                        norm_img_batch.append(norm_img)
+                    elif self.rec_algorithm == "SPIN":
+                        norm_img = self.resize_norm_img_spin(img_list[indices[ino]])
+                        norm_img = norm_img[np.newaxis, :]
+                        norm_img_batch.append(norm_img)
+                    elif self.rec_algorithm == "ABINet":
+                        norm_img = self.resize_norm_img_abinet(
+                            img_list[indices[ino]], self.rec_image_shape
+                        )
+                        norm_img = norm_img[np.newaxis, :]
+                        norm_img_batch.append(norm_img)
+                    elif self.rec_algorithm == "RobustScanner":
+                        norm_img, _, _, valid_ratio = self.resize_norm_img_sar(
+                            img_list[indices[ino]],
+                            self.rec_image_shape,
+                            width_downsample_ratio=0.25,
+                        )
+                        norm_img = norm_img[np.newaxis, :]
+                        valid_ratio = np.expand_dims(valid_ratio, axis=0)
+                        valid_ratios = []
+                        valid_ratios.append(valid_ratio)
+                        norm_img_batch.append(norm_img)
+                        word_positions_list = []
+                        word_positions = np.array(range(0, 40)).astype("int64")
+                        word_positions = np.expand_dims(word_positions, axis=0)
+                        word_positions_list.append(word_positions)
+                    elif self.rec_algorithm == "CAN":
+                        norm_img = self.norm_img_can(
+                            img_list[indices[ino]], max_wh_ratio
+                        )
+                        norm_img = norm_img[np.newaxis, :]
+                        norm_img_batch.append(norm_img)
+                        norm_image_mask = np.ones(norm_img.shape, dtype="float32")
+                        word_label = np.ones([1, 36], dtype="int64")
+                        norm_img_mask_batch = []
+                        word_label_list = []
+                        norm_img_mask_batch.append(norm_image_mask)
+                        word_label_list.append(word_label)
+                    elif self.rec_algorithm == "LaTeXOCR":
+                        norm_img = self.norm_img_latexocr(img_list[indices[ino]])
+                        norm_img = norm_img[np.newaxis, :]
+                        norm_img_batch.append(norm_img)
+                    else:
+                        norm_img = self.resize_norm_img(
+                            img_list[indices[ino]], max_wh_ratio
+                        )
+                        norm_img = norm_img[np.newaxis, :]
+                        norm_img_batch.append(norm_img)
+                norm_img_batch = np.concatenate(norm_img_batch)
+                norm_img_batch = norm_img_batch.copy()
             if self.benchmark:
                 self.autolog.times.stamp()
 
@@ -676,175 +819,101 @@ class TextRecognizer(object):
                     gsrm_slf_attn_bias1_list,
                     gsrm_slf_attn_bias2_list,
                 ]
-                if self.use_onnx:
-                    input_dict = {}
-                    input_dict[self.input_tensor.name] = norm_img_batch
-                    outputs = self.predictor.run(self.output_tensors, input_dict)
-                    preds = {"predict": outputs[2]}
-                else:
-                    input_names = self.predictor.get_input_names()
-                    for i in range(len(input_names)):
-                        input_tensor = self.predictor.get_input_handle(input_names[i])
-                        input_tensor.copy_from_cpu(inputs[i])
-                    self.predictor.run()
-                    outputs = []
-                    for output_tensor in self.output_tensors:
-                        output = output_tensor.copy_to_cpu()
-                        outputs.append(output)
-                    if self.benchmark:
-                        self.autolog.times.stamp()
-                    preds = {"predict": outputs[2]}
+                outputs = self._run_predictor(inputs)
+                preds = {"predict": outputs[2]}
             elif self.rec_algorithm == "SAR":
                 valid_ratios = np.concatenate(valid_ratios)
                 inputs = [
                     norm_img_batch,
                     np.array([valid_ratios], dtype=np.float32).T,
                 ]
-                if self.use_onnx:
-                    input_dict = {}
-                    input_dict[self.input_tensor.name] = norm_img_batch
-                    outputs = self.predictor.run(self.output_tensors, input_dict)
-                    preds = outputs[0]
-                else:
-                    input_names = self.predictor.get_input_names()
-                    for i in range(len(input_names)):
-                        input_tensor = self.predictor.get_input_handle(input_names[i])
-                        input_tensor.copy_from_cpu(inputs[i])
-                    self.predictor.run()
-                    outputs = []
-                    for output_tensor in self.output_tensors:
-                        output = output_tensor.copy_to_cpu()
-                        outputs.append(output)
-                    if self.benchmark:
-                        self.autolog.times.stamp()
-                    preds = outputs[0]
+                outputs = self._run_predictor(inputs)
+                preds = outputs[0]
             elif self.rec_algorithm == "RobustScanner":
                 valid_ratios = np.concatenate(valid_ratios)
                 word_positions_list = np.concatenate(word_positions_list)
                 inputs = [norm_img_batch, valid_ratios, word_positions_list]
-
-                if self.use_onnx:
-                    input_dict = {}
-                    input_dict[self.input_tensor.name] = norm_img_batch
-                    outputs = self.predictor.run(self.output_tensors, input_dict)
-                    preds = outputs[0]
-                else:
-                    input_names = self.predictor.get_input_names()
-                    for i in range(len(input_names)):
-                        input_tensor = self.predictor.get_input_handle(input_names[i])
-                        input_tensor.copy_from_cpu(inputs[i])
-                    self.predictor.run()
-                    outputs = []
-                    for output_tensor in self.output_tensors:
-                        output = output_tensor.copy_to_cpu()
-                        outputs.append(output)
-                    if self.benchmark:
-                        self.autolog.times.stamp()
-                    preds = outputs[0]
+                outputs = self._run_predictor(inputs)
+                preds = outputs[0]
             elif self.rec_algorithm == "CAN":
                 norm_img_mask_batch = np.concatenate(norm_img_mask_batch)
                 word_label_list = np.concatenate(word_label_list)
                 inputs = [norm_img_batch, norm_img_mask_batch, word_label_list]
-                if self.use_onnx:
-                    input_dict = {}
-                    input_dict[self.input_tensor.name] = norm_img_batch
-                    outputs = self.predictor.run(self.output_tensors, input_dict)
-                    preds = outputs
-                else:
-                    input_names = self.predictor.get_input_names()
-                    input_tensor = []
-                    for i in range(len(input_names)):
-                        input_tensor_i = self.predictor.get_input_handle(input_names[i])
-                        input_tensor_i.copy_from_cpu(inputs[i])
-                        input_tensor.append(input_tensor_i)
-                    self.input_tensor = input_tensor
-                    self.predictor.run()
-                    outputs = []
-                    for output_tensor in self.output_tensors:
-                        output = output_tensor.copy_to_cpu()
-                        outputs.append(output)
-                    if self.benchmark:
-                        self.autolog.times.stamp()
-                    preds = outputs
+                preds = self._run_predictor(inputs)
             elif self.rec_algorithm == "LaTeXOCR":
-                inputs = [norm_img_batch]
-                if self.use_onnx:
-                    input_dict = {}
-                    input_dict[self.input_tensor.name] = norm_img_batch
-                    outputs = self.predictor.run(self.output_tensors, input_dict)
+                preds = self._run_predictor([norm_img_batch])
+            else:
+                outputs = self._run_predictor([norm_img_batch])
+                if len(outputs) != 1 and not self.use_onnx:
                     preds = outputs
                 else:
-                    input_names = self.predictor.get_input_names()
-                    input_tensor = []
-                    for i in range(len(input_names)):
-                        input_tensor_i = self.predictor.get_input_handle(input_names[i])
-                        input_tensor_i.copy_from_cpu(inputs[i])
-                        input_tensor.append(input_tensor_i)
-                    self.input_tensor = input_tensor
-                    self.predictor.run()
-                    outputs = []
-                    for output_tensor in self.output_tensors:
-                        output = output_tensor.copy_to_cpu()
-                        outputs.append(output)
-                    if self.benchmark:
-                        self.autolog.times.stamp()
-                    preds = outputs
-            else:
-                if self.use_onnx:
-                    input_dict = {}
-                    input_dict[self.input_tensor.name] = norm_img_batch
-                    outputs = self.predictor.run(self.output_tensors, input_dict)
                     preds = outputs[0]
-                else:
-                    self.input_tensor.copy_from_cpu(norm_img_batch)
-                    self.predictor.run()
-                    outputs = []
-                    for output_tensor in self.output_tensors:
-                        output = output_tensor.copy_to_cpu()
-                        outputs.append(output)
-                    if self.benchmark:
-                        self.autolog.times.stamp()
-                    if len(outputs) != 1:
-                        preds = outputs
-                        # logger.debug(f"Model output shape: {preds.shape}")
-                    else:
-                        preds = outputs[0]
-                        # logger.debug(f"Model output shape: {preds.shape}")
             ##########
-            if self.postprocess_params["name"] == "CTCLabelDecode":
-                text_list, detail_list = self.postprocess_op(
-                    preds,
-                    return_word_box=self.return_word_box,
-                    wh_ratio_list=wh_ratio_list,
-                    max_wh_ratio=max_wh_ratio,
-                )
-                rec_result = []
-                for text, details in zip(text_list, detail_list):
-                    if isinstance(text, list):
-                        text_score = text
-                    else:
-                        if details:
-                            top1_scores = [char["top3"][0]["score"] for char in details]
-                            weights = [1.0 if i == 0 else 0.5 for i in range(len(details))]
-                            weighted_score = np.sum([s * w for s, w in zip(top1_scores, weights)]) / sum(weights)
-                            text_score = [text, float(weighted_score)]
+            with metrics.span("rec.post"):
+                if fast_decode:
+                    rec_result = [
+                        {"text": text, "score": float(score), "char_details": []}
+                        for text, score in self.postprocess_op(preds)
+                    ]
+                elif compact:
+                    rec_result = self.postprocess_op(preds)
+                    rec_result.scores = weighted_top1_scores(
+                        rec_result.offsets, rec_result.topk_scores[:, 0]
+                    )
+                    compact_res.append(rec_result)
+                    if self.benchmark:
+                        self.autolog.times.end(stamp=True)
+                    continue
+                elif is_ctc:
+                    text_list, detail_list = self.postprocess_op(
+                        preds,
+                        return_word_box=self.return_word_box,
+                        wh_ratio_list=wh_ratio_list,
+                        max_wh_ratio=max_wh_ratio,
+                    )
+                    rec_result = []
+                    for text, details in zip(text_list, detail_list):
+                        if isinstance(text, list):
+                            text_score = text
                         else:
-                            text_score = [text, 0.0]
-                    rec_item = {
-                        "text": text_score[0],
-                        "score": text_score[1],
-                        "char_details": details
-                    }
-                    rec_result.append(rec_item)
-            elif self.postprocess_params["name"] == "LaTeXOCRDecode":
-                preds = [p.reshape([-1]) for p in preds]
-                rec_result = self.postprocess_op(preds)
-            else:
-                rec_result = self.postprocess_op(preds)
-            for rno in range(len(rec_result)):
-                rec_res[indices[beg_img_no + rno]] = rec_result[rno]
+                            if details:
+                                top1_scores = [
+                                    char["top3"][0]["score"] for char in details
+                                ]
+                                weights = [
+                                    1.0 if i == 0 else 0.5 for i in range(len(details))
+                                ]
+                                weighted_score = np.sum(
+                                    [s * w for s, w in zip(top1_scores, weights)]
+                                ) / sum(weights)
+                                text_score = [text, float(weighted_score)]
+                            else:
+                                text_score = [text, 0.0]
+                        rec_item = {
+                            "text": text_score[0],
+                            "score": text_score[1],
+                            "char_details": details,
+                        }
+                        rec_result.append(rec_item)
+                elif self.postprocess_params["name"] == "LaTeXOCRDecode":
+                    preds = [p.reshape([-1]) for p in preds]
+                    rec_result = self.postprocess_op(preds)
+                else:
+                    rec_result = self.postprocess_op(preds)
+                for rno in range(len(rec_result)):
+                    rec_res[indices[beg_img_no + rno]] = rec_result[rno]
             if self.benchmark:
                 self.autolog.times.end(stamp=True)
+        if compact:
+            if len(compact_res) == 0:
+                rec_res = RecCandidates.empty(
+                    self.postprocess_op.character,
+                    topk=self.postprocess_op.topk,
+                    score_dtype=self.postprocess_op.candidate_dtype,
+                )
+            else:
+                # batches follow the width-sorted order, restore the input order
+                rec_res = RecCandidates.concat(compact_res).take(np.argsort(indices))
         return rec_res, time.time() - st
 
 
@@ -895,6 +964,13 @@ def main(args):
         logger.info(
             "Predicts of {}:{}".format(valid_image_file_list[ino], rec_res[ino])
         )
+    if text_recognizer.use_width_buckets:
+        for width, hits in text_recognizer.width_bucket_stats().items():
+            logger.info(
+                "rec width bucket {}: {} crops in {} batches".format(
+                    width, hits["crops"], hits["batches"]
+                )
+            )
     if args.benchmark:
         text_recognizer.autolog.report()
 
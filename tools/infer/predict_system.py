@@ -22,44 +22,171 @@ sys.path.insert(0, os.path.abspath(os.path.join(__dir__, "../..")))
 os.environ["FLAGS_allocator_strategy"] = "auto_growth"
 
 import cv2
-import copy
 import numpy as np
 import json
+import hashlib
 import time
 import logging
+import threading
 from PIL import Image
 import tools.infer.utility as utility
 import tools.infer.predict_rec as predict_rec
 import tools.infer.predict_det as predict_det
 import tools.infer.predict_cls as predict_cls
-from ppocr.utils.utility import get_image_file_list, check_and_read
+from ppocr.utils.utility import get_image_file_list, check_and_read, close_pages
 from ppocr.utils.logging import get_logger
+from ppocr.utils.instrumentation import configure_metrics, get_metrics
+from ppocr.utils.image_decode import DecodedImage
+from ppocr.postprocess.parallel import map_ordered
+from ppocr.postprocess.rec_candidates import RecCandidates
+from tools.infer.pipeline import TextSystemPipeline, load_image_pages
+from tools.infer.crop_engine import CropEngine
+from tools.infer.reading_order import get_reading_order
+from tools.infer.warmup import run_warmup
+from tools.infer.result_cache import (
+    DET_ARGS,
+    REC_ARGS,
+    build_result_cache,
+    config_fingerprint,
+    image_digest,
+)
 from tools.infer.utility import (
     draw_ocr_box_txt,
-    get_rotate_crop_image,
-    get_minarea_rect_crop,
     slice_generator,
     merge_fragmented,
+    suppress_duplicate_boxes,
 )
 
 logger = get_logger()
+metrics = get_metrics()
+
+STAGE_ATTRS = {
+    "det": "text_detector",
+    "rec": "text_recognizer",
+    "cls": "text_classifier",
+}
+
+# defaults of the optional slice options, the tile ones apply with "overlap"
+SLICE_DEFAULTS = {"merge_direction": "horizontal"}
+TILE_DEFAULTS = {
+    "batch_size": 8,
+    "nms_thresh": 0.5,
+    "skip_empty": False,
+    "coarse_side": 2048,
+}
+
+
+def slice_options(slice):
+    """The slice options with the defaults of the optional ones filled in."""
+    if not slice:
+        return {}
+    options = dict(SLICE_DEFAULTS)
+    if "overlap" in slice:
+        options.update(TILE_DEFAULTS)
+    options.update(slice)
+    return options
+
+
+def _stage_property(stage):
+    """Predictor of a TextSystem stage, built by build_stage on first access."""
+    attr = "_{}_predictor".format(stage)
+
+    def fget(self):
+        predictor = self.__dict__.get(attr)
+        if predictor is None:
+            with TextSystem._stage_lock:
+                predictor = self.__dict__.get(attr)
+                if predictor is None:
+                    predictor = self.build_stage(stage)
+                    self.__dict__[attr] = predictor
+        return predictor
+
+    def fset(self, predictor):
+        self.__dict__[attr] = predictor
+
+    return property(fget, fset)
 
 
 class TextSystem(object):
+    result_cache = None
+    _stage_lock = threading.RLock()
+
+    text_detector = _stage_property("det")
+    text_recognizer = _stage_property("rec")
+    text_classifier = _stage_property("cls")
+
     def __init__(self, args):
         if not args.show_log:
             logger.setLevel(logging.INFO)
 
-        self.text_detector = predict_det.TextDetector(args)
-        self.text_recognizer = predict_rec.TextRecognizer(args)
+        self.args = args
         self.use_angle_cls = args.use_angle_cls
         self.drop_score = args.drop_score
-        if self.use_angle_cls:
-            self.text_classifier = predict_cls.TextClassifier(args)
+        configure_metrics(args)
+        if not args.lazy_model_init:
+            self.init_stages()
+
+        self.sort_boxes = get_reading_order(args.reading_order)
+        self.crop_engine = CropEngine(
+            box_type=args.det_box_type,
+            target_height=(
+                int(args.rec_image_shape.split(",")[1])
+                if args.crop_to_rec_height
+                else None
+            ),
+            num_threads=args.crop_num_threads,
+        )
 
-        self.args = args
         self.crop_image_res_index = 0
 
+        self.result_cache = build_result_cache(args)
+        if self.result_cache is not None:
+            self.det_fingerprint = config_fingerprint(args, DET_ARGS)
+            self.ocr_fingerprint = config_fingerprint(args, DET_ARGS + REC_ARGS)
+
+    def build_stage(self, stage):
+        """Build the "det", "rec" or "cls" predictor, on first use of the stage."""
+        if stage == "det":
+            return predict_det.TextDetector(self.args)
+        if stage == "rec":
+            return predict_rec.TextRecognizer(self.args)
+        if stage == "cls":
+            if not self.use_angle_cls:
+                raise AttributeError("the angle classifier is not enabled")
+            return predict_cls.TextClassifier(self.args)
+        raise ValueError("unknown stage: {}".format(stage))
+
+    def init_stages(self, stages=("det", "rec", "cls")):
+        """Build the predictors of the stages now instead of on first use."""
+        for stage in stages:
+            if stage == "cls" and not self.use_angle_cls:
+                continue
+            getattr(self, STAGE_ATTRS[stage])
+
+    def warmup(self, plan=None):
+        """Run the stages on the input shapes of plan_warmup, see tools/infer/warmup.py."""
+        return run_warmup(self, plan)
+
+    def cache_key(self, stage, digest, **options):
+        """
+        Result cache key of an image digest, `stage` is "det" for the boxes or
+        "ocr" for the whole result, options are the call options that change it.
+        """
+        fingerprint = self.det_fingerprint if stage == "det" else self.ocr_fingerprint
+        if "slice" in options:
+            # the defaults change the boxes as much as the given options
+            options["slice"] = slice_options(options["slice"])
+        data = json.dumps(options, sort_keys=True, default=str)
+        return hashlib.sha1(
+            "{}:{}:{}:{}".format(stage, fingerprint, digest, data).encode("utf-8")
+        ).hexdigest()
+
+    def _use_det_cache(self):
+        return self.result_cache is not None and self.result_cache.det_only
+
+    def _use_ocr_cache(self):
+        return self.result_cache is not None and not self.result_cache.det_only
+
     def draw_crop_rec_res(self, output_dir, img_crop_list, rec_res):
         os.makedirs(output_dir, exist_ok=True)
         bbox_num = len(img_crop_list)
@@ -73,41 +200,253 @@ class TextSystem(object):
             logger.debug(f"{bno}, {rec_res[bno]}")
         self.crop_image_res_index += bbox_num
 
-    def __call__(self, img, cls=True, slice={}):
-        time_dict = {"det": 0, "rec": 0, "cls": 0, "all": 0}
-
-        if img is None:
-            logger.debug("no valid image provided")
-            return None, None, time_dict
-
-        start = time.time()
-        ori_im = img.copy()
+    def detect(self, img, slice={}):
+        """
+        Run text detection on one image, with sliding windows if `slice` is set.
+        The boxes are looked up in the result cache first in det_only mode.
+        """
+        if not self._use_det_cache():
+            return self._detect(img, slice)
+        st = time.time()
+        key = self.cache_key("det", image_digest(img), slice=slice)
+        dt_boxes = self.result_cache.get(key)
+        if dt_boxes is not None:
+            return dt_boxes, time.time() - st
+        dt_boxes, elapse = self._detect(img, slice)
+        self.result_cache.put(key, dt_boxes)
+        return dt_boxes, elapse
+
+    def _detect(self, img, slice={}):
+        if isinstance(img, DecodedImage):
+            if slice:
+                # sliding windows are meant for the full resolution
+                return self.detect(img.full(), slice)
+            dt_boxes, elapse = self.text_detector(img.img)
+            return img.to_full(dt_boxes), elapse
+        if slice and "overlap" in slice:
+            return self.detect_tiles(img, slice)
         if slice:
             slice_gen = slice_generator(
                 img,
                 horizontal_stride=slice["horizontal_stride"],
                 vertical_stride=slice["vertical_stride"],
             )
+            tiles = list(slice_gen)
+            # the post-processing of a slice overlaps the inference of the
+            # next ones, the predictor pool serializes the inference
+            tile_results = map_ordered(
+                lambda tile: self.text_detector(tile[0], use_slice=True),
+                tiles,
+                getattr(self.args, "det_postprocess_threads", 1),
+            )
             elapsed = []
             dt_slice_boxes = []
-            for slice_crop, v_start, h_start in slice_gen:
-                dt_boxes, elapse = self.text_detector(slice_crop, use_slice=True)
+            for (_, v_start, h_start), (dt_boxes, elapse) in zip(tiles, tile_results):
                 if dt_boxes.size:
                     dt_boxes[:, :, 0] += h_start
                     dt_boxes[:, :, 1] += v_start
                     dt_slice_boxes.append(dt_boxes)
                     elapsed.append(elapse)
+            if len(dt_slice_boxes) == 0:
+                return np.zeros((0, 4, 2), dtype=np.float32), sum(elapsed)
             dt_boxes = np.concatenate(dt_slice_boxes)
 
+            slice = slice_options(slice)
             dt_boxes = merge_fragmented(
                 boxes=dt_boxes,
                 x_threshold=slice["merge_x_thres"],
                 y_threshold=slice["merge_y_thres"],
+                direction=slice["merge_direction"],
             )
             elapse = sum(elapsed)
         else:
             dt_boxes, elapse = self.text_detector(img)
+        return dt_boxes, elapse
+
+    def detect_tiles(self, img, slice):
+        """
+        Sliding window detection with tiles overlapping by slice["overlap"] pixels.
+
+        Tiles are detected in batches of slice["batch_size"] (default 8).
+        Duplicates in the overlaps and fragments covered by a less cut box are
+        removed with suppress_duplicate_boxes (slice["nms_thresh"], default
+        0.5), and lines longer than the overlap are joined with
+        merge_fragmented. With slice["skip_empty"], a detection pass on the
+        image downscaled to slice["coarse_side"] (default 2048) selects the
+        tiles that contain text, the others are not detected at all.
+        """
+        st = time.time()
+        slice = slice_options(slice)
+        overlap = int(slice["overlap"])
+        img_h, img_w = img.shape[:2]
+        tiles = list(
+            slice_generator(
+                img,
+                horizontal_stride=slice["horizontal_stride"],
+                vertical_stride=slice["vertical_stride"],
+                overlap=overlap,
+            )
+        )
+        if slice["skip_empty"]:
+            tiles = self._text_tiles(img, tiles, slice["coarse_side"], margin=overlap)
+        tile_boxes, _ = self.text_detector.predict_batch(
+            [tile for tile, _, _ in tiles], batch_num=slice["batch_size"]
+        )
+
+        boxes_list, cut_flags_list = [], []
+        for (tile, v_start, h_start), dt_boxes in zip(tiles, tile_boxes):
+            if dt_boxes is None or len(dt_boxes) == 0:
+                continue
+            dt_boxes = np.asarray(dt_boxes, dtype=np.float32)
+            tile_h, tile_w = tile.shape[:2]
+            min_xy, max_xy = dt_boxes.min(axis=1), dt_boxes.max(axis=1)
+            # tile borders (not image borders) the box touches
+            cut_x = ((min_xy[:, 0] <= 1) & (h_start > 0)) | (
+                (max_xy[:, 0] >= tile_w - 2) & (h_start + tile_w < img_w)
+            )
+            cut_y = ((min_xy[:, 1] <= 1) & (v_start > 0)) | (
+                (max_xy[:, 1] >= tile_h - 2) & (v_start + tile_h < img_h)
+            )
+            dt_boxes[:, :, 0] += h_start
+            dt_boxes[:, :, 1] += v_start
+            boxes_list.append(dt_boxes)
+            cut_flags_list.append(cut_x.astype(np.int64) | cut_y.astype(np.int64) << 1)
+        if len(boxes_list) == 0:
+            return np.zeros((0, 4, 2), dtype=np.float32), time.time() - st
+        dt_boxes = np.concatenate(boxes_list)
+        keep = suppress_duplicate_boxes(
+            dt_boxes,
+            np.concatenate(cut_flags_list),
+            thresh=slice["nms_thresh"],
+        )
+        dt_boxes = merge_fragmented(
+            boxes=dt_boxes[keep],
+            x_threshold=slice["merge_x_thres"],
+            y_threshold=slice["merge_y_thres"],
+            direction=slice["merge_direction"],
+            max_overlap=overlap,
+        )
+        return dt_boxes, time.time() - st
+
+    def _text_tiles(self, img, tiles, coarse_side, margin=0):
+        """Keep the tiles where a detection pass on the downscaled image finds text."""
+        img_h, img_w = img.shape[:2]
+        scale = min(1.0, float(coarse_side) / max(img_h, img_w))
+        if scale < 1.0:
+            small = cv2.resize(
+                img,
+                (max(1, int(img_w * scale)), max(1, int(img_h * scale))),
+                interpolation=cv2.INTER_AREA,
+            )
+        else:
+            small = img
+        coarse_boxes, _ = self.text_detector.predict(small)
+        if coarse_boxes is None or len(coarse_boxes) == 0:
+            return []
+        coarse_boxes = np.asarray(coarse_boxes, dtype=np.float32) / scale
+        lo = coarse_boxes.min(axis=1) - margin
+        hi = coarse_boxes.max(axis=1) + margin
+        text_tiles = []
+        for tile, v_start, h_start in tiles:
+            tile_h, tile_w = tile.shape[:2]
+            hit = (
+                (lo[:, 0] < h_start + tile_w)
+                & (hi[:, 0] > h_start)
+                & (lo[:, 1] < v_start + tile_h)
+                & (hi[:, 1] > v_start)
+            )
+            if hit.any():
+                text_tiles.append((tile, v_start, h_start))
+        logger.debug("slice tiles with text: {}/{}".format(len(text_tiles), len(tiles)))
+        return text_tiles
+
+    def crop(self, ori_im, dt_boxes):
+        if isinstance(ori_im, DecodedImage):
+            return self._crop_decoded(ori_im, dt_boxes)
+        return self.crop_engine(ori_im, dt_boxes)
+
+    def _crop_decoded(self, decoded, dt_boxes):
+        """
+        Crop the lines that are at least as high as the rec input from the
+        reduced image, and the smaller ones from the full resolution image.
+        """
+        if len(dt_boxes) == 0:
+            return []
+        reduced_boxes = decoded.to_reduced(dt_boxes)
+        rec_height = self.text_recognizer.rec_image_shape[1]
+        small = [
+            idx
+            for idx, box in enumerate(reduced_boxes)
+            if min(cv2.minAreaRect(box.astype(np.float32))[1]) < rec_height
+        ]
+        small_set = set(small)
+        large = [idx for idx in range(len(dt_boxes)) if idx not in small_set]
+        crops = [None] * len(dt_boxes)
+        if large:
+            large_crops = self.crop_engine(
+                decoded.img, [reduced_boxes[idx] for idx in large]
+            )
+            for idx, crop in zip(large, large_crops):
+                crops[idx] = crop
+        if small:
+            small_crops = self.crop_engine(
+                decoded.full(), [dt_boxes[idx] for idx in small]
+            )
+            for idx, crop in zip(small, small_crops):
+                crops[idx] = crop
+        return crops
+
+    def filter_rec_res(self, dt_boxes, rec_res):
+        """Drop the results whose score is lower than drop_score."""
+        if isinstance(rec_res, RecCandidates):
+            keep = np.nonzero(rec_res.scores >= self.drop_score)[0]
+            filter_boxes = [dt_boxes[i] for i in keep.tolist()]
+            return filter_boxes, rec_res.take(keep)
+        filter_boxes, filter_rec_res = [], []
+        for box, rec_result in zip(dt_boxes, rec_res):
+            # 處理字典格式的結果
+            if isinstance(rec_result, dict):
+                text = rec_result.get("text", "")
+                score = rec_result.get("score", 0.0)
+                char_details = rec_result.get("char_details", [])
+                # 構建與原始格式兼容的結果，但添加字符詳情
+                rec_result_formatted = [text, score, char_details]
+            else:
+                # 原始的列表或元組格式
+                text = rec_result[0]
+                score = rec_result[1]
+                char_details = rec_result[2] if len(rec_result) > 2 else None
+                rec_result_formatted = [text, score, char_details]
+
+            if score >= self.drop_score:
+                filter_boxes.append(box)
+                filter_rec_res.append(rec_result_formatted)
+        return filter_boxes, filter_rec_res
+
+    def __call__(self, img, cls=True, slice={}):
+        with metrics.span("ocr"):
+            return self._ocr_image(img, cls, slice)
+
+    def _ocr_image(self, img, cls, slice):
+        time_dict = {"det": 0, "rec": 0, "cls": 0, "all": 0}
+
+        if img is None:
+            logger.debug("no valid image provided")
+            return None, None, time_dict
 
+        start = time.time()
+        cache_key = None
+        if self._use_ocr_cache():
+            cache_key = self.cache_key(
+                "ocr", image_digest(img), cls=self.use_angle_cls and cls, slice=slice
+            )
+            cached = self.result_cache.get(cache_key)
+            if cached is not None:
+                time_dict["all"] = time.time() - start
+                return cached[0], cached[1], time_dict
+
+        with metrics.span("det"):
+            dt_boxes, elapse = self.detect(img, slice)
         time_dict["det"] = elapse
 
         if dt_boxes is None:
@@ -119,19 +458,16 @@ class TextSystem(object):
             logger.debug(
                 "dt_boxes num : {}, elapsed : {}".format(len(dt_boxes), elapse)
             )
-        img_crop_list = []
-
-        dt_boxes = sorted_boxes(dt_boxes)
 
-        for bno in range(len(dt_boxes)):
-            tmp_box = copy.deepcopy(dt_boxes[bno])
-            if self.args.det_box_type == "quad":
-                img_crop = get_rotate_crop_image(ori_im, tmp_box)
-            else:
-                img_crop = get_minarea_rect_crop(ori_im, tmp_box)
-            img_crop_list.append(img_crop)
+        metrics.count("det.boxes", len(dt_boxes))
+        with metrics.span("sort"):
+            dt_boxes = self.sort_boxes(dt_boxes)
+        with metrics.span("crop"):
+            img_crop_list = self.crop(img, dt_boxes)
+        metrics.count("crops", len(img_crop_list))
         if self.use_angle_cls and cls:
-            img_crop_list, angle_list, elapse = self.text_classifier(img_crop_list)
+            with metrics.span("cls"):
+                img_crop_list, angle_list, elapse = self.text_classifier(img_crop_list)
             time_dict["cls"] = elapse
             logger.debug(
                 "cls num  : {}, elapsed : {}".format(len(img_crop_list), elapse)
@@ -141,34 +477,123 @@ class TextSystem(object):
                 f"rec crops num: {len(img_crop_list)}, time and memory cost may be large."
             )
 
-        rec_res, elapse = self.text_recognizer(img_crop_list)
+        with metrics.span("rec"):
+            rec_res, elapse = self.text_recognizer(img_crop_list)
         time_dict["rec"] = elapse
         logger.debug("rec_res num  : {}, elapsed : {}".format(len(rec_res), elapse))
         if self.args.save_crop_res:
             self.draw_crop_rec_res(self.args.crop_res_save_dir, img_crop_list, rec_res)
-        filter_boxes, filter_rec_res = [], []
-        for box, rec_result in zip(dt_boxes, rec_res):
-            # 處理字典格式的結果
-            if isinstance(rec_result, dict):
-                text = rec_result.get("text", "")
-                score = rec_result.get("score", 0.0)
-                char_details = rec_result.get("char_details", [])
-                # 構建與原始格式兼容的結果，但添加字符詳情
-                rec_result_formatted = [text, score, char_details]
-            else:
-                # 原始的列表或元組格式
-                text = rec_result[0]
-                score = rec_result[1]
-                char_details = rec_result[2] if len(rec_result) > 2 else None
-                rec_result_formatted = [text, score, char_details]
-            
-            if score >= self.drop_score:
-                filter_boxes.append(box)
-                filter_rec_res.append(rec_result_formatted)
+        filter_boxes, filter_rec_res = self.filter_rec_res(dt_boxes, rec_res)
+        if cache_key is not None:
+            self.result_cache.put(cache_key, (filter_boxes, filter_rec_res))
         end = time.time()
         time_dict["all"] = end - start
         return filter_boxes, filter_rec_res, time_dict
 
+    def batch_call(self, img_list, cls=True, slice={}):
+        """
+        OCR a list of images with pooled classification and recognition.
+
+        Detection runs per image (batched with TextDetector.predict_batch when
+        det_batch_num > 1 and no slicing), then the crops of all images go through
+        TextClassifier and TextRecognizer as one width-sorted queue, so the
+        rec batches are filled across image boundaries.
+
+        args:
+            img_list(list): images with shape [h, w, 3], None entries are skipped
+        return:
+            list of (filter_boxes, filter_rec_res) per image, (None, None) for
+            images without valid boxes, and the accumulated time_dict
+        """
+        with metrics.span("ocr_batch"):
+            return self._batch_call(img_list, cls, slice)
+
+    def _batch_call(self, img_list, cls, slice):
+        time_dict = {"det": 0, "rec": 0, "cls": 0, "all": 0}
+        start = time.time()
+
+        with metrics.span("det"):
+            det_res = [None] * len(img_list)
+            if not slice and self.args.det_batch_num > 1:
+                valid = [idx for idx, img in enumerate(img_list) if img is not None]
+                cache_keys = {}
+                if self._use_det_cache():
+                    # only the images without cached boxes are detected
+                    for idx in valid:
+                        cache_keys[idx] = self.cache_key(
+                            "det", image_digest(img_list[idx]), slice=slice
+                        )
+                        det_res[idx] = self.result_cache.get(cache_keys[idx])
+                    valid = [idx for idx in valid if det_res[idx] is None]
+                batch_dt_boxes, elapse = self.text_detector.predict_batch(
+                    [
+                        (
+                            img_list[idx].img
+                            if isinstance(img_list[idx], DecodedImage)
+                            else img_list[idx]
+                        )
+                        for idx in valid
+                    ]
+                )
+                time_dict["det"] += elapse
+                for idx, dt_boxes in zip(valid, batch_dt_boxes):
+                    if isinstance(img_list[idx], DecodedImage):
+                        dt_boxes = img_list[idx].to_full(dt_boxes)
+                    det_res[idx] = dt_boxes
+                    if idx in cache_keys:
+                        self.result_cache.put(cache_keys[idx], dt_boxes)
+            else:
+                for idx, img in enumerate(img_list):
+                    if img is not None:
+                        det_res[idx], elapse = self.detect(img, slice)
+                        time_dict["det"] += elapse
+
+        boxes_list = []
+        crop_list = []
+        crop_offsets = [0]
+        for img, dt_boxes in zip(img_list, det_res):
+            if dt_boxes is None:
+                boxes_list.append(None)
+                crop_offsets.append(crop_offsets[-1])
+                continue
+            metrics.count("det.boxes", len(dt_boxes))
+            with metrics.span("sort"):
+                dt_boxes = self.sort_boxes(dt_boxes)
+            boxes_list.append(dt_boxes)
+            with metrics.span("crop"):
+                crop_list.extend(self.crop(img, dt_boxes))
+            crop_offsets.append(len(crop_list))
+        metrics.count("crops", len(crop_list))
+        logger.debug(
+            "images num : {}, crops num : {}".format(len(img_list), len(crop_list))
+        )
+
+        rec_res = []
+        if len(crop_list) > 0:
+            if self.use_angle_cls and cls:
+                with metrics.span("cls"):
+                    crop_list, angle_list, elapse = self.text_classifier(crop_list)
+                time_dict["cls"] = elapse
+            with metrics.span("rec"):
+                rec_res, elapse = self.text_recognizer(crop_list)
+            time_dict["rec"] = elapse
+            if self.args.save_crop_res:
+                self.draw_crop_rec_res(self.args.crop_res_save_dir, crop_list, rec_res)
+
+        results = []
+        for idx, dt_boxes in enumerate(boxes_list):
+            if dt_boxes is None:
+                results.append((None, None))
+                continue
+            beg, end = crop_offsets[idx], crop_offsets[idx + 1]
+            if isinstance(rec_res, RecCandidates):
+                img_rec_res = rec_res.take(np.arange(beg, end))
+            else:
+                img_rec_res = rec_res[beg:end]
+            results.append(self.filter_rec_res(dt_boxes, img_rec_res))
+        time_dict["all"] = time.time() - start
+        return results, time_dict
+
 
 def sorted_boxes(dt_boxes):
     """
@@ -199,13 +624,123 @@ def sorted_boxes(dt_boxes):
     return _boxes
 
 
+def save_page_result(
+    args, image_file, index, num_pages, img, dt_boxes, rec_res, flag_gif, flag_pdf
+):
+    """Format one page result as a system_results.txt line and save its visualization."""
+    res = [
+        {
+            "transcription": rec_res[i][0],
+            "points": np.array(dt_boxes[i]).astype(np.int32).tolist(),
+        }
+        for i in range(len(dt_boxes))
+    ]
+    if num_pages > 1:
+        save_pred = (
+            os.path.basename(image_file)
+            + "_"
+            + str(index)
+            + "\t"
+            + json.dumps(res, ensure_ascii=False)
+            + "\n"
+        )
+    else:
+        save_pred = (
+            os.path.basename(image_file)
+            + "\t"
+            + json.dumps(res, ensure_ascii=False)
+            + "\n"
+        )
+
+    image = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+    boxes = dt_boxes
+    txts = [rec_res[i][0] for i in range(len(rec_res))]
+    scores = [rec_res[i][1] for i in range(len(rec_res))]
+
+    draw_img = draw_ocr_box_txt(
+        image,
+        boxes,
+        txts,
+        scores,
+        drop_score=args.drop_score,
+        font_path=args.vis_font_path,
+    )
+    if flag_gif:
+        save_file = image_file[:-3] + "png"
+    elif flag_pdf:
+        save_file = image_file.replace(".pdf", "_" + str(index) + ".png")
+    else:
+        save_file = image_file
+    cv2.imwrite(
+        os.path.join(args.draw_img_save_dir, os.path.basename(save_file)),
+        draw_img[:, :, ::-1],
+    )
+    logger.debug(
+        "The visualized image saved in {}".format(
+            os.path.join(args.draw_img_save_dir, os.path.basename(save_file))
+        )
+    )
+    return save_pred
+
+
+def main_pipeline(args, text_sys, image_file_list):
+    """Run main() through TextSystemPipeline, det of the next page overlaps rec of the current one."""
+    page_counts = {}
+
+    def loader(image_file):
+        imgs = load_image_pages(image_file, **utility.get_pdf_options(args))
+        page_counts[image_file] = len(imgs)
+        return imgs
+
+    def serializer(item):
+        image_file = item["input"]
+        flag_pdf = image_file[-3:].lower() == "pdf"
+        flag_gif = image_file[-3:].lower() == "gif"
+        return save_page_result(
+            args,
+            image_file,
+            item["page_idx"],
+            page_counts[image_file],
+            item["img"],
+            item["dt_boxes"],
+            item["rec_res"],
+            flag_gif,
+            flag_pdf,
+        )
+
+    text_pipeline = TextSystemPipeline(
+        text_sys,
+        queue_size=args.pipeline_queue_size,
+        loader=loader,
+        serializer=serializer,
+    )
+    save_results = []
+    for item in text_pipeline.run(image_file_list):
+        if item["dt_boxes"] is None:
+            continue
+        logger.debug(
+            "{}_{}  Predict time of {}: {:.3f}s".format(
+                item["input_idx"],
+                item["page_idx"],
+                item["input"],
+                item["time_dict"]["all"],
+            )
+        )
+        save_results.append(item["output"])
+    for name, stats in text_pipeline.stats().items():
+        logger.info(
+            "pipeline stage {}: items {}, busy {:.3f}s, max queue depth {}".format(
+                name, stats["items"], stats["busy"], stats["max_queue_depth"]
+            )
+        )
+    return save_results
+
+
 def main(args):
     image_file_list = get_image_file_list(args.image_dir)
     image_file_list = image_file_list[args.process_id :: args.total_process_num]
     text_sys = TextSystem(args)
     is_visualize = True
-    font_path = args.vis_font_path
-    drop_score = args.drop_score
     draw_img_save_dir = args.draw_img_save_dir
     os.makedirs(draw_img_save_dir, exist_ok=True)
     save_results = []
@@ -215,30 +750,40 @@ def main(args):
         "if you are using recognition model with PP-OCRv2 or an older version, please set --rec_image_shape='3,32,320"
     )
 
-    # warm up 10 times
+    # warm up the predictors on the det sizes and rec widths of real inputs
     if args.warmup:
-        img = np.random.uniform(0, 255, [640, 640, 3]).astype(np.uint8)
-        for i in range(10):
-            res = text_sys(img)
+        warmup_times = text_sys.warmup()
+        logger.info(
+            "warmup: {}".format(
+                ", ".join(
+                    "{} {:.3f}s".format(stage, elapse)
+                    for stage, elapse in warmup_times.items()
+                )
+            )
+        )
 
     total_time = 0
     cpu_mem, gpu_mem, gpu_util = 0, 0, 0
     _st = time.time()
     count = 0
+    if args.use_pipeline:
+        save_results = main_pipeline(args, text_sys, image_file_list)
+        image_file_list = []
     for idx, image_file in enumerate(image_file_list):
-        img, flag_gif, flag_pdf = check_and_read(image_file)
-        if not flag_gif and not flag_pdf:
-            img = cv2.imread(image_file)
+        # pdf pages are rendered one by one during the loop
+        with metrics.span("decode"):
+            img, flag_gif, flag_pdf = check_and_read(
+                image_file, lazy=True, **utility.get_pdf_options(args)
+            )
+            if not flag_gif and not flag_pdf:
+                img = cv2.imread(image_file)
         if not flag_pdf:
             if img is None:
                 logger.debug("error in loading image:{}".format(image_file))
                 continue
             imgs = [img]
         else:
-            page_num = args.page_num
-            if page_num > len(img) or page_num == 0:
-                page_num = len(img)
-            imgs = img[:page_num]
+            imgs = img
         for index, img in enumerate(imgs):
             starttime = time.time()
             dt_boxes, rec_res, time_dict = text_sys(img)
@@ -255,65 +800,30 @@ def main(args):
                 logger.debug(
                     str(idx) + "  Predict time of %s: %.3fs" % (image_file, elapse)
                 )
-            for text, score in rec_res:
-                logger.debug("{}, {:.3f}".format(text, score))
-
-            res = [
-                {
-                    "transcription": rec_res[i][0],
-                    "points": np.array(dt_boxes[i]).astype(np.int32).tolist(),
-                }
-                for i in range(len(dt_boxes))
-            ]
-            if len(imgs) > 1:
-                save_pred = (
-                    os.path.basename(image_file)
-                    + "_"
-                    + str(index)
-                    + "\t"
-                    + json.dumps(res, ensure_ascii=False)
-                    + "\n"
-                )
-            else:
-                save_pred = (
-                    os.path.basename(image_file)
-                    + "\t"
-                    + json.dumps(res, ensure_ascii=False)
-                    + "\n"
-                )
-            save_results.append(save_pred)
+            for rec_result in rec_res:
+                logger.debug("{}, {:.3f}".format(rec_result[0], rec_result[1]))
 
             if is_visualize:
-                image = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
-                boxes = dt_boxes
-                txts = [rec_res[i][0] for i in range(len(rec_res))]
-                scores = [rec_res[i][1] for i in range(len(rec_res))]
-
-                draw_img = draw_ocr_box_txt(
-                    image,
-                    boxes,
-                    txts,
-                    scores,
-                    drop_score=drop_score,
-                    font_path=font_path,
-                )
-                if flag_gif:
-                    save_file = image_file[:-3] + "png"
-                elif flag_pdf:
-                    save_file = image_file.replace(".pdf", "_" + str(index) + ".png")
-                else:
-                    save_file = image_file
-                cv2.imwrite(
-                    os.path.join(draw_img_save_dir, os.path.basename(save_file)),
-                    draw_img[:, :, ::-1],
-                )
-                logger.debug(
-                    "The visualized image saved in {}".format(
-                        os.path.join(draw_img_save_dir, os.path.basename(save_file))
+                with metrics.span("serialize"):
+                    save_pred = save_page_result(
+                        args,
+                        image_file,
+                        index,
+                        len(imgs),
+                        img,
+                        dt_boxes,
+                        rec_res,
+                        flag_gif,
+                        flag_pdf,
                     )
-                )
+                save_results.append(save_pred)
+        close_pages(imgs)
 
     logger.info("The predict total time is {}".format(time.time() - _st))
+    if text_sys.result_cache is not None:
+        logger.info("result cache: {}".format(text_sys.result_cache.stats()))
+    if metrics.enabled:
+        logger.info("metrics: {}".format(json.dumps(metrics.snapshot())))
     if args.benchmark:
         text_sys.text_detector.autolog.report()
         text_sys.text_recognizer.autolog.report()
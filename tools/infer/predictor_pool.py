@@ -0,0 +1,88 @@
+# Copyright (c) 2024 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Pool of predictors of one model for concurrent inference.
+
+A paddle predictor and its tensor handles can only run one batch at a time, so
+the pool keeps `predictor.clone()` copies, which share the weights of the
+first predictor, and hands one out per run. An onnxruntime session can run
+concurrently, all the handles of an onnx pool use the same session and the
+pool only bounds the number of concurrent runs.
+"""
+
+import os
+import queue
+from contextlib import contextmanager
+
+from tools.infer.utility import get_input_tensor, get_output_tensors
+
+__all__ = ["PredictorHandle", "PredictorPool", "predictor_pool_size"]
+
+
+def predictor_pool_size(args):
+    """--predictor_pool_size, or cpu_count // cpu_threads when it is 0."""
+    size = getattr(args, "predictor_pool_size", 1)
+    if size > 0:
+        return size
+    cpu_threads = max(1, getattr(args, "cpu_threads", 1) or 1)
+    return max(1, (os.cpu_count() or 1) // cpu_threads)
+
+
+class PredictorHandle(object):
+    """A predictor with its own input and output tensor handles."""
+
+    def __init__(self, predictor, input_tensor, output_tensors):
+        self.predictor = predictor
+        self.input_tensor = input_tensor
+        self.output_tensors = output_tensors
+
+
+class PredictorPool(object):
+    """
+    Args:
+        args: inference args, see tools/infer/utility.py.
+        mode(str): model of the predictor, as in create_predictor.
+        predictor, input_tensor, output_tensors: returned by create_predictor.
+        size(int): number of predictors, predictor_pool_size(args) by default.
+    """
+
+    def __init__(self, args, mode, predictor, input_tensor, output_tensors, size=None):
+        if size is None:
+            size = predictor_pool_size(args)
+        self.size = max(1, size)
+        self.handles = [PredictorHandle(predictor, input_tensor, output_tensors)]
+        for _ in range(self.size - 1):
+            if args.use_onnx:
+                handle = PredictorHandle(predictor, input_tensor, output_tensors)
+            else:
+                clone = predictor.clone()
+                handle = PredictorHandle(
+                    clone,
+                    get_input_tensor(mode, clone),
+                    get_output_tensors(args, mode, clone),
+                )
+            self.handles.append(handle)
+        # the most recently returned predictor is handed out first
+        self._free = queue.LifoQueue()
+        for handle in reversed(self.handles):
+            self._free.put(handle)
+
+    @contextmanager
+    def checkout(self):
+        """Borrow a PredictorHandle, blocks while all of them are in use."""
+        handle = self._free.get()
+        try:
+            yield handle
+        finally:
+            self._free.put(handle)
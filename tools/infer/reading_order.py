@@ -0,0 +1,188 @@
+# Copyright (c) 2024 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Reading order of detected text boxes.
+
+Boxes are first grouped into columns (vertical text) or lines (horizontal
+text) by the overlap of their projections on the cross axis, with one sorted
+sweep, then the groups and the boxes inside every group are ordered. The cost
+is O(n log n), and a slowly drifting column stays one group because every box
+is compared with the previous box of the group.
+
+Boxes spanning several groups, such as a full-width title above vertical
+columns, are not clustered: they split the page into sections along the
+reading axis, which are read one after the other.
+
+    order = get_reading_order("vertical_rtl")
+    dt_boxes = order(dt_boxes)
+"""
+
+import numpy as np
+
+__all__ = [
+    "READING_ORDERS",
+    "get_reading_order",
+    "reading_order_indices",
+    "cluster_intervals",
+]
+
+
+def _box_extents(dt_boxes):
+    """[N, 4] array of (x_min, y_min, x_max, y_max) of quads or padded polygons."""
+    boxes = np.asarray(dt_boxes, dtype=np.float32)
+    if boxes.ndim == 3:
+        return np.concatenate([boxes.min(axis=1), boxes.max(axis=1)], axis=1)
+    # polygons with different numbers of points
+    return np.array(
+        [
+            np.concatenate([np.min(box, axis=0), np.max(box, axis=0)])
+            for box in dt_boxes
+        ],
+        dtype=np.float32,
+    ).reshape(-1, 4)
+
+
+def cluster_intervals(lo, hi, min_overlap=0.5):
+    """
+    Group 1-D intervals [lo, hi] with a sweep in order of `lo`. An interval
+    joins the current group when its overlap with the last interval of the
+    group is at least `min_overlap` of the narrower of the two.
+
+    return:
+        labels(array): group id of every interval, ids increase with `lo`
+    """
+    num = len(lo)
+    labels = np.zeros(num, dtype=np.int64)
+    if num == 0:
+        return labels
+    order = np.argsort(lo, kind="stable")
+    lo_sorted = lo[order].tolist()
+    hi_sorted = hi[order].tolist()
+    label = 0
+    cur_lo, cur_hi = lo_sorted[0], hi_sorted[0]
+    sorted_labels = [0] * num
+    for i in range(1, num):
+        b_lo, b_hi = lo_sorted[i], hi_sorted[i]
+        overlap = min(b_hi, cur_hi) - b_lo
+        width = min(b_hi - b_lo, cur_hi - cur_lo)
+        if not (overlap > 0 and overlap >= min_overlap * width):
+            label += 1
+        cur_lo, cur_hi = b_lo, b_hi
+        sorted_labels[i] = label
+    labels[order] = sorted_labels
+    return labels
+
+
+def _spanning_boxes(lo, hi, min_overlap=0.5, wide_ratio=2.0):
+    """
+    Mask of the intervals wider than `wide_ratio` times the median width that
+    cover at least two groups of the other intervals.
+    """
+    widths = hi - lo
+    wide = widths > wide_ratio * np.median(widths)
+    if not wide.any() or wide.all():
+        return np.zeros(len(lo), dtype=bool)
+    narrow = np.nonzero(~wide)[0]
+    labels = cluster_intervals(lo[narrow], hi[narrow], min_overlap)
+    num_groups = labels.max() + 1
+    group_lo = np.full(num_groups, np.inf)
+    group_hi = np.full(num_groups, -np.inf)
+    np.minimum.at(group_lo, labels, lo[narrow])
+    np.maximum.at(group_hi, labels, hi[narrow])
+    spanning = np.zeros(len(lo), dtype=bool)
+    for i in np.nonzero(wide)[0].tolist():
+        overlap = np.minimum(hi[i], group_hi) - np.maximum(lo[i], group_lo)
+        covered = overlap >= min_overlap * (group_hi - group_lo)
+        spanning[i] = np.count_nonzero(covered & (overlap > 0)) >= 2
+    return spanning
+
+
+def reading_order_indices(dt_boxes, vertical=True, reverse=False, min_overlap=0.5):
+    """
+    args:
+        dt_boxes(array|list): quads [N, 4, 2] or polygons
+        vertical(bool): group boxes into columns read top to bottom, otherwise
+            into lines read left to right
+        reverse(bool): order the columns (or lines) right to left / bottom to top
+        min_overlap(float): see cluster_intervals
+    return:
+        indices(array) of the boxes in reading order
+    """
+    if len(dt_boxes) == 0:
+        return np.zeros(0, dtype=np.int64)
+    extents = _box_extents(dt_boxes)
+    x_min, y_min, x_max, y_max = extents.T
+    if vertical:
+        cross_lo, cross_hi, along, along_hi = x_min, x_max, y_min, y_max
+    else:
+        cross_lo, cross_hi, along, along_hi = y_min, y_max, x_min, x_max
+    centers = (cross_lo + cross_hi) / 2.0
+    along_centers = (along + along_hi) / 2.0
+
+    # the spanning boxes end the sections they are below (or right of)
+    spanning = _spanning_boxes(cross_lo, cross_hi, min_overlap)
+    span_ids = np.nonzero(spanning)[0]
+    span_ids = span_ids[np.argsort(along_centers[span_ids], kind="stable")]
+    section = np.zeros(len(centers), dtype=np.int64)
+    section[span_ids] = 2 * np.arange(len(span_ids)) + 1
+    rest = np.nonzero(~spanning)[0]
+    section[rest] = 2 * np.searchsorted(along_centers[span_ids], along_centers[rest])
+
+    group = np.zeros(len(centers), dtype=np.int64)
+    labels = cluster_intervals(cross_lo[rest], cross_hi[rest], min_overlap)
+    if len(rest) > 0:
+        # group position is the mean center of its boxes
+        num_groups = labels.max() + 1
+        group_pos = np.bincount(labels, weights=centers[rest], minlength=num_groups)
+        group_pos /= np.bincount(labels, minlength=num_groups)
+        group_rank = np.empty(num_groups, dtype=np.int64)
+        group_order = np.argsort(-group_pos if reverse else group_pos, kind="stable")
+        group_rank[group_order] = np.arange(num_groups)
+        group[rest] = group_rank[labels]
+    tie_break = -centers if reverse else centers
+    return np.lexsort((tie_break, along, group, section))
+
+
+def _make_order(vertical, reverse):
+    def order(dt_boxes, min_overlap=0.5):
+        indices = reading_order_indices(dt_boxes, vertical, reverse, min_overlap)
+        return [dt_boxes[i] for i in indices.tolist()]
+
+    return order
+
+
+def _legacy_order(dt_boxes, min_overlap=0.5):
+    from tools.infer.predict_system import sorted_boxes
+
+    return sorted_boxes(dt_boxes)
+
+
+READING_ORDERS = {
+    "horizontal_ltr": _make_order(vertical=False, reverse=False),
+    "vertical_rtl": _make_order(vertical=True, reverse=True),
+    "vertical_ltr": _make_order(vertical=True, reverse=False),
+    # the previous quadratic sort, kept to reproduce old outputs
+    "legacy": _legacy_order,
+}
+
+
+def get_reading_order(name):
+    """Return fn(dt_boxes) -> boxes in reading order, registered in READING_ORDERS."""
+    if name not in READING_ORDERS:
+        raise ValueError(
+            "reading_order must be one of {}, but got {}".format(
+                list(READING_ORDERS.keys()), name
+            )
+        )
+    return READING_ORDERS[name]
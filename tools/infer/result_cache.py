@@ -0,0 +1,294 @@
+# Copyright (c) 2024 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Content addressed cache of OCR results.
+
+Entries are keyed by a hash of the image content, a fingerprint of the models
+and of the args that change the results, and the call options. They are kept
+in a size bounded SQLite file with LRU eviction, in front of which sits a small
+in-memory LRU of recently used entries.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from ppocr.utils.image_decode import DecodedImage
+from tools.infer.optim_cache import model_digest
+
+__all__ = [
+    "ResultCache",
+    "build_result_cache",
+    "config_fingerprint",
+    "image_digest",
+    "DET_ARGS",
+    "REC_ARGS",
+]
+
+# args that change the detected boxes
+DET_ARGS = [
+    "det_algorithm",
+    "det_model_dir",
+    "det_limit_side_len",
+    "det_limit_type",
+    "det_reduced_decode",
+    # the zero padding of the images of a det batch
+    "det_batch_num",
+    "det_batch_bucket_step",
+    "det_box_type",
+    "det_db_thresh",
+    "det_db_box_thresh",
+    "det_db_unclip_ratio",
+    "use_dilation",
+    "det_db_score_mode",
+    "det_east_score_thresh",
+    "det_east_cover_thresh",
+    "det_east_nms_thresh",
+    "det_sast_score_thresh",
+    "det_sast_nms_thresh",
+    "det_pse_thresh",
+    "det_pse_box_thresh",
+    "det_pse_min_area",
+    "det_pse_scale",
+    "scales",
+    "alpha",
+    "beta",
+    "fourier_degree",
+    "det_fce_nms_mode",
+    "precision",
+    "use_onnx",
+]
+
+# args that change the recognized text, on top of DET_ARGS
+REC_ARGS = [
+    "rec_algorithm",
+    "rec_model_dir",
+    "rec_image_inverse",
+    "rec_image_shape",
+    # the crops that share a rec (or cls) batch are padded to the same width
+    "rec_batch_num",
+    "cls_batch_num",
+    "pdf_page_chunk",
+    "rec_width_buckets",
+    "rec_char_dict_path",
+    "rec_topk",
+    "rec_compact_result",
+    "rec_candidate_dtype",
+    "crop_to_rec_height",
+    "max_text_length",
+    "use_space_char",
+    "merge_repeated",
+    "return_word_box",
+    "drop_score",
+    "reading_order",
+    "use_angle_cls",
+    "cls_model_dir",
+    "cls_image_shape",
+    "label_list",
+    "cls_thresh",
+]
+
+
+def _path_state(path, cache_root=None):
+    """Names and content digest of a model dir or file, so that a new model changes the fingerprint."""
+    if not path or not os.path.exists(path):
+        return path
+    if os.path.isfile(path):
+        return [path, model_digest([path], cache_root)]
+    names = sorted(
+        name for name in os.listdir(path) if os.path.isfile(os.path.join(path, name))
+    )
+    files = [os.path.join(path, name) for name in names]
+    return [path, names, model_digest(files, cache_root)]
+
+
+def config_fingerprint(args, arg_names):
+    """
+    Hash of the given args, model dirs and dict files are hashed with their
+    content (the cls model only with use_angle_cls). The content digests are
+    remembered in --optim_cache_dir when it is set.
+    """
+    cache_root = getattr(args, "optim_cache_dir", None)
+    if cache_root:
+        os.makedirs(cache_root, exist_ok=True)
+    values = {}
+    for name in arg_names:
+        value = getattr(args, name, None)
+        if name.endswith("_model_dir") or name.endswith("_dict_path"):
+            if name != "cls_model_dir" or getattr(args, "use_angle_cls", False):
+                value = _path_state(value, cache_root)
+        values[name] = value
+    data = json.dumps(values, sort_keys=True, default=str)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+def image_digest(img):
+    """Hash of an image array, a DecodedImage or encoded image data."""
+    h = hashlib.blake2b(digest_size=20)
+    if isinstance(img, DecodedImage):
+        h.update(str(img.full_shape).encode("utf-8"))
+        img = img.img
+    if isinstance(img, np.ndarray):
+        img = np.ascontiguousarray(img)
+        h.update("{}{}".format(img.shape, img.dtype).encode("utf-8"))
+        h.update(memoryview(img).cast("B"))
+    else:
+        h.update(img)
+    return h.hexdigest()
+
+
+class ResultCache(object):
+    """
+    Two tier LRU cache of picklable results.
+
+    Args:
+        path(str): SQLite file of the disk tier, ":memory:" keeps it in memory.
+        max_bytes(int): size bound of the disk tier, the least recently used
+            entries are evicted above it.
+        memory_items(int): number of entries of the in-memory tier.
+        det_only(bool): only detection boxes are cached, see TextSystem.detect.
+    """
+
+    def __init__(self, path, max_bytes=1 << 30, memory_items=256, det_only=False):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.memory_items = memory_items
+        self.det_only = det_only
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "puts": 0,
+            "evictions": 0,
+        }
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries "
+            "(key TEXT PRIMARY KEY, value BLOB, size INTEGER, atime REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_atime ON entries(atime)")
+        self._db.commit()
+        self._disk_bytes = self._total_bytes()
+
+    def _total_bytes(self):
+        return self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()[0]
+
+    def _remember(self, key, blob):
+        self._memory[key] = blob
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        """Cached value of `key`, None on a miss."""
+        with self._lock:
+            blob = self._memory.get(key)
+            if blob is not None:
+                self._memory.move_to_end(key)
+                self._counters["memory_hits"] += 1
+            else:
+                row = self._db.execute(
+                    "SELECT value FROM entries WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    self._counters["misses"] += 1
+                    return None
+                blob = row[0]
+                self._db.execute(
+                    "UPDATE entries SET atime = ? WHERE key = ?", (time.time(), key)
+                )
+                self._db.commit()
+                self._remember(key, blob)
+                self._counters["disk_hits"] += 1
+        return pickle.loads(blob)
+
+    def put(self, key, value):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._remember(key, blob)
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, atime) VALUES (?, ?, ?, ?)",
+                (key, blob, len(blob), time.time()),
+            )
+            self._disk_bytes += len(blob)
+            if self._disk_bytes > self.max_bytes:
+                self._evict()
+            self._db.commit()
+            self._counters["puts"] += 1
+
+    def _evict(self):
+        # other processes may share the file, recount before evicting
+        self._disk_bytes = self._total_bytes()
+        excess = self._disk_bytes - self.max_bytes
+        if excess <= 0:
+            return
+        keys = []
+        for key, size in self._db.execute(
+            "SELECT key, size FROM entries ORDER BY atime"
+        ):
+            keys.append((key,))
+            excess -= size
+            self._disk_bytes -= size
+            if excess <= 0:
+                break
+        self._db.executemany("DELETE FROM entries WHERE key = ?", keys)
+        for (key,) in keys:
+            self._memory.pop(key, None)
+        self._counters["evictions"] += len(keys)
+
+    def stats(self):
+        """Hit and miss counters, and the size of both tiers."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["memory_items"] = len(self._memory)
+            stats["disk_bytes"] = self._disk_bytes
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._db.execute("DELETE FROM entries")
+            self._db.commit()
+            self._disk_bytes = 0
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def build_result_cache(args):
+    """ResultCache configured by the args, None when --result_cache_path is not set."""
+    path = getattr(args, "result_cache_path", None)
+    if not path:
+        return None
+    return ResultCache(
+        path,
+        max_bytes=int(args.result_cache_max_mb) << 20,
+        memory_items=args.result_cache_memory_items,
+        det_only=args.result_cache_det_only,
+    )
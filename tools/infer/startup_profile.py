@@ -0,0 +1,138 @@
+# Copyright (c) 2024 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Startup profile, used by `paddleocr --profile-startup`.
+
+The import time of each component is measured with `python -X importtime` in
+a fresh interpreter, a module shared by several components is counted in the
+first one that imports it. The load time of the det, rec and cls stages is the
+time to build their predictors, including the model download.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+from ppocr.utils.logging import get_logger
+from tools.infer.predict_system import STAGE_ATTRS
+
+logger = get_logger()
+
+__all__ = [
+    "component_times",
+    "import_times",
+    "load_times",
+    "parse_importtime",
+    "profile_startup",
+]
+
+
+def parse_importtime(output):
+    """(name, depth, self_us, cumulative_us) of the lines of -X importtime output."""
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3:
+            continue
+        try:
+            self_us, cumulative_us = int(fields[0]), int(fields[1])
+        except ValueError:
+            # the header line
+            continue
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((name.strip(), depth, self_us, cumulative_us))
+    return entries
+
+
+def import_times(module):
+    """Entries of `python -X importtime -c "import module"` in a fresh interpreter."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [path for path in sys.path if path] + [env.get("PYTHONPATH", "")]
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + module],
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError("import {} failed:\n{}".format(module, proc.stderr[-2000:]))
+    return parse_importtime(proc.stderr)
+
+
+def component_times(entries, module):
+    """
+    Total import time of `module` and the (name, cumulative_us) of its direct
+    imports, slowest first.
+    """
+    for idx, (name, depth, _, total_us) in enumerate(entries):
+        if name == module:
+            break
+    else:
+        raise ValueError("{} is not in the importtime entries".format(module))
+    # a module is printed after the modules it imports
+    children = []
+    for name, child_depth, _, cumulative_us in reversed(entries[:idx]):
+        if child_depth <= depth:
+            break
+        if child_depth == depth + 1:
+            children.append((name, cumulative_us))
+    children.sort(key=lambda child: -child[1])
+    return total_us, children
+
+
+def load_times(engine_factory, stages=("det", "rec", "cls")):
+    """The engine and the seconds spent in its constructor and in building each stage."""
+    st = time.perf_counter()
+    engine = engine_factory()
+    times = {"init": time.perf_counter() - st}
+    for stage in stages:
+        if stage == "cls" and not engine.use_angle_cls:
+            continue
+        st = time.perf_counter()
+        getattr(engine, STAGE_ATTRS[stage])
+        times[stage] = time.perf_counter() - st
+    return engine, times
+
+
+def profile_startup(engine_factory, module, top=15, save_path=None):
+    """Log the import and load time per component, optionally saved as json."""
+    total_us, children = component_times(import_times(module), module)
+    logger.info("import {}: {:.1f} ms".format(module, total_us / 1000.0))
+    for name, cumulative_us in children[:top]:
+        logger.info("  {:<48} {:9.1f} ms".format(name, cumulative_us / 1000.0))
+
+    _, times = load_times(engine_factory)
+    for stage, elapse in times.items():
+        logger.info("load {:<4}: {:.1f} ms".format(stage, elapse * 1000))
+
+    profile = {
+        "import_ms": total_us / 1000.0,
+        "import_components_ms": {
+            name: cumulative_us / 1000.0 for name, cumulative_us in children
+        },
+        "load_ms": {stage: elapse * 1000 for stage, elapse in times.items()},
+    }
+    if save_path:
+        with open(save_path, "w", encoding="utf-8") as f:
+            json.dump(profile, f, indent=2)
+        logger.info("startup profile saved to {}".format(save_path))
+    return profile
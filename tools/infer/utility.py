@@ -24,6 +24,7 @@ import math
 from paddle import inference
 import random
 from ppocr.utils.logging import get_logger
+from tools.infer import optim_cache
 
 
 def str2bool(v):
@@ -34,6 +35,19 @@ def str2int_tuple(v):
     return tuple([int(i.strip()) for i in v.split(",")])
 
 
+def get_pdf_options(args):
+    """Options of ppocr.utils.utility.PDFPages taken from the args."""
+    target_side = 0
+    if getattr(args, "pdf_fit_det_limit", False):
+        target_side = int(args.det_limit_side_len)
+    return {
+        "page_num": getattr(args, "page_num", 0),
+        "target_side": target_side,
+        "limit_type": getattr(args, "det_limit_type", "max"),
+        "prefetch": getattr(args, "pdf_prefetch", 0),
+    }
+
+
 def init_args():
     parser = argparse.ArgumentParser()
     # params for prediction engine
@@ -57,10 +71,42 @@ def init_args():
     # params for text detector
     parser.add_argument("--image_dir", type=str)
     parser.add_argument("--page_num", type=int, default=0)
+    parser.add_argument(
+        "--pdf_fit_det_limit",
+        type=str2bool,
+        default=False,
+        help="render pdf pages directly at the size set by det_limit_side_len and det_limit_type",
+    )
+    parser.add_argument(
+        "--pdf_prefetch",
+        type=int,
+        default=0,
+        help="number of pdf pages rendered ahead in a background thread",
+    )
+    parser.add_argument(
+        "--pdf_page_chunk",
+        type=int,
+        default=4,
+        help="number of pdf pages PaddleOCR.ocr processes together, the text lines "
+        "of these pages share cls and rec batches",
+    )
     parser.add_argument("--det_algorithm", type=str, default="DB")
     parser.add_argument("--det_model_dir", type=str)
     parser.add_argument("--det_limit_side_len", type=float, default=960)
     parser.add_argument("--det_limit_type", type=str, default="max")
+    parser.add_argument(
+        "--det_reduced_decode",
+        type=str2bool,
+        default=False,
+        help="decode large jpeg inputs at 1/2, 1/4 or 1/8 resolution for det_limit_type max, text lines lower than the rec input are cropped from the full resolution image",
+    )
+    parser.add_argument("--det_batch_num", type=int, default=1)
+    parser.add_argument(
+        "--det_batch_bucket_step",
+        type=int,
+        default=128,
+        help="det_batch_num > 1 pads the resized images up to multiples of this step, at most det_limit_side_len for det_limit_type max",
+    )
     parser.add_argument("--det_box_type", type=str, default="quad")
 
     # DB params
@@ -69,7 +115,19 @@ def init_args():
     parser.add_argument("--det_db_unclip_ratio", type=float, default=1.5)
     parser.add_argument("--max_batch_size", type=int, default=10)
     parser.add_argument("--use_dilation", type=str2bool, default=False)
-    parser.add_argument("--det_db_score_mode", type=str, default="fast")
+    parser.add_argument(
+        "--det_db_score_mode",
+        type=str,
+        default="fast",
+        help="fast, slow or cc, cc extracts the quad boxes from connected components without a loop over the contours",
+    )
+
+    parser.add_argument(
+        "--det_postprocess_threads",
+        type=int,
+        default=1,
+        help="threads post-processing the images of a det batch (DB, DB++, PSE, CT), the levels of FCE and the slices of an image",
+    )
 
     # EAST params
     parser.add_argument("--det_east_score_thresh", type=float, default=0.8)
@@ -91,6 +149,12 @@ def init_args():
     parser.add_argument("--alpha", type=float, default=1.0)
     parser.add_argument("--beta", type=float, default=1.0)
     parser.add_argument("--fourier_degree", type=int, default=5)
+    parser.add_argument(
+        "--det_fce_nms_mode",
+        type=str,
+        default="poly",
+        help="IoU of the FCE polygon nms: poly (exact) or mask (rasterized, for dense maps)",
+    )
 
     # params for text recognizer
     parser.add_argument("--rec_algorithm", type=str, default="SVTR_LCNet")
@@ -98,13 +162,44 @@ def init_args():
     parser.add_argument("--rec_image_inverse", type=str2bool, default=True)
     parser.add_argument("--rec_image_shape", type=str, default="3, 48, 320")
     parser.add_argument("--rec_batch_num", type=int, default=6)
+    # comma separated padded widths, e.g. "320,480,640,960,1280"; empty pads each batch to its own max width
+    parser.add_argument("--rec_width_buckets", type=str, default="")
+    # text line crops: warp straight to the rec height, threads for crowded pages
+    parser.add_argument("--crop_to_rec_height", type=str2bool, default=False)
+    parser.add_argument("--crop_num_threads", type=int, default=0)
     parser.add_argument("--max_text_length", type=int, default=25)
     parser.add_argument(
         "--rec_char_dict_path", type=str, default="./ppocr/utils/ppocr_keys_v1.txt"
     )
     parser.add_argument("--use_space_char", type=str2bool, default=True)
+    parser.add_argument(
+        "--rec_topk",
+        type=int,
+        default=3,
+        help="Number of candidate characters kept for each recognized character (CTC only)",
+    )
+    parser.add_argument(
+        "--rec_compact_result",
+        type=str2bool,
+        default=False,
+        help="Return CTC candidates as a NumPy-backed RecCandidates object instead of per-character dicts",
+    )
+    parser.add_argument(
+        "--rec_candidate_dtype",
+        type=str,
+        default="float32",
+        help="dtype of the candidate scores in compact results, float16 or float32",
+    )
     parser.add_argument("--vis_font_path", type=str, default="./doc/fonts/simfang.ttf")
     parser.add_argument("--drop_score", type=float, default=0.5)
+    parser.add_argument(
+        "--reading_order",
+        type=str,
+        default="legacy",
+        help="box order of the results, legacy (the order of sorted_boxes), "
+        "horizontal_ltr, vertical_rtl or vertical_ltr; the clustering orders are "
+        "O(n log n) and keep drifting columns together, but differ from legacy",
+    )
 
     # params for e2e
     parser.add_argument("--e2e_algorithm", type=str, default="PGNet")
@@ -130,8 +225,20 @@ def init_args():
 
     parser.add_argument("--enable_mkldnn", type=str2bool, default=False)
     parser.add_argument("--cpu_threads", type=int, default=10)
+    parser.add_argument(
+        "--predictor_pool_size",
+        type=int,
+        default=1,
+        help="predictor clones per model for concurrent calls, "
+        "0 to use cpu_count // cpu_threads",
+    )
     parser.add_argument("--use_pdserving", type=str2bool, default=False)
-    parser.add_argument("--warmup", type=str2bool, default=False)
+    parser.add_argument(
+        "--warmup",
+        type=str2bool,
+        default=False,
+        help="run the predictors on the det sizes and rec widths of real inputs at startup",
+    )
 
     # SR params
     parser.add_argument("--sr_model_dir", type=str)
@@ -143,6 +250,26 @@ def init_args():
     parser.add_argument("--save_crop_res", type=str2bool, default=False)
     parser.add_argument("--crop_res_save_dir", type=str, default="./output")
 
+    # pipelined det -> cls -> rec across pages
+    parser.add_argument("--use_pipeline", type=str2bool, default=False)
+    parser.add_argument("--pipeline_queue_size", type=int, default=4)
+
+    # content addressed result cache
+    parser.add_argument(
+        "--result_cache_path",
+        type=str,
+        default="",
+        help="sqlite file of the ocr result cache, empty to disable the cache",
+    )
+    parser.add_argument("--result_cache_max_mb", type=int, default=1024)
+    parser.add_argument("--result_cache_memory_items", type=int, default=256)
+    parser.add_argument(
+        "--result_cache_det_only",
+        type=str2bool,
+        default=False,
+        help="only cache detection boxes, so that changes of the rec config still reuse det",
+    )
+
     # multi-process
     parser.add_argument("--use_mp", type=str2bool, default=False)
     parser.add_argument("--total_process_num", type=int, default=1)
@@ -153,6 +280,36 @@ def init_args():
 
     parser.add_argument("--show_log", type=str2bool, default=True)
     parser.add_argument("--use_onnx", type=str2bool, default=False)
+    parser.add_argument(
+        "--lazy_model_init",
+        type=str2bool,
+        default=True,
+        help="build the det, rec and cls predictors of TextSystem on first use",
+    )
+    parser.add_argument(
+        "--metrics_sample_rate",
+        type=float,
+        default=0.0,
+        help="fraction of the requests whose stages are timed, 0 turns the instrumentation off",
+    )
+    parser.add_argument(
+        "--metrics_json_path",
+        type=str,
+        default=None,
+        help="append the stage timings of every sampled request to this file as json lines",
+    )
+    parser.add_argument(
+        "--metrics_port",
+        type=int,
+        default=0,
+        help="serve the metrics in the Prometheus text format on http://0.0.0.0:port/metrics",
+    )
+    parser.add_argument(
+        "--optim_cache_dir",
+        type=str,
+        default=None,
+        help="save the optimized models here and load them on the next start",
+    )
     parser.add_argument("--onnx_providers", nargs="+", type=str, default=False)
     parser.add_argument("--onnx_sess_options", type=list, default=False)
 
@@ -203,6 +360,23 @@ def create_predictor(args, mode, logger):
             raise ValueError("not find model file path {}".format(model_file_path))
 
         sess_options = args.onnx_sess_options or None
+        # the optimized graph is only cached with the default session options
+        optim_dir = None
+        if sess_options is None:
+            optim_dir = optim_cache.model_cache_dir(args, mode, [model_file_path])
+        if optim_dir is not None:
+            sess_options = ort.SessionOptions()
+            optimized_path, saved = optim_cache.onnx_optimized_path(optim_dir)
+            if saved:
+                model_file_path = optimized_path
+                sess_options.graph_optimization_level = (
+                    ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+                )
+            else:
+                os.makedirs(optim_dir, exist_ok=True)
+                sess_options.optimized_model_filepath = "{}.{}".format(
+                    optimized_path, os.getpid()
+                )
 
         if args.onnx_providers and len(args.onnx_providers) > 0:
             sess = ort.InferenceSession(
@@ -227,6 +401,8 @@ def create_predictor(args, mode, logger):
                 providers=["CPUExecutionProvider"],
                 sess_options=sess_options,
             )
+        if optim_dir is not None and not saved:
+            os.replace(sess_options.optimized_model_filepath, optimized_path)
         inputs = sess.get_inputs()
         return (
             sess,
@@ -258,7 +434,14 @@ def create_predictor(args, mode, logger):
         else:
             model_file_path = f"{model_dir}/{file_name}.pdmodel"
 
-        config = inference.Config(model_file_path, params_file_path)
+        optim_dir = optim_cache.model_cache_dir(
+            args, mode, [model_file_path, params_file_path]
+        )
+        optimized_model = optim_cache.paddle_optimized_model(optim_dir)
+        if optimized_model is not None:
+            config = inference.Config(*optimized_model)
+        else:
+            config = inference.Config(model_file_path, params_file_path)
 
         if hasattr(args, "precision"):
             if args.precision == "fp16" and args.use_tensorrt:
@@ -354,22 +537,52 @@ def create_predictor(args, mode, logger):
         if mode == "table":
             config.delete_pass("fc_fuse_pass")  # not supported for table
         config.switch_use_feed_fetch_ops(False)
-        config.switch_ir_optim(True)
+        # the cached program is already optimized
+        config.switch_ir_optim(optimized_model is None)
+        optim_tmp_dir = None
+        if optim_dir is not None and optimized_model is None:
+            if args.use_tensorrt:
+                # the serialized trt engines are reused
+                config.set_optim_cache_dir(optim_dir)
+            elif hasattr(
+                config, "enable_save_optim_model"
+            ) and not optim_cache.is_unsupported(optim_dir):
+                optim_tmp_dir = "{}.{}".format(optim_dir, os.getpid())
+                os.makedirs(optim_tmp_dir, exist_ok=True)
+                config.set_optim_cache_dir(optim_tmp_dir)
+                config.enable_save_optim_model(True)
 
         # create predictor
-        predictor = inference.create_predictor(config)
-        input_names = predictor.get_input_names()
-        if mode in ["ser", "re"]:
-            input_tensor = []
-            for name in input_names:
-                input_tensor.append(predictor.get_input_handle(name))
-        else:
-            for name in input_names:
-                input_tensor = predictor.get_input_handle(name)
+        try:
+            predictor = inference.create_predictor(config)
+        except Exception as e:
+            if optimized_model is None:
+                raise
+            logger.warning(
+                "failed to load the optimized {} model from {}, it is optimized "
+                "again from now on: {}".format(mode, optim_dir, e)
+            )
+            optim_cache.mark_unsupported(optim_dir, e)
+            return create_predictor(args, mode, logger)
+        if optim_tmp_dir is not None:
+            optim_cache.publish(optim_tmp_dir, optim_dir)
+        input_tensor = get_input_tensor(mode, predictor)
         output_tensors = get_output_tensors(args, mode, predictor)
         return predictor, input_tensor, output_tensors, config
 
 
+def get_input_tensor(mode, predictor):
+    input_names = predictor.get_input_names()
+    if mode in ["ser", "re"]:
+        input_tensor = []
+        for name in input_names:
+            input_tensor.append(predictor.get_input_handle(name))
+    else:
+        for name in input_names:
+            input_tensor = predictor.get_input_handle(name)
+    return input_tensor
+
+
 def get_output_tensors(args, mode, predictor):
     output_names = predictor.get_output_names()
     output_tensors = []
@@ -736,7 +949,8 @@ def get_rotate_crop_image(img, points):
     return dst_img
 
 
-def get_minarea_rect_crop(img, points):
+def get_minarea_rect(points):
+    """Min area rect of `points` as 4 corners in tl, tr, br, bl order."""
     bounding_box = cv2.minAreaRect(np.array(points).astype(np.int32))
     points = sorted(list(cv2.boxPoints(bounding_box)), key=lambda x: x[0])
 
@@ -755,11 +969,17 @@ def get_minarea_rect_crop(img, points):
         index_c = 2
 
     box = [points[index_a], points[index_b], points[index_c], points[index_d]]
-    crop_img = get_rotate_crop_image(img, np.array(box))
+    return np.array(box)
+
+
+def get_minarea_rect_crop(img, points):
+    crop_img = get_rotate_crop_image(img, get_minarea_rect(points))
     return crop_img
 
 
-def slice_generator(image, horizontal_stride, vertical_stride, maximum_slices=500):
+def slice_generator(
+    image, horizontal_stride, vertical_stride, maximum_slices=500, overlap=0
+):
     if not isinstance(image, np.ndarray):
         image = np.array(image)
 
@@ -789,11 +1009,11 @@ def slice_generator(image, horizontal_stride, vertical_stride, maximum_slices=50
 
     for v_slice_idx in range(vertical_num_slices):
         v_start = max(0, (v_slice_idx * vertical_stride))
-        v_end = min(((v_slice_idx + 1) * vertical_stride), image_h)
+        v_end = min(((v_slice_idx + 1) * vertical_stride) + overlap, image_h)
         vertical_slice = image[v_start:v_end, :]
         for h_slice_idx in range(horizontal_num_slices):
             h_start = max(0, (h_slice_idx * horizontal_stride))
-            h_end = min(((h_slice_idx + 1) * horizontal_stride), image_w)
+            h_end = min(((h_slice_idx + 1) * horizontal_stride) + overlap, image_w)
             horizontal_slice = vertical_slice[:, h_start:h_end]
 
             yield (horizontal_slice, v_start, h_start)
@@ -830,31 +1050,197 @@ def merge_boxes(box1, box2, x_threshold, y_threshold):
         return None
 
 
-def merge_fragmented(boxes, x_threshold=10, y_threshold=10):
-    merged_boxes = []
-    visited = set()
+def _find_root(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
 
-    for i, box1 in enumerate(boxes):
-        if i in visited:
-            continue
 
-        merged_box = [point[:] for point in box1]
+def merge_fragmented(
+    boxes, x_threshold=10, y_threshold=10, direction="horizontal", max_overlap=0
+):
+    """
+    Merge the fragments of text lines cut by slice borders in one pass.
 
-        for j, box2 in enumerate(boxes[i + 1 :], start=i + 1):
-            if j not in visited:
-                merged_result = merge_boxes(
-                    merged_box, box2, x_threshold=x_threshold, y_threshold=y_threshold
-                )
-                if merged_result:
-                    merged_box = merged_result
-                    visited.add(j)
+    Two boxes are joined horizontally when their top and bottom edges are
+    within y_threshold and the right edge of one is within x_threshold of the
+    left edge of the other; vertically (for vertical text) when their left and
+    right edges are within x_threshold and the bottom of one is within
+    y_threshold of the top of the other. Candidate pairs come from a grid of
+    the top-left corners, joined boxes are grouped with union-find and every
+    group becomes its bounding box (boxes that join nothing are kept as is).
 
-        merged_boxes.append(merged_box)
+    args:
+        boxes(array|list): axis-aligned boxes, shape [N, 4, 2]
+        direction(str): "horizontal", "vertical" or "both"
+        max_overlap(int): fragments may also overlap by up to this many pixels,
+            as those of overlapping slices do
+    return:
+        merged boxes(array) with shape [M, 4, 2], in order of their first fragment
+    """
+    assert direction in [
+        "horizontal",
+        "vertical",
+        "both",
+    ], "direction must be horizontal, vertical or both, but got {}".format(direction)
+    boxes = np.asarray(boxes, dtype=np.float32)
+    num = len(boxes)
+    if num == 0:
+        return np.zeros((0, 4, 2), dtype=np.float32)
+    min_xy = boxes.min(axis=1)
+    max_xy = boxes.max(axis=1)
+    min_x, min_y = min_xy[:, 0].tolist(), min_xy[:, 1].tolist()
+    max_x, max_y = max_xy[:, 0].tolist(), max_xy[:, 1].tolist()
+
+    cell_w = max(float(x_threshold), 1.0)
+    cell_h = max(float(y_threshold), 1.0)
+    grid = {}
+    for i in range(num):
+        key = (int(math.floor(min_x[i] / cell_w)), int(math.floor(min_y[i] / cell_h)))
+        grid.setdefault(key, []).append(i)
+
+    def neighbours(x_lo, x_hi, y_lo, y_hi):
+        for cx in range(
+            int(math.floor(x_lo / cell_w)), int(math.floor(x_hi / cell_w)) + 1
+        ):
+            for cy in range(
+                int(math.floor(y_lo / cell_h)), int(math.floor(y_hi / cell_h)) + 1
+            ):
+                for j in grid.get((cx, cy), ()):
+                    yield j
+
+    parent = list(range(num))
+
+    def union(i, j):
+        root_i, root_j = _find_root(parent, i), _find_root(parent, j)
+        if root_i != root_j:
+            # the earlier box stays the root so the output keeps the input order
+            parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    for i in range(num):
+        if direction in ["horizontal", "both"]:
+            # boxes starting where box i ends, on the same line
+            for j in neighbours(
+                max_x[i] - x_threshold - max_overlap,
+                max_x[i] + x_threshold,
+                min_y[i] - y_threshold,
+                min_y[i] + y_threshold,
+            ):
+                if (
+                    j != i
+                    and -x_threshold - max_overlap <= min_x[j] - max_x[i] <= x_threshold
+                    and min_x[j] > min_x[i]
+                    and abs(min_y[i] - min_y[j]) <= y_threshold
+                    and abs(max_y[i] - max_y[j]) <= y_threshold
+                ):
+                    union(i, j)
+        if direction in ["vertical", "both"]:
+            # boxes starting where box i ends, in the same column
+            for j in neighbours(
+                min_x[i] - x_threshold,
+                min_x[i] + x_threshold,
+                max_y[i] - y_threshold - max_overlap,
+                max_y[i] + y_threshold,
+            ):
+                if (
+                    j != i
+                    and -y_threshold - max_overlap <= min_y[j] - max_y[i] <= y_threshold
+                    and min_y[j] > min_y[i]
+                    and abs(min_x[i] - min_x[j]) <= x_threshold
+                    and abs(max_x[i] - max_x[j]) <= x_threshold
+                ):
+                    union(i, j)
+
+    roots = np.array([_find_root(parent, i) for i in range(num)])
+    uniq_roots, labels = np.unique(roots, return_inverse=True)
+    group_min = np.full((len(uniq_roots), 2), np.inf, dtype=np.float32)
+    group_max = np.full((len(uniq_roots), 2), -np.inf, dtype=np.float32)
+    np.minimum.at(group_min, labels, min_xy)
+    np.maximum.at(group_max, labels, max_xy)
+    merged = np.stack(
+        [
+            group_min,
+            np.stack([group_max[:, 0], group_min[:, 1]], axis=1),
+            group_max,
+            np.stack([group_min[:, 0], group_max[:, 1]], axis=1),
+        ],
+        axis=1,
+    )
+    single = np.bincount(labels) == 1
+    merged[single] = boxes[uniq_roots[single]]
+    return merged
 
-    if len(merged_boxes) == len(boxes):
-        return np.array(merged_boxes)
-    else:
-        return merge_fragmented(merged_boxes, x_threshold, y_threshold)
+
+def suppress_duplicate_boxes(boxes, cut_flags=None, thresh=0.5, cell_size=256):
+    """
+    Greedy NMS of the detections of overlapping slices.
+
+    cut_flags marks the slice borders a box touches (1: a vertical border,
+    2: a horizontal one), i.e. the directions it may be truncated in. Going
+    from the least cut and largest boxes down, a kept box drops every box it
+    covers by more than `thresh` of that box's area, provided the other box is
+    cut on the same or a superset of its borders. Boxes cut on the same
+    borders must cover each other, so two fragments of one long line are
+    both kept (for merge_fragmented) while identical ones are not. Candidate pairs come from a grid of `cell_size` cells.
+
+    args:
+        boxes(array): shape [N, 4, 2] (the bounding rects are compared)
+        cut_flags(array|None): int [N], None if no box is cut
+    return:
+        keep(array): indices of the kept boxes, in input order
+    """
+    boxes = np.asarray(boxes, dtype=np.float32)
+    num = len(boxes)
+    if num == 0:
+        return np.zeros(0, dtype=np.int64)
+    if cut_flags is None:
+        cut_flags = np.zeros(num, dtype=np.int64)
+    cut_flags = np.asarray(cut_flags, dtype=np.int64)
+    min_xy = boxes.min(axis=1)
+    max_xy = boxes.max(axis=1)
+    areas = np.prod(np.maximum(max_xy - min_xy, 1e-6), axis=1)
+
+    grid = {}
+    cell_lo = np.floor(min_xy / cell_size).astype(np.int64).tolist()
+    cell_hi = np.floor(max_xy / cell_size).astype(np.int64).tolist()
+    for i in range(num):
+        for cx in range(cell_lo[i][0], cell_hi[i][0] + 1):
+            for cy in range(cell_lo[i][1], cell_hi[i][1] + 1):
+                grid.setdefault((cx, cy), []).append(i)
+
+    num_cuts = (cut_flags & 1) + (cut_flags >> 1 & 1)
+    order = np.lexsort((-areas, num_cuts)).tolist()
+    suppressed = np.zeros(num, dtype=bool)
+    for i in order:
+        if suppressed[i]:
+            continue
+        cand = set()
+        for cx in range(cell_lo[i][0], cell_hi[i][0] + 1):
+            for cy in range(cell_lo[i][1], cell_hi[i][1] + 1):
+                cand.update(grid[(cx, cy)])
+        cand.discard(i)
+        cand = np.array([j for j in cand if not suppressed[j]], dtype=np.int64)
+        if len(cand) == 0:
+            continue
+        flags = cut_flags[cand]
+        allowed = (cut_flags[i] & ~flags) == 0
+        same_cut = (flags == cut_flags[i]) & (cut_flags[i] != 0)
+        inter = np.prod(
+            np.clip(
+                np.minimum(max_xy[cand], max_xy[i])
+                - np.maximum(min_xy[cand], min_xy[i]),
+                0,
+                None,
+            ),
+            axis=1,
+        )
+        covered = inter / areas[cand] > thresh
+        # boxes cut on the same borders may be fragments of one line, they
+        # are only duplicates when they also cover the kept box
+        covered &= ~same_cut | (inter / areas[i] > thresh)
+        suppressed[cand[allowed & covered]] = True
+    return np.nonzero(~suppressed)[0]
 
 
 def check_gpu(use_gpu):
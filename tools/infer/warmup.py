@@ -0,0 +1,122 @@
+# Copyright (c) 2024 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Warmup of the det, cls and rec predictors of a TextSystem.
+
+The first runs of a predictor on a new input shape are slow: oneDNN creates its
+primitives, TensorRT and cuDNN pick their kernels per shape. The plan covers the
+shapes that real inputs produce: pages of common aspect ratios at the det
+size limit, rec batches at each width bucket (or a spread of widths without
+buckets) and full and partial cls batches.
+"""
+
+import time
+
+import numpy as np
+
+from ppocr.utils.logging import get_logger
+
+logger = get_logger()
+
+__all__ = ["plan_warmup", "run_warmup"]
+
+
+def _det_sizes(args):
+    side = int(args.det_limit_side_len)
+    if args.det_limit_type == "min":
+        # the short side is resized to the limit
+        return [
+            (side, side),
+            (side, side * 4 // 3),
+            (side * 4 // 3, side),
+            (side, side * 2),
+        ]
+    # the long side is resized down to the limit, smaller images keep their size
+    return [
+        (side, side),
+        (side * 3 // 4, side),
+        (side, side * 3 // 4),
+        (side // 2, side),
+        (side // 2, side // 2),
+    ]
+
+
+def _rec_widths(args):
+    _, img_h, img_w = [int(v) for v in args.rec_image_shape.split(",")]
+    buckets = [int(v) for v in args.rec_width_buckets.split(",") if v.strip()]
+    # crops are never padded below the rec input width
+    widths = sorted(set(w for w in buckets if w >= img_w))
+    if not widths:
+        widths = [img_w, img_w * 3 // 2, img_w * 2, img_w * 3]
+    return img_h, widths
+
+
+def plan_warmup(args):
+    """
+    Shapes replayed by run_warmup:
+        det: (height, width, batch size) of the input images
+        rec: (height, width, batch size) of the text line crops
+        cls: (height, width, batch size) of the text line crops
+    """
+    det = [(h, w, 1) for h, w in _det_sizes(args)]
+    if args.det_batch_num > 1:
+        h, w = det[2][:2]
+        det.append((h, w, args.det_batch_num))
+
+    img_h, widths = _rec_widths(args)
+    rec = [(img_h, w, args.rec_batch_num) for w in widths]
+    if args.rec_batch_num > 1:
+        # the last batch of an image is usually partial
+        rec.append((img_h, widths[0], 1))
+
+    cls = []
+    if args.use_angle_cls:
+        _, cls_h, cls_w = [int(v) for v in args.cls_image_shape.split(",")]
+        cls = [(cls_h, cls_w, args.cls_batch_num)]
+        if args.cls_batch_num > 1:
+            cls.append((cls_h, cls_w, 1))
+    return {"det": det, "cls": cls, "rec": rec}
+
+
+def run_warmup(text_system, plan=None, rounds=2):
+    """
+    Run the stages of text_system on every shape of the plan (plan_warmup by
+    default) `rounds` times. Returns the seconds spent per stage.
+    """
+    if plan is None:
+        plan = plan_warmup(text_system.args)
+    times = {}
+    for stage in ["det", "cls", "rec"]:
+        if not plan.get(stage):
+            continue
+        st = time.time()
+        for h, w, batch in plan[stage]:
+            # blank images, the content does not change the predictor run
+            img = np.full((h, w, 3), 255, dtype=np.uint8)
+            for _ in range(rounds):
+                if stage == "det" and batch == 1:
+                    text_system.text_detector(img)
+                elif stage == "det":
+                    text_system.text_detector.predict_batch([img] * batch)
+                elif stage == "cls":
+                    text_system.text_classifier([img] * batch)
+                else:
+                    text_system.text_recognizer([img] * batch)
+        times[stage] = time.time() - st
+        logger.debug(
+            "warmup {}: {} shapes in {:.3f}s".format(
+                stage, len(plan[stage]), times[stage]
+            )
+        )
+    return times